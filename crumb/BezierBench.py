@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# キー登録（補間曲線の分割）のベンチマーク
+# 補間曲線を設定した合成モーションに、全フレームのキーを登録し、1秒あたりの登録回数を計測する
+# python BezierBench.py
+import sys
+import time
+import random
+import pathlib
+# このソースのあるディレクトリの絶対パスを取得
+current_dir = pathlib.Path(__file__).resolve().parent
+# モジュールのあるパスを追加
+sys.path.append(str(current_dir) + '/../')
+sys.path.append(str(current_dir) + '/../src/')
+sys.path.append(str(current_dir))
+
+from utils import MBezierUtils # noqa
+from utils.MLogger import MLogger # noqa
+from GlobalPosBench import create_bench_model, create_bench_motion # noqa
+
+
+logger = MLogger(__name__, level=MLogger.INFO)
+
+# 補間曲線の制御点（MMDの範囲内に収まるものと、収まらないもの（分割される）を混ぜる）
+BENCH_INTERPOLATIONS = [(20, 20, 107, 107), (64, 0, 64, 127), (127, 0, 0, 127), (10, 100, 30, 120), (100, 10, 120, 30), (0, 127, 127, 0)]
+
+
+def set_bench_interpolation(motion):
+    random.seed(0)
+
+    for bone_name, bfs in motion.bones.items():
+        for bf in bfs.values():
+            interpolation = list(bf.interpolation)
+
+            for bz_type in [MBezierUtils.BZ_TYPE_R, MBezierUtils.BZ_TYPE_MX, MBezierUtils.BZ_TYPE_MY, MBezierUtils.BZ_TYPE_MZ]:
+                x1v, y1v, x2v, y2v = random.choice(BENCH_INTERPOLATIONS)
+
+                for idxs, value in zip(MBezierUtils.from_bz_type(bz_type), [x1v, y1v, x2v, y2v]):
+                    for idx in idxs:
+                        interpolation[idx] = value
+
+            bf.interpolation = interpolation
+
+
+def main():
+    last_fno = 300
+
+    model = create_bench_model()
+    motion = create_bench_motion(model, last_fno)
+    set_bench_interpolation(motion)
+
+    # 既存キーの間のフレームに、キーを登録していく
+    regist_fnos = [fno for fno in range(last_fno) if fno % 5 != 0]
+
+    start = time.perf_counter()
+    for bone_name in model.bones.keys():
+        for fno in regist_fnos:
+            motion.regist_bf(motion.calc_bf(bone_name, fno), bone_name, fno)
+    elapsed = time.perf_counter() - start
+
+    regist_count = len(model.bones) * len(regist_fnos)
+    logger.info("キー登録(%sボーン): %s回 %.3f秒 (%.1f 回/秒)", len(model.bones), regist_count, elapsed, regist_count / elapsed)
+    logger.info("補間曲線の表: hit=%s, miss=%s, 破棄=%s, 保持=%s", *MBezierUtils.bezier_lut_cache.counts())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# OneEuroフィルターのベンチマーク
+# ボーン・モーフのフィルター（smooth_filter_bf・smooth_filter_mf）と、トラック一括のフィルター（filter_values）を
+# 1件ずつかけた場合・複数スレッドでボーンごとにかけた場合と比較する
+# python FilterBench.py [VMDパス]（指定がない場合は合成モーション）
+import sys
+import time
+import pathlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+# このソースのあるディレクトリの絶対パスを取得
+current_dir = pathlib.Path(__file__).resolve().parent
+# モジュールのあるパスを追加
+sys.path.append(str(current_dir) + '/../')
+sys.path.append(str(current_dir) + '/../src/')
+sys.path.append(str(current_dir))
+
+from mmd.VmdReader import VmdReader # noqa
+from mmd.VmdData import VmdMorphFrame, OneEuroFilter, filter_values # noqa
+from utils.MLogger import MLogger # noqa
+from InfectionBench import BENCH_INFECTION_BONES, create_infection_motion # noqa
+
+
+logger = MLogger(__name__, level=MLogger.INFO)
+
+BENCH_FILTER_CONFIG = {"freq": 30, "mincutoff": 0.3, "beta": 0.01, "dcutoff": 0.25}
+
+# 計測対象モーフ（合成モーションの場合）
+BENCH_FILTER_MORPHS = ["あ", "い", "う", "まばたき"]
+
+
+def create_filter_motion(last_fno: int):
+    motion = create_infection_motion(last_fno)
+
+    for morph_idx, morph_name in enumerate(BENCH_FILTER_MORPHS):
+        for fno in range(last_fno):
+            mf = VmdMorphFrame(fno)
+            mf.set_name(morph_name)
+            mf.ratio = max(0, np.sin((fno + morph_idx * 7) / 9) + np.sin(fno / 2) * 0.1)
+            mf.key = True
+            motion.regist_mf(mf, morph_name, fno)
+
+    return motion
+
+
+def main():
+    last_fno = 3000
+
+    if len(sys.argv) > 1:
+        motion = VmdReader(sys.argv[1]).read_data()
+        bone_names = [bone_name for bone_name, bfs in motion.bones.items() if len(bfs) > 2]
+        morph_names = [morph_name for morph_name, mfs in motion.morphs.items() if len(mfs) > 2]
+    else:
+        motion = create_filter_motion(last_fno)
+        bone_names = BENCH_INFECTION_BONES
+        morph_names = BENCH_FILTER_MORPHS
+
+    start = time.perf_counter()
+    for bone_name in bone_names:
+        motion.smooth_filter_bf(0, bone_name, True, True, mconfig=BENCH_FILTER_CONFIG, is_show_log=False)
+    elapsed = time.perf_counter() - start
+
+    logger.info("ボーンフィルター(%sボーン): %.3f秒", len(bone_names), elapsed)
+
+    start = time.perf_counter()
+    for morph_name in morph_names:
+        motion.smooth_filter_mf(0, morph_name, loop=2, config=BENCH_FILTER_CONFIG, is_show_log=False)
+    elapsed = time.perf_counter() - start
+
+    logger.info("モーフフィルター(%sモーフ): %.3f秒", len(morph_names), elapsed)
+
+    # トラック一括のフィルター（移動XYZ＋회전）
+    tracks = []
+    for bone_name in bone_names:
+        bfs = [motion.calc_bf(bone_name, fno) for fno in motion.get_bone_fnos(bone_name)]
+        tracks.append((np.array([[bf.position.x(), bf.position.y(), bf.position.z()] for bf in bfs]), \
+                       np.array([[bf.rotation.scalar(), bf.rotation.x(), bf.rotation.y(), bf.rotation.z()] for bf in bfs])))
+    # 計測用に長くする
+    tracks = [(np.tile(positions, (100, 1)), np.tile(rotations, (100, 1))) for positions, rotations in tracks]
+    value_count = sum([positions.shape[0] for positions, _ in tracks])
+
+    def filter_track(track):
+        return filter_values(track[0], BENCH_FILTER_CONFIG), filter_values(track[1], BENCH_FILTER_CONFIG, is_quaternion=True)
+
+    start = time.perf_counter()
+    for positions, _ in tracks[:1]:
+        filters = [OneEuroFilter(**BENCH_FILTER_CONFIG) for _ in range(3)]
+        [[filters[col](positions[n, col]) for col in range(3)] for n in range(positions.shape[0])]
+    elapsed = time.perf_counter() - start
+
+    logger.info("1件ずつ(移動のみ, 1ボーン): %.3f秒 (%.1f フレーム/秒)", elapsed, tracks[0][0].shape[0] / elapsed)
+
+    start = time.perf_counter()
+    serial_results = [filter_track(track) for track in tracks]
+    elapsed = time.perf_counter() - start
+
+    logger.info("一括(%sボーン): %.3f秒 (%.1f フレーム/秒)", len(tracks), elapsed, value_count / elapsed)
+
+    for max_workers in [2, 4]:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            thread_results = list(executor.map(filter_track, tracks))
+        elapsed = time.perf_counter() - start
+
+        is_same = all([np.array_equal(sp, tp) and np.array_equal(sr, tr) for (sp, sr), (tp, tr) in zip(serial_results, thread_results)])
+        logger.info("一括(%sボーン, %sスレッド): %.3f秒 (%.1f フレーム/秒), 結果一致=%s", len(tracks), max_workers, elapsed, value_count / elapsed, is_same)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+#
+# グローバル位置計算（FK）のベンチマーク
+# 腕・足のリンクについて、1秒あたりに計算できるチェーン数を計測する
+# python GlobalPosBench.py [PMXパス VMDパス]（指定がない場合は合成モデル・合成モーション）
+import sys
+import time
+import random
+import pathlib
+# このソースのあるディレクトリの絶対パスを取得
+current_dir = pathlib.Path(__file__).resolve().parent
+# モジュールのあるパスを追加
+sys.path.append(str(current_dir) + '/../')
+sys.path.append(str(current_dir) + '/../src/')
+
+from mmd.PmxReader import PmxReader # noqa
+from mmd.VmdReader import VmdReader # noqa
+from mmd.PmxData import PmxModel, Bone # noqa
+from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdPoseCache # noqa
+from module.MMath import MVector3D, MQuaternion # noqa
+from module.MParams import BoneLinks # noqa
+from utils import MServiceUtils # noqa
+from utils.MLogger import MLogger # noqa
+
+
+MLogger.initialize(level=MLogger.INFO, is_file=False)
+logger = MLogger(__name__, level=MLogger.INFO)
+
+# 合成モデルのボーン（名前, 位置, 親ボーン名）
+BENCH_BONES = [
+    ("全ての親", MVector3D(0, 0, 0), None),
+    ("センター", MVector3D(0, 8, 0), "全ての親"),
+    ("グルーブ", MVector3D(0, 8.2, 0), "センター"),
+    ("腰", MVector3D(0, 10, 0.5), "グルーブ"),
+    ("上半身", MVector3D(0, 11.5, 0.2), "腰"),
+    ("上半身2", MVector3D(0, 12.5, 0.2), "上半身"),
+    ("右肩", MVector3D(-0.6, 15.5, 0.3), "上半身2"),
+    ("右腕", MVector3D(-1.5, 15.2, 0.4), "右肩"),
+    ("右ひじ", MVector3D(-3.5, 13.5, 0.5), "右腕"),
+    ("右手首", MVector3D(-5.2, 11.8, 0.2), "右ひじ"),
+    ("下半身", MVector3D(0, 11.5, 0.2), "腰"),
+    ("右足", MVector3D(-0.9, 10.5, 0.1), "下半身"),
+    ("右ひざ", MVector3D(-1.0, 5.8, -0.1), "右足"),
+    ("右足首", MVector3D(-1.0, 1.2, 0.4), "右ひざ"),
+]
+
+BENCH_CHAINS = {
+    "腕": ["全ての親", "センター", "グルーブ", "腰", "上半身", "上半身2", "右肩", "右腕", "右ひじ", "右手首"],
+    "足": ["全ての親", "センター", "グルーブ", "腰", "下半身", "右足", "右ひざ", "右足首"],
+}
+
+
+def create_bench_model():
+    model = PmxModel()
+    model.name = "bench"
+
+    for bidx, (bone_name, position, parent_name) in enumerate(BENCH_BONES):
+        parent_index = model.bones[parent_name].index if parent_name else -1
+        bone = Bone(bone_name, bone_name, position, parent_index, 0, 0x0001 | 0x0002 | 0x0004 | 0x0008 | 0x0010)
+        bone.index = bidx
+        model.bones[bone_name] = bone
+        model.bone_indexes[bidx] = bone_name
+
+    return model
+
+
+def create_bench_motion(model: PmxModel, last_fno: int):
+    motion = VmdMotion()
+    random.seed(0)
+
+    for bone_name in model.bones.keys():
+        for fno in range(0, last_fno + 1, 5):
+            bf = VmdBoneFrame(fno)
+            bf.set_name(bone_name)
+            bf.key = True
+            bf.read = True
+            bf.position = MVector3D(random.uniform(-1, 1), random.uniform(-1, 1), random.uniform(-1, 1))
+            bf.rotation = MQuaternion.fromEulerAngles(random.uniform(-45, 45), random.uniform(-45, 45), random.uniform(-45, 45))
+            motion.append_bone_frame(bf)
+
+    motion.last_motion_frame = last_fno
+
+    return motion
+
+
+def create_bench_links(model: PmxModel, bone_names: list):
+    links = BoneLinks()
+
+    for bone_name in bone_names:
+        links.append(model.bones[bone_name])
+
+    return links
+
+
+def main():
+    last_fno = 1000
+
+    if len(sys.argv) > 2:
+        model = PmxReader(sys.argv[1], is_check=False).read_data()
+        motion = VmdReader(sys.argv[2]).read_data()
+        last_fno = min(last_fno, motion.last_motion_frame)
+        target_links = {"腕": model.create_link_2_top_one("右手首"), "足": model.create_link_2_top_one("右足首")}
+    else:
+        model = create_bench_model()
+        motion = create_bench_motion(model, last_fno)
+        target_links = {chain_name: create_bench_links(model, bone_names) for chain_name, bone_names in BENCH_CHAINS.items()}
+
+    for pose_cache in [None, VmdPoseCache()]:
+        # キャッシュありの場合、参照専用のスナップショットで計測する
+        target_motion = motion if pose_cache is None else motion.snapshot()
+        target_motion.pose_cache = pose_cache
+
+        for chain_name, links in target_links.items():
+            for is_local_x in [False, True]:
+                start = time.perf_counter()
+                for fno in range(last_fno):
+                    MServiceUtils.calc_global_pos(model, links, target_motion, fno, return_matrix=True, is_local_x=is_local_x)
+                elapsed = time.perf_counter() - start
+
+                logger.info("%s(%sボーン, is_local_x=%s, キャッシュ=%s): %sフレーム %.3f秒 (%.1f チェーン/秒)", chain_name, links.size(), is_local_x, pose_cache is not None, \
+                            last_fno, elapsed, last_fno / elapsed)
+
+        if pose_cache is not None:
+            logger.info("キャッシュ: hit=%s, miss=%s, 破棄=%s, 保持=%s", *pose_cache.counts())
+
+    # 全フレームをまとめて計算する
+    start = time.perf_counter()
+    pose_range = MServiceUtils.calc_global_pose_range(model, motion, range(last_fno), list(target_links.values()))
+    elapsed = time.perf_counter() - start
+    logger.info("一括(%sチェーン): %sフレーム %.3f秒 (%.1f チェーン/秒)", len(target_links), last_fno, elapsed, len(target_links) * last_fno / elapsed)
+
+    for chain_name, links in target_links.items():
+        start = time.perf_counter()
+        for fno in range(last_fno):
+            pose_range.calc_global_pos(links, fno, return_matrix=True)
+        elapsed = time.perf_counter() - start
+
+        logger.info("一括から取得 %s(%sボーン): %sフレーム %.3f秒 (%.1f チェーン/秒)", chain_name, links.size(), last_fno, elapsed, last_fno / elapsed)
+
+    # モデルの全ボーン
+    start = time.perf_counter()
+    pose_range = MServiceUtils.calc_global_pose_range(model, motion, range(last_fno))
+    elapsed = time.perf_counter() - start
+    logger.info("一括(全%sボーン): %sフレーム %.3f秒", len(model.bones), last_fno, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# IK計算（c_calc_IK）のベンチマーク
+# 腕・足のチェーンについて、1秒あたりに解けるIKの回数を計測する
+# python IKBench.py
+import sys
+import time
+import pathlib
+# このソースのあるディレクトリの絶対パスを取得
+current_dir = pathlib.Path(__file__).resolve().parent
+# モジュールのあるパスを追加
+sys.path.append(str(current_dir) + '/../')
+sys.path.append(str(current_dir) + '/../src/')
+sys.path.append(str(current_dir))
+
+from module.MMath import MVector3D # noqa
+from module.MParams import BoneLinks # noqa
+from utils import MServiceUtils # noqa
+from utils.MLogger import MLogger # noqa
+from GlobalPosBench import BENCH_CHAINS, create_bench_model, create_bench_motion, create_bench_links # noqa
+
+
+MLogger.initialize(level=MLogger.INFO, is_file=False)
+logger = MLogger(__name__, level=MLogger.INFO)
+
+# IKのリンク（先頭がエフェクタ、末尾が根元）と、エフェクタをずらす量
+BENCH_IK_CHAINS = {
+    "腕": (["右手首", "右ひじ", "右腕"], MVector3D(-0.3, 0.3, 0.2)),
+    "足": (["右足首", "右ひざ", "右足"], MVector3D(0.2, 0.3, -0.3)),
+}
+
+# エフェクタを根元に寄せる割合（目標に届くようにする）
+BENCH_REACH_RATIO = 0.9
+
+
+def main():
+    last_fno = 300
+    max_count = 20
+
+    for chain_name, (ik_bone_names, offset) in BENCH_IK_CHAINS.items():
+        # 前フレームを引き継がない場合の平均反復回数
+        cold_mean_iterations = {}
+        for is_analytic, is_warm_start in [(False, False), (False, True), (True, False), (True, True)]:
+            model = create_bench_model()
+            motion = create_bench_motion(model, last_fno)
+            links = create_bench_links(model, BENCH_CHAINS[chain_name])
+
+            ik_links = BoneLinks()
+            for bone_name in ik_bone_names:
+                model.bones[bone_name].degree_limit = 57.0
+                ik_links.append(model.bones[bone_name])
+
+            # 目標位置は、元のエフェクタ位置を根元に寄せて、一定量ずらした所
+            targets = []
+            for fno in range(last_fno):
+                global_3ds = MServiceUtils.calc_global_pos(model, links, motion, fno)
+                root_pos = global_3ds[ik_bone_names[-1]]
+                targets.append(root_pos + (global_3ds[ik_bone_names[0]] - root_pos) * BENCH_REACH_RATIO + offset)
+
+            # キー登録（補間曲線の分割）はIK計算以外のコストなので、計測前に済ませておく
+            for fno in range(last_fno):
+                for bone_name in ik_bone_names[1:]:
+                    motion.regist_bf(motion.calc_bf(bone_name, fno), bone_name, fno)
+
+            MServiceUtils.ik_solve_stats.reset_counts()
+            # 引き継がない場合も、反復回数は記録する
+            warm_start = MServiceUtils.IKWarmStart(is_warm=is_warm_start)
+
+            distance = 0
+            start = time.perf_counter()
+            for fno in range(last_fno):
+                MServiceUtils.calc_IK(model, links, motion, fno, targets[fno], ik_links, max_count=max_count, is_analytic=is_analytic, warm_start=warm_start)
+            elapsed = time.perf_counter() - start
+
+            for fno in range(last_fno):
+                global_3ds = MServiceUtils.calc_global_pos(model, links, motion, fno)
+                distance += (global_3ds[ik_bone_names[0]] - targets[fno]).length()
+
+            logger.info("%s(%sボーン, IK%sボーン, 最大%s回, 解析解=%s, 前フレーム引継=%s): %sフレーム %.3f秒 (%.1f 回/秒, 平均残差 %.5f)", chain_name, links.size(), \
+                        len(ik_bone_names), max_count, is_analytic, is_warm_start, last_fno, elapsed, last_fno / elapsed, distance / last_fno)
+            logger.info("解析解=%s, CCD=%s, 解析解からCCDに切り替え=%s", *[c for n, c in enumerate(MServiceUtils.ik_solve_stats.counts()) if n in (0, 2, 4)])
+            logger.info("収束=%s/%s, 前フレーム引継=%s, 平均反復回数=%.2f, 反復回数別フレーム数=%s", warm_start.converged_count, warm_start.solve_count, \
+                        warm_start.warm_count, warm_start.mean_iterations(), warm_start.counts()[3])
+
+            # 前フレームを引き継いだCCDは、引き継がない場合より少ない反復回数で解ける
+            if not is_warm_start:
+                cold_mean_iterations[is_analytic] = warm_start.mean_iterations()
+            elif not is_analytic:
+                assert warm_start.mean_iterations() < cold_mean_iterations[is_analytic], \
+                    "{0}: {1:.2f} >= {2:.2f}".format(chain_name, warm_start.mean_iterations(), cold_mean_iterations[is_analytic])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# 変曲点・キー追加対象フレーム・유연화のベンチマーク
+# 補間曲線を設定した合成モーションについて、get_differ_fnos・smooth_bf・smooth_filter_bf の処理時間を計測する
+# python InfectionBench.py [VMDパス]（指定がない場合は合成モーション）
+import sys
+import time
+import pathlib
+# このソースのあるディレクトリの絶対パスを取得
+current_dir = pathlib.Path(__file__).resolve().parent
+# モジュールのあるパスを追加
+sys.path.append(str(current_dir) + '/../')
+sys.path.append(str(current_dir) + '/../src/')
+sys.path.append(str(current_dir))
+
+from mmd.VmdReader import VmdReader # noqa
+from utils.MLogger import MLogger # noqa
+from GlobalPosBench import create_bench_model, create_bench_motion # noqa
+from BezierBench import set_bench_interpolation # noqa
+
+
+logger = MLogger(__name__, level=MLogger.INFO)
+
+# 計測対象ボーン（合成モーションの場合）
+BENCH_INFECTION_BONES = ["センター", "上半身", "右腕", "右ひじ", "右足", "右ひざ"]
+
+
+def create_infection_motion(last_fno: int):
+    model = create_bench_model()
+    motion = create_bench_motion(model, last_fno)
+    set_bench_interpolation(motion)
+
+    return motion
+
+
+def main():
+    last_fno = 3000
+
+    if len(sys.argv) > 1:
+        motion = VmdReader(sys.argv[1]).read_data()
+        bone_names = [bone_name for bone_name, bfs in motion.bones.items() if len(bfs) > 2]
+    else:
+        motion = create_infection_motion(last_fno)
+        bone_names = BENCH_INFECTION_BONES
+
+    for limit_degrees, limit_length in [(10, 0), (0, 0.5), (5, 0.3)]:
+        start = time.perf_counter()
+        fnos = motion.get_differ_fnos(0, bone_names, limit_degrees=limit_degrees, limit_length=limit_length)
+        elapsed = time.perf_counter() - start
+
+        logger.info("キー追加対象フレーム(%sボーン, 角度=%s, 距離=%s): %.3f秒, %sフレーム", len(bone_names), limit_degrees, limit_length, elapsed, len(fnos))
+
+    start = time.perf_counter()
+    for bone_name in bone_names:
+        motion.smooth_bf(0, bone_name, True, False, 5, is_show_log=False)
+    elapsed = time.perf_counter() - start
+
+    logger.info("유연화(%sボーン): %.3f秒", len(bone_names), elapsed)
+
+    start = time.perf_counter()
+    for bone_name in bone_names:
+        motion.smooth_filter_bf(0, bone_name, True, True, is_show_log=False)
+    elapsed = time.perf_counter() - start
+
+    logger.info("フィルター(%sボーン): %.3f秒", len(bone_names), elapsed)
+
+
+if __name__ == '__main__':
+    main()
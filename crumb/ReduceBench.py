@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# 不要キー削除（補間曲線の当てはめ）のベンチマーク
+# 全フレームにキーがあるモーションについて、最小二乗法と従来の方法（カトマル曲線から次数を減らす）の処理時間と、残ったキー数を比較する
+# python ReduceBench.py [VMDパス]（指定がない場合は合成モーション）
+import sys
+import time
+import pathlib
+# このソースのあるディレクトリの絶対パスを取得
+current_dir = pathlib.Path(__file__).resolve().parent
+# モジュールのあるパスを追加
+sys.path.append(str(current_dir) + '/../')
+sys.path.append(str(current_dir) + '/../src/')
+sys.path.append(str(current_dir))
+
+from mmd.VmdReader import VmdReader # noqa
+from utils import MBezierUtils # noqa
+from utils.MLogger import MLogger # noqa
+from GlobalPosBench import create_bench_model, create_bench_motion # noqa
+from BezierBench import set_bench_interpolation # noqa
+
+
+logger = MLogger(__name__, level=MLogger.INFO)
+
+# 不要キー削除の対象ボーン（合成モーションの場合）
+BENCH_REDUCE_BONES = ["センター", "上半身", "右腕", "右ひじ", "右足", "右ひざ"]
+
+# 補間曲線の当てはめだけを計測する区間の長さ
+BENCH_SPAN_LENGTHS = [5, 10, 20, 40]
+
+
+# 補間曲線を設定した合成モーションを、全フレームにキーを登録して焼き込む
+def create_reduce_motion(last_fno: int):
+    model = create_bench_model()
+    motion = create_bench_motion(model, last_fno)
+    set_bench_interpolation(motion)
+
+    for bone_name in BENCH_REDUCE_BONES:
+        for fno in range(last_fno):
+            motion.regist_bf(motion.calc_bf(bone_name, fno), bone_name, fno)
+
+    return motion
+
+
+# 各ボーンの移動X・Yの値について、いろいろな長さの区間で補間曲線の当てはめだけを計測する
+def bench_join_value(motion, bone_names: list):
+    spans = []
+    for bone_name in bone_names:
+        fnos = motion.get_bone_fnos(bone_name)
+        values = [[motion.calc_bf(bone_name, fno).position.x() for fno in fnos], [motion.calc_bf(bone_name, fno).position.y() for fno in fnos]]
+        for span_values in values:
+            for span_length in BENCH_SPAN_LENGTHS:
+                spans.extend([span_values[n:n + span_length + 1] for n in range(0, len(span_values) - span_length, span_length)])
+
+    for is_least_squares in [False, True]:
+        success_count = 0
+        start = time.perf_counter()
+        for span_values in spans:
+            joined_bz, _ = MBezierUtils.join_value_2_bezier(0, "bench", span_values, 0, 0.1, is_least_squares)
+            success_count += 1 if joined_bz else 0
+        elapsed = time.perf_counter() - start
+
+        logger.info("補間曲線の当てはめ(最小二乗法=%s): %s区間 %.3f秒 (%.1f 区間/秒), 成功 %s区間", is_least_squares, len(spans), elapsed, len(spans) / elapsed, success_count)
+
+
+def main():
+    last_fno = 300
+
+    for is_least_squares in [False, True]:
+        if len(sys.argv) > 1:
+            motion = VmdReader(sys.argv[1]).read_data()
+            bone_names = [bone_name for bone_name, bfs in motion.bones.items() if len(bfs) > 2]
+        else:
+            motion = create_reduce_motion(last_fno)
+            bone_names = BENCH_REDUCE_BONES
+
+        before_count = sum([len(motion.get_bone_fnos(bone_name, is_key=True)) for bone_name in bone_names])
+
+        start = time.perf_counter()
+        for bone_name in bone_names:
+            motion.remove_unnecessary_bf(0, bone_name, True, True, is_show_log=False, is_least_squares=is_least_squares)
+        elapsed = time.perf_counter() - start
+
+        after_count = sum([len(motion.get_bone_fnos(bone_name, is_key=True)) for bone_name in bone_names])
+
+        logger.info("不要キー削除(%sボーン, 最小二乗法=%s): %.3f秒 (%.1f キー/秒), キー数 %s -> %s", len(bone_names), is_least_squares, elapsed, \
+                    before_count / elapsed, before_count, after_count)
+
+    if len(sys.argv) > 1:
+        motion = VmdReader(sys.argv[1]).read_data()
+        bench_join_value(motion, [bone_name for bone_name, bfs in motion.bones.items() if len(bfs) > 2])
+    else:
+        bench_join_value(create_reduce_motion(last_fno), BENCH_REDUCE_BONES)
+
+
+if __name__ == '__main__':
+    main()
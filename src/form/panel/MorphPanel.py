@@ -162,7 +162,7 @@ class MorphSet():
             for mk in file_set.motion_vmd_file_ctrl.data.morphs.keys():
                 morph_fnos = file_set.motion_vmd_file_ctrl.data.get_morph_fnos(mk)
                 for fno in morph_fnos:
-                    if file_set.motion_vmd_file_ctrl.data.morphs[mk][fno].ratio != 0:
+                    if file_set.motion_vmd_file_ctrl.data.peek_mf(mk, fno).ratio != 0:
                         # キーが存在しており、かつ初期値ではない値が入っている場合、치환対象
 
                         if mk in file_set.rep_model_file_ctrl.data.morphs and file_set.rep_model_file_ctrl.data.morphs[mk].display:
@@ -7,6 +7,7 @@ import re
 import wx
 import logging
 from mmd.PmxReader import PmxReader
+from mmd.VmdData import VmdMotion
 from mmd.VmdReader import VmdReader
 from mmd.VpdReader import VpdReader
 from utils import MFileUtils
@@ -317,6 +318,10 @@ class BaseFilePickerCtrl():
                 # ハッシュが取得できてて、過去データがないかハッシュが違う場合、読み込み
                 self.data = reader.read_data()
 
+                if isinstance(self.data, VmdMotion):
+                    # 読み込んだモーションは列指向トラックにして、複製時に配列を共有する（取り出したフレームへの変更は保持される）
+                    self.data.pack_tracks()
+
                 logger.info("%s%s 읽기 성공: %s", display_set_no, self.title, os.path.basename(file_path))
                 return True
             elif new_data_digest and self.data and self.data.digest == new_data_digest:
@@ -169,7 +169,8 @@ class SizingFileSet():
         for k in motion.bones.keys():
             bone_fnos = motion.get_bone_fnos(k)
             for fno in bone_fnos:
-                if motion.bones[k][fno].position != MVector3D() or motion.bones[k][fno].rotation != MQuaternion():
+                bf = motion.peek_bf(k, fno)
+                if bf.position != MVector3D() or bf.rotation != MQuaternion():
                     # キーが存在しており, かつ初期値ではない値が入っている場合, 警告対象
 
                     if isinstance(org_pmx, Exception):
@@ -215,7 +216,7 @@ class SizingFileSet():
         for k in motion.morphs.keys():
             morph_fnos = motion.get_morph_fnos(k)
             for fno in morph_fnos:
-                if motion.morphs[k][fno].ratio != 0:
+                if motion.peek_mf(k, fno).ratio != 0:
                     # キーが存在しており, かつ初期値ではない値が入っている場合, 警告対象
 
                     if k not in org_pmx.morphs:
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 #
 
-from module.MMath cimport MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
+from module.MMath cimport MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4, MTransform # noqa
 from module.MParams cimport BoneLinks
 
 
@@ -122,8 +122,8 @@ cdef class OBB:
     cdef public bint is_arm_upper
     cdef public bint is_small
     cdef public bint is_arm_left
-    cdef public MMatrix4x4 matrix
-    cdef public MMatrix4x4 rotated_matrix
+    cdef public MTransform matrix
+    cdef public MTransform rotated_matrix
     cdef public MVector3D origin
     cdef public dict origin_xyz
     cdef public dict shape_size_xyz
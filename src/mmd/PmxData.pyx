@@ -7,7 +7,7 @@ import math
 import numpy as np
 
 from module.MParams import BoneLinks # noqa
-from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
+from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4, MTransform # noqa
 
 from utils.MException import SizingException # noqa
 from utils.MLogger import MLogger # noqa
@@ -573,10 +573,10 @@ cdef class OBB:
         self.is_small = is_small
         self.is_arm_left = is_arm_left
 
-        # 回転なし行列
-        self.matrix = bone_matrix[bone_name].copy()
+        # 回転なし行列（剛体変換。行列が渡された場合も剛体変換にする）
+        self.matrix = MTransform(bone_matrix[bone_name])
         # 回転あり行列
-        self.rotated_matrix = bone_matrix[bone_name].copy()
+        self.rotated_matrix = MTransform(bone_matrix[bone_name])
 
         # 剛体自体の位置
         self.matrix.translate(self.shape_position - bone_pos)
@@ -601,7 +601,7 @@ cdef class Sphere(OBB):
 
     # 衝突しているか
     cpdef tuple get_collistion(self, MVector3D point, MVector3D root_global_pos, float max_length, float base_size):
-        cdef MMatrix4x4 arm_matrix
+        cdef MTransform arm_matrix
         cdef bint collision, near_collision
         cdef double d, sin_x_theta, sin_y_theta, sin_z_plus_theta, sin_z_minus_theta, x, x_theta, y, y_theta, z, z_plus_theta, z_minus_theta, x_distance, z_plus_distance, z_minus_distance, new_y
         cdef MVector3D local_point, new_x_local, new_z_plus_local, new_z_minus_local, rep_x_collision_vec, rep_z_plus_collision_vec, rep_z_minus_collision_vec, x_arm_local, z_plus_arm_local, z_minus_arm_local
@@ -656,8 +656,7 @@ cdef class Sphere(OBB):
             rep_z_minus_collision_vec = self.matrix * new_z_minus_local
 
             # 腕の位置を起点とする行列（移動量だけ見る）
-            arm_matrix = MMatrix4x4()
-            arm_matrix.setToIdentity()
+            arm_matrix = MTransform()
             arm_matrix.translate(root_global_pos)
 
             # 腕から見た回避位置
@@ -701,7 +700,7 @@ cdef class Box(OBB):
     # 衝突しているか（内外判定）
     # https://stackoverflow.com/questions/21037241/how-to-determine-a-point-is-inside-or-outside-a-cube
     cpdef tuple get_collistion(self, MVector3D point, MVector3D root_global_pos, float max_length, float base_size):
-        cdef MMatrix4x4 arm_matrix
+        cdef MTransform arm_matrix
         cdef bint collision, near_collision, res1, res2, res3
         cdef double d, sin_x_theta, sin_y_theta, sin_z_plus_theta, sin_z_minus_theta, x_theta, y, y_theta, z_plus_theta, z_minus_theta, new_y, size1, size2, size3, x, z_plus, z_minus, x_diff, z_plus_diff, x_distance, z_plus_distance, z_minus_distance
         cdef MVector3D b1,  b2, b4, d1, d2, d3, dir1, dir2, dir3, dir_vec, local_point, new_x_local, new_z_plus_local, new_z_minus_local, rep_x_collision_vec, rep_z_plus_collision_vec, rep_z_minus_collision_vec, t1
@@ -825,8 +824,7 @@ cdef class Box(OBB):
             rep_z_minus_collision_vec = self.rotated_matrix * new_z_minus_local
 
             # 腕の位置を起点とする行列（移動量だけ見る）
-            arm_matrix = MMatrix4x4()
-            arm_matrix.setToIdentity()
+            arm_matrix = MTransform()
             arm_matrix.translate(root_global_pos)
 
             # 腕から見た回避位置
@@ -868,7 +866,7 @@ cdef class Capsule(OBB):
     # 衝突しているか
     # http://marupeke296.com/COL_3D_No27_CapsuleCapsule.html
     cpdef tuple get_collistion(self, MVector3D point, MVector3D root_global_pos, float max_length, float base_size):
-        cdef MMatrix4x4 arm_matrix
+        cdef MTransform arm_matrix
         cdef bint collision, near_collision
         cdef double d, sin_x_theta, sin_y_theta, sin_z_plus_theta, x, x_theta, y, y_theta, z_plus, z_minus, z_plus_theta, x_distance, z_plus_distance, new_y, sin_z_minus_theta, z_minus_theta, z_minus_distance
         cdef MVector3D local_point, new_x_local, new_z_plus_local, rep_x_collision_vec, rep_z_plus_collision_vec, x_arm_local, z_plus_arm_local, new_z_minus_local, rep_z_minus_collision_vec, z_minus_arm_local
@@ -973,8 +971,7 @@ cdef class Capsule(OBB):
             rep_z_minus_collision_vec = h_matrix * new_z_minus_local
 
             # 腕の位置を起点とする行列（移動量だけ見る）
-            arm_matrix = MMatrix4x4()
-            arm_matrix.setToIdentity()
+            arm_matrix = MTransform()
             arm_matrix.translate(root_global_pos)
 
             # 腕から見た回避位置
@@ -1244,13 +1241,8 @@ cdef class PmxModel:
             links = self.create_link_2_top(target_bone_name, None, is_defined)
 
             if links and target_bone_name in links.all():
-                reversed_links = BoneLinks()
-
                 # リンクがある場合、反転させて返す
-                for lname in reversed(links.all()):
-                    reversed_links.append(links.get(lname))
-
-                return reversed_links
+                return BoneLinks([links.get(lname) for lname in reversed(links.all())])
 
         # 最後まで回しても取れなかった場合、エラー
         raise SizingException("본 링크 생성에 실패했습니다.모델 %s에 %s 본이 있는지 확인하십시오." % (self.name, ",".join(target_bone_names)))
@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
 #
 import struct
-import hashlib
 import random
 import string
 
 from mmd.PmxData import PmxModel, Bone, RigidBody, Vertex, Material, Morph, DisplaySlot, RigidBody, Joint, Ik, IkLink, Bdef1, Bdef2, Bdef4, Sdef, Qdef, MaterialMorphData, UVMorphData, BoneMorphData, VertexMorphOffset, GroupMorphData # noqa
 from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
 from utils.MLogger import MLogger # noqa
+from utils import MFileutils
 from utils.MException import SizingException, MKilledException, MParseException
 
 logger = MLogger(__name__, level=1)
@@ -103,9 +103,9 @@ class PmxReader:
         pmx.path = self.file_path
 
         try:
-            # PMXファイルをバイナリ読み込み
-            with open(self.file_path, "rb") as f:
-                self.buffer = f.read()
+            # PMXファイルをメモリマップでバイナリ読み込み
+            with MFileutils.open_file_buffer(self.file_path) as buffer:
+                self.buffer = buffer
                 # logger.test("hashlib.algorithms_available: %s", hashlib.algorithms_available)
 
                 # pmx宣言
@@ -909,9 +909,11 @@ class PmxReader:
 
                 logger.info("-- PMX 관절 읽기 완료")
 
-            # ハッシュを設定
-            pmx.digest = self.hexdigest()
-            logger.test("pmx: %s, hash: %s", pmx.name, pmx.digest)
+                # ハッシュを設定（読み込んだ内容から計算する）
+                pmx.digest = MFileutils.get_file_digest(self.file_path, self.buffer)
+                logger.test("pmx: %s, hash: %s", pmx.name, pmx.digest)
+
+                self.buffer = None
 
             if self.is_check:
                 # 腕がサイジング可能かチェック
@@ -965,19 +967,9 @@ class PmxReader:
         else:
             return index, pmx.bones[tmp_bone_indexes[parent_index]].index
 
+    # ハッシュ値（サイズと更新日時が変わっていなければキャッシュを使う）
     def hexdigest(self):
-        sha1 = hashlib.sha1()
-
-        with open(self.file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(2048 * sha1.block_size), b''):
-                sha1.update(chunk)
-
-        sha1.update(chunk)
-
-        # ファイルパスをハッシュに含める
-        sha1.update(self.file_path.encode('utf-8'))
-
-        return sha1.hexdigest()
+        return MFileutils.get_file_digest(self.file_path)
 
     def calc_bone_length(self, bones, bone_indexes):
         for k, v in bones.items():
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 #
 cimport numpy as np
-from module.MMath cimport MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
+from cpython cimport array
+from module.MMath cimport MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4, MTransform # noqa
 
 
 cdef class LowPassFilter:
@@ -31,13 +32,19 @@ cdef class VmdBoneFrame:
     cdef public MVector3D position
     cdef public MQuaternion rotation
     cdef public MVector3D org_position
-    cdef public MQuaternion org_rotation
-    cdef public list interpolation
-    cdef public list org_interpolation
+    cdef MQuaternion __org_rotation
+    # 元회전を他のフレームと共有しているか（共有している間は取得時に複製する）
+    cdef bint __is_shared_org_rotation
+    # 보간 곡선（64要素の符号付き16bit配列）
+    cdef array.array __interpolation
+    cdef public tuple org_interpolation
     cdef public bint key
     cdef public bint read
     cdef public str avoidance
 
+    cdef MQuaternion c_peek_org_rotation(self)
+    cdef c_share_org_rotation(self, VmdBoneFrame bf)
+
 cdef class VmdMorphFrame:
     cdef public str name
     cdef public bytes bname
@@ -46,6 +53,63 @@ cdef class VmdMorphFrame:
     cdef public bint key
     cdef public bint read
 
+# 書き込みのたびに version を進めるキーフレーム辞書
+cdef class VmdFrameDict(dict):
+    cdef readonly long version
+
+cdef class VmdFrameTrack:
+    cdef public str name
+    cdef public bytes bname
+    # 昇順フレーム番号（列の行番号と対応）
+    cdef np.ndarray fnos
+    cdef np.ndarray key_flags
+    cdef np.ndarray read_flags
+    # 名前などが既定と異なる行のみ保持する（fno: tuple）
+    cdef dict extras
+    # 取り出し・追加されたフレーム（fno: フレーム）
+    cdef dict frames
+    # 列から削除されたフレーム番号
+    cdef set removed
+    # 列にないフレーム番号で追加されたフレーム数
+    cdef int new_cnt
+    # 取り出したフレームを frames に保持するか（False は参照専用トラック）
+    cdef bint keep_frames
+    # 書き込みのたびに進める番号
+    cdef readonly long version
+
+    cdef Py_ssize_t c_find_row(self, int fno)
+    cdef object c_make_frame(self, Py_ssize_t row)
+    cdef object c_peek(self, int fno, bint is_keep=*)
+    cdef c_check_writable(self)
+    cdef c_copy_to(self, VmdFrameTrack track, bint keep_frames)
+    cdef bint c_is_flag(self, int fno, bint is_key, bint is_read)
+    cdef list c_keys(self)
+
+cdef class VmdBoneTrack(VmdFrameTrack):
+    cdef np.ndarray positions
+    cdef np.ndarray rotations
+    cdef np.ndarray org_rotations
+    cdef np.ndarray interpolations
+
+cdef class VmdMorphTrack(VmdFrameTrack):
+    cdef np.ndarray ratios
+
+cdef class VmdPoseCache:
+    cdef public int max_size
+    cdef public long hits
+    cdef public long misses
+    cdef public long invalidations
+    cdef object entries
+    cdef dict fno_keys
+    cdef list fnos
+    cdef dict models
+    cdef object lock
+
+    cdef tuple c_get(self, object model, int fno, object link_key, tuple stamp)
+    cdef c_put(self, object model, int fno, object link_key, tuple stamp, MVector3D global_pos, MTransform total_transform)
+    cdef c_discard_key(self, tuple key)
+    cdef c_invalidate(self, int start_fno, int end_fno)
+
 cdef class VmdMotion:
     cdef public str path
     cdef public str signature
@@ -64,6 +128,22 @@ cdef class VmdMotion:
     cdef public int ik_cnt
     cdef public list showiks
     cdef public str digest
+    # ボーン名/モーフ名：昇順フレーム番号インデックス
+    cdef dict bone_fno_indexes
+    cdef dict morph_fno_indexes
+    cdef public object pose_cache
+
+    cdef list c_get_sorted_fnos(self, dict fno_indexes, dict frames, str name)
+
+    cdef object c_peek_frame(self, dict frames, str name, int fno)
+
+    cdef c_set_frame(self, dict fno_indexes, dict frames, str name, int fno, object frame)
+
+    cdef c_remove_frame(self, dict fno_indexes, dict frames, str name, int fno)
+
+    cdef c_invalidate_pose(self, str bone_name, int fno)
+
+    cdef bint c_is_key_frame(self, object bf_dict, int fno)
 
     cdef c_regist_full_bf(self, int data_set_no, list bone_name_list, int offset, bint is_key)
 
@@ -72,10 +152,15 @@ cdef class VmdMotion:
     cdef c_smooth_bf(self, int data_set_no, str bone_name, bint is_rot, bint is_mov, double limit_degrees, int start_fno, int end_fno, bint is_show_log)
 
     cdef c_smooth_filter_bf(self, int data_set_no, str bone_name, bint is_rot, bint is_mov, int loop, dict mconfig, int start_fno, int end_fno, bint is_show_log)
+
+    cdef tuple c_calc_filter_bf(self, str bone_name, list infections, bint is_mov, dict config)
+
+    cdef VmdBoneFrame c_get_filter_bf(self, str bone_name, int fno, bint is_stored)
     
     cdef list c_remove_unnecessary_bf(self, int data_set_no, str bone_name, bint is_rot, bint is_mov, \
                                       double offset, double rot_diff_limit, double mov_diff_limit, int start_fno, int end_fno, bint is_show_log, bint is_force, bint is_sub_remove, 
-                                      dict rot_diff_value_dict, dict mx_diff_value_dict, dict my_diff_value_dict, dict mz_diff_value_dict, list infections)
+                                      np.ndarray values, int value_start_fno, list infections, \
+                                      bint is_least_squares)
 
     cdef tuple c_get_infections(self, int data_set_no, str bone_name, bint is_rot, bint is_mov, np.ndarray fnos, list active_fnos)
 
@@ -87,6 +172,10 @@ cdef class VmdMotion:
 
     cdef VmdBoneFrame c_calc_bf(self, str bone_name, int fno, bint is_key, bint is_read, bint is_reset_interpolation)
 
+    cdef tuple c_calc_bf_range(self, str bone_name, np.ndarray fnos)
+
+    cdef tuple c_get_bf_columns(self, str bone_name)
+
     cdef MQuaternion calc_bf_rot(self, VmdBoneFrame prev_bf, VmdBoneFrame fill_bf, VmdBoneFrame next_bf)
 
     cdef MVector3D calc_bf_pos(self, VmdBoneFrame prev_bf, VmdBoneFrame fill_bf, VmdBoneFrame next_bf)
@@ -111,6 +200,8 @@ cdef class VmdMotion:
 
     cdef VmdMorphFrame c_calc_mf(self, str morph_name, int fno, bint is_key, bint is_read)
 
+    cdef np.ndarray c_calc_mf_range(self, str morph_name, np.ndarray fnos)
+
     cdef c_smooth_filter_mf(self, int data_set_no, str morph_name, int loop, dict config, int start_fno, int end_fno, bint is_show_log)
 
     cdef c_remove_unnecessary_mf(self, int data_set_no, str morph_name, double offset, double diff_limit, int r_start_fno, int r_end_fno, bint is_show_log, bint is_force)
@@ -119,7 +210,6 @@ cdef class VmdMotion:
 
     cpdef bint is_active_bones(self, str bone_name)
 
+cdef long c_get_frames_version(object frames)
 
-
-
-
+cdef bint c_is_same_stamp(tuple stamp, tuple other)
@@ -3,23 +3,62 @@
 import math
 import numpy as np
 cimport numpy as np
+cimport cython
 cimport libc.math as cmath
 from libcpp cimport  list, str, int, float
 import struct
+import array
+from cpython cimport array
 import _pickle as cPickle
-from libc.math cimport pi, fabs
+import threading
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right, insort
+from libc.math cimport pi, fabs, sqrt, acos
+from libc.limits cimport INT_MIN, INT_MAX
 from math import ceil, radians, isnan, isinf
 
 from utils import MBezierUtils # noqa
+from utils.MBezierUtils cimport c_evaluate, c_evaluate_by_t, c_split_bezier_mmd, c_is_fit_bezier_mmd, c_join_value_2_bezier # noqa
 from utils.MLogger import MLogger
 
-from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4, get_effective_value # noqa
+from module.MMath cimport calc_slerp # noqa
+from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4, MTransform, get_effective_value # noqa
 
 logger = MLogger(__name__, level=1)
 
 ctypedef np.int_t DTYPE_INT_t
 ctypedef np.float64_t DTYPE_FLOAT_t
 
+# サイジング用ボーン（VMDには出力しない）
+SIZING_BONE_NAMES = frozenset(["SIZING_ROOT_BONE", "頭頂", "右つま先実体", "左つま先実体", "右足底辺", "左足底辺", "右足底実体", "左足底実体", "右足ＩＫ底実体", "左足ＩＫ底実体", "右足IK親底実体", "左足IK親底実体", \
+                               "首根元", "右腕下延長", "左腕下延長", "右腕垂直", "左腕垂直", "センター実体", "左腕ひじ中間", "右腕ひじ中間", "左ひじ手首中間", "右ひじ手首中間", "左手首実体", "右手首実体", \
+                               "左親指先実体", "左人指先実体", "左中指先実体", "左薬指先実体", "左小指先実体", "右親指先実体", "右人指先実体", "右中指先実体", "右薬指先実体", "右小指先実体"])
+
+# 既定の보간 곡선（全フレームで共有するので不変のタプル）
+DEFAULT_INTERPOLATION = (20, 20, 0, 0, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 20, 20, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 20, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 0, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 0, 0) # noqa
+# 既定の보간 곡선（フレーム毎の初期値はこれを複製する）
+cdef array.array DEFAULT_INTERPOLATION_BUF = array.array('h', DEFAULT_INTERPOLATION)
+# 既定の元회전（全フレームで共有し、取得時に複製する）
+DEFAULT_ORG_ROTATION = MQuaternion()
+
+
+# 보간 곡선を符号付き16bit配列にする
+# 再設定時に範囲外の値を持つこともあるため、符号付きで保持し、16bitを超える値のみ丸める
+cdef array.array to_interpolation(object values):
+    if isinstance(values, array.array) and values.typecode == 'h':
+        return values
+
+    try:
+        return array.array('h', values)
+    except OverflowError:
+        return array.array('h', [-32768 if v < -32768 else 32767 if v > 32767 else v for v in values])
+
+
+# 보간 곡선の値を符号付き16bitの範囲に収める
+cdef int clamp_interpolation(double value):
+    cdef int iv = -32768 if value < -32768 else 32767 if value > 32767 else <int>value
+    return iv
+
 
 # OneEuroFilter
 # オリジナル：https://www.cristal.univ-lille.fr/~casiez/1euro/
@@ -107,6 +146,168 @@ cdef class OneEuroFilter:
         return self.__x(x, timestamp, alpha=self.__alpha(cutoff))
 
 
+# OneEuroFilterの一括計算用の状態（OneEuroFilterと、値・変化量の2つのLowPassFilterの値をまとめたもの）
+cdef struct OneEuroState:
+    double freq
+    double mincutoff
+    double beta
+    double dcutoff
+    double lasttime
+    # 値のLowPassFilter（y: 前回の値, s: 前回の結果）
+    double x_y
+    double x_s
+    double x_alpha
+    # 変化量のLowPassFilter
+    double dx_y
+    double dx_s
+    double dx_alpha
+
+
+# OneEuroFilter(**config) と同じ初期状態にする
+cdef c_init_one_euro_state(OneEuroState* state, dict config):
+    cdef double freq = config["freq"]
+    cdef double mincutoff = config.get("mincutoff", 1.0)
+    cdef double beta = config.get("beta", 0.0)
+    cdef double dcutoff = config.get("dcutoff", 1.0)
+
+    if freq <= 0:
+        raise ValueError("freq should be >0")
+    if mincutoff <= 0:
+        raise ValueError("mincutoff should be >0")
+    if dcutoff <= 0:
+        raise ValueError("dcutoff should be >0")
+
+    state.freq = freq
+    state.mincutoff = mincutoff
+    state.beta = beta
+    state.dcutoff = dcutoff
+    state.lasttime = -1
+    state.x_y = -1
+    state.x_s = -1
+    state.x_alpha = c_clamp_one_euro_alpha(c_calc_one_euro_alpha(freq, mincutoff))
+    state.dx_y = -1
+    state.dx_s = -1
+    state.dx_alpha = c_clamp_one_euro_alpha(c_calc_one_euro_alpha(freq, dcutoff))
+
+
+# OneEuroFilter.__alphaと同じ
+@cython.cdivision(True)
+cdef inline double c_calc_one_euro_alpha(double freq, double cutoff) nogil:
+    cdef double te = 1.0 / freq
+    cdef double tau = 1.0 / (2 * pi * cutoff)
+    return 1.0 / (1.0 + tau / te)
+
+
+# LowPassFilter.__setAlphaと同じ範囲に収める
+cdef inline double c_clamp_one_euro_alpha(double alpha) nogil:
+    if not alpha < 1:
+        alpha = 1
+    if not alpha > 0.000001:
+        alpha = 0.000001
+    return alpha
+
+
+# OneEuroFilter.c__call__と同じ計算で1件フィルターをかける（timestamp: 指定なしの場合は-1）
+@cython.cdivision(True)
+cdef inline double c_filter_one_euro(OneEuroState* state, double x, double timestamp) nogil:
+    cdef double prev_x, dx, edx, cutoff, alpha, s
+
+    # ---- update the sampling frequency based on timestamps
+    if state.lasttime != 0 and timestamp != 0 and (timestamp - state.lasttime) != 0:
+        state.freq = 1.0 / (timestamp - state.lasttime)
+    state.lasttime = timestamp
+
+    # ---- estimate the current variation per second
+    prev_x = state.x_y
+    dx = 0.0 if prev_x < 0 else (x - prev_x) * state.freq
+    alpha = c_calc_one_euro_alpha(state.freq, state.dcutoff)
+    if alpha >= 0:
+        state.dx_alpha = c_clamp_one_euro_alpha(alpha)
+    if state.dx_y < 0:
+        edx = dx
+    else:
+        edx = state.dx_alpha * dx + (1.0 - state.dx_alpha) * state.dx_s
+    state.dx_y = dx
+    state.dx_s = edx
+
+    # ---- use it to update the cutoff frequency
+    cutoff = state.mincutoff + state.beta * fabs(edx)
+
+    # まったく同じ値の場合、スキップ
+    if prev_x == x:
+        state.x_y = x
+        state.x_s = x
+        return x
+
+    # ---- filter the given value
+    alpha = c_calc_one_euro_alpha(state.freq, cutoff)
+    if alpha >= 0:
+        state.x_alpha = c_clamp_one_euro_alpha(alpha)
+    if state.x_y < 0:
+        s = x
+    else:
+        s = state.x_alpha * x + (1.0 - state.x_alpha) * state.x_s
+    state.x_y = x
+    state.x_s = s
+
+    return s
+
+
+# OneEuroFilterの一括計算（values: N または N×k）
+# 列ごとに OneEuroFilter(**config) を作って、行の順に1件ずつかけたのと同じ結果を返す
+# timestamps: 各行のタイムスタンプ（Noneの場合は指定なし）
+# is_quaternion: 行をクォータニオン(w, x, y, z)とみなし、前の行との内積が負の場合は符号を反転して向きを揃えてからかけ、結果を正規化する
+def filter_values(values, config: dict, timestamps=None, is_quaternion=False):
+    cdef np.ndarray org_values = np.asarray(values, dtype=np.float64)
+    cdef np.ndarray results = c_filter_values(np.ascontiguousarray(org_values.reshape(np.PyArray_DIM(org_values, 0), -1)), config, \
+                                              None if timestamps is None else np.ascontiguousarray(timestamps, dtype=np.float64), is_quaternion)
+
+    return results.reshape(np.shape(org_values))
+
+
+@cython.cdivision(True)
+cdef np.ndarray c_filter_values(np.ndarray values, dict config, np.ndarray timestamps, bint is_quaternion):
+    cdef Py_ssize_t n = np.PyArray_DIM(values, 0)
+    cdef Py_ssize_t col_cnt = np.PyArray_DIM(values, 1)
+    cdef np.ndarray results = np.array(values, dtype=np.float64)
+    cdef np.ndarray row_timestamps = np.full(n, -1, dtype=np.float64) if timestamps is None else timestamps
+    cdef double[:, ::1] rv = results
+    cdef double[::1] tv = row_timestamps
+    cdef OneEuroState init_state
+    cdef OneEuroState state
+    cdef Py_ssize_t i, col
+    cdef double l2
+
+    if is_quaternion and col_cnt != 4:
+        raise ValueError("quaternion values should be N×4 (w, x, y, z): {0}".format(col_cnt))
+
+    c_init_one_euro_state(&init_state, config)
+
+    if n == 0:
+        return results
+
+    with nogil:
+        if is_quaternion:
+            # 前の行と同じ向きに揃える（q と -q は同じ회전）
+            for i in range(1, n):
+                if c_dot_quaternion(&rv[i - 1, 0], &rv[i, 0]) < 0:
+                    for col in range(4):
+                        rv[i, col] = -rv[i, col]
+
+        for col in range(col_cnt):
+            state = init_state
+            for i in range(n):
+                rv[i, col] = c_filter_one_euro(&state, rv[i, col], tv[i])
+
+        if is_quaternion:
+            for i in range(n):
+                l2 = sqrt(rv[i, 0] * rv[i, 0] + rv[i, 1] * rv[i, 1] + rv[i, 2] * rv[i, 2] + rv[i, 3] * rv[i, 3])
+                for col in range(4):
+                    rv[i, col] /= l2
+
+    return results
+
+
 cdef class VmdBoneFrame:
 
     def __init__(self, fno=0):
@@ -115,9 +316,11 @@ cdef class VmdBoneFrame:
         self.fno = fno
         self.position = MVector3D()
         self.rotation = MQuaternion()
-        self.org_rotation = MQuaternion()
-        self.interpolation = [20, 20, 0, 0, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 20, 20, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 20, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 0, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 0, 0] # noqa
-        self.org_interpolation = [20, 20, 0, 0, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 20, 20, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 20, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 0, 20, 20, 20, 20, 20, 107, 107, 107, 107, 107, 107, 107, 107, 0, 0, 0] # noqa
+        self.__org_rotation = DEFAULT_ORG_ROTATION
+        self.__is_shared_org_rotation = True
+        self.__interpolation = array.copy(DEFAULT_INTERPOLATION_BUF)
+        # 元の보간 곡선は不変のタプルなので共有する
+        self.org_interpolation = DEFAULT_INTERPOLATION
         # 등록対象であるか否か
         self.key = False
         # VMD読み込み処理で読み込んだ키か
@@ -125,18 +328,49 @@ cdef class VmdBoneFrame:
         # 接触回避の方向
         self.avoidance = ""
 
+    property interpolation:
+        def __get__(self):
+            return self.__interpolation
+
+        def __set__(self, values):
+            self.__interpolation = to_interpolation(values)
+
+    # 元회전は他のフレームと共有している間は、取得時に複製してから返す（コピーオンライト）
+    property org_rotation:
+        def __get__(self):
+            if self.__is_shared_org_rotation:
+                self.__org_rotation = self.__org_rotation.copy()
+                self.__is_shared_org_rotation = False
+
+            return self.__org_rotation
+
+        def __set__(self, MQuaternion org_rotation):
+            self.__org_rotation = org_rotation
+            self.__is_shared_org_rotation = False
+
+    # 値の参照用に元회전を取得する（複製しないので、書き換えないこと）
+    cdef MQuaternion c_peek_org_rotation(self):
+        return self.__org_rotation
+
+    # 指定フレームと元회전を共有する（どちらも、次の取得時に複製する）
+    cdef c_share_org_rotation(self, VmdBoneFrame bf):
+        self.__org_rotation = bf.__org_rotation
+        self.__is_shared_org_rotation = True
+        bf.__is_shared_org_rotation = True
+
     def set_name(self, name):
         self.name = name
         self.bname = b'' if not name else name.encode('cp932').decode('shift_jis').encode('shift_jis')[:15].ljust(15, b'\x00')
 
     def copy(self):
-        bf = VmdBoneFrame(self.fno)
+        cdef VmdBoneFrame bf = VmdBoneFrame(self.fno)
         bf.name = self.name
         bf.bname = self.bname
         bf.position = self.position.copy()
         bf.rotation = self.rotation.copy()
-        bf.org_rotation = self.org_rotation.copy()
-        bf.interpolation = cPickle.loads(cPickle.dumps(self.interpolation, -1))
+        # 元회전は書き換えるまで共有する
+        bf.c_share_org_rotation(self)
+        bf.interpolation = array.copy(self.__interpolation)
         bf.key = self.key
         bf.read = self.read
 
@@ -198,6 +432,384 @@ cdef class VmdMorphFrame:
         return "<VmdMorphFrame name:{0}, fno:{1}, ratio:{2}".format(self.name, self.fno, self.ratio)
 
 
+# キーフレーム辞書（fno: フレーム）
+# 書き込み・削除のたびに version を進めるので、キーの入れ替えや値の差し替えも検知できる
+cdef class VmdFrameDict(dict):
+
+    def __setitem__(self, fno, frame):
+        self.version += 1
+        dict.__setitem__(self, fno, frame)
+
+    def __delitem__(self, fno):
+        self.version += 1
+        dict.__delitem__(self, fno)
+
+    def pop(self, *args):
+        self.version += 1
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self.version += 1
+        return dict.popitem(self)
+
+    def setdefault(self, fno, frame=None):
+        self.version += 1
+        return dict.setdefault(self, fno, frame)
+
+    def update(self, *args, **kwargs):
+        self.version += 1
+        dict.update(self, *args, **kwargs)
+
+    def clear(self):
+        self.version += 1
+        dict.clear(self)
+
+    def copy(self):
+        return VmdFrameDict(self)
+
+    def __reduce__(self):
+        return (VmdFrameDict, (dict(self),))
+
+
+# キーフレームの書き込み番号（VmdFrameDict・VmdFrameTrack 以外の辞書は -1）
+cdef long c_get_frames_version(object frames):
+    if isinstance(frames, VmdFrameDict):
+        return (<VmdFrameDict>frames).version
+
+    if isinstance(frames, VmdFrameTrack):
+        return (<VmdFrameTrack>frames).version
+
+    return -1
+
+
+# キーフレームの列指向トラック（1ボーン・1モーフ分）
+# 値は昇順フレーム番号と対応した配列で保持し、辞書と同じように fno でアクセスできる
+# 取り出したフレームは frames に保持され、以降の変更はそのフレームに対して行われる（辞書と同じ）
+# 参照専用のトラック（keep_frames=False を指定して複製したもの）のみ、取り出すたびに一時的なフレームを生成し、書き込みは受け付けない
+# 列の配列は書き換えずに差し替えるので、複製したトラック同士で共有できる（コピーオンライト）
+cdef class VmdFrameTrack:
+
+    def __init__(self, name, frames=None):
+        self.name = name
+        self.bname = b''
+        self.fnos = np.zeros(0, dtype=np.int32)
+        self.key_flags = np.zeros(0, dtype=np.bool_)
+        self.read_flags = np.zeros(0, dtype=np.bool_)
+        self.extras = {}
+        self.frames = {}
+        self.removed = set()
+        self.new_cnt = 0
+        self.keep_frames = True
+
+        if frames:
+            self.pack(frames)
+
+    # フレーム番号の行番号を二分探索で求める（なければ-1）
+    cdef Py_ssize_t c_find_row(self, int fno):
+        cdef int[:] fnos = self.fnos
+        cdef Py_ssize_t lo = 0
+        cdef Py_ssize_t hi = fnos.shape[0]
+        cdef Py_ssize_t mid
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if fnos[mid] < fno:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < fnos.shape[0] and fnos[lo] == fno:
+            return lo
+
+        return -1
+
+    # 行からフレームを生成する
+    cdef object c_make_frame(self, Py_ssize_t row):
+        return None
+
+    # フレームを取得する（列にのみある場合、生成したフレームを保持する）
+    # is_keep=False か参照専用トラックの場合は保持せず、一時的なフレームを返す（戻り値への変更は反映されない）
+    cdef object c_peek(self, int fno, bint is_keep=True):
+        if fno in self.frames:
+            if self.keep_frames:
+                return self.frames[fno]
+
+            # 参照専用トラックでは、保持しているフレームも書き換えられないよう複製して返す
+            return self.frames[fno].copy()
+
+        cdef Py_ssize_t row = self.c_find_row(fno)
+        if row < 0 or fno in self.removed:
+            return None
+
+        if is_keep and self.keep_frames:
+            return self.frames.setdefault(fno, self.c_make_frame(row))
+
+        return self.c_make_frame(row)
+
+    # 参照専用トラックへの書き込みは受け付けない
+    cdef c_check_writable(self):
+        if not self.keep_frames:
+            raise TypeError("read-only track: {0}".format(self.name))
+
+        self.version += 1
+
+    # 列の配列は共有し、取り出し済みのフレームのみ複製する
+    cdef c_copy_to(self, VmdFrameTrack track, bint keep_frames):
+        track.bname = self.bname
+        track.fnos = self.fnos
+        track.key_flags = self.key_flags
+        track.read_flags = self.read_flags
+        track.frames = {fno: frame.copy() for fno, frame in self.frames.items()}
+        track.removed = set(self.removed)
+        track.new_cnt = self.new_cnt
+        track.keep_frames = keep_frames
+
+    # 指定フレームが条件（등록対象・読み込み키）に合致するか
+    cdef bint c_is_flag(self, int fno, bint is_key, bint is_read):
+        cdef Py_ssize_t row
+
+        if fno in self.frames:
+            frame = self.frames[fno]
+            return (not is_key or frame.key) and (not is_read or frame.read)
+
+        row = self.c_find_row(fno)
+        return (not is_key or self.key_flags[row]) and (not is_read or self.read_flags[row])
+
+    # 昇順フレーム番号リスト
+    cdef list c_keys(self):
+        cdef list fnos = self.fnos.tolist()
+
+        if self.removed:
+            fnos = [fno for fno in fnos if fno not in self.removed]
+
+        if self.new_cnt > 0:
+            fnos.extend([fno for fno in self.frames.keys() if self.c_find_row(fno) < 0])
+            fnos.sort()
+
+        return fnos
+
+    def __len__(self):
+        return np.PyArray_DIM(self.fnos, 0) - len(self.removed) + self.new_cnt
+
+    def __contains__(self, fno):
+        if fno in self.frames:
+            return True
+
+        return self.c_find_row(fno) >= 0 and fno not in self.removed
+
+    def __getitem__(self, fno):
+        if self.keep_frames and fno in self.frames:
+            return self.frames[fno]
+
+        frame = self.c_peek(fno)
+        if frame is None:
+            raise KeyError(fno)
+
+        return frame
+
+    def __setitem__(self, fno, frame):
+        cdef Py_ssize_t row
+
+        self.c_check_writable()
+
+        if fno not in self.frames:
+            row = self.c_find_row(fno)
+            if row < 0:
+                self.new_cnt += 1
+            else:
+                self.removed.discard(fno)
+
+        self.frames[fno] = frame
+
+    def __delitem__(self, fno):
+        self.c_check_writable()
+
+        cdef Py_ssize_t row = self.c_find_row(fno)
+
+        if fno in self.frames:
+            del self.frames[fno]
+            if row < 0:
+                self.new_cnt -= 1
+            else:
+                self.removed.add(fno)
+        elif row >= 0 and fno not in self.removed:
+            self.removed.add(fno)
+        else:
+            raise KeyError(fno)
+
+    def __iter__(self):
+        return iter(self.c_keys())
+
+    def keys(self):
+        return self.c_keys()
+
+    def values(self):
+        return [self[fno] for fno in self.c_keys()]
+
+    def items(self):
+        return [(fno, self[fno]) for fno in self.c_keys()]
+
+    def get(self, fno, default=None):
+        if fno in self:
+            return self[fno]
+
+        return default
+
+    # 取り出し済みのフレームを列に書き戻す
+    def compact(self):
+        self.pack({fno: self.c_peek(fno, False) for fno in self.c_keys()})
+
+    def pack(self, frames):
+        pass
+
+
+# ボーンキーフレームの列指向トラック
+cdef class VmdBoneTrack(VmdFrameTrack):
+
+    def __init__(self, name, frames=None):
+        self.positions = np.zeros((0, 3), dtype=np.float64)
+        self.rotations = np.zeros((0, 4), dtype=np.float64)
+        self.org_rotations = np.zeros((0, 4), dtype=np.float64)
+        self.interpolations = np.zeros((0, 64), dtype=np.int16)
+        super().__init__(name, frames)
+
+    cdef object c_make_frame(self, Py_ssize_t row):
+        cdef double[:, :] positions = self.positions
+        cdef double[:, :] rotations = self.rotations
+        cdef double[:, :] org_rotations = self.org_rotations
+        cdef int fno = self.fnos[row]
+        cdef VmdBoneFrame bf = VmdBoneFrame(fno)
+
+        bf.name = self.name
+        bf.bname = self.bname
+        bf.position = MVector3D(positions[row, 0], positions[row, 1], positions[row, 2])
+        bf.rotation = MQuaternion(rotations[row, 0], rotations[row, 1], rotations[row, 2], rotations[row, 3])
+        if org_rotations[row, 0] != 1 or org_rotations[row, 1] != 0 or org_rotations[row, 2] != 0 or org_rotations[row, 3] != 0:
+            # 既定の元회전は共有したままにする
+            bf.org_rotation = MQuaternion(org_rotations[row, 0], org_rotations[row, 1], org_rotations[row, 2], org_rotations[row, 3])
+        bf.interpolation = array.array('h', self.interpolations[row].tobytes())
+        bf.key = self.key_flags[row]
+        bf.read = self.read_flags[row]
+
+        if fno in self.extras:
+            bf.name, bf.bname, bf.avoidance, bf.org_position = self.extras[fno]
+
+        return bf
+
+    # ボーンキーフレーム辞書（fno: VmdBoneFrame）を列に詰める
+    def pack(self, frames):
+        cdef VmdBoneFrame bf
+        cdef MQuaternion org_rotation
+        cdef list packed = []
+        cdef list org_rotations = []
+        cdef dict rest = {}
+        cdef Py_ssize_t n
+
+        for fno in sorted(frames.keys()):
+            bf = frames[fno]
+            if bf.fno != fno or bf.position is None or bf.rotation is None or bf.c_peek_org_rotation() is None \
+                    or len(bf.interpolation) != 64 \
+                    or (bf.org_interpolation is not DEFAULT_INTERPOLATION and bf.org_interpolation != DEFAULT_INTERPOLATION):
+                # 列で表せないフレームはそのまま保持する
+                rest[fno] = bf
+            else:
+                packed.append(bf)
+
+        if packed and not self.bname:
+            self.bname = packed[0].bname
+
+        n = len(packed)
+        self.fnos = np.array([bf.fno for bf in packed], dtype=np.int32)
+        self.positions = np.array([[bf.position.x(), bf.position.y(), bf.position.z()] for bf in packed], dtype=np.float64).reshape(n, 3)
+        self.rotations = np.array([[bf.rotation.scalar(), bf.rotation.x(), bf.rotation.y(), bf.rotation.z()] for bf in packed], dtype=np.float64).reshape(n, 4)
+        # 参照のみなので、共有している元회전は複製しない
+        for bf in packed:
+            org_rotation = bf.c_peek_org_rotation()
+            org_rotations.append((org_rotation.scalar(), org_rotation.x(), org_rotation.y(), org_rotation.z()))
+        self.org_rotations = np.array(org_rotations, dtype=np.float64).reshape(n, 4)
+        # 보간 곡선はフレームと同じ符号付き16bitのまま連結する
+        self.interpolations = np.frombuffer(b''.join([bf.interpolation for bf in packed]), dtype=np.int16).reshape(n, 64)
+        self.key_flags = np.array([bf.key for bf in packed], dtype=np.bool_)
+        self.read_flags = np.array([bf.read for bf in packed], dtype=np.bool_)
+        self.extras = {bf.fno: (bf.name, bf.bname, bf.avoidance, bf.org_position) for bf in packed \
+                       if bf.name != self.name or bf.bname != self.bname or bf.avoidance or bf.org_position is not None}
+        self.frames = rest
+        self.removed = set()
+        self.new_cnt = len(rest)
+
+    # keep_frames: 複製先で取り出したフレームを保持するか（書き込み用の複製ではTrue）
+    def copy(self, keep_frames=True):
+        cdef VmdBoneTrack track = VmdBoneTrack(self.name)
+
+        self.c_copy_to(track, keep_frames)
+        track.positions = self.positions
+        track.rotations = self.rotations
+        track.org_rotations = self.org_rotations
+        track.interpolations = self.interpolations
+        track.extras = {fno: (name, bname, avoidance, None if org_position is None else org_position.copy()) \
+                        for fno, (name, bname, avoidance, org_position) in self.extras.items()}
+
+        return track
+
+
+# モーフキーフレームの列指向トラック
+cdef class VmdMorphTrack(VmdFrameTrack):
+
+    def __init__(self, name, frames=None):
+        self.ratios = np.zeros(0, dtype=np.float32)
+        super().__init__(name, frames)
+
+    cdef object c_make_frame(self, Py_ssize_t row):
+        cdef float[:] ratios = self.ratios
+        cdef int fno = self.fnos[row]
+        cdef VmdMorphFrame mf = VmdMorphFrame(fno)
+
+        mf.name = self.name
+        mf.bname = self.bname
+        mf.ratio = ratios[row]
+        mf.key = self.key_flags[row]
+        mf.read = self.read_flags[row]
+
+        if fno in self.extras:
+            mf.name, mf.bname = self.extras[fno]
+
+        return mf
+
+    # モーフキーフレーム辞書（fno: VmdMorphFrame）を列に詰める
+    def pack(self, frames):
+        cdef VmdMorphFrame mf
+        cdef list packed = []
+        cdef dict rest = {}
+
+        for fno in sorted(frames.keys()):
+            mf = frames[fno]
+            if mf.fno != fno:
+                rest[fno] = mf
+            else:
+                packed.append(mf)
+
+        if packed and not self.bname:
+            self.bname = packed[0].bname
+
+        self.fnos = np.array([mf.fno for mf in packed], dtype=np.int32)
+        self.ratios = np.array([mf.ratio for mf in packed], dtype=np.float32)
+        self.key_flags = np.array([mf.key for mf in packed], dtype=np.bool_)
+        self.read_flags = np.array([mf.read for mf in packed], dtype=np.bool_)
+        self.extras = {mf.fno: (mf.name, mf.bname) for mf in packed if mf.name != self.name or mf.bname != self.bname}
+        self.frames = rest
+        self.removed = set()
+        self.new_cnt = len(rest)
+
+    def copy(self, keep_frames=True):
+        cdef VmdMorphTrack track = VmdMorphTrack(self.name)
+
+        self.c_copy_to(track, keep_frames)
+        track.ratios = self.ratios
+        track.extras = dict(self.extras)
+
+        return track
+
+
 class VmdCameraFrame:
     def __init__(self):
         self.fno = 0
@@ -294,6 +906,486 @@ class VmdShowIkFrame:
             fout.write(struct.pack('b', k.onoff))
 
 
+# フレーム毎のグローバル行列キャッシュ（参照専用モーションの FK 結果を処理段階間で共有する）
+# キー: (モデルID, フレーム番号, 親からのリンクキー)  値: (グローバル位置, 自身までの剛体変換の積, stamp)
+# キーフレーム辞書への書き込みは stamp の書き込み番号で検知する。取り出したフレームの直接の変更は検知できないので、
+# 取り出したフレームを書き換えられない参照専用モーション（snapshot）でのみ使う
+cdef class VmdPoseCache:
+    def __init__(self, max_size=50000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.entries = OrderedDict()
+        # フレーム番号：そのフレームのキー集合
+        self.fno_keys = {}
+        # キャッシュがあるフレーム番号（昇順）
+        self.fnos = []
+        # IDが再利用されないよう、キーにしたモデルを保持する
+        self.models = {}
+        self.lock = threading.Lock()
+
+    # stamp: 計算に使ったキーフレーム辞書と書き込み番号の組（登録時と異なれば、古いキャッシュとして破棄する）
+    def get(self, model, fno: int, link_key, stamp: tuple):
+        return self.c_get(model, fno, link_key, stamp)
+
+    cdef tuple c_get(self, object model, int fno, object link_key, tuple stamp):
+        cdef tuple key = (id(model), fno, link_key)
+        cdef tuple pose
+
+        with self.lock:
+            pose = self.entries.get(key, None)
+            if pose is None:
+                return None
+
+            if not c_is_same_stamp(pose[2], stamp):
+                # 登録後にキーフレームが書き換えられている
+                del self.entries[key]
+                self.c_discard_key(key)
+                self.invalidations += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        return pose
+
+    def put(self, model, fno: int, link_key, stamp: tuple, global_pos: MVector3D, total_transform: MTransform):
+        self.c_put(model, fno, link_key, stamp, global_pos, total_transform)
+
+    cdef c_put(self, object model, int fno, object link_key, tuple stamp, MVector3D global_pos, MTransform total_transform):
+        cdef tuple key = (id(model), fno, link_key)
+        cdef tuple old_key
+
+        with self.lock:
+            self.misses += 1
+            self.models[id(model)] = model
+
+            if fno not in self.fno_keys:
+                self.fno_keys[fno] = set()
+                insort(self.fnos, fno)
+            self.fno_keys[fno].add(key)
+            self.entries[key] = (global_pos, total_transform, stamp)
+
+            while len(self.entries) > self.max_size:
+                # 一番使われていないものから捨てる
+                old_key, _ = self.entries.popitem(last=False)
+                self.c_discard_key(old_key)
+
+    cdef c_discard_key(self, tuple key):
+        cdef int fno = key[1]
+        cdef set keys = self.fno_keys.get(fno, None)
+
+        if keys is None:
+            return
+
+        keys.discard(key)
+        if not keys:
+            del self.fno_keys[fno]
+            del self.fnos[bisect_left(self.fnos, fno)]
+
+    # 指定範囲（両端は含まない）のフレームのキャッシュを破棄する
+    def invalidate(self, start_fno=None, end_fno=None):
+        self.c_invalidate(INT_MIN if start_fno is None else start_fno, INT_MAX if end_fno is None else end_fno)
+
+    cdef c_invalidate(self, int start_fno, int end_fno):
+        cdef Py_ssize_t start_idx, end_idx
+        cdef int fno
+        cdef tuple key
+
+        with self.lock:
+            start_idx = bisect_right(self.fnos, start_fno)
+            end_idx = bisect_left(self.fnos, end_fno)
+
+            if start_idx >= end_idx:
+                return
+
+            for fno in self.fnos[start_idx:end_idx]:
+                for key in self.fno_keys.pop(fno):
+                    del self.entries[key]
+                    self.invalidations += 1
+            del self.fnos[start_idx:end_idx]
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.fno_keys.clear()
+            self.fnos.clear()
+            self.models.clear()
+
+    def reset_counts(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ヒット数, ミス数, 破棄数, 保持数
+    def counts(self):
+        return self.hits, self.misses, self.invalidations, len(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# キャッシュの stamp（キーフレーム辞書, 書き込み番号, ...）が同じか（辞書は同一オブジェクトであること）
+cdef bint c_is_same_stamp(tuple stamp, tuple other):
+    cdef Py_ssize_t n
+
+    if len(stamp) != len(other):
+        return False
+
+    for n in range(0, len(stamp), 2):
+        if stamp[n] is not other[n] or stamp[n + 1] != other[n + 1]:
+            return False
+
+    return True
+
+
+# 変曲点の判定に使う変化量の閾値（회전, 이동）
+INFECTION_ROT_LIMIT = 0.001
+INFECTION_MOV_LIMIT = 0.003
+
+cdef double INFECTION_ROT_LIMIT_VALUE = INFECTION_ROT_LIMIT
+cdef double INFECTION_MOV_LIMIT_VALUE = INFECTION_MOV_LIMIT
+cdef double RAD_TO_DEG = 180.0 / pi
+
+
+# 正規化したクォータニオン（MQuaternion.normalizedと同じ計算順）
+cdef inline void c_normalize_quaternion(double* q, double* result) nogil:
+    cdef double l2
+    cdef int k
+
+    for k in range(4):
+        result[k] = q[k]
+
+    l2 = sqrt(result[0] * result[0] + result[1] * result[1] + result[2] * result[2] + result[3] * result[3])
+    for k in range(4):
+        result[k] /= l2
+
+
+cdef inline double c_dot_quaternion(double* q1, double* q2) nogil:
+    return q1[0] * q2[0] + q1[1] * q2[1] + q1[2] * q2[2] + q1[3] * q2[3]
+
+
+cdef inline void c_copy_quaternion(double* q, double* result) nogil:
+    cdef int k
+    for k in range(4):
+        result[k] = q[k]
+
+
+# MQuaternionの!=と同じ
+cdef inline bint c_is_different_quaternion(double* q1, double* q2) nogil:
+    return not (q1[0] == q2[0] and q1[1] == q2[1] and q1[2] == q2[2] and q1[3] == q2[3])
+
+
+# np.signと同じ（NaNはNaNのまま）
+cdef inline double c_sign_value(double v) nogil:
+    if v > 0:
+        return 1
+    elif v < 0:
+        return -1
+    elif v == 0:
+        return 0
+    return v
+
+
+# 変化量の列から変曲点を求め、marksに印をつける（np.gradient -> 符号の変化 -> 変曲点同士の差が閾値以上）
+# https://teratail.com/questions/162391
+cdef void c_mark_infections(double* diffs, Py_ssize_t n, double limit, unsigned char* marks) nogil:
+    cdef Py_ssize_t i
+    cdef Py_ssize_t prev_idx = -1
+    cdef double prime, prev_sign, now_sign
+
+    if n < 2:
+        return
+
+    # 差分近似（np.gradientと同じく、端は片側差分、間は中心差分）
+    prev_sign = c_sign_value((diffs[1] - diffs[0]) / 1.0)
+    for i in range(1, n):
+        if i < n - 1:
+            prime = (diffs[i + 1] - diffs[i - 1]) / 2.0
+        else:
+            prime = (diffs[i] - diffs[i - 1]) / 1.0
+        now_sign = c_sign_value(prime)
+
+        if (now_sign - prev_sign) != 0:
+            # 符号が変わった（i - 1 が変曲点の候補）
+            if prev_idx >= 0 and fabs(diffs[i - 1] - diffs[prev_idx]) > limit:
+                # 前の候補との差が閾値以上の場合、前の候補の次フレームを変曲点とする
+                marks[prev_idx + 1] = 1
+            prev_idx = i - 1
+
+        prev_sign = now_sign
+
+
+# 변곡점の一括検出（rotations: N×4(w, x, y, z)、positions: N×3、連続したフレームの値）
+# 戻り値: (変曲点のフラグ(N), 変化量(N×4: 前フレームとの회전の変位量(calcTheata), 이동X, 이동Y, 이동Z))
+def calc_infections(rotations, positions, is_rot: bint, is_mov: bint):
+    return c_calc_infections(np.ascontiguousarray(rotations, dtype=np.float64), np.ascontiguousarray(positions, dtype=np.float64), is_rot, is_mov)
+
+
+cdef tuple c_calc_infections(np.ndarray rotations, np.ndarray positions, bint is_rot, bint is_mov):
+    cdef Py_ssize_t n = np.PyArray_DIM(rotations, 0)
+    cdef np.ndarray marks = np.zeros(n, dtype=np.uint8)
+    cdef np.ndarray values = np.zeros((n, 4), dtype=np.float64)
+    cdef np.ndarray diffs = np.zeros(n, dtype=np.float64)
+    cdef double[:, ::1] rv = rotations
+    cdef double[:, ::1] pv = positions
+    cdef double[:, ::1] vv = values
+    cdef double[::1] dv = diffs
+    cdef unsigned char[::1] mv = marks
+    cdef double identity[4]
+    cdef double prev_q[4]
+    cdef double now_q[4]
+    cdef Py_ssize_t i
+    cdef int axis
+
+    if n == 0:
+        return marks, values
+
+    identity[:] = [1, 0, 0, 0]
+
+    with nogil:
+        if is_rot:
+            c_normalize_quaternion(&rv[0, 0], prev_q)
+            for i in range(1, n):
+                c_normalize_quaternion(&rv[i, 0], now_q)
+                vv[i, 0] = 1 - c_dot_quaternion(now_q, prev_q)
+                dv[i] = vv[i, 0]
+                c_copy_quaternion(now_q, prev_q)
+
+            if n > 1:
+                # 先頭の次は、従来どおり初期値（単位クォータニオン）との変位量で判定する
+                c_normalize_quaternion(&rv[1, 0], now_q)
+                dv[1] = 1 - c_dot_quaternion(now_q, identity)
+
+            c_mark_infections(&dv[0], n, INFECTION_ROT_LIMIT_VALUE, &mv[0])
+
+        if is_mov:
+            for axis in range(3):
+                for i in range(n):
+                    vv[i, axis + 1] = pv[i, axis]
+                    dv[i] = pv[i, axis] - pv[i - 1, axis] if i > 0 else 0
+
+                c_mark_infections(&dv[0], n, INFECTION_MOV_LIMIT_VALUE, &mv[0])
+
+    return marks.astype(np.bool_), values
+
+
+# キー追加対象フレームの一括判定（ws: ボーン×フレームの회전W、positions: ボーン×フレーム×3、reads: ボーン×フレームの読み込みキーフラグ）
+# フレーム0から順に、ボーン毎に前フレームとの角度差・이동量を積み上げ、閾値を超えたフレームに印をつける
+# 戻り値: 追加フラグ（フレーム0は常に対象）
+def calc_differ_flags(ws, positions, reads, limit_degrees: float, limit_length: float):
+    return c_calc_differ_flags(np.ascontiguousarray(ws, dtype=np.float64), np.ascontiguousarray(positions, dtype=np.float64), \
+                               np.ascontiguousarray(reads, dtype=np.uint8), limit_degrees, limit_length)
+
+
+cdef np.ndarray c_calc_differ_flags(np.ndarray ws, np.ndarray positions, np.ndarray reads, double limit_degrees, double limit_length):
+    cdef Py_ssize_t bone_cnt = np.PyArray_DIM(ws, 0)
+    cdef Py_ssize_t fno_cnt = np.PyArray_DIM(ws, 1)
+    cdef np.ndarray flags = np.zeros(fno_cnt, dtype=np.uint8)
+    cdef np.ndarray degrees = np.zeros((bone_cnt, fno_cnt), dtype=np.float64)
+    cdef double[:, ::1] wv = ws
+    cdef double[:, :, ::1] pv = positions
+    cdef unsigned char[:, ::1] readv = reads
+    cdef double[:, ::1] degv = degrees
+    cdef unsigned char[::1] fv = flags
+    cdef double rot_diff = 0
+    cdef double mov_diff = 0
+    cdef double w, dx, dy, dz
+    cdef Py_ssize_t b, fno
+
+    if fno_cnt == 0:
+        return flags
+
+    with nogil:
+        # 角度（MQuaternion.toDegreeと同じ）
+        for b in range(bone_cnt):
+            for fno in range(fno_cnt):
+                w = -1
+                if wv[b, fno] > w:
+                    w = wv[b, fno]
+                if w > 1:
+                    w = 1
+                degv[b, fno] = 2 * acos(w) * RAD_TO_DEG
+
+        fv[0] = 1
+        for fno in range(1, fno_cnt):
+            for b in range(bone_cnt):
+                if readv[b, fno]:
+                    # 読み込みキーである場合、必ず処理対象に追加
+                    fv[fno] = 1
+                    rot_diff = 0
+                    mov_diff = 0
+                    continue
+
+                if fv[fno - 1]:
+                    # 前のキーがある場合、とりあえずスルー
+                    continue
+
+                rot_diff += fabs(degv[b, fno - 1] - degv[b, fno])
+                if rot_diff > limit_degrees and limit_degrees > 0:
+                    fv[fno] = 1
+                    rot_diff = 0
+                elif limit_length > 0:
+                    dx = pv[b, fno - 1, 0] - pv[b, fno, 0]
+                    dy = pv[b, fno - 1, 1] - pv[b, fno, 1]
+                    dz = pv[b, fno - 1, 2] - pv[b, fno, 2]
+                    mov_diff += sqrt(dx * dx + dy * dy + dz * dz)
+                    if mov_diff > limit_length:
+                        fv[fno] = 1
+                        mov_diff = 0
+
+    return flags
+
+
+# 跳ねたキーの一括유연화（key_fnos: キーのフレーム番号、rotations: キー×4(w, x, y, z)、結果で上書きする）
+# keys: 登録対象キーのフラグ、prev_ys・next_ys: 各キーの前後1フレームの회전보간 곡선の値（間にキーがない場合のみ使う）
+# start_row から end_row の手前までのキーを順に処理する（前のキーの修正結果を、次のキーの判定に使う）
+# 戻り値: 修正したキーのフラグ
+def smooth_rotations(key_fnos, rotations, keys, prev_ys, next_ys, start_row: int, end_row: int, limit_degrees: float):
+    return c_smooth_rotations(np.ascontiguousarray(key_fnos, dtype=np.int32), rotations, np.ascontiguousarray(keys, dtype=np.uint8), \
+                              np.ascontiguousarray(prev_ys, dtype=np.float64), np.ascontiguousarray(next_ys, dtype=np.float64), \
+                              start_row, end_row, radians(limit_degrees))
+
+
+cdef np.ndarray c_smooth_rotations(np.ndarray key_fnos, np.ndarray rotations, np.ndarray keys, np.ndarray prev_ys, np.ndarray next_ys, \
+                                   Py_ssize_t start_row, Py_ssize_t end_row, double limit_radians):
+    cdef Py_ssize_t key_cnt = np.PyArray_DIM(key_fnos, 0)
+    cdef np.ndarray flags = np.zeros(key_cnt, dtype=np.uint8)
+    cdef int[::1] fnov = key_fnos
+    cdef double[:, ::1] rv = rotations
+    cdef unsigned char[::1] kv = keys
+    cdef double[::1] pyv = prev_ys
+    cdef double[::1] nyv = next_ys
+    cdef unsigned char[::1] fv = flags
+    cdef double prev_q[4]
+    cdef double next_q[4]
+    cdef double prev_next_dot, now_next_dot
+    cdef Py_ssize_t r
+
+    with nogil:
+        for r in range(max(start_row, 0), min(end_row, key_cnt)):
+            if not kv[r]:
+                continue
+
+            # 前のフレーム（キーがない場合は補間）
+            if r == 0:
+                c_copy_quaternion(&rv[r, 0], prev_q)
+            elif fnov[r - 1] == fnov[r] - 1 or not c_is_different_quaternion(&rv[r - 1, 0], &rv[r, 0]):
+                c_copy_quaternion(&rv[r - 1, 0], prev_q)
+            else:
+                calc_slerp(&rv[r - 1, 0], &rv[r, 0], pyv[r], prev_q)
+
+            # 後のフレーム（キーがない場合は補間）
+            if r == key_cnt - 1:
+                c_copy_quaternion(&rv[r, 0], next_q)
+            elif fnov[r + 1] == fnov[r] + 1:
+                c_copy_quaternion(&rv[r + 1, 0], next_q)
+            elif not c_is_different_quaternion(&rv[r, 0], &rv[r + 1, 0]):
+                c_copy_quaternion(&rv[r, 0], next_q)
+            else:
+                calc_slerp(&rv[r, 0], &rv[r + 1, 0], nyv[r], next_q)
+
+            # 前後の内積と、自分と後の内積
+            prev_next_dot = c_dot_quaternion(prev_q, next_q)
+            now_next_dot = c_dot_quaternion(&rv[r, 0], next_q)
+
+            # 前後と自分の内積の差が一定以上の場合、유연화
+            if prev_next_dot > now_next_dot and fabs(now_next_dot - prev_next_dot) > limit_radians:
+                calc_slerp(prev_q, next_q, 0.5, &rv[r, 0])
+                fv[r] = 1
+
+    return flags
+
+
+# smooth_filter_bf の区間内フレームの一括計算
+# 区間内のフレームは前から順に登録し直すため、キーのないフレームは「直前に登録したフレーム」と「次のキー」の間で補間した値になる
+# segs: 各フレームの区間INDEX、fnos: フレーム番号、stored: キーがあるか
+# positions・rotations: キーがある場合はその値、ない場合は次のキーの値
+# ys: キーがない場合の보간 곡선の値（회전, 이동X, 이동Y, 이동Z）
+# seg_fnos: 区間の開始・終了フレーム番号、seg_positions・seg_rotations: 区間開始キーの値、seg_end_rotations: 区間終了キーの회전
+# is_mov: Trueの場合は이동をOneEuroFilterにかけ、Falseの場合は회전を区間の開始・終了の間に寄せる
+# 戻り値: 各フレームの登録値（이동, 회전）
+@cython.cdivision(True)
+cdef tuple c_filter_bf_frames(np.ndarray segs, np.ndarray fnos, np.ndarray stored, np.ndarray positions, np.ndarray rotations, np.ndarray ys, \
+                              np.ndarray seg_fnos, np.ndarray seg_positions, np.ndarray seg_rotations, np.ndarray seg_end_rotations, bint is_mov, dict config):
+    cdef Py_ssize_t frame_cnt = np.PyArray_DIM(fnos, 0)
+    cdef np.ndarray results_positions = np.zeros((frame_cnt, 3), dtype=np.float64)
+    cdef np.ndarray results_rotations = np.zeros((frame_cnt, 4), dtype=np.float64)
+    cdef int[::1] segv = segs
+    cdef int[::1] fnov = fnos
+    cdef unsigned char[::1] storedv = stored
+    cdef double[:, ::1] pv = positions
+    cdef double[:, ::1] rv = rotations
+    cdef double[:, ::1] yv = ys
+    cdef int[:, ::1] seg_fnov = seg_fnos
+    cdef double[:, ::1] seg_pv = seg_positions
+    cdef double[:, ::1] seg_rv = seg_rotations
+    cdef double[:, ::1] seg_erv = seg_end_rotations
+    cdef double[:, ::1] rpv = results_positions
+    cdef double[:, ::1] rrv = results_rotations
+    cdef OneEuroState filters[3]
+    cdef double prev_pos[3]
+    cdef double prev_rot[4]
+    cdef double now_pos[3]
+    cdef double now_rot[4]
+    cdef double filterd_rot[4]
+    cdef Py_ssize_t m
+    cdef int s, k
+
+    for k in range(3):
+        c_init_one_euro_state(&filters[k], config)
+
+    with nogil:
+        for m in range(frame_cnt):
+            s = segv[m]
+
+            if m == 0 or segv[m - 1] != s:
+                # 区間の最初は、区間開始キーとの間で補間する
+                for k in range(3):
+                    prev_pos[k] = seg_pv[s, k]
+                c_copy_quaternion(&seg_rv[s, 0], prev_rot)
+
+            if storedv[m]:
+                # キーがある場合はそのまま
+                for k in range(3):
+                    now_pos[k] = pv[m, k]
+                c_copy_quaternion(&rv[m, 0], now_rot)
+            else:
+                # 이동（calc_bf_posと同じ）
+                if prev_pos[0] != pv[m, 0] or prev_pos[1] != pv[m, 1] or prev_pos[2] != pv[m, 2]:
+                    for k in range(3):
+                        now_pos[k] = prev_pos[k] + ((pv[m, k] - prev_pos[k]) * yv[m, k + 1])
+                else:
+                    for k in range(3):
+                        now_pos[k] = prev_pos[k]
+
+                # 회전（calc_bf_rotと同じ）
+                if c_is_different_quaternion(prev_rot, &rv[m, 0]):
+                    calc_slerp(prev_rot, &rv[m, 0], yv[m, 0], now_rot)
+                else:
+                    c_copy_quaternion(prev_rot, now_rot)
+
+            if is_mov:
+                for k in range(3):
+                    rpv[m, k] = c_filter_one_euro(&filters[k], now_pos[k], -1)
+                c_copy_quaternion(now_rot, &rrv[m, 0])
+            else:
+                # まず前後の中間をそのまま求め、現在の회전にも少し近づける
+                calc_slerp(&seg_rv[s, 0], &seg_erv[s, 0], (fnov[m] - seg_fnov[s, 0]) / <double>(seg_fnov[s, 1] - seg_fnov[s, 0]), filterd_rot)
+                calc_slerp(filterd_rot, now_rot, 0.8, &rrv[m, 0])
+                for k in range(3):
+                    rpv[m, k] = now_pos[k]
+
+            # 次のフレームの直前は、今回登録する値
+            for k in range(3):
+                prev_pos[k] = rpv[m, k]
+            c_copy_quaternion(&rrv[m, 0], prev_rot)
+
+    return results_positions, results_rotations
+
+
 # https://blog.goo.ne.jp/torisu_tetosuki/e/bc9f1c4d597341b394bd02b64597499d
 # https://w.atwiki.jp/kumiho_k/pages/15.html
 cdef class VmdMotion:
@@ -322,6 +1414,118 @@ cdef class VmdMotion:
         self.showiks = []
         # ハッシュ値
         self.digest = None
+        # ボーン名：[キーフレーム辞書, 昇順フレーム番号リスト, 辞書の書き込み番号]
+        self.bone_fno_indexes = {}
+        # モーフ名：[キーフレーム辞書, 昇順フレーム番号リスト, 辞書の書き込み番号]
+        self.morph_fno_indexes = {}
+        # グローバル行列キャッシュ（VmdPoseCache）。参照専用モーションでのみ有効にする
+        self.pose_cache = None
+
+    # 指定ボーン・モーフの昇順フレーム番号リスト（インデックス）を取得する
+    cdef list c_get_sorted_fnos(self, dict fno_indexes, dict frames, str name):
+        if name not in frames:
+            return []
+
+        cdef object name_frames = frames[name]
+        cdef list fno_index = fno_indexes.get(name, None)
+        cdef long version = c_get_frames_version(name_frames)
+
+        if fno_index is None or fno_index[0] is not name_frames or fno_index[2] != version or len(fno_index[1]) != len(name_frames):
+            # 辞書が差し替えられたり、外から直接書き込まれた場合、作り直す
+            # （書き込み番号を持たない辞書は、キー数の変化でのみ判定する）
+            fno_index = [name_frames, sorted(name_frames.keys()), version]
+            fno_indexes[name] = fno_index
+
+        return fno_index[1]
+
+    # 値の参照用に指定キーフレームを取得する（列指向トラックの場合、保持せずに一時的なフレームを生成する）
+    # 戻り値を変更・返却する場合は frames[name][fno] で取得すること
+    cdef object c_peek_frame(self, dict frames, str name, int fno):
+        cdef object name_frames = frames[name]
+
+        if isinstance(name_frames, VmdFrameTrack):
+            return (<VmdFrameTrack>name_frames).c_peek(fno, False)
+
+        return name_frames[fno]
+
+    # インデックスを更新しつつキーフレームを登録する
+    cdef c_set_frame(self, dict fno_indexes, dict frames, str name, int fno, object frame):
+        if self.pose_cache is not None and frames is self.bones:
+            self.c_invalidate_pose(name, fno)
+
+        if name not in frames:
+            frames[name] = VmdFrameDict()
+
+        cdef list fnos = self.c_get_sorted_fnos(fno_indexes, frames, name)
+
+        if fno not in frames[name]:
+            insort(fnos, fno)
+
+        frames[name][fno] = frame
+        # インデックスは更新済みなので、書き込み番号だけ合わせる
+        fno_indexes[name][2] = c_get_frames_version(frames[name])
+
+    # インデックスを更新しつつキーフレームを削除する
+    cdef c_remove_frame(self, dict fno_indexes, dict frames, str name, int fno):
+        if name not in frames or fno not in frames[name]:
+            return
+
+        if self.pose_cache is not None and frames is self.bones:
+            self.c_invalidate_pose(name, fno)
+
+        cdef list fnos = self.c_get_sorted_fnos(fno_indexes, frames, name)
+        cdef int fidx = bisect_left(fnos, fno)
+
+        if fidx < len(fnos) and fnos[fidx] == fno:
+            del fnos[fidx]
+
+        del frames[name][fno]
+        fno_indexes[name][2] = c_get_frames_version(frames[name])
+
+    # 指定ボーン・フレームの変更で結果が変わりうるフレームのグローバル行列キャッシュを破棄する
+    # bone_name を省略した場合は全フレーム
+    def invalidate_pose(self, bone_name=None, fno=0):
+        if self.pose_cache is None:
+            return
+
+        if bone_name is None:
+            self.pose_cache.clear()
+        else:
+            self.c_invalidate_pose(bone_name, fno)
+
+    cdef c_invalidate_pose(self, str bone_name, int fno):
+        # 보간 곡선の再設定・分割は前後の키まで及ぶので、前後の키の間（キーがなければ端まで）を対象とする
+        cdef int start_fno = INT_MIN
+        cdef int end_fno = INT_MAX
+        cdef list fnos
+        cdef Py_ssize_t fidx
+        cdef object bf_dict
+
+        if bone_name in self.bones:
+            bf_dict = self.bones[bone_name]
+            fnos = self.c_get_sorted_fnos(self.bone_fno_indexes, self.bones, bone_name)
+
+            fidx = bisect_left(fnos, fno) - 1
+            while fidx >= 0:
+                if self.c_is_key_frame(bf_dict, fnos[fidx]):
+                    start_fno = fnos[fidx]
+                    break
+                fidx -= 1
+
+            fidx = bisect_right(fnos, fno)
+            while fidx < len(fnos):
+                if self.c_is_key_frame(bf_dict, fnos[fidx]):
+                    end_fno = fnos[fidx]
+                    break
+                fidx += 1
+
+        (<VmdPoseCache>self.pose_cache).c_invalidate(start_fno, end_fno)
+
+    cdef bint c_is_key_frame(self, object bf_dict, int fno):
+        if isinstance(bf_dict, VmdFrameTrack):
+            return (<VmdFrameTrack>bf_dict).c_is_flag(fno, True, False)
+
+        return bf_dict[fno].key
 
     def regist_full_bf(self, data_set_no: int, bone_name_list: list, offset=1, is_key=True):
         self.c_regist_full_bf(data_set_no, bone_name_list, offset, is_key)
@@ -364,19 +1568,10 @@ cdef class VmdMotion:
         return self.c_get_differ_fnos(data_set_no, bone_name_list, limit_degrees, limit_length)
 
     cdef list c_get_differ_fnos(self, int data_set_no, list bone_name_list, double limit_degrees, double limit_length):
-        # cdef double limit_radians = cmath.cos(math.radians(limit_degrees))
-        cdef list fnos = [0]
-        cdef str bone_name
-        cdef int prev_sep_fno = 0
         cdef list bone_fnos
-        cdef VmdBoneFrame prev_bf
-        cdef int fno
-        cdef int last_fno
-        cdef VmdBoneFrame bf
-        cdef DTYPE_FLOAT_t dot
-        cdef DTYPE_FLOAT_t rot_diff, mov_diff
-
-        prev_sep_fno = 0
+        cdef str bone_name
+        cdef int last_fno, bidx
+        cdef np.ndarray sample_fnos, ws, positions, reads, read_fnos, bone_positions, bone_rotations
 
         # 有効키を取得
         bone_fnos = self.get_bone_fnos(*bone_name_list, is_key=True)
@@ -384,55 +1579,30 @@ cdef class VmdMotion:
         if len(bone_fnos) <= 0:
             return []
 
-        # 比較対象bf
-        rot_diff = 0
-        mov_diff = 0
-        prev_bf = None
+        # 比較対象の全フレームの値をボーン毎にまとめて求める
         last_fno = bone_fnos[-1] + 1
-        for fno in range(1, last_fno + 1):
-            for bone_name in bone_name_list:
-                prev_bf = self.c_calc_bf(bone_name, fno - 1, is_key=False, is_read=False, is_reset_interpolation=False)
-                bf = self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
+        sample_fnos = np.arange(0, last_fno + 1, dtype=np.int32)
+        ws = np.zeros((len(bone_name_list), np.PyArray_DIM(sample_fnos, 0)), dtype=np.float64)
+        positions = np.zeros((len(bone_name_list), np.PyArray_DIM(sample_fnos, 0), 3), dtype=np.float64)
+        reads = np.zeros((len(bone_name_list), np.PyArray_DIM(sample_fnos, 0)), dtype=np.uint8)
 
-                if bf.read:
-                    # 読み込み키である場合、必ず処理対象に추가
-                    fnos.append(fno)
-                    rot_diff = 0
-                    mov_diff = 0
-                else:
-                    # 読み込み키ではない場合、処理対象にするかチェック
-                    if fno - 1 in fnos:
-                        # 前の키がある場合、とりあえずスルー
-                        continue
-
-                    # 読み込み키との差
-                    rot_diff += abs(prev_bf.rotation.toDegree() - bf.rotation.toDegree())
-                    if rot_diff > limit_degrees and limit_degrees > 0:
-                        # 前と今回の内積の差が指定度数より離れている場合、추가
-                        logger.debug("★ 추가 set: %s, %s, f: %s, diff: %s", data_set_no, bone_name, fno, rot_diff)
-                        fnos.append(fno)
-                        rot_diff = 0
-                    elif limit_length > 0:
-                        # 読み込み키との差
-                        mov_diff += prev_bf.position.distanceToPoint(bf.position)
-                        if mov_diff > limit_length:
-                            # 前と今回の이동量の差が指定値より離れている場合、추가
-                            logger.test("★ 추가 set: %s, %s, f: %s, diff: %s", data_set_no, bone_name, fno, mov_diff)
-                            fnos.append(fno)
-                            mov_diff = 0
-                    else:
-                        logger.test("× 추 가없는 set: %s, %s, f: %s, rot_diff: %s, mov_diff: %s", data_set_no, bone_name, fno, rot_diff, mov_diff)
+        for bidx, bone_name in enumerate(bone_name_list):
+            if bone_name not in self.bones:
+                # calc_bfと同じく、ないボーンは初期値で追加しておく
+                self.c_calc_bf(bone_name, 0, is_key=False, is_read=False, is_reset_interpolation=False)
 
-                if fno // 2000 > prev_sep_fno and bone_fnos[-1] > 0:
-                    if data_set_no > 0:
-                        logger.info("-- %s프레임째: 종료(%s％)【No.%s - 키 프레임 추가 준비 - %s】", fno, round((fno / bone_fnos[-1]) * 100, 3), data_set_no, bone_name)
-                        prev_sep_fno = fno // 2000
-                    else:
-                        logger.info("-- %s프레임째: 종료(%s％)【키 프레임 추가 준비 - %s】", fno, round((fno / bone_fnos[-1]) * 100, 3), bone_name)
-                        prev_sep_fno = fno // 2000
+            bone_positions, bone_rotations = self.c_calc_bf_range(bone_name, sample_fnos)
+            ws[bidx] = bone_rotations[:, 0]
+            positions[bidx] = bone_positions
 
-        # 重複を除いて再計算
-        return sorted(list(set(fnos)))
+            # 読み込み키（補間したフレームは読み込み키ではない）
+            read_fnos = np.array(self.get_bone_fnos(bone_name, is_read=True, end_fno=last_fno), dtype=np.int64)
+            reads[bidx, read_fnos] = 1
+
+        fnos = np.flatnonzero(c_calc_differ_flags(ws, positions, reads, limit_degrees, limit_length)).tolist()
+        logger.debug("★ 추가 set: %s, %s, fnos: %s", data_set_no, bone_name_list, fnos)
+
+        return fnos
 
     # 指定ボーンが跳ねてたりするのを回避
     def smooth_bf(self, data_set_no: int, bone_name: str, is_rot: bint, is_mov: bint, limit_degrees: float, start_fno=-1, end_fno=-1, is_show_log=True):
@@ -449,42 +1619,44 @@ cdef class VmdMotion:
             # 範囲指定がある場合はその範囲内だけ
             fnos = self.get_bone_fnos(bone_name, start_fno=start_fno, end_fno=end_fno)
 
-        cdef double limit_radians = radians(limit_degrees)
+        if len(fnos) <= 2 or not is_rot:
+            return
+
+        cdef np.ndarray key_fnos, key_positions, key_rotations, key_interpolations
+        key_fnos, key_positions, key_rotations, key_interpolations = self.c_get_bf_columns(bone_name)
+
+        # 前後1フレームの회전보간 곡선の値（キーの間にフレームがある箇所のみ）
+        cdef Py_ssize_t key_cnt = np.PyArray_DIM(key_fnos, 0)
+        cdef np.ndarray prev_ys = np.zeros(key_cnt, dtype=np.float64)
+        cdef np.ndarray next_ys = np.zeros(key_cnt, dtype=np.float64)
+        cdef np.ndarray gaps = np.flatnonzero(np.diff(key_fnos) > 1)
+        cdef np.ndarray next_interpolations
+
+        if np.PyArray_DIM(gaps, 0) > 0:
+            next_interpolations = key_interpolations[gaps + 1]
+            prev_ys[gaps + 1] = MBezierUtils.evaluate_range(next_interpolations[:, MBezierUtils.R_x1_idxs[3]], next_interpolations[:, MBezierUtils.R_y1_idxs[3]], \
+                                                            next_interpolations[:, MBezierUtils.R_x2_idxs[3]], next_interpolations[:, MBezierUtils.R_y2_idxs[3]], \
+                                                            key_fnos[gaps], key_fnos[gaps + 1] - 1, key_fnos[gaps + 1])
+            next_ys[gaps] = MBezierUtils.evaluate_range(next_interpolations[:, MBezierUtils.R_x1_idxs[3]], next_interpolations[:, MBezierUtils.R_y1_idxs[3]], \
+                                                        next_interpolations[:, MBezierUtils.R_x2_idxs[3]], next_interpolations[:, MBezierUtils.R_y2_idxs[3]], \
+                                                        key_fnos[gaps], key_fnos[gaps] + 1, key_fnos[gaps + 1])
+
+        # 列は書き換えないよう複製してから유연화する
+        cdef np.ndarray rotations = np.array(key_rotations, dtype=np.float64)
+        cdef np.ndarray keys = np.isin(key_fnos, self.get_bone_fnos(bone_name, is_key=True)).astype(np.uint8)
+        cdef Py_ssize_t start_row = np.searchsorted(key_fnos, fnos[0])
+        cdef np.ndarray flags = c_smooth_rotations(np.ascontiguousarray(key_fnos, dtype=np.int32), rotations, keys, prev_ys, next_ys, \
+                                                   start_row, start_row + len(fnos), radians(limit_degrees))
 
-        cdef int prev_sep_fno = 0
-        cdef int fno
-        cdef VmdBoneFrame prev_bf
         cdef VmdBoneFrame now_bf
-        cdef VmdBoneFrame next_bf
-        cdef DTYPE_FLOAT_t prev_next_dot
-        cdef DTYPE_FLOAT_t now_next_dot
-        cdef DTYPE_FLOAT_t diff
+        cdef Py_ssize_t row
 
-        if len(fnos) > 2:
-            for fno in fnos:
-                prev_bf = self.c_calc_bf(bone_name, fno - 1, is_key=False, is_read=False, is_reset_interpolation=False)
-                now_bf = self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
-                next_bf = self.c_calc_bf(bone_name, fno + 1, is_key=False, is_read=False, is_reset_interpolation=False)
-
-                if is_rot and now_bf.key:
-                    # 前後の内積
-                    prev_next_dot = MQuaternion.dotProduct(prev_bf.rotation, next_bf.rotation)
-                    # 自分と後の内積
-                    now_next_dot = MQuaternion.dotProduct(now_bf.rotation, next_bf.rotation)
-                    # 内積差分
-                    diff = np.abs(np.diff([prev_next_dot, now_next_dot]))
-                    logger.test("set: %s, %s, f: %s, diff: %s, prev_next_dot: %s, now_next_dot: %s", data_set_no, bone_name, fno, diff, prev_next_dot, now_next_dot)
-
-                    # 前後と自分の内積の差が一定以上の場合、유연화
-                    if prev_next_dot > now_next_dot and diff > limit_radians:
-                        logger.debug("★ 유연화 set: %s, %s, f: %s, diff: %s, prev_next_dot: %s, now_next_dot: %s", \
-                                     data_set_no, bone_name, fno, diff, prev_next_dot, now_next_dot)
-
-                        now_bf.rotation = MQuaternion.slerp(prev_bf.rotation, next_bf.rotation, ((now_bf.fno - prev_bf.fno) / (next_bf.fno - prev_bf.fno)))
+        # 유연화したキーだけ書き戻す
+        for row in np.flatnonzero(flags):
+            logger.debug("★ 유연화 set: %s, %s, f: %s", data_set_no, bone_name, key_fnos[row])
 
-                if is_show_log and data_set_no > 0 and fno // 2000 > prev_sep_fno and fnos[-1] > 0:
-                    logger.info("-- %s프레임째: 종료(%s％)【No.%s - 유연화 - %s】", fno, round((fno / fnos[-1]) * 100, 3), data_set_no, bone_name)
-                    prev_sep_fno = fno // 2000
+            now_bf = self.c_calc_bf(bone_name, key_fnos[row], is_key=False, is_read=False, is_reset_interpolation=False)
+            now_bf.rotation = MQuaternion(rotations[row, 0], rotations[row, 1], rotations[row, 2], rotations[row, 3])
 
     def smooth_filter_bf(self, data_set_no: int, bone_name: str, is_rot: bint, is_mov: bint, loop=1, \
                          mconfig={"freq": 30, "mincutoff": 0.3, "beta": 0.01, "dcutoff": 0.25}, start_fno=-1, end_fno=-1, is_show_log=True):
@@ -493,11 +1665,14 @@ cdef class VmdMotion:
     # フィルターをかける
     cdef c_smooth_filter_bf(self, int data_set_no, str bone_name, bint is_rot, bint is_mov, int loop, dict mconfig, int start_fno, int end_fno, bint is_show_log):
         cdef int n, fno
+        cdef Py_ssize_t m
         cdef list active_fnos
         cdef prev_sep_fno = 0
-        cdef VmdBoneFrame now_bf, start_bf, end_bf, bf
-        cdef MQuaternion filterd_qq
+        cdef VmdBoneFrame now_bf
         cdef np.ndarray[DTYPE_INT_t, ndim=1] fnos
+        cdef np.ndarray filter_fnos, stored, positions, rotations
+        cdef unsigned char[:] sv
+        cdef double[:, :] pv, rv
 
         for n in range(loop):
             prev_sep_fno = 0
@@ -512,54 +1687,110 @@ cdef class VmdMotion:
 
             fnos = np.array(list(range(active_fnos[0], active_fnos[-1] + 1)), dtype=np.int)
 
-            infections, _, _, _, _ = self.c_get_infections(data_set_no, bone_name, is_rot, is_mov, fnos, active_fnos)
+            infections, _ = self.c_get_infections(data_set_no, bone_name, is_rot, is_mov, fnos, active_fnos)
 
             # 全区間をフィルタにかける
             if is_mov:
                 prev_sep_fno = 0
-                mxfilter = OneEuroFilter(**mconfig)
-                myfilter = OneEuroFilter(**mconfig)
-                mzfilter = OneEuroFilter(**mconfig)
 
                 # S字の単位で調整
-                for inf_start_fno, inf_end_fno in zip(infections[:-2:2], infections[2::2]):
-                    logger.test("move filter: start: %s, end: %s", inf_start_fno, inf_end_fno)
-
-                    for fno in range(inf_start_fno + 1, inf_end_fno):
-                        now_bf = self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
-                        now_bf.position = MVector3D(mxfilter(now_bf.position.x()), myfilter(now_bf.position.y()), mzfilter(now_bf.position.z()))
-                        # 보간 곡선分割なしでそのまま등록
-                        self.bones[bone_name][fno] = now_bf
-
-                        if is_show_log and fno // 2000 > prev_sep_fno and fnos[-1] > 0:
-                            if data_set_no > 0:
-                                logger.info("-- %s프레임째: 종료(%s％)【No.%s - 이동 필터링(%s) - %s】", fno, round((fno / fnos[-1]) * 100, 3), data_set_no, (n + 1), bone_name)
-                            else:
-                                logger.info("-- %s프레임째: 종료(%s％)【이동 필터링(%s) - %s】", fno, round((fno / fnos[-1]) * 100, 3), (n + 1), bone_name)
-                            prev_sep_fno = fno // 2000
+                filter_fnos, stored, positions, rotations = self.c_calc_filter_bf(bone_name, infections, True, mconfig)
+                sv, pv, rv = stored, positions, rotations
+
+                for m, fno in enumerate(filter_fnos.tolist()):
+                    now_bf = self.c_get_filter_bf(bone_name, fno, sv[m])
+                    now_bf.position = MVector3D(pv[m, 0], pv[m, 1], pv[m, 2])
+                    if not sv[m]:
+                        now_bf.rotation = MQuaternion(rv[m, 0], rv[m, 1], rv[m, 2], rv[m, 3])
+                    # 보간 곡선分割なしでそのまま등록
+                    self.c_set_frame(self.bone_fno_indexes, self.bones, bone_name, fno, now_bf)
+
+                    if is_show_log and fno // 2000 > prev_sep_fno and fnos[-1] > 0:
+                        if data_set_no > 0:
+                            logger.info("-- %s프레임째: 종료(%s％)【No.%s - 이동 필터링(%s) - %s】", fno, round((fno / fnos[-1]) * 100, 3), data_set_no, (n + 1), bone_name)
+                        else:
+                            logger.info("-- %s프레임째: 종료(%s％)【이동 필터링(%s) - %s】", fno, round((fno / fnos[-1]) * 100, 3), (n + 1), bone_name)
+                        prev_sep_fno = fno // 2000
 
             if is_rot:
                 prev_sep_fno = 0
 
-                for inf_start_fno, inf_end_fno in zip(infections[:-2:2], infections[2::2]):
-                    start_bf = self.c_calc_bf(bone_name, inf_start_fno, is_key=False, is_read=False, is_reset_interpolation=False)
-                    end_bf = self.c_calc_bf(bone_name, inf_end_fno, is_key=False, is_read=False, is_reset_interpolation=False)
+                # 区間の前後の中間に寄せる
+                filter_fnos, stored, positions, rotations = self.c_calc_filter_bf(bone_name, infections, False, mconfig)
+                sv, pv, rv = stored, positions, rotations
 
-                    for fno in range(inf_start_fno + 1, inf_end_fno):
-                        now_bf = self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
-                        # まず前後の中間をそのまま求める
-                        filterd_qq = MQuaternion.slerp(start_bf.rotation, end_bf.rotation, (fno - inf_start_fno) / (inf_end_fno - inf_start_fno))
-                        # 現在の회전にも少し近づける
-                        now_bf.rotation = MQuaternion.slerp(filterd_qq, now_bf.rotation, 0.8)
-                        # 보간 곡선分割なしでそのまま등록
-                        self.bones[bone_name][fno] = now_bf
+                for m, fno in enumerate(filter_fnos.tolist()):
+                    now_bf = self.c_get_filter_bf(bone_name, fno, sv[m])
+                    if not sv[m]:
+                        now_bf.position = MVector3D(pv[m, 0], pv[m, 1], pv[m, 2])
+                    now_bf.rotation = MQuaternion(rv[m, 0], rv[m, 1], rv[m, 2], rv[m, 3])
+                    # 보간 곡선分割なしでそのまま등록
+                    self.c_set_frame(self.bone_fno_indexes, self.bones, bone_name, fno, now_bf)
 
-                    if is_show_log and inf_start_fno // 2000 > prev_sep_fno and fnos[-1] > 0:
+                    if is_show_log and fno // 2000 > prev_sep_fno and fnos[-1] > 0:
                         if data_set_no > 0:
-                            logger.info("-- %s프레임째: 종료(%s％)【No.%s - 회전 필터링(%s) - %s】", inf_start_fno, round((inf_start_fno / fnos[-1]) * 100, 3), data_set_no, (n + 1), bone_name)
+                            logger.info("-- %s프레임째: 종료(%s％)【No.%s - 회전 필터링(%s) - %s】", fno, round((fno / fnos[-1]) * 100, 3), data_set_no, (n + 1), bone_name)
                         else:
-                            logger.info("-- %s프레임째: 종료(%s％)【회전 필터링(%s) - %s】", inf_start_fno, round((inf_start_fno / fnos[-1]) * 100, 3), (n + 1), bone_name)
-                        prev_sep_fno = inf_start_fno // 2000
+                            logger.info("-- %s프레임째: 종료(%s％)【회전 필터링(%s) - %s】", fno, round((fno / fnos[-1]) * 100, 3), (n + 1), bone_name)
+                        prev_sep_fno = fno // 2000
+
+    # フィルターをかける区間内の全フレームの値を一括で求める（区間は変曲点を2つずつ進めたもの）
+    # 戻り値: (フレーム番号, キーがあるか, 이동, 회전)
+    cdef tuple c_calc_filter_bf(self, str bone_name, list infections, bint is_mov, dict config):
+        cdef np.ndarray seg_fnos = np.array([[inf_start_fno, inf_end_fno] for inf_start_fno, inf_end_fno in zip(infections[:-2:2], infections[2::2])], \
+                                            dtype=np.int32).reshape(-1, 2)
+        cdef np.ndarray counts = np.maximum(seg_fnos[:, 1] - seg_fnos[:, 0] - 1, 0)
+        cdef np.ndarray segs = np.repeat(np.arange(np.PyArray_DIM(seg_fnos, 0), dtype=np.int32), counts)
+        cdef np.ndarray fnos = (seg_fnos[segs, 0] + 1 + np.arange(np.PyArray_DIM(segs, 0)) - (np.cumsum(counts) - counts)[segs]).astype(np.int32)
+
+        if np.PyArray_DIM(fnos, 0) == 0:
+            return fnos, np.zeros(0, dtype=np.uint8), np.zeros((0, 3), dtype=np.float64), np.zeros((0, 4), dtype=np.float64)
+
+        cdef np.ndarray key_fnos, key_positions, key_rotations, key_interpolations
+        key_fnos, key_positions, key_rotations, key_interpolations = self.c_get_bf_columns(bone_name)
+
+        # キーがある場合はその行、ない場合は次のキーの行（区間の終了はキーなので、必ずある）
+        cdef np.ndarray rows = np.searchsorted(key_fnos, fnos)
+        cdef np.ndarray stored = (key_fnos[rows] == fnos).astype(np.uint8)
+        cdef np.ndarray targets = np.flatnonzero(stored == 0)
+        cdef np.ndarray next_interpolations = key_interpolations[rows[targets]]
+        cdef np.ndarray ys = np.zeros((np.PyArray_DIM(fnos, 0), 4), dtype=np.float64)
+
+        # 直前のフレームから次のキーまでの보간 곡선の値
+        for yidx, (x1_idxs, y1_idxs, x2_idxs, y2_idxs) in enumerate([(MBezierUtils.R_x1_idxs, MBezierUtils.R_y1_idxs, MBezierUtils.R_x2_idxs, MBezierUtils.R_y2_idxs), \
+                                                                     (MBezierUtils.MX_x1_idxs, MBezierUtils.MX_y1_idxs, MBezierUtils.MX_x2_idxs, MBezierUtils.MX_y2_idxs), \
+                                                                     (MBezierUtils.MY_x1_idxs, MBezierUtils.MY_y1_idxs, MBezierUtils.MY_x2_idxs, MBezierUtils.MY_y2_idxs), \
+                                                                     (MBezierUtils.MZ_x1_idxs, MBezierUtils.MZ_y1_idxs, MBezierUtils.MZ_x2_idxs, MBezierUtils.MZ_y2_idxs)]):
+            ys[targets, yidx] = MBezierUtils.evaluate_range(next_interpolations[:, x1_idxs[3]], next_interpolations[:, y1_idxs[3]], \
+                                                            next_interpolations[:, x2_idxs[3]], next_interpolations[:, y2_idxs[3]], \
+                                                            fnos[targets] - 1, fnos[targets], key_fnos[rows[targets]])
+
+        cdef np.ndarray start_rows = np.searchsorted(key_fnos, seg_fnos[:, 0])
+        cdef np.ndarray end_rows = np.searchsorted(key_fnos, seg_fnos[:, 1])
+        cdef np.ndarray positions, rotations
+
+        positions, rotations = c_filter_bf_frames(segs, fnos, stored, np.ascontiguousarray(key_positions[rows], dtype=np.float64), \
+                                                  np.ascontiguousarray(key_rotations[rows], dtype=np.float64), ys, seg_fnos, \
+                                                  np.ascontiguousarray(key_positions[start_rows], dtype=np.float64), \
+                                                  np.ascontiguousarray(key_rotations[start_rows], dtype=np.float64), \
+                                                  np.ascontiguousarray(key_rotations[end_rows], dtype=np.float64), is_mov, config)
+
+        return fnos, stored, positions, rotations
+
+    # フィルター結果を登録するフレーム（キーがない場合は、calc_bfと同じく直前のフレームの名前で生成する）
+    cdef VmdBoneFrame c_get_filter_bf(self, str bone_name, int fno, bint is_stored):
+        cdef VmdBoneFrame prev_bf
+        cdef VmdBoneFrame fill_bf
+
+        if is_stored:
+            return self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
+
+        prev_bf = self.c_peek_frame(self.bones, bone_name, fno - 1)
+        fill_bf = VmdBoneFrame(fno)
+        fill_bf.name = prev_bf.name
+        fill_bf.bname = prev_bf.bname
+
+        return fill_bf
 
     # 無効な키を物理삭제する
     def remove_unkey_bf(self, data_set_no: int, bone_name: str):
@@ -567,27 +1798,29 @@ cdef class VmdMotion:
             bf = self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
 
             if fno in self.bones[bone_name] and not bf.key:
-                del self.bones[bone_name][fno]
+                self.c_remove_frame(self.bone_fno_indexes, self.bones, bone_name, fno)
 
     # 指定ボーンの불필요키を삭제する
     # 変曲点を求める
     # https://teratail.com/questions/162391
+    # is_least_squares: 区間の補間曲線を最小二乗法で求めるか（False の場合、カトマル曲線から次数を減らして求める）
     def remove_unnecessary_bf(self, data_set_no: int, bone_name: str, is_rot: bint, is_mov: bint, \
-                                     offset=0, rot_diff_limit=0.001, mov_diff_limit=0.1, start_fno=-1, end_fno=-1, is_show_log=True, is_force=False, is_sub_remove=False):
+                                     offset=0, rot_diff_limit=0.001, mov_diff_limit=0.1, start_fno=-1, end_fno=-1, is_show_log=True, is_force=False, is_sub_remove=False, \
+                                     is_least_squares=False):
         self.c_remove_unnecessary_bf(data_set_no, bone_name, is_rot, is_mov, offset, rot_diff_limit, mov_diff_limit, start_fno, end_fno, is_show_log, False, is_sub_remove,
-                                     None, None, None, None, None)
+                                     None, 0, None, is_least_squares)
 
     # 指定ボーンの불필요키を삭제する
     # 変曲点を求める
     # https://teratail.com/questions/162391
     cdef list c_remove_unnecessary_bf(self, int data_set_no, str bone_name, bint is_rot, bint is_mov, \
                                       double offset, double rot_diff_limit, double mov_diff_limit, int r_start_fno, int r_end_fno, bint is_show_log, bint is_force, bint is_sub_remove,
-                                      dict r_dict, dict mx_dict, dict my_dict, dict mz_dict, list infections):
+                                      np.ndarray values, int value_start_fno, list infections, bint is_least_squares):
         cdef int prev_sep_fno = 0
         cdef list active_fnos
         cdef np.ndarray[DTYPE_INT_t, ndim=1] fnos
 
-        logger.test("self.bones[bone_name].keys(): %s", self.bones[bone_name].keys())
+        logger.test("self.bones[bone_name].keys(): %s", MLogger.lazy(self.bones[bone_name].keys))
 
         # 키 프레임を取得する
         if r_start_fno < 0 and r_end_fno < 0:
@@ -611,7 +1844,8 @@ cdef class VmdMotion:
         cdef int fidx, fno, prev_fno, next_fno, n
 
         if not infections:
-            infections, r_dict, mx_dict, my_dict, mz_dict = self.c_get_infections(data_set_no, bone_name, is_rot, is_mov, fnos, active_fnos)
+            infections, values = self.c_get_infections(data_set_no, bone_name, is_rot, is_mov, fnos, active_fnos)
+            value_start_fno = fnos[0]
 
         logger.debug_info("☆%s: start: %s, end: %s, infections: %s", bone_name, fnos[0], fnos[-1], infections)
 
@@ -627,7 +1861,7 @@ cdef class VmdMotion:
         cdef list mx_values = []
         cdef list my_values = []
         cdef list mz_values = []
-        cdef list inf_fnos = []
+        cdef Py_ssize_t vidx
         cdef bint is_prev_success = False
         cdef dict rconfig = {"freq": 30, "mincutoff": 5, "beta": 1, "dcutoff": 5}
         cdef dict mconfig = {"freq": 30, "mincutoff": 5, "beta": 1, "dcutoff": 5}
@@ -638,41 +1872,41 @@ cdef class VmdMotion:
             my_values = []
             mz_values = []
             inf_end_fno = infections[iidx]
-            inf_fnos = list(range(inf_start_fno, inf_end_fno + 1))
+            vidx = inf_start_fno - value_start_fno
 
-            for fidx, f in enumerate(inf_fnos):
-                if is_rot and fidx > 0:
-                    rot_values.append(rot_values[fidx - 1] + r_dict[f].calcTheata(r_dict[f - 1]))
+            if is_rot:
+                # 회전は変位量の累積（前から順に足す）
+                rot_values.extend(np.cumsum(values[vidx + 1:vidx + inf_end_fno - inf_start_fno + 1, 0]).tolist())
 
-                if is_mov:
-                    mx_values.append(mx_dict[f])
-                    my_values.append(my_dict[f])
-                    mz_values.append(mz_dict[f])
+            if is_mov:
+                mx_values = values[vidx:vidx + inf_end_fno - inf_start_fno + 1, 1].tolist()
+                my_values = values[vidx:vidx + inf_end_fno - inf_start_fno + 1, 2].tolist()
+                mz_values = values[vidx:vidx + inf_end_fno - inf_start_fno + 1, 3].tolist()
 
             next_bf = None
 
             # 単調増加として키を結合してみる
-            (joined_rot_bzs, rot_inflection) = MBezierUtils.join_value_2_bezier(inf_end_fno, f'{bone_name}R', rot_values, \
-                                                                                offset=offset, diff_limit=rot_diff_limit) if is_rot else (True, [])
-            (joined_mx_bzs, mx_inflection) = MBezierUtils.join_value_2_bezier(inf_end_fno, f'{bone_name}MX', mx_values, \
-                                                                              offset=offset, diff_limit=mov_diff_limit) if is_mov else (True, [])
-            (joined_my_bzs, my_inflection) = MBezierUtils.join_value_2_bezier(inf_end_fno, f'{bone_name}MY', my_values, \
-                                                                              offset=offset, diff_limit=mov_diff_limit) if is_mov else (True, [])
-            (joined_mz_bzs, mz_inflection) = MBezierUtils.join_value_2_bezier(inf_end_fno, f'{bone_name}MZ', mz_values, \
-                                                                              offset=offset, diff_limit=mov_diff_limit) if is_mov else (True, [])
+            (joined_rot_bzs, rot_inflection) = c_join_value_2_bezier(inf_end_fno, f'{bone_name}R', rot_values, offset, rot_diff_limit, \
+                                                                     is_least_squares) if is_rot else (True, [])
+            (joined_mx_bzs, mx_inflection) = c_join_value_2_bezier(inf_end_fno, f'{bone_name}MX', mx_values, offset, mov_diff_limit, \
+                                                                   is_least_squares) if is_mov else (True, [])
+            (joined_my_bzs, my_inflection) = c_join_value_2_bezier(inf_end_fno, f'{bone_name}MY', my_values, offset, mov_diff_limit, \
+                                                                   is_least_squares) if is_mov else (True, [])
+            (joined_mz_bzs, mz_inflection) = c_join_value_2_bezier(inf_end_fno, f'{bone_name}MZ', mz_values, offset, mov_diff_limit, \
+                                                                   is_least_squares) if is_mov else (True, [])
 
             if joined_rot_bzs and joined_mx_bzs and joined_my_bzs and joined_mz_bzs:
                 next_bf = self.c_calc_bf(bone_name, inf_end_fno, is_key=False, is_read=False, is_reset_interpolation=False)
 
                 # 結合できた場合、보간 곡선をnextに設定
                 if is_rot and len(joined_rot_bzs) > 0:
-                    logger.debug_info("☆%s: f: %s(%s), 키:회전 보간 곡선 성공: 1: %s, 2: %s", bone_name, inf_start_fno, inf_end_fno, joined_rot_bzs[1].to_log(), joined_rot_bzs[2].to_log())
+                    logger.debug_info("☆%s: f: %s(%s), 키:회전 보간 곡선 성공: 1: %s, 2: %s", bone_name, inf_start_fno, inf_end_fno, MLogger.lazy(joined_rot_bzs[1].to_log), MLogger.lazy(joined_rot_bzs[2].to_log))
                     self.reset_interpolation_parts(bone_name, next_bf, joined_rot_bzs, MBezierUtils.R_x1_idxs, MBezierUtils.R_y1_idxs, MBezierUtils.R_x2_idxs, MBezierUtils.R_y2_idxs)
 
                 if is_mov and len(joined_mx_bzs) > 0 and len(joined_my_bzs) > 0 and len(joined_mz_bzs) > 0:
-                    logger.debug_info("☆%s: f: %s(%s), 키:이동 X 보간 곡선 성공: 1: %s, 2: %s", bone_name, inf_start_fno, inf_end_fno, joined_mx_bzs[1].to_log(), joined_mx_bzs[2].to_log())
-                    logger.debug_info("☆%s: f: %s(%s), 키:이동 Y 보간 곡선 성공: 1: %s, 2: %s", bone_name, inf_start_fno, inf_end_fno, joined_my_bzs[1].to_log(), joined_my_bzs[2].to_log())
-                    logger.debug_info("☆%s: f: %s(%s), 키:이동 Z 보간 곡선 성공: 1: %s, 2: %s", bone_name, inf_start_fno, inf_end_fno, joined_mz_bzs[1].to_log(), joined_mz_bzs[2].to_log())
+                    logger.debug_info("☆%s: f: %s(%s), 키:이동 X 보간 곡선 성공: 1: %s, 2: %s", bone_name, inf_start_fno, inf_end_fno, MLogger.lazy(joined_mx_bzs[1].to_log), MLogger.lazy(joined_mx_bzs[2].to_log))
+                    logger.debug_info("☆%s: f: %s(%s), 키:이동 Y 보간 곡선 성공: 1: %s, 2: %s", bone_name, inf_start_fno, inf_end_fno, MLogger.lazy(joined_my_bzs[1].to_log), MLogger.lazy(joined_my_bzs[2].to_log))
+                    logger.debug_info("☆%s: f: %s(%s), 키:이동 Z 보간 곡선 성공: 1: %s, 2: %s", bone_name, inf_start_fno, inf_end_fno, MLogger.lazy(joined_mz_bzs[1].to_log), MLogger.lazy(joined_mz_bzs[2].to_log))
                     self.reset_interpolation_parts(bone_name, next_bf, joined_mx_bzs, MBezierUtils.MX_x1_idxs, MBezierUtils.MX_y1_idxs, MBezierUtils.MX_x2_idxs, MBezierUtils.MX_y2_idxs)
                     self.reset_interpolation_parts(bone_name, next_bf, joined_my_bzs, MBezierUtils.MY_x1_idxs, MBezierUtils.MY_y1_idxs, MBezierUtils.MY_x2_idxs, MBezierUtils.MY_y2_idxs)
                     self.reset_interpolation_parts(bone_name, next_bf, joined_mz_bzs, MBezierUtils.MZ_x1_idxs, MBezierUtils.MZ_y1_idxs, MBezierUtils.MZ_x2_idxs, MBezierUtils.MZ_y2_idxs)
@@ -681,10 +1915,12 @@ cdef class VmdMotion:
                 if bone_name in self.bones and inf_end_fno in self.bones[bone_name]:
                     self.bones[bone_name][inf_end_fno].key = True
                     self.bones[bone_name][inf_end_fno].interpolation = next_bf.interpolation
-                    logger.debug_info("◇등록 %s: f: %s, next_bf(%s) rot:%s", bone_name, inf_end_fno, next_bf.fno, next_bf.rotation.toEulerAngles4MMD().to_log())
+                    if logger.is_enabled(MLogger.DEBUG_INFO):
+                        logger.debug_info("◇등록 %s: f: %s, next_bf(%s) rot:%s", bone_name, inf_end_fno, next_bf.fno, next_bf.rotation.toEulerAngles4MMD().to_log())
                 else:
                     self.c_regist_bf(next_bf, bone_name, inf_end_fno, copy_interpolation=True, key=True)
-                    logger.debug_info("☆등록 %s: f: %s, next_bf(%s) rot:%s", bone_name, inf_end_fno, next_bf.fno, next_bf.rotation.toEulerAngles4MMD().to_log())
+                    if logger.is_enabled(MLogger.DEBUG_INFO):
+                        logger.debug_info("☆등록 %s: f: %s, next_bf(%s) rot:%s", bone_name, inf_end_fno, next_bf.fno, next_bf.rotation.toEulerAngles4MMD().to_log())
 
                 logger.debug_info("☆%s: f: %s, 키 프레임 삭제: %s-%s", bone_name, inf_end_fno, inf_start_fno + 1, inf_end_fno - 1)
 
@@ -692,7 +1928,7 @@ cdef class VmdMotion:
                     # 結合できた場合、区間内を삭제
                     if f in self.bones[bone_name]:
                         # self.bones[bone_name][f].key = False
-                        del self.bones[bone_name][f]
+                        self.c_remove_frame(self.bone_fno_indexes, self.bones, bone_name, f)
 
                 # 성공記録
                 is_prev_success = True
@@ -715,15 +1951,15 @@ cdef class VmdMotion:
                     activate_fnos = None
 
                     if inf_start_fno < separate_fno - 1:
-                        logger.debug_info(f"【불필요 키 삭제(구분 삭제:전) - {bone_name}:{inf_start_fno}-{separate_fno}】")
+                        logger.debug_info("【불필요 키 삭제(구분 삭제:전) - %s:%s-%s】", bone_name, inf_start_fno, separate_fno)
                         activate_fnos = self.c_remove_unnecessary_bf(data_set_no, bone_name, is_rot, is_mov, offset, rot_diff_limit, mov_diff_limit, inf_start_fno, separate_fno, False, True, is_sub_remove,
-                                                                     r_dict, mx_dict, my_dict, mz_dict, [inf_start_fno, separate_fno])
+                                                                     values, value_start_fno, [inf_start_fno, separate_fno], is_least_squares)
                         # 前回結合最終点を保持（結合した後ろのを保持）
                         inf_start_fno = separate_fno
                     else:
-                        logger.debug_info(f"【불필요 키 삭제(구분 삭제:후) - {bone_name}:{separate_fno}-{inf_end_fno}】")
+                        logger.debug_info("【불필요 키 삭제(구분 삭제:후) - %s:%s-%s】", bone_name, separate_fno, inf_end_fno)
                         activate_fnos = self.c_remove_unnecessary_bf(data_set_no, bone_name, is_rot, is_mov, offset, rot_diff_limit, mov_diff_limit, separate_fno, inf_end_fno, False, True, is_sub_remove,
-                                                                     r_dict, mx_dict, my_dict, mz_dict, [separate_fno, inf_end_fno])
+                                                                     values, value_start_fno, [separate_fno, inf_end_fno], is_least_squares)
                         # 前回結合最終点を保持（結合した後ろのを保持）
                         inf_start_fno = inf_end_fno
                 else:
@@ -758,116 +1994,19 @@ cdef class VmdMotion:
 
         return activate_fnos
 
+    # 変曲点と、各フレームの変化量（前フレームとの회전の変位量, 이동X, 이동Y, 이동Z）を求める
     cdef tuple c_get_infections(self, int data_set_no, str bone_name, bint is_rot, bint is_mov, np.ndarray fnos, list active_fnos):
-        cdef dict r_dict = {}
-        cdef dict mx_dict = {}
-        cdef dict my_dict = {}
-        cdef dict mz_dict = {}
-        cdef dict rot_diff_value_dict = {}
-        cdef dict mx_diff_value_dict = {}
-        cdef dict my_diff_value_dict = {}
-        cdef dict mz_diff_value_dict = {}
-        cdef np.ndarray[DTYPE_INT_t, ndim=1] r_infections = np.array([], dtype=np.int)
-        cdef np.ndarray[DTYPE_INT_t, ndim=1] mx_infections = np.array([], dtype=np.int)
-        cdef np.ndarray[DTYPE_INT_t, ndim=1] my_infections = np.array([], dtype=np.int)
-        cdef np.ndarray[DTYPE_INT_t, ndim=1] mz_infections = np.array([], dtype=np.int)
-
-        for fidx, fno in enumerate(fnos):
-            bf = self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
-            logger.test("*%s: f: %s, bf(%s):rot:%s", bone_name, fno, bf.fno, bf.rotation.toEulerAngles4MMD().to_log())
+        cdef np.ndarray positions, rotations, marks, values
 
-            if is_mov:
-                mx_dict[fno] = bf.position.x()
-                my_dict[fno] = bf.position.y()
-                mz_dict[fno] = bf.position.z()
-
-            if is_rot:
-                r_dict[fno] = bf.rotation
-
-        # 変化量
-        for fidx, fno in enumerate(fnos):
-            if is_rot:
-                if fidx == 0:
-                    rot_diff_value_dict[fno] = 0
-                    prev_rot = MQuaternion()
-                else:
-                    rot = r_dict[fno]
-                    rot_diff_value_dict[fno] = rot.calcTheata(prev_rot)
-                    prev_rot = rot
-
-            if is_mov:
-                if fidx == 0:
-                    mx_diff_value_dict[fno] = 0
-                    my_diff_value_dict[fno] = 0
-                    mz_diff_value_dict[fno] = 0
-                else:
-                    mx_diff_value_dict[fno] = mx_dict[fno] - mx_dict[fnos[fidx - 1]]
-                    my_diff_value_dict[fno] = my_dict[fno] - my_dict[fnos[fidx - 1]]
-                    mz_diff_value_dict[fno] = mz_dict[fno] - mz_dict[fnos[fidx - 1]]
-
-        # 全変化量から変曲点を求める
-        # https://teratail.com/questions/162391
-        if is_rot:
-            rf_prime = np.gradient(list(rot_diff_value_dict.values()))                                                      # 差分近似
-            r_indices = np.where(np.diff(np.sign(rf_prime)))[0]                                                             # 変曲点を求める。
-            r_diff_indices = np.where(np.abs(np.diff(np.array(list(rot_diff_value_dict.values()))[r_indices])) > 0.001)     # 変曲点同士の差異が閾値以上
-            r_infections = (fnos[1:][r_indices])[r_diff_indices]                                                            # 変曲点の키 프레임を再取得する
-
-            logger.debug_info("☆%s: start: %s, end: %s, rf_prime: %s", bone_name, fnos[0], fnos[-1], list(rf_prime))
-            logger.debug_info("☆%s: start: %s, end: %s, sign: %s", bone_name, fnos[0], fnos[-1], list(np.sign(rf_prime)))
-            logger.debug_info("☆%s: start: %s, end: %s, diff: %s", bone_name, fnos[0], fnos[-1], list(np.diff(np.sign(rf_prime))))
-            logger.debug_info("☆%s: start: %s, end: %s, r_indices: %s", bone_name, fnos[0], fnos[-1], list(fnos[r_indices]))
-            logger.debug_info("☆%s: start: %s, end: %s, index_diff: %s", bone_name, fnos[0], fnos[-1], list(np.diff(np.array(list(rot_diff_value_dict.values()))[r_indices])))
-            logger.debug_info("☆%s: start: %s, end: %s, r_diff_indices: %s", bone_name, fnos[0], fnos[-1], list((fnos[r_indices])[r_diff_indices]))
-
-        if is_mov:
-            mxf_prime = np.gradient(list(mx_diff_value_dict.values()))
-            mx_indices = np.where(np.diff(np.sign(mxf_prime)))[0]
-            mx_diff_indices = np.where(np.abs(np.diff(np.array(list(mx_diff_value_dict.values()))[mx_indices])) > 0.003)
-            mx_infections = (fnos[1:][mx_indices])[mx_diff_indices]
-
-            logger.debug_info("☆%s: start: %s, end: %s, mxf_prime: %s", bone_name, fnos[0], fnos[-1], list(mxf_prime))
-            logger.debug_info("☆%s: start: %s, end: %s, sign: %s", bone_name, fnos[0], fnos[-1], list(np.sign(mxf_prime)))
-            logger.debug_info("☆%s: start: %s, end: %s, diff: %s", bone_name, fnos[0], fnos[-1], list(np.diff(np.sign(mxf_prime))))
-            logger.debug_info("☆%s: start: %s, end: %s, mx_indices: %s", bone_name, fnos[0], fnos[-1], list(fnos[mx_indices]))
-            logger.debug_info("☆%s: start: %s, end: %s, index_diff: %s", bone_name, fnos[0], fnos[-1], list(np.diff(np.array(list(mx_diff_value_dict.values()))[mx_indices])))
-            logger.debug_info("☆%s: start: %s, end: %s, mx_diff_indices: %s", bone_name, fnos[0], fnos[-1], list((fnos[mx_indices])[mx_diff_indices]))
-
-            myf_prime = np.gradient(list(my_diff_value_dict.values()))
-            my_indices = np.where(np.diff(np.sign(myf_prime)))[0]
-            my_diff_indices = np.where(np.abs(np.diff(np.array(list(my_diff_value_dict.values()))[my_indices])) > 0.003)
-            my_infections = (fnos[1:][my_indices])[my_diff_indices]
-
-            logger.debug_info("☆%s: start: %s, end: %s, myf_prime: %s", bone_name, fnos[0], fnos[-1], list(myf_prime))
-            logger.debug_info("☆%s: start: %s, end: %s, sign: %s", bone_name, fnos[0], fnos[-1], list(np.sign(myf_prime)))
-            logger.debug_info("☆%s: start: %s, end: %s, diff: %s", bone_name, fnos[0], fnos[-1], list(np.diff(np.sign(myf_prime))))
-            logger.debug_info("☆%s: start: %s, end: %s, my_indices: %s", bone_name, fnos[0], fnos[-1], list(fnos[my_indices]))
-            logger.debug_info("☆%s: start: %s, end: %s, index_diff: %s", bone_name, fnos[0], fnos[-1], list(np.diff(np.array(list(my_diff_value_dict.values()))[my_indices])))
-            logger.debug_info("☆%s: start: %s, end: %s, my_diff_indices: %s", bone_name, fnos[0], fnos[-1], list((fnos[my_indices])[my_diff_indices]))
-
-            mzf_prime = np.gradient(list(mz_diff_value_dict.values()))
-            mz_indices = np.where(np.diff(np.sign(mzf_prime)))[0]
-            mz_diff_indices = np.where(np.abs(np.diff(np.array(list(mz_diff_value_dict.values()))[mz_indices])) > 0.003)
-            mz_infections = (fnos[1:][mz_indices])[mz_diff_indices]
-
-            logger.debug_info("☆%s: start: %s, end: %s, mzf_prime: %s", bone_name, fnos[0], fnos[-1], list(mzf_prime))
-            logger.debug_info("☆%s: start: %s, end: %s, sign: %s", bone_name, fnos[0], fnos[-1], list(np.sign(mzf_prime)))
-            logger.debug_info("☆%s: start: %s, end: %s, diff: %s", bone_name, fnos[0], fnos[-1], list(np.diff(np.sign(mzf_prime))))
-            logger.debug_info("☆%s: start: %s, end: %s, mz_indices: %s", bone_name, fnos[0], fnos[-1], list(fnos[mz_indices]))
-            logger.debug_info("☆%s: start: %s, end: %s, index_diff: %s", bone_name, fnos[0], fnos[-1], list(np.diff(np.array(list(mz_diff_value_dict.values()))[mz_indices])))
-            logger.debug_info("☆%s: start: %s, end: %s, mz_diff_indices: %s", bone_name, fnos[0], fnos[-1], list((fnos[mz_indices])[mz_diff_indices]))
+        positions, rotations = self.c_calc_bf_range(bone_name, np.asarray(fnos, dtype=np.int32))
+        marks, values = c_calc_infections(rotations, positions, is_rot, is_mov)
 
         # 各値の変曲点の和集合かつ有効な키 프레임のみ対象とする
-        infections = sorted(set(set([active_fnos[0], active_fnos[-1]]) | set(r_infections) | set(mx_infections) | set(my_infections) | set(mz_infections) | set([active_fnos[-1]])) & set(active_fnos))
+        infections = sorted((set([active_fnos[0], active_fnos[-1]]) | set(fnos[marks].tolist())) & set(active_fnos))
         logger.debug_info("☆%s: start: %s, end: %s, active_fnos: %s", bone_name, fnos[0], fnos[-1], active_fnos)
-        logger.debug_info("☆%s: start: %s, end: %s, r_infections: %s", bone_name, fnos[0], fnos[-1], list(r_infections))
-        logger.debug_info("☆%s: start: %s, end: %s, mx_infections: %s", bone_name, fnos[0], fnos[-1], list(mx_infections))
-        logger.debug_info("☆%s: start: %s, end: %s, my_infections: %s", bone_name, fnos[0], fnos[-1], list(my_infections))
-        logger.debug_info("☆%s: start: %s, end: %s, mz_infections: %s", bone_name, fnos[0], fnos[-1], list(mz_infections))
-
         logger.debug_info("☆%s: start: %s, end: %s, infections: %s", bone_name, fnos[0], fnos[-1], infections)
 
-        return (infections, r_dict, mx_dict, my_dict, mz_dict)
+        return (infections, values)
 
     # 平滑化
     cdef dict c_smooth_values(self, dict value_dict, dict config):
@@ -907,17 +2046,21 @@ cdef class VmdMotion:
 
     # 보간 곡선分割ありで등록
     cdef c_regist_bf(self, VmdBoneFrame bf, str bone_name, int fno, bint copy_interpolation, bint key):
+        if self.pose_cache is not None:
+            # 既存フレームや次の키の보간 곡선を直接書き換えるので、先にキャッシュを破棄する
+            self.c_invalidate_pose(bone_name, fno)
+
         # 등록対象の場合のみ、보간 곡선リセットで등록する
         cdef VmdBoneFrame regist_bf = self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=True)
         regist_bf.position = bf.position.copy()
         regist_bf.rotation = bf.rotation.copy()
-        regist_bf.org_rotation = bf.org_rotation.copy()
+        regist_bf.c_share_org_rotation(bf)
         if copy_interpolation:
-            regist_bf.interpolation = cPickle.loads(cPickle.dumps(bf.interpolation, -1))
+            regist_bf.interpolation = array.copy(bf.interpolation)
 
         # 키を등록
         regist_bf.key = key
-        self.bones[bone_name][fno] = regist_bf
+        self.c_set_frame(self.bone_fno_indexes, self.bones, bone_name, fno, regist_bf)
         # 보간 곡선を設定（有効な키のみ）
         cdef int prev_fno, next_fno
         cdef VmdBoneFrame prev_bf, next_bf
@@ -940,7 +2083,7 @@ cdef class VmdMotion:
         cdef VmdBoneFrame fill_bf = VmdBoneFrame(fno)
 
         if bone_name not in self.bones:
-            self.bones[bone_name] = {fno: fill_bf}
+            self.bones[bone_name] = VmdFrameDict({fno: fill_bf})
             fill_bf.set_name(bone_name)
             return fill_bf
 
@@ -956,33 +2099,37 @@ cdef class VmdMotion:
                 # 既存키のみ探している場合はNone
                 return None
 
-        # 番号より前のフレーム番号
-        cdef list before_fnos = [x for x in sorted(self.bones[bone_name].keys()) if (x < fno)]
-        # 番号より後のフレーム番号
-        cdef list after_fnos = [x for x in sorted(self.bones[bone_name].keys()) if (x > fno)]
+        # 昇順フレーム番号から、番号の前後のフレーム番号を二分探索で求める
+        cdef list fnos = self.c_get_sorted_fnos(self.bone_fno_indexes, self.bones, bone_name)
+        cdef int fidx = bisect_left(fnos, fno)
+        # 番号より前のフレーム番号（なければ-1）
+        cdef int before_fno = fnos[fidx - 1] if fidx > 0 else -1
+        # 番号より後のフレーム番号（なければ-1）
+        cdef int after_fno = fnos[fidx] if fidx < len(fnos) else -1
 
-        if len(after_fnos) == 0 and len(before_fnos) == 0:
+        if fidx == 0 and fidx == len(fnos):
             fill_bf.set_name(bone_name)
             return fill_bf
 
-        if len(after_fnos) == 0:
+        if fidx == len(fnos):
             # 番号より前があって、後のがない場合、前のをコピーして返す
-            fill_bf = self.bones[bone_name][before_fnos[-1]].copy()
+            fill_bf = self.c_peek_frame(self.bones, bone_name, before_fno).copy()
             fill_bf.fno = fno
             fill_bf.key = False
             fill_bf.read = False
             return fill_bf
 
-        if len(before_fnos) == 0:
+        if fidx == 0:
             # 番号より後があって、前がない場合、後のをコピーして返す
-            fill_bf = self.bones[bone_name][after_fnos[0]].copy()
+            fill_bf = self.c_peek_frame(self.bones, bone_name, after_fno).copy()
             fill_bf.fno = fno
             fill_bf.key = False
             fill_bf.read = False
             return fill_bf
 
-        cdef VmdBoneFrame prev_bf = self.bones[bone_name][before_fnos[-1]]
-        cdef VmdBoneFrame next_bf = self.bones[bone_name][after_fnos[0]]
+        cdef VmdBoneFrame prev_bf = self.c_peek_frame(self.bones, bone_name, before_fno)
+        # 보간 곡선再設定の場合、next키の보간 곡선も書き換えるので、保持しているフレームを使う
+        cdef VmdBoneFrame next_bf = self.bones[bone_name][after_fno] if is_reset_interpolation else self.c_peek_frame(self.bones, bone_name, after_fno)
 
         # 名前をコピー
         fill_bf.name = prev_bf.name
@@ -1001,24 +2148,24 @@ cdef class VmdMotion:
 
             # 회전の分割
             r_x, r_y, r_t, r_bresult, r_aresult, r_before_bz, r_after_bz \
-                = MBezierUtils.split_bezier_mmd(next_bf.interpolation[MBezierUtils.R_x1_idxs[3]], next_bf.interpolation[MBezierUtils.R_y1_idxs[3]], \
-                                                next_bf.interpolation[MBezierUtils.R_x2_idxs[3]], next_bf.interpolation[MBezierUtils.R_y2_idxs[3]], \
-                                                prev_bf.fno, fill_bf.fno, next_bf.fno)
+                = c_split_bezier_mmd(next_bf.interpolation[MBezierUtils.R_x1_idxs[3]], next_bf.interpolation[MBezierUtils.R_y1_idxs[3]], \
+                                    next_bf.interpolation[MBezierUtils.R_x2_idxs[3]], next_bf.interpolation[MBezierUtils.R_y2_idxs[3]], \
+                                    prev_bf.fno, fill_bf.fno, next_bf.fno)
             # 이동Xの分割
             x_x, x_y, x_t, x_bresult, x_aresult, x_before_bz, x_aftex_bz \
-                = MBezierUtils.split_bezier_mmd(next_bf.interpolation[MBezierUtils.MX_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MX_y1_idxs[3]], \
-                                                next_bf.interpolation[MBezierUtils.MX_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MX_y2_idxs[3]], \
-                                                prev_bf.fno, fill_bf.fno, next_bf.fno)
+                = c_split_bezier_mmd(next_bf.interpolation[MBezierUtils.MX_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MX_y1_idxs[3]], \
+                                    next_bf.interpolation[MBezierUtils.MX_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MX_y2_idxs[3]], \
+                                    prev_bf.fno, fill_bf.fno, next_bf.fno)
             # 이동Yの分割
             y_x, y_y, y_t, y_bresult, y_aresult, y_before_bz, y_aftey_bz \
-                = MBezierUtils.split_bezier_mmd(next_bf.interpolation[MBezierUtils.MY_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MY_y1_idxs[3]], \
-                                                next_bf.interpolation[MBezierUtils.MY_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MY_y2_idxs[3]], \
-                                                prev_bf.fno, fill_bf.fno, next_bf.fno)
+                = c_split_bezier_mmd(next_bf.interpolation[MBezierUtils.MY_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MY_y1_idxs[3]], \
+                                    next_bf.interpolation[MBezierUtils.MY_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MY_y2_idxs[3]], \
+                                    prev_bf.fno, fill_bf.fno, next_bf.fno)
             # 이동Zの分割
             z_x, z_y, z_t, z_bresult, z_aresult, z_before_bz, z_aftez_bz \
-                = MBezierUtils.split_bezier_mmd(next_bf.interpolation[MBezierUtils.MZ_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MZ_y1_idxs[3]], \
-                                                next_bf.interpolation[MBezierUtils.MZ_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MZ_y2_idxs[3]], \
-                                                prev_bf.fno, fill_bf.fno, next_bf.fno)
+                = c_split_bezier_mmd(next_bf.interpolation[MBezierUtils.MZ_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MZ_y1_idxs[3]], \
+                                    next_bf.interpolation[MBezierUtils.MZ_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MZ_y2_idxs[3]], \
+                                    prev_bf.fno, fill_bf.fno, next_bf.fno)
 
             # 強制設定
             self.reset_interpolation(bone_name, prev_bf, fill_bf, next_bf, r_before_bz, r_after_bz, \
@@ -1032,15 +2179,96 @@ cdef class VmdMotion:
 
         return fill_bf
 
+    # 複数フレームの値をまとめて求める（回転はw, x, y, zの順）
+    # 各フレームの値はcalc_bfと同じ（ボーンがない場合は初期値。calc_bfと違い、ボーンの追加はしない）
+    def calc_bf_range(self, bone_name: str, fnos):
+        return self.c_calc_bf_range(bone_name, np.asarray(fnos, dtype=np.int32))
+
+    cdef tuple c_calc_bf_range(self, str bone_name, np.ndarray fnos):
+        cdef Py_ssize_t n = np.PyArray_DIM(fnos, 0)
+        cdef np.ndarray positions = np.zeros((n, 3), dtype=np.float64)
+        cdef np.ndarray rotations = np.zeros((n, 4), dtype=np.float64)
+        rotations[:, 0] = 1
+
+        if bone_name not in self.bones or len(self.bones[bone_name]) == 0 or n == 0:
+            return positions, rotations
+
+        cdef np.ndarray key_fnos, key_positions, key_rotations, key_interpolations
+        key_fnos, key_positions, key_rotations, key_interpolations = self.c_get_bf_columns(bone_name)
+
+        # 前後の키の行（範囲外の場合は端の키をそのまま使う）
+        cdef Py_ssize_t key_cnt = np.PyArray_DIM(key_fnos, 0)
+        cdef np.ndarray idxs = np.searchsorted(key_fnos, fnos)
+        cdef np.ndarray exact = key_fnos[np.minimum(idxs, key_cnt - 1)] == fnos
+        cdef np.ndarray prev_rows = np.where(exact, idxs, idxs - 1).clip(0, key_cnt - 1)
+        cdef np.ndarray next_rows = idxs.clip(0, key_cnt - 1)
+        cdef np.ndarray inners = np.flatnonzero(~exact & (idxs > 0) & (idxs < key_cnt))
+
+        positions[:] = key_positions[prev_rows]
+        rotations[:] = key_rotations[prev_rows]
+
+        if np.PyArray_DIM(inners, 0) == 0:
+            return positions, rotations
+
+        cdef np.ndarray prev_idxs = prev_rows[inners]
+        cdef np.ndarray next_idxs = next_rows[inners]
+        cdef np.ndarray prev_fnos = key_fnos[prev_idxs]
+        cdef np.ndarray next_fnos = key_fnos[next_idxs]
+        cdef np.ndarray now_fnos = fnos[inners]
+        cdef np.ndarray next_interpolations = key_interpolations[next_idxs]
+        cdef np.ndarray targets, ys
+
+        # 회전：前後で値が異なる場合のみslerp
+        targets = np.flatnonzero(np.any(key_rotations[prev_idxs] != key_rotations[next_idxs], axis=1))
+        if np.PyArray_DIM(targets, 0) > 0:
+            ys = MBezierUtils.evaluate_range(next_interpolations[targets, MBezierUtils.R_x1_idxs[3]], next_interpolations[targets, MBezierUtils.R_y1_idxs[3]], \
+                                             next_interpolations[targets, MBezierUtils.R_x2_idxs[3]], next_interpolations[targets, MBezierUtils.R_y2_idxs[3]], \
+                                             prev_fnos[targets], now_fnos[targets], next_fnos[targets])
+            rotations[inners[targets]] = MQuaternion.slerp_range(key_rotations[prev_idxs[targets]], key_rotations[next_idxs[targets]], ys)
+
+        # 이동：前後で値が異なる場合のみ、軸ごとの보간 곡선で埋める
+        targets = np.flatnonzero(np.any(key_positions[prev_idxs] != key_positions[next_idxs], axis=1))
+        if np.PyArray_DIM(targets, 0) > 0:
+            for axis, (x1_idxs, y1_idxs, x2_idxs, y2_idxs) in enumerate([(MBezierUtils.MX_x1_idxs, MBezierUtils.MX_y1_idxs, MBezierUtils.MX_x2_idxs, MBezierUtils.MX_y2_idxs), \
+                                                                           (MBezierUtils.MY_x1_idxs, MBezierUtils.MY_y1_idxs, MBezierUtils.MY_x2_idxs, MBezierUtils.MY_y2_idxs), \
+                                                                           (MBezierUtils.MZ_x1_idxs, MBezierUtils.MZ_y1_idxs, MBezierUtils.MZ_x2_idxs, MBezierUtils.MZ_y2_idxs)]):
+                ys = MBezierUtils.evaluate_range(next_interpolations[targets, x1_idxs[3]], next_interpolations[targets, y1_idxs[3]], \
+                                                 next_interpolations[targets, x2_idxs[3]], next_interpolations[targets, y2_idxs[3]], \
+                                                 prev_fnos[targets], now_fnos[targets], next_fnos[targets])
+                prev_values = key_positions[prev_idxs[targets], axis]
+                next_values = key_positions[next_idxs[targets], axis]
+                positions[inners[targets], axis] = prev_values + ((next_values - prev_values) * ys)
+
+        return positions, rotations
+
+    # ボーンの키 프레임を配列で取得する（フレーム番号, 位置, 回転, 보간 곡선）
+    cdef tuple c_get_bf_columns(self, str bone_name):
+        cdef object bf_dict = self.bones[bone_name]
+        cdef VmdBoneTrack track
+        cdef list bfs
+
+        if isinstance(bf_dict, VmdBoneTrack):
+            track = bf_dict
+            if not track.frames and not track.removed:
+                # 列だけで全キーが表せる場合はそのまま使う
+                return track.fnos, track.positions, track.rotations, track.interpolations
+
+        bfs = [self.c_peek_frame(self.bones, bone_name, fno) for fno in self.c_get_sorted_fnos(self.bone_fno_indexes, self.bones, bone_name)]
+
+        return np.array([bf.fno for bf in bfs], dtype=np.int32), \
+            np.array([[bf.position.x(), bf.position.y(), bf.position.z()] for bf in bfs], dtype=np.float64), \
+            np.array([[bf.rotation.scalar(), bf.rotation.x(), bf.rotation.y(), bf.rotation.z()] for bf in bfs], dtype=np.float64), \
+            np.array([bf.interpolation for bf in bfs], dtype=np.int64)
+
     # 보간 곡선を元に、회전ボーンの値を求める
     cdef MQuaternion calc_bf_rot(self, VmdBoneFrame prev_bf, VmdBoneFrame fill_bf, VmdBoneFrame next_bf):
         cdef double rx, ry, rt
 
         if prev_bf.rotation != next_bf.rotation:
             # 회전보간 곡선
-            rx, ry, rt = MBezierUtils.evaluate(next_bf.interpolation[MBezierUtils.R_x1_idxs[3]], next_bf.interpolation[MBezierUtils.R_y1_idxs[3]], \
-                                               next_bf.interpolation[MBezierUtils.R_x2_idxs[3]], next_bf.interpolation[MBezierUtils.R_y2_idxs[3]], \
-                                               prev_bf.fno, fill_bf.fno, next_bf.fno)
+            rx, ry, rt = c_evaluate(next_bf.interpolation[MBezierUtils.R_x1_idxs[3]], next_bf.interpolation[MBezierUtils.R_y1_idxs[3]], \
+                                    next_bf.interpolation[MBezierUtils.R_x2_idxs[3]], next_bf.interpolation[MBezierUtils.R_y2_idxs[3]], \
+                                    prev_bf.fno, fill_bf.fno, next_bf.fno)
             return MQuaternion.slerp(prev_bf.rotation, next_bf.rotation, ry)
 
         return prev_bf.rotation.copy()
@@ -1054,17 +2282,17 @@ cdef class VmdMotion:
         if prev_bf.position != next_bf.position:
             # http://rantyen.blog.fc2.com/blog-entry-65.html
             # X이동보간 곡선
-            xx, xy, xt = MBezierUtils.evaluate(next_bf.interpolation[MBezierUtils.MX_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MX_y1_idxs[3]], \
-                                               next_bf.interpolation[MBezierUtils.MX_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MX_y2_idxs[3]], \
-                                               prev_bf.fno, fill_bf.fno, next_bf.fno)
+            xx, xy, xt = c_evaluate(next_bf.interpolation[MBezierUtils.MX_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MX_y1_idxs[3]], \
+                                    next_bf.interpolation[MBezierUtils.MX_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MX_y2_idxs[3]], \
+                                    prev_bf.fno, fill_bf.fno, next_bf.fno)
             # Y이동보간 곡선
-            yx, yy, yt = MBezierUtils.evaluate(next_bf.interpolation[MBezierUtils.MY_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MY_y1_idxs[3]], \
-                                               next_bf.interpolation[MBezierUtils.MY_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MY_y2_idxs[3]], \
-                                               prev_bf.fno, fill_bf.fno, next_bf.fno)
+            yx, yy, yt = c_evaluate(next_bf.interpolation[MBezierUtils.MY_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MY_y1_idxs[3]], \
+                                    next_bf.interpolation[MBezierUtils.MY_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MY_y2_idxs[3]], \
+                                    prev_bf.fno, fill_bf.fno, next_bf.fno)
             # Z이동보간 곡선
-            zx, zy, zt = MBezierUtils.evaluate(next_bf.interpolation[MBezierUtils.MZ_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MZ_y1_idxs[3]], \
-                                               next_bf.interpolation[MBezierUtils.MZ_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MZ_y2_idxs[3]], \
-                                               prev_bf.fno, fill_bf.fno, next_bf.fno)
+            zx, zy, zt = c_evaluate(next_bf.interpolation[MBezierUtils.MZ_x1_idxs[3]], next_bf.interpolation[MBezierUtils.MZ_y1_idxs[3]], \
+                                    next_bf.interpolation[MBezierUtils.MZ_x2_idxs[3]], next_bf.interpolation[MBezierUtils.MZ_y2_idxs[3]], \
+                                    prev_bf.fno, fill_bf.fno, next_bf.fno)
 
             fill_pos = MVector3D()
             fill_pos.setX(prev_bf.position.x() + ((next_bf.position.x() - prev_bf.position.x()) * xy))
@@ -1084,7 +2312,7 @@ cdef class VmdMotion:
         # 보간 곡선もともに分割する
         cdef VmdBoneFrame fill_bf = self.c_calc_bf(target_bone_name, fill_fno, is_key=False, is_read=False, is_reset_interpolation=True)
         fill_bf.key = True
-        self.bones[target_bone_name][fill_fno] = fill_bf
+        self.c_set_frame(self.bone_fno_indexes, self.bones, target_bone_name, fill_fno, fill_bf)
 
         # 分割結果
         cdef bint fill_result = True
@@ -1139,11 +2367,16 @@ cdef class VmdMotion:
         cdef int next_y1v = next_bf.interpolation[y1_idxs[3]]
         cdef int next_x2v = next_bf.interpolation[x2_idxs[3]]
         cdef int next_y2v = next_bf.interpolation[y2_idxs[3]]
+        cdef double next_xs[4]
+        cdef double next_ys[4]
         cdef int new_fill_fno
 
-        if not MBezierUtils.is_fit_bezier_mmd([MVector2D(), MVector2D(next_x1v, next_y1v), MVector2D(next_x2v, next_y2v), MVector2D()]):
+        next_xs[:] = [0, next_x1v, next_x2v, 0]
+        next_ys[:] = [0, next_y1v, next_y2v, 0]
+
+        if not c_is_fit_bezier_mmd(next_xs, next_ys, 0):
             # ベジェ曲線がMMDの範囲内に収まっていない場合、中点で分割
-            new_fill_fno, _, _ = MBezierUtils.evaluate_by_t(next_x1v, next_y1v, next_x2v, next_y2v, prev_bf.fno, next_bf.fno, 0.5)
+            new_fill_fno = c_evaluate_by_t(next_x1v, next_y1v, next_x2v, next_y2v, prev_bf.fno, next_bf.fno, 0.5)[0]
 
             if prev_bf.fno < new_fill_fno < next_bf.fno:
                 return new_fill_fno
@@ -1164,7 +2397,8 @@ cdef class VmdMotion:
     # 보간 곡선のコピー
     cpdef copy_interpolation(self, VmdBoneFrame org_bf, VmdBoneFrame rep_bf, str bz_type):
         cdef list bz_x1_idxs, bz_y1_idxs, bz_x2_idxs, bz_y2_idxs
-        cdef list org_interpolation = cPickle.loads(cPickle.dumps(org_bf.interpolation, -1))
+        # rep_bf と同じ配列の場合もあるので、書き換える前に複製する
+        cdef array.array org_interpolation = array.copy(org_bf.interpolation)
 
         bz_x1_idxs, bz_y1_idxs, bz_x2_idxs, bz_y2_idxs = MBezierUtils.from_bz_type(bz_type)
 
@@ -1181,12 +2415,12 @@ cdef class VmdMotion:
     # 보간 곡선の再設定部品
     cdef reset_interpolation_parts(self, str target_bone_name, VmdBoneFrame bf, list bzs, list x1_idxs, list y1_idxs, list x2_idxs, list y2_idxs):
         # 키の始点は、B
-        bf.interpolation[x1_idxs[0]] = bf.interpolation[x1_idxs[1]] = bf.interpolation[x1_idxs[2]] = bf.interpolation[x1_idxs[3]] = int(bzs[1].x())
-        bf.interpolation[y1_idxs[0]] = bf.interpolation[y1_idxs[1]] = bf.interpolation[y1_idxs[2]] = bf.interpolation[y1_idxs[3]] = int(bzs[1].y())
+        bf.interpolation[x1_idxs[0]] = bf.interpolation[x1_idxs[1]] = bf.interpolation[x1_idxs[2]] = bf.interpolation[x1_idxs[3]] = clamp_interpolation(bzs[1].x())
+        bf.interpolation[y1_idxs[0]] = bf.interpolation[y1_idxs[1]] = bf.interpolation[y1_idxs[2]] = bf.interpolation[y1_idxs[3]] = clamp_interpolation(bzs[1].y())
 
         # 키の終点は、C
-        bf.interpolation[x2_idxs[0]] = bf.interpolation[x2_idxs[1]] = bf.interpolation[x2_idxs[2]] = bf.interpolation[x2_idxs[3]] = int(bzs[2].x())
-        bf.interpolation[y2_idxs[0]] = bf.interpolation[y2_idxs[1]] = bf.interpolation[y2_idxs[2]] = bf.interpolation[y2_idxs[3]] = int(bzs[2].y())
+        bf.interpolation[x2_idxs[0]] = bf.interpolation[x2_idxs[1]] = bf.interpolation[x2_idxs[2]] = bf.interpolation[x2_idxs[3]] = clamp_interpolation(bzs[2].x())
+        bf.interpolation[y2_idxs[0]] = bf.interpolation[y2_idxs[1]] = bf.interpolation[y2_idxs[2]] = bf.interpolation[y2_idxs[3]] = clamp_interpolation(bzs[2].y())
 
     def regist_full_mf(self, data_set_no: int, morph_name_list: list, offset=1, is_key=True):
         self.c_regist_full_mf(data_set_no, morph_name_list, offset, is_key)
@@ -1234,6 +2468,8 @@ cdef class VmdMotion:
 
     # モーフモーション：フレーム番号リスト
     def get_morph_fnos(self, *morph_names, **kwargs):
+        cdef VmdFrameTrack track
+
         if not self.morphs:
             return []
 
@@ -1248,8 +2484,22 @@ cdef class VmdMotion:
         keys = []
         for morph_name in morph_names:
             if morph_name in self.morphs:
-                keys.extend([x for x in self.morphs[morph_name].keys() if self.morphs[morph_name][x].fno >= start_fno and self.morphs[morph_name][x].fno <= end_fno and \
-                            (not is_key or (is_key and self.morphs[morph_name][x].key)) and (not is_read or (is_read and self.morphs[morph_name][x].read))])
+                # 昇順インデックスから範囲内のフレーム番号だけを二分探索で切り出す
+                fnos = self.c_get_sorted_fnos(self.morph_fno_indexes, self.morphs, morph_name)
+                range_fnos = fnos[bisect_left(fnos, start_fno):bisect_right(fnos, end_fno)]
+
+                if not is_key and not is_read:
+                    keys.extend(range_fnos)
+                elif isinstance(self.morphs[morph_name], VmdFrameTrack):
+                    # 列指向トラックの場合、フレームを生成せずにフラグだけ見る
+                    track = self.morphs[morph_name]
+                    keys.extend([x for x in range_fnos if track.c_is_flag(x, is_key, is_read)])
+                else:
+                    keys.extend([x for x in range_fnos if (not is_key or (is_key and self.morphs[morph_name][x].key)) and (not is_read or (is_read and self.morphs[morph_name][x].read))])
+
+        if len(morph_names) == 1:
+            # 1モーフのみの場合、既に重複なしの昇順
+            return keys
 
         # 重複を除いた昇順フレーム番号リストを返す
         return sorted(list(set(keys)))
@@ -1268,14 +2518,14 @@ cdef class VmdMotion:
         regist_mf.ratio = get_effective_value(mf.ratio)
 
         if morph_name not in self.morphs:
-            self.morphs[morph_name] = {}
+            self.morphs[morph_name] = VmdFrameDict()
 
         if isnan(regist_mf.ratio) or isinf(regist_mf.ratio):
             logger.debug("*** c_regist_mf: (%s)%s", regist_mf.fno, regist_mf.ratio)
 
         # 키を등록
         regist_mf.key = True
-        self.morphs[morph_name][fno] = regist_mf
+        self.c_set_frame(self.morph_fno_indexes, self.morphs, morph_name, fno, regist_mf)
 
     # 指定フレーム番号のモーフ
     def calc_mf(self, morph_name: str, fno: int, is_key=False, is_read=False):
@@ -1288,7 +2538,7 @@ cdef class VmdMotion:
 
         if morph_name not in self.morphs:
             fill_mf.set_name(morph_name)
-            self.morphs[morph_name] = {fno: fill_mf}
+            self.morphs[morph_name] = VmdFrameDict({fno: fill_mf})
             return fill_mf
 
         # 条件に合致するフレーム番号を探す
@@ -1304,35 +2554,38 @@ cdef class VmdMotion:
                 # 既存키のみ探している場合はNone
                 return None
 
-        # 番号より前のフレーム番号
-        cdef list before_fnos = [x for x in sorted(self.morphs[morph_name].keys()) if (x < fno)]
-        # 番号より後のフレーム番号
-        cdef list after_fnos = [x for x in sorted(self.morphs[morph_name].keys()) if (x > fno)]
+        # 昇順フレーム番号から、番号の前後のフレーム番号を二分探索で求める
+        cdef list fnos = self.c_get_sorted_fnos(self.morph_fno_indexes, self.morphs, morph_name)
+        cdef int fidx = bisect_left(fnos, fno)
+        # 番号より前のフレーム番号（なければ-1）
+        cdef int before_fno = fnos[fidx - 1] if fidx > 0 else -1
+        # 番号より後のフレーム番号（なければ-1）
+        cdef int after_fno = fnos[fidx] if fidx < len(fnos) else -1
 
-        if len(after_fnos) == 0 and len(before_fnos) == 0:
+        if fidx == 0 and fidx == len(fnos):
             fill_mf.set_name(morph_name)
             return fill_mf
 
-        if len(after_fnos) == 0:
+        if fidx == len(fnos):
             # 番号より前があって、後のがない場合、前のをコピーして返す
-            fill_mf = self.morphs[morph_name][before_fnos[-1]].copy()
+            fill_mf = self.c_peek_frame(self.morphs, morph_name, before_fno).copy()
             fill_mf.fno = fno
             fill_mf.key = False
             fill_mf.read = False
             logger.debug("** not after: fill: (%s)%s", fill_mf.fno, fill_mf.ratio)
             return fill_mf
 
-        if len(before_fnos) == 0:
+        if fidx == 0:
             # 番号より後があって、前がない場合、後のをコピーして返す
-            fill_mf = self.morphs[morph_name][after_fnos[0]].copy()
+            fill_mf = self.c_peek_frame(self.morphs, morph_name, after_fno).copy()
             fill_mf.fno = fno
             fill_mf.key = False
             fill_mf.read = False
             logger.debug("** not before: fill: (%s)%s", fill_mf.fno, fill_mf.ratio)
             return fill_mf
 
-        cdef VmdMorphFrame prev_mf = self.morphs[morph_name][before_fnos[-1]]
-        cdef VmdMorphFrame next_mf = self.morphs[morph_name][after_fnos[0]]
+        cdef VmdMorphFrame prev_mf = self.c_peek_frame(self.morphs, morph_name, before_fno)
+        cdef VmdMorphFrame next_mf = self.c_peek_frame(self.morphs, morph_name, after_fno)
         if isnan(prev_mf.ratio) or isinf(prev_mf.ratio):
             logger.debug("** prev_mf: (%s)%s", prev_mf.fno, prev_mf.ratio)
         if isnan(next_mf.ratio) or isinf(next_mf.ratio):
@@ -1354,22 +2607,58 @@ cdef class VmdMotion:
 
         return fill_mf
 
+    # 複数フレームのモーフ値をまとめて求める（各フレームの値はcalc_mfと同じ）
+    def calc_mf_range(self, morph_name: str, fnos):
+        return self.c_calc_mf_range(morph_name, np.asarray(fnos, dtype=np.int32))
+
+    cdef np.ndarray c_calc_mf_range(self, str morph_name, np.ndarray fnos):
+        cdef Py_ssize_t n = np.PyArray_DIM(fnos, 0)
+        cdef np.ndarray ratios = np.zeros(n, dtype=np.float32)
+
+        if morph_name not in self.morphs or len(self.morphs[morph_name]) == 0 or n == 0:
+            return ratios
+
+        cdef list mfs = [self.c_peek_frame(self.morphs, morph_name, fno) for fno in self.c_get_sorted_fnos(self.morph_fno_indexes, self.morphs, morph_name)]
+        cdef np.ndarray key_fnos = np.array([mf.fno for mf in mfs], dtype=np.int32)
+        cdef np.ndarray key_ratios = np.array([mf.ratio for mf in mfs], dtype=np.float32)
+
+        # 前後の키の行（範囲外の場合は端の키をそのまま使う）
+        cdef Py_ssize_t key_cnt = np.PyArray_DIM(key_fnos, 0)
+        cdef np.ndarray idxs = np.searchsorted(key_fnos, fnos)
+        cdef np.ndarray exact = key_fnos[np.minimum(idxs, key_cnt - 1)] == fnos
+        cdef np.ndarray prev_rows = np.where(exact, idxs, idxs - 1).clip(0, key_cnt - 1)
+        cdef np.ndarray inners = np.flatnonzero(~exact & (idxs > 0) & (idxs < key_cnt))
+        cdef np.ndarray values = key_ratios[prev_rows]
+
+        if np.PyArray_DIM(inners, 0) > 0:
+            # 線形で埋める
+            prev_idxs = prev_rows[inners]
+            next_idxs = idxs[inners]
+            # calc_mfと同じく、差分はfloatのまま求める
+            prev_values = key_ratios[prev_idxs]
+            next_values = key_ratios[next_idxs]
+            values = values.astype(np.float64)
+            values[inners] = prev_values.astype(np.float64) + ((next_values - prev_values).astype(np.float64) \
+                                                               * ((fnos[inners] - key_fnos[prev_idxs]) / (key_fnos[next_idxs] - key_fnos[prev_idxs])))
+
+        ratios[:] = values
+
+        return ratios
+
     def smooth_filter_mf(self, data_set_no: int, morph_name: str, loop=1, \
                          config={"freq": 30, "mincutoff": 0.3, "beta": 0.01, "dcutoff": 0.25}, start_fno=-1, end_fno=-1, is_show_log=True):
         self.c_smooth_filter_mf(data_set_no, morph_name, loop, config, start_fno, end_fno, is_show_log)
 
     # フィルターをかける
     cdef c_smooth_filter_mf(self, int data_set_no, str morph_name, int loop, dict config, int start_fno, int end_fno, bint is_show_log):
-        cdef OneEuroFilter rxfilter
-        cdef int n
-        cdef list fnos
+        cdef int n, fno
+        cdef Py_ssize_t m
+        cdef list fnos, mfs
         cdef prev_sep_fno = 0
         cdef VmdMorphFrame now_mf
+        cdef np.ndarray ratios
 
         for n in range(loop):
-            rxfilter = OneEuroFilter(**config)
-
-            fnos = self.get_morph_fnos(morph_name)
             prev_sep_fno = 0
 
             # 키 프레임を取得する
@@ -1380,10 +2669,16 @@ cdef class VmdMotion:
                 # 範囲指定がある場合はその範囲内だけ
                 fnos = self.get_morph_fnos(morph_name, start_fno=start_fno, end_fno=end_fno)
 
-            # 全区間をフィルタにかける
-            for fno in fnos:
-                now_mf = self.c_calc_mf(morph_name, fno, is_key=False, is_read=False)
-                now_mf.ratio = rxfilter(now_mf.ratio, fno)
+            if not fnos:
+                continue
+
+            # 全区間をまとめてフィルタにかける（타임스탬프はフレーム番号）
+            mfs = [self.c_calc_mf(morph_name, fno, is_key=False, is_read=False) for fno in fnos]
+            ratios = c_filter_values(np.array([[now_mf.ratio] for now_mf in mfs], dtype=np.float64), config, np.array(fnos, dtype=np.float64), False)
+
+            for m, fno in enumerate(fnos):
+                now_mf = mfs[m]
+                now_mf.ratio = ratios[m, 0]
 
                 if is_show_log and data_set_no > 0 and fno // 2000 > prev_sep_fno and fnos[-1] > 0:
                     logger.info("-- %s프레임째: 종료(%s％)【No.%s - 필터링 - %s(%s)】", fno, round((fno / fnos[-1]) * 100, 3), data_set_no, morph_name, (n + 1))
@@ -1395,7 +2690,7 @@ cdef class VmdMotion:
             mf = self.c_calc_mf(morph_name, fno, is_key=False, is_read=False)
 
             if fno in self.morphs[morph_name] and not mf.key:
-                del self.morphs[morph_name][fno]
+                self.c_remove_frame(self.morph_fno_indexes, self.morphs, morph_name, fno)
 
     # 指定モーフの불필요키を삭제する
     # 変曲点を求める
@@ -1447,7 +2742,7 @@ cdef class VmdMotion:
         for f in fnos:
             if f not in reduce_fnos and f in self.morphs[morph_name]:
                 # 키 프레임が残す対象でない場合、삭제
-                del self.morphs[morph_name][f]
+                self.c_remove_frame(self.morph_fno_indexes, self.morphs, morph_name, f)
 
     # 키 프레임ームを間引く
     # オリジナル：https://github.com/errno-mmd/smoothvmd/blob/master/reducevmd.cc
@@ -1504,7 +2799,8 @@ cdef class VmdMotion:
         if bone_name not in self.bones:
             return False
 
-        for bf in self.bones[bone_name].values():
+        for fno in self.bones[bone_name].keys():
+            bf = self.c_peek_frame(self.bones, bone_name, fno)
             if bf.position != MVector3D():
                 return True
             if bf.rotation != MQuaternion():
@@ -1514,6 +2810,8 @@ cdef class VmdMotion:
 
     # ボーンモーション：フレーム番号リスト
     def get_bone_fnos(self, *bone_names, **kwargs):
+        cdef VmdFrameTrack track
+
         if not self.bones:
             return []
 
@@ -1528,8 +2826,22 @@ cdef class VmdMotion:
         keys = []
         for bone_name in bone_names:
             if bone_name in self.bones:
-                keys.extend([x for x in self.bones[bone_name].keys() if self.bones[bone_name][x].fno >= start_fno and self.bones[bone_name][x].fno <= end_fno and \
-                            (not is_key or (is_key and self.bones[bone_name][x].key)) and (not is_read or (is_read and self.bones[bone_name][x].read))])
+                # 昇順インデックスから範囲内のフレーム番号だけを二分探索で切り出す
+                fnos = self.c_get_sorted_fnos(self.bone_fno_indexes, self.bones, bone_name)
+                range_fnos = fnos[bisect_left(fnos, start_fno):bisect_right(fnos, end_fno)]
+
+                if not is_key and not is_read:
+                    keys.extend(range_fnos)
+                elif isinstance(self.bones[bone_name], VmdFrameTrack):
+                    # 列指向トラックの場合、フレームを生成せずにフラグだけ見る
+                    track = self.bones[bone_name]
+                    keys.extend([x for x in range_fnos if track.c_is_flag(x, is_key, is_read)])
+                else:
+                    keys.extend([x for x in range_fnos if (not is_key or (is_key and self.bones[bone_name][x].key)) and (not is_read or (is_read and self.bones[bone_name][x].read))])
+
+        if len(bone_names) == 1:
+            # 1ボーンのみの場合、既に重複なしの昇順
+            return keys
 
         # 重複を除いた昇順フレーム番号リストを返す
         return sorted(list(set(keys)))
@@ -1542,14 +2854,14 @@ cdef class VmdMotion:
         fno = kwargs["fno"] if "fno" in kwargs else 0
 
         # 指定より前の키 프레임
-        prev_fnos = [x for x in fnos if x < fno]
+        prev_idx = bisect_left(fnos, fno)
         # 指定より後の키 프레임
-        next_fnos = [x for x in fnos if x > fno]
+        next_idx = bisect_right(fnos, fno)
 
         # 前のは取れなければ-1で強制的に前の
-        prev_fno = -1 if len(prev_fnos) <= 0 else prev_fnos[-1]
+        prev_fno = -1 if prev_idx <= 0 else fnos[prev_idx - 1]
         # 後のは取れなければ最終フレーム＋1
-        next_fno = self.last_motion_frame + 1 if len(next_fnos) <= 0 else next_fnos[0]
+        next_fno = self.last_motion_frame + 1 if next_idx >= len(fnos) else fnos[next_idx]
 
         return prev_fno, next_fno
 
@@ -1567,9 +2879,7 @@ cdef class VmdMotion:
         target_fnos = {}
 
         for bone_name, bone_frames in self.bones.items():
-            if bone_name not in ["SIZING_ROOT_BONE", "頭頂", "右つま先実体", "左つま先実体", "右足底辺", "左足底辺", "右足底実体", "左足底実体", "右足ＩＫ底実体", "左足ＩＫ底実体", "右足IK親底実体", "左足IK親底実体", \
-                                 "首根元", "右腕下延長", "左腕下延長", "右腕垂直", "左腕垂直", "センター実体", "左腕ひじ中間", "右腕ひじ中間", "左ひじ手首中間", "右ひじ手首中間", "左手首実体", "右手首実体", \
-                                 "左親指先実体", "左人指先実体", "左中指先実体", "左薬指先実体", "左小指先実体", "右親指先実体", "右人指先実体", "右中指先実体", "右薬指先実体", "右小指先実体"]:
+            if bone_name not in SIZING_BONE_NAMES:
                 # サイジング用ボーンは出力しない
                 target_fnos[bone_name] = self.get_bone_fnos(bone_name, is_key=True)
 
@@ -1622,26 +2932,69 @@ cdef class VmdMotion:
 
     # ボーン키 프레임を추가
     def append_bone_frame(self, frame: VmdBoneFrame):
-        if frame.name not in self.bones:
-            # まだ該当ボーン名がない場合、추가
-            self.bones[frame.name] = {}
-
-        self.bones[frame.name][frame.fno] = frame
+        # まだ該当ボーン名がない場合は추가しつつ、インデックスも更新
+        self.c_set_frame(self.bone_fno_indexes, self.bones, frame.name, frame.fno, frame)
 
     # モーフ키 프레임を추가
     def append_morph_frame(self, frame: VmdMorphFrame):
-        if frame.name not in self.morphs:
-            # まだ該当モーフ名がない場合、추가
-            self.morphs[frame.name] = {}
+        # まだ該当モーフ名がない場合は추가しつつ、インデックスも更新
+        self.c_set_frame(self.morph_fno_indexes, self.morphs, frame.name, frame.fno, frame)
+
+    # 値の参照用にボーンキーフレームを取得する（列指向トラックでは保持しないので、戻り値への変更は反映されない）
+    def peek_bf(self, bone_name: str, fno: int):
+        bf = self.c_peek_frame(self.bones, bone_name, fno)
+        if bf is None:
+            raise KeyError(fno)
+
+        return bf
+
+    # 値の参照用にモーフキーフレームを取得する（列指向トラックでは保持しないので、戻り値への変更は反映されない）
+    def peek_mf(self, morph_name: str, fno: int):
+        mf = self.c_peek_frame(self.morphs, morph_name, fno)
+        if mf is None:
+            raise KeyError(fno)
+
+        return mf
+
+    # ボーン・モーフのキーフレームを列指向トラックに詰める（複製元モーションの省メモリ化用。辞書と同じく書き込める）
+    def pack_tracks(self):
+        for bone_name, bf_dict in self.bones.items():
+            if isinstance(bf_dict, VmdFrameTrack):
+                bf_dict.compact()
+            else:
+                self.bones[bone_name] = VmdBoneTrack(bone_name, bf_dict)
+
+        for morph_name, mf_dict in self.morphs.items():
+            if isinstance(mf_dict, VmdFrameTrack):
+                mf_dict.compact()
+            else:
+                self.morphs[morph_name] = VmdMorphTrack(morph_name, mf_dict)
+
+        # 差し替え前の辞書を参照しているので、インデックスは作り直す
+        self.bone_fno_indexes = {}
+        self.morph_fno_indexes = {}
+        self.invalidate_pose()
+
+    # 列指向トラックをキーフレーム辞書に戻す
+    def unpack_tracks(self):
+        for bone_name, bf_dict in self.bones.items():
+            if isinstance(bf_dict, VmdFrameTrack):
+                self.bones[bone_name] = VmdFrameDict(bf_dict.items())
+
+        for morph_name, mf_dict in self.morphs.items():
+            if isinstance(mf_dict, VmdFrameTrack):
+                self.morphs[morph_name] = VmdFrameDict(mf_dict.items())
 
-        self.morphs[frame.name][frame.fno] = frame
+        self.bone_fno_indexes = {}
+        self.morph_fno_indexes = {}
+        self.invalidate_pose()
 
     # 指定fnoのみのモーションデータを生成する
     def copy_bone_motion(self, fno: int):
         new_motion = VmdMotion()
 
         for bone_name in self.bones.keys():
-            new_motion.bones[bone_name] = {fno: self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False).copy()}
+            new_motion.bones[bone_name] = VmdFrameDict({fno: self.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False).copy()})
 
         return new_motion
 
@@ -1655,12 +3008,20 @@ cdef class VmdMotion:
         motion.motion_cnt = cPickle.loads(cPickle.dumps(self.motion_cnt, -1))
 
         for bone_name, bf_dict in self.bones.items():
-            motion.bones[bone_name] = {}
+            if isinstance(bf_dict, VmdFrameTrack):
+                motion.bones[bone_name] = bf_dict.copy()
+                continue
+
+            motion.bones[bone_name] = VmdFrameDict()
             for bf in bf_dict.values():
                 motion.bones[bone_name][bf.fno] = bf.copy()
 
         motion.morph_cnt = cPickle.loads(cPickle.dumps(self.morph_cnt, -1))
-        motion.morphs = cPickle.loads(cPickle.dumps(self.morphs, -1))
+        for morph_name, mf_dict in self.morphs.items():
+            if isinstance(mf_dict, VmdFrameTrack):
+                motion.morphs[morph_name] = mf_dict.copy()
+            else:
+                motion.morphs[morph_name] = cPickle.loads(cPickle.dumps(mf_dict, -1))
         motion.camera_cnt = cPickle.loads(cPickle.dumps(self.camera_cnt, -1))
         motion.cameras = cPickle.loads(cPickle.dumps(self.cameras, -1))
 
@@ -1674,3 +3035,49 @@ cdef class VmdMotion:
         motion.digest = cPickle.loads(cPickle.dumps(self.digest, -1))
 
         return motion
+
+    # 参照専用の複製を生成する
+    # ボーン・モーフは参照専用の列指向トラックにして配列を共有するため、フレームの複製は行わない（書き込みは TypeError）
+    def snapshot(self):
+        cdef VmdFrameTrack track
+        motion = VmdMotion()
+
+        motion.path = self.path
+        motion.signature = self.signature
+        motion.model_name = self.model_name
+        motion.last_motion_frame = self.last_motion_frame
+        motion.motion_cnt = self.motion_cnt
+
+        for bone_name, bf_dict in self.bones.items():
+            if isinstance(bf_dict, VmdFrameTrack):
+                motion.bones[bone_name] = bf_dict.copy(keep_frames=False)
+            else:
+                track = VmdBoneTrack(bone_name, bf_dict)
+                # 列で表せず残ったフレームは元と共有しないよう複製する
+                track.frames = {fno: bf.copy() for fno, bf in track.frames.items()}
+                track.keep_frames = False
+                motion.bones[bone_name] = track
+
+        motion.morph_cnt = self.morph_cnt
+        for morph_name, mf_dict in self.morphs.items():
+            if isinstance(mf_dict, VmdFrameTrack):
+                motion.morphs[morph_name] = mf_dict.copy(keep_frames=False)
+            else:
+                track = VmdMorphTrack(morph_name, mf_dict)
+                track.frames = {fno: mf.copy() for fno, mf in track.frames.items()}
+                track.keep_frames = False
+                motion.morphs[morph_name] = track
+
+        motion.camera_cnt = self.camera_cnt
+        motion.cameras = cPickle.loads(cPickle.dumps(self.cameras, -1))
+
+        motion.light_cnt = self.light_cnt
+        motion.lights = cPickle.loads(cPickle.dumps(self.lights, -1))
+        motion.shadow_cnt = self.shadow_cnt
+        motion.shadows = cPickle.loads(cPickle.dumps(self.shadows, -1))
+        motion.ik_cnt = self.ik_cnt
+        motion.showiks = cPickle.loads(cPickle.dumps(self.showiks, -1))
+
+        motion.digest = self.digest
+
+        return motion
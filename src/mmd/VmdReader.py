@@ -1,16 +1,24 @@
 # -*- coding: utf-8 -*-
 #
+import sys
 import struct
-import hashlib
+import array
 import re
+import numpy as np
 
-from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame
+from mmd.VmdData import VmdMotion, VmdFrameDict, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame
 from module.MMath import MRect, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
 from utils.MLogger import MLogger # noqa
+from utils import MFileutils
 from utils.MException import SizingException, MKilledException, MParseException
 
 logger = MLogger(__name__)
 
+# ボーンフレーム1件分（111byte）
+BONE_FRAME_DTYPE = np.dtype([("name", "V15"), ("fno", "<u4"), ("position", "<f4", (3,)), ("rotation", "<f4", (4,)), ("interpolation", "u1", (64,))])
+# モーフフレーム1件分（23byte）
+MORPH_FRAME_DTYPE = np.dtype([("name", "V15"), ("fno", "<u4"), ("ratio", "<f4")])
+
 
 class VmdReader:
     def __init__(self, file_path):
@@ -18,6 +26,8 @@ class VmdReader:
         self.buffer = None
         self.encoding = None
         self.file_path = file_path
+        # 名前のデコードキャッシュ（key: 固定長のバイト列）
+        self.texts = {}
 
     # モデル名だけ取得
     def read_model_name(self):
@@ -42,9 +52,9 @@ class VmdReader:
         motion.path = self.file_path
 
         try:
-            with open(self.file_path, "rb") as f:
-                # VMDファイルをバイナリ읽기
-                self.buffer = f.read()
+            with MFileutils.open_file_buffer(self.file_path) as buffer:
+                # VMDファイルをメモリマップでバイナリ읽기
+                self.buffer = buffer
 
                 # vmdバージョン
                 signature = self.unpack(30, "30s")
@@ -59,95 +69,15 @@ class VmdReader:
                 motion.motion_cnt = self.read_uint(4)
                 logger.test("motion.motion_cnt %s", motion.motion_cnt)
 
-                # 1F分の모션情報
-
-                prev_n = 0
-                for n in range(motion.motion_cnt):
-                    frame = VmdBoneFrame(0)
-                    frame.key = True
-                    frame.read = True
-
-                    # ボーン ----------------------
-                    # ボーン名
-                    bone_bname, bone_name = self.read_text(15)
-
-                    frame.name = bone_name
-                    frame.bname = bone_bname
-                    logger.test("name: %s, bname %s", bone_name, bone_bname)
-
-                    # フレームIDX
-                    frame.fno = self.read_uint(4)
-                    logger.test("frame.fno %s", frame.fno)
-
-                    # 位置X,Y,Z
-                    frame.position = self.read_Vector3D()
-                    logger.test("frame.position %s", frame.position)
-
-                    # 回転X,Y,Z,scalar
-                    frame.rotation = self.read_Quaternion()
-                    logger.test("frame.rotation %s", frame.rotation)
-                    logger.test("frame.rotation.euler %s", frame.rotation.toEulerAngles())
-                    # オリジナルを保持
-                    frame.org_rotation = frame.rotation.copy()
-
-                    # 補間曲線
-                    frame.interpolation = list(self.unpack(64, "64B", True))
-                    logger.test("interpolation %s", frame.interpolation)
-
-                    if bone_name not in motion.bones:
-                        # まだ辞書にない場合、配列追加
-                        motion.bones[bone_name] = {}
-
-                    # 辞書の該当部分にボーンフレームを追加
-                    if frame.fno not in motion.bones[bone_name]:
-                        motion.bones[bone_name][frame.fno] = frame
-
-                    if frame.fno > motion.last_motion_frame:
-                        # 最終フレームを記録
-                        motion.last_motion_frame = frame.fno
-
-                    if n // 10000 > prev_n:
-                        prev_n = n // 10000
-                        logger.info("-- VMD 모션 읽기 키: %s" % n)
+                # 1F分の모션情報（ボーン）をまとめて読み込む
+                self.read_bone_frames(motion)
 
                 # 모프数
                 motion.morph_cnt = self.read_uint(4)
                 logger.test("motion.morph_cnt %s", motion.morph_cnt)
 
-                # 1F分の모프情報
-                prev_n = 0
-                for n in range(motion.morph_cnt):
-                    morph = VmdMorphFrame()
-                    morph.key = True
-                    morph.read = True
-
-                    # 모프 ----------------------
-                    # 모프名
-                    morph_bname, morph_name = self.read_text(15)
-
-                    morph.name = morph_name
-                    morph.bname = morph_bname
-                    logger.test("name: %s, bname %s", morph_name, morph_bname)
-
-                    # フレームIDX
-                    morph.fno = self.read_uint(4)
-                    logger.test("morph.fno %s", morph.fno)
-
-                    # 度数
-                    morph.ratio = self.read_float(4)
-                    logger.test("morph.ratio %s", morph.ratio)
-
-                    if morph_name not in motion.morphs:
-                        # まだ辞書にない場合、配列追加
-                        motion.morphs[morph_name] = {}
-
-                    if morph.fno not in motion.morphs[morph_name]:
-                        # まだなければ辞書の該当部分に모프フレームを追加
-                        motion.morphs[morph_name][morph.fno] = morph
-
-                    if n // 1000 > prev_n:
-                        prev_n = n // 1000
-                        logger.info("-- VMD 모션 읽기 모프: %s" % n)
+                # 1F分の모프情報をまとめて読み込む
+                self.read_morph_frames(motion)
 
                 try:
                     # カメラ数
@@ -305,9 +235,11 @@ class VmdReader:
                     # 昔のMMD（MMDv7.39.x64以前）はIK情報がないため、catchして握りつぶす
                     motion.ik_cnt = 0
 
-            # ハッシュを設定
-            motion.digest = self.hexdigest()
-            logger.test("motion: %s, hash: %s", motion.path, motion.digest)
+                # ハッシュを設定（読み込んだ内容から計算する）
+                motion.digest = MFileutils.get_file_digest(self.file_path, self.buffer)
+                logger.test("motion: %s, hash: %s", motion.path, motion.digest)
+
+                self.buffer = None
 
             return motion
         except MKilledException as ke:
@@ -321,32 +253,120 @@ class VmdReader:
             logger.critical("VMD읽기 처리가 의도치 않은 오류로 종료했습니다.\n\n%s", traceback.format_exc(), decoration=MLogger.DECORATION_BOX)
             raise e
 
+    # ボーンフレームをまとめて読み込む
+    def read_bone_frames(self, motion: VmdMotion):
+        # 1レコード111byteを構造化配列で一括展開する
+        records = np.frombuffer(self.buffer, dtype=BONE_FRAME_DTYPE, count=motion.motion_cnt, offset=self.offset)
+        self.offset += BONE_FRAME_DTYPE.itemsize * motion.motion_cnt
+
+        names = [self.decode_cached_text(bname) for bname in records["name"].tolist()]
+        fnos = records["fno"].tolist()
+        positions = records["position"].astype(np.float64).tolist()
+        rotations = records["rotation"].astype(np.float64).tolist()
+        # 보간 곡선はフレームと同じ符号付き16bitの並びにしておき、1フレーム128byteずつ切り出す
+        interpolations = records["interpolation"].astype(np.int16).tobytes()
+
+        prev_n = 0
+        for n in range(motion.motion_cnt):
+            bone_bname, bone_name = names[n]
+            fno = fnos[n]
+
+            if bone_name not in motion.bones:
+                # まだ辞書にない場合、配列追加
+                motion.bones[bone_name] = VmdFrameDict()
+
+            # 辞書の該当部分にボーンフレームを追加（同じフレーム番号は先のを優先）
+            if fno not in motion.bones[bone_name]:
+                frame = VmdBoneFrame(fno)
+                frame.key = True
+                frame.read = True
+                frame.name = bone_name
+                frame.bname = bone_bname
+                # 位置X,Y,Z
+                frame.position = MVector3D(positions[n][0], positions[n][1], positions[n][2])
+                # 回転X,Y,Z,scalar
+                x, y, z, scalar = rotations[n]
+                frame.rotation = MQuaternion(scalar, x, y, z)
+                # オリジナルを保持
+                frame.org_rotation = MQuaternion(scalar, x, y, z)
+                # 補間曲線
+                frame.interpolation = array.array('h', interpolations[n * 128:(n + 1) * 128])
+
+                motion.bones[bone_name][fno] = frame
+
+            if fno > motion.last_motion_frame:
+                # 最終フレームを記録
+                motion.last_motion_frame = fno
+
+            if n // 10000 > prev_n:
+                prev_n = n // 10000
+                logger.info("-- VMD 모션 읽기 키: %s" % n)
+
+        logger.test("bone frames: %s, bones: %s", motion.motion_cnt, len(motion.bones))
+
+    # モーフフレームをまとめて読み込む
+    def read_morph_frames(self, motion: VmdMotion):
+        # 1レコード23byteを構造化配列で一括展開する
+        records = np.frombuffer(self.buffer, dtype=MORPH_FRAME_DTYPE, count=motion.morph_cnt, offset=self.offset)
+        self.offset += MORPH_FRAME_DTYPE.itemsize * motion.morph_cnt
+
+        names = [self.decode_cached_text(bname) for bname in records["name"].tolist()]
+        fnos = records["fno"].tolist()
+        ratios = records["ratio"].astype(np.float64).tolist()
+
+        prev_n = 0
+        for n in range(motion.morph_cnt):
+            morph_bname, morph_name = names[n]
+            fno = fnos[n]
+
+            if morph_name not in motion.morphs:
+                # まだ辞書にない場合、配列追加
+                motion.morphs[morph_name] = VmdFrameDict()
+
+            if fno not in motion.morphs[morph_name]:
+                # まだなければ辞書の該当部分に모프フレームを追加
+                morph = VmdMorphFrame(fno)
+                morph.key = True
+                morph.read = True
+                morph.name = morph_name
+                morph.bname = morph_bname
+                morph.ratio = ratios[n]
+
+                motion.morphs[morph_name][fno] = morph
+
+            if n // 1000 > prev_n:
+                prev_n = n // 1000
+                logger.info("-- VMD 모션 읽기 모프: %s" % n)
+
+        logger.test("morph frames: %s, morphs: %s", motion.morph_cnt, len(motion.morphs))
+
+    # ハッシュ値（サイズと更新日時が変わっていなければキャッシュを使う）
     def hexdigest(self):
-        sha1 = hashlib.sha1()
-
-        with open(self.file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(2048 * sha1.block_size), b''):
-                sha1.update(chunk)
-
-        sha1.update(chunk)
-
-        # ファイルパスをハッシュに含める
-        sha1.update(self.file_path.encode('utf-8'))
-
-        return sha1.hexdigest()
+        return MFileutils.get_file_digest(self.file_path)
 
     def read_text(self, format_size):
         bresult = self.unpack(format_size, "{0}s".format(format_size))
 
+        return self.decode_cached_text(bresult)
+
+    # バイト列を(bytes, 文字列)にする
+    # 同じバイト列は一度だけデコードし、bytesとintern済みの文字列をフレーム間で共有する
+    def decode_cached_text(self, bresult):
+        if bresult in self.texts:
+            return self.texts[bresult]
+
         if not self.encoding:
             # まだエンコードが確定していない場合、エンコード取得
             self.encoding = self.get_encoding(bresult, False)
 
-        if self.encoding:
-            # エンコードが取れた場合、復元
-            return bresult, self.decode_text(bresult, self.encoding, False)
+        if not self.encoding:
+            return None, None
+
+        # エンコードが取れた場合、復元
+        text = self.decode_text(bresult, self.encoding, False)
+        self.texts[bresult] = (bresult, None if text is None else sys.intern(text))
 
-        return None, None
+        return self.texts[bresult]
 
     # ファイルのエンコードを取得する
     def get_encoding(self, fbytes, is_raise=True):
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 #
+import io
+from itertools import chain
 import struct
+import numpy as np
+from mmd.VmdReader import BONE_FRAME_DTYPE, MORPH_FRAME_DTYPE
 from module.MOptions import MOptionsDataSet
 from utils.MLogger import MLogger # noqa
 
@@ -40,11 +44,9 @@ class VmdWriter():
 
         # bone frames
         fout.write(struct.pack('<L', len(bone_frames)))  # ボーンフレーム数
-        for bf in bone_frames:
-            bf.write(fout)
+        fout.write(self.pack_bone_frames(bone_frames))
         fout.write(struct.pack('<L', len(morph_frames)))  # 表情キーフレーム数
-        for mf in morph_frames:
-            mf.write(fout)
+        fout.write(self.pack_morph_frames(morph_frames))
         fout.write(struct.pack('<L', len(camera_frames)))  # カメラキーフレーム数
         for cf in camera_frames:
             cf.write(fout)
@@ -61,3 +63,98 @@ class VmdWriter():
                 sf.write(fout)
 
         fout.close()
+
+    # ボーンフレームを1つのバッファにまとめる（内容はVmdBoneFrame.writeを並べたものと同じ）
+    def pack_bone_frames(self, bone_frames: list):
+        bnames = []
+        fnos = []
+        positions = []
+        rotations = []
+        interpolations = []
+
+        for bf in bone_frames:
+            if not bf.bname:
+                bf.bname = bf.name.encode('cp932').decode('shift_jis').encode('shift_jis')[:15].ljust(15, b'\x00')   # 15文字制限
+
+            bnames.append(bf.bname)
+            fnos.append(bf.fno)
+            positions.append(bf.position.data())
+            # w, x, y, z
+            rotations.append(bf.rotation.data().components)
+            interpolations.append(bf.interpolation)
+
+        if any([len(interpolation) != 64 for interpolation in interpolations]):
+            return self.write_frames(bone_frames)
+
+        frame_cnt = len(bone_frames)
+        positions = np.array(positions, dtype=np.float64).reshape(frame_cnt, 3)
+        rotations = np.array(rotations, dtype=np.float64).reshape(frame_cnt, 4)
+
+        # MQuaternion.normalized と同じ計算順で正規化し、x, y, z, w の順にする
+        with np.errstate(all="ignore"):
+            sizes = np.sqrt(rotations[:, 0] * rotations[:, 0] + rotations[:, 1] * rotations[:, 1] + rotations[:, 2] * rotations[:, 2] + rotations[:, 3] * rotations[:, 3])
+            rotations = rotations[:, [1, 2, 3, 0]] / sizes[:, np.newaxis]
+
+        if not self.is_packable(bnames, fnos, [positions, rotations]):
+            # 配列で表せない場合、1件ずつ出力する
+            return self.write_frames(bone_frames)
+
+        records = np.zeros(frame_cnt, dtype=BONE_FRAME_DTYPE)
+        records["name"] = bnames
+        records["fno"] = fnos
+        records["position"] = positions
+        records["rotation"] = rotations
+        records["interpolation"] = np.fromiter(chain.from_iterable(interpolations), dtype=np.int64, count=frame_cnt * 64).reshape(frame_cnt, 64).clip(0, 127)
+
+        return records.tobytes()
+
+    # モーフフレームを1つのバッファにまとめる（内容はVmdMorphFrame.writeを並べたものと同じ）
+    def pack_morph_frames(self, morph_frames: list):
+        bnames = []
+        fnos = []
+        ratios = []
+
+        for mf in morph_frames:
+            if not mf.bname:
+                mf.bname = mf.name.encode('cp932').decode('shift_jis').encode('shift_jis')[:15].ljust(15, b'\x00')   # 15文字制限
+
+            bnames.append(mf.bname)
+            fnos.append(mf.fno)
+            ratios.append(mf.ratio)
+
+        ratios = np.array(ratios, dtype=np.float64)
+
+        if not self.is_packable(bnames, fnos, [ratios]):
+            return self.write_frames(morph_frames)
+
+        records = np.zeros(len(morph_frames), dtype=MORPH_FRAME_DTYPE)
+        records["name"] = bnames
+        records["fno"] = fnos
+        records["ratio"] = ratios
+
+        return records.tobytes()
+
+    # 構造化配列でそのまま出力できるか
+    # 名前が15byte以外、負のフレーム番号、floatに収まらない値はstruct.packと結果が変わるので対象外
+    def is_packable(self, bnames: list, fnos: list, values_list: list):
+        if any([len(bname) != 15 for bname in bnames]):
+            return False
+
+        if fnos and min(fnos) < 0:
+            return False
+
+        for values in values_list:
+            with np.errstate(over="ignore"):
+                if np.any(np.isfinite(values) & ~np.isfinite(values.astype(np.float32))):
+                    return False
+
+        return True
+
+    # 1件ずつ出力した内容を返す
+    def write_frames(self, frames: list):
+        buffer = io.BytesIO()
+
+        for frame in frames:
+            frame.write(buffer)
+
+        return buffer.getvalue()
@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 #
-import hashlib
 import re
 
 from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
 from module.MMath import MRect, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
 from utils.MException import MParseException # noqa
 from utils.MLogger import MLogger # noqa
+from utils import MFileutils
 from utils.MException import SizingException, MKilledException
 
 logger = MLogger(__name__)
@@ -139,19 +139,9 @@ class VpdReader():
         # 正規表現に合致するのが取れなかった場合、None
         return None
 
+    # ハッシュ値（サイズと更新日時が変わっていなければキャッシュを使う）
     def hexdigest(self):
-        sha1 = hashlib.sha1()
-
-        with open(self.file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(2048 * sha1.block_size), b''):
-                sha1.update(chunk)
-
-        sha1.update(chunk)
-
-        # ファイルパスをハッシュに含める
-        sha1.update(self.file_path.encode('utf-8'))
-
-        return sha1.hexdigest()
+        return MFileutils.get_file_digest(self.file_path)
 
     # ファイルのエンコードを取得する
     def get_file_encoding(self, file_path):
@@ -92,7 +92,9 @@ cdef class MVector2D:
 
 
 cdef class MVector3D:
-    cdef np.ndarray __data
+    cdef DTYPE_FLOAT_t __x
+    cdef DTYPE_FLOAT_t __y
+    cdef DTYPE_FLOAT_t __z
 
     cpdef MVector3D copy(self)
 
@@ -168,11 +170,11 @@ cdef class MVector3D:
 
     cpdef DTYPE_FLOAT_t z(self)
     
-    cpdef setX(self, x)
+    cpdef setX(self, DTYPE_FLOAT_t x)
 
-    cpdef setY(self, y)
+    cpdef setY(self, DTYPE_FLOAT_t y)
 
-    cpdef setZ(self, z)
+    cpdef setZ(self, DTYPE_FLOAT_t z)
 
 cdef MVector3D crossProduct_MVector3D(MVector3D v1, MVector3D v2)
 
@@ -180,7 +182,10 @@ cdef double dotProduct_MVector3D(MVector3D v1, MVector3D v2)
 
 
 cdef class MVector4D:
-    cdef np.ndarray __data
+    cdef DTYPE_FLOAT_t __x
+    cdef DTYPE_FLOAT_t __y
+    cdef DTYPE_FLOAT_t __z
+    cdef DTYPE_FLOAT_t __w
 
     cpdef double length(self)
 
@@ -242,18 +247,21 @@ cdef class MVector4D:
     
     cpdef DTYPE_FLOAT_t w(self)
     
-    cpdef setX(self, x)
+    cpdef setX(self, DTYPE_FLOAT_t x)
 
-    cpdef setY(self, y)
+    cpdef setY(self, DTYPE_FLOAT_t y)
 
-    cpdef setZ(self, z)
+    cpdef setZ(self, DTYPE_FLOAT_t z)
 
-    cpdef setW(self, w)
+    cpdef setW(self, DTYPE_FLOAT_t w)
 
 cdef double dotProduct_MVector4D(MVector4D v1, MVector4D v2)
 
 cdef class MQuaternion:
-    cdef np.ndarray __data
+    cdef DTYPE_FLOAT_t __w
+    cdef DTYPE_FLOAT_t __x
+    cdef DTYPE_FLOAT_t __y
+    cdef DTYPE_FLOAT_t __z
 
     cpdef MQuaternion copy(self)
 
@@ -295,13 +303,13 @@ cdef class MQuaternion:
 
     cpdef MVector3D vector(self)
 
-    cpdef setX(self, x)
+    cpdef setX(self, double x)
 
-    cpdef setY(self, y)
+    cpdef setY(self, double y)
     
-    cpdef setZ(self, z)
+    cpdef setZ(self, double z)
 
-    cpdef setScalar(self, w)
+    cpdef setScalar(self, double w)
 
 cdef double dotProduct_MQuaternion(MQuaternion v1, MQuaternion v2)
 
@@ -323,9 +331,13 @@ cdef MQuaternion nlerp(MQuaternion q1, MQuaternion q2, double t)
 
 cdef MQuaternion slerp(MQuaternion q1, MQuaternion q2, double t)
 
+cdef np.ndarray slerp_range(np.ndarray q1s, np.ndarray q2s, np.ndarray ts)
+
+cdef void calc_slerp(double* q1, double* q2, double t, double* result) nogil
+
 
 cdef class MMatrix4x4:
-    cdef np.ndarray __data
+    cdef DTYPE_FLOAT_t __data[4][4]
 
     cpdef MMatrix4x4 copy(self)
 
@@ -348,6 +360,8 @@ cdef class MMatrix4x4:
     cpdef MVector3D mapVector(self, MVector3D vector)
 
     cpdef MQuaternion toQuaternion(self)
+
+    cdef set_data(self, np.ndarray m)
     
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] add_MMatrix4x4(self, MMatrix4x4 other)
 
@@ -372,6 +386,115 @@ cdef class MMatrix4x4:
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] mul_int(self, DTYPE_INT_t other)
 
 
+cdef class MTransform:
+    cdef double __qw
+    cdef double __qx
+    cdef double __qy
+    cdef double __qz
+    cdef double __tx
+    cdef double __ty
+    cdef double __tz
+
+    cpdef MTransform copy(self)
+
+    cpdef MQuaternion rotation(self)
+
+    cpdef MVector3D translation(self)
+
+    cdef set_rotation(self, MQuaternion qq)
+
+    cpdef MTransform inverted(self)
+
+    cpdef translate(self, MVector3D vec3)
+
+    cpdef rotate(self, MQuaternion qq)
+
+    cpdef MVector3D mul_MVector3D(self, MVector3D other)
+
+    cpdef MTransform mul_MTransform(self, MTransform other)
+
+    cpdef MMatrix4x4 toMatrix4x4(self)
+
+cdef MTransform new_MTransform(MQuaternion qq, MVector3D vec3)
+
+cdef void mul_transform(MTransform tf1, MTransform tf2, MTransform result)
+
+
+cdef class MVector3DArray:
+    cdef np.ndarray __data
+
+    cpdef MVector3DArray copy(self)
+
+    cpdef np.ndarray data(self)
+
+    cpdef np.ndarray x(self)
+
+    cpdef np.ndarray y(self)
+
+    cpdef np.ndarray z(self)
+
+    cpdef np.ndarray length(self)
+
+    cpdef np.ndarray lengthSquared(self)
+
+    cpdef MVector3DArray normalized(self)
+
+    cpdef normalize(self)
+
+    cpdef np.ndarray distanceToPoint(self, MVector3DArray vs)
+
+    cpdef MVector3DArray effective(self)
+
+
+cdef class MQuaternionArray:
+    cdef np.ndarray __data
+
+    cpdef MQuaternionArray copy(self)
+
+    cpdef np.ndarray data(self)
+
+    cpdef np.ndarray w(self)
+
+    cpdef np.ndarray x(self)
+
+    cpdef np.ndarray y(self)
+
+    cpdef np.ndarray z(self)
+
+    cpdef np.ndarray length(self)
+
+    cpdef np.ndarray lengthSquared(self)
+
+    cpdef MQuaternionArray inverted(self)
+
+    cpdef MQuaternionArray normalized(self)
+
+    cpdef normalize(self)
+
+    cpdef MQuaternionArray effective(self)
+
+    cpdef MMatrix4x4Array toMatrix4x4(self)
+
+    cpdef MVector3DArray toEulerAngles4MMD(self)
+
+    cpdef MVector3DArray toEulerAngles(self)
+
+    cpdef np.ndarray toDegree(self)
+
+
+cdef class MMatrix4x4Array:
+    cdef np.ndarray __data
+
+    cpdef MMatrix4x4Array copy(self)
+
+    cpdef np.ndarray data(self)
+
+    cpdef MMatrix4x4Array inverted(self)
+
+    cpdef rotate(self, qqs)
+
+    cpdef translate(self, vs)
+
 
 cpdef bint is_almost_null(v)    
 
@@ -7,13 +7,77 @@ import quaternion # noqa
 import numpy as np
 cimport numpy as np
 cimport cython
-from libc.math cimport sin, cos, acos, atan2, asin, pi, sqrt
+from libc.math cimport sin, cos, acos, atan2, asin, pi, sqrt, fabs, floor, fmod, copysign, isnan, isinf
 from math import degrees, radians
 
 from utils.MLogger import MLogger # noqa
 
 logger = MLogger(__name__)
 
+# 4x4行列の1行
+ctypedef double MatrixRow[4]
+
+# math.degrees, math.radiansと同じ係数
+cdef double RAD_TO_DEG = 180.0 / pi
+cdef double DEG_TO_RAD = pi / 180.0
+
+
+# NaN・無限大は0とする（effective用）
+cdef inline double effective_value(double v):
+    if isnan(v) or isinf(v):
+        return 0
+    return v
+
+
+cdef inline bint almost_null(double v):
+    return fabs(v) < 0.0000001
+
+
+# np.signと同じ
+cdef inline double sign_value(double v):
+    if v > 0:
+        return 1
+    elif v < 0:
+        return -1
+    return v
+
+
+# np.floor_divideと同じ（0除算はinf/nan）
+@cython.cdivision(True)
+cdef inline double floordiv_value(double a, double b):
+    cdef double mod, div, floordiv
+
+    if b == 0:
+        return a / b
+
+    mod = fmod(a, b)
+    div = (a - mod) / b
+    if mod != 0 and ((b < 0) != (mod < 0)):
+        div -= 1.0
+
+    if div != 0:
+        floordiv = floor(div)
+        if div - floordiv > 0.5:
+            floordiv += 1.0
+        return floordiv
+
+    return copysign(0, a / b)
+
+
+# np.remainderと同じ（割る数と同じ符号）
+cdef inline double mod_value(double a, double b):
+    cdef double mod = fmod(a, b)
+
+    if b == 0:
+        return mod
+
+    if mod != 0:
+        if (b < 0) != (mod < 0):
+            mod += b
+        return mod
+
+    return copysign(0, b)
+
 
 cdef class MRect:
 
@@ -294,42 +358,54 @@ cdef class MVector2D:
 cdef class MVector3D:
 
     def __init__(self, x=0.0, y=0.0, z=0.0):
-        if isinstance(x, float):
-            # 実数の場合
-            self.__data = np.array([x, y, z], dtype=np.float64)
-        elif isinstance(x, MVector3D):
+        if isinstance(x, MVector3D):
             # クラスの場合
-            self.__data = np.array([x.x(), x.y(), x.z()], dtype=np.float64)
+            self.__x = x.x()
+            self.__y = x.y()
+            self.__z = x.z()
         elif isinstance(x, np.ndarray):
             # arrayそのものの場合
-            self.__data = np.array([x[0], x[1], x[2]], dtype=np.float64)
+            self.__x = x[0]
+            self.__y = x[1]
+            self.__z = x[2]
         else:
-            self.__data = np.array([x, y, z], dtype=np.float64)
+            # 実数の場合
+            self.__x = x
+            self.__y = y
+            self.__z = z
 
     cpdef MVector3D copy(self):
-        return MVector3D(self.x(), self.y(), self.z())
+        return new_MVector3D(self.__x, self.__y, self.__z)
 
     cpdef double length(self):
-        return float(np.linalg.norm(self.data(), ord=2))
+        return sqrt(self.lengthSquared())
 
     cpdef double lengthSquared(self):
-        return float(np.linalg.norm(self.data(), ord=2)**2)
+        return self.__x * self.__x + self.__y * self.__y + self.__z * self.__z
 
+    @cython.cdivision(True)
     cpdef MVector3D normalized(self):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] l2 = np.linalg.norm(self.data(), ord=2, axis=-1, keepdims=True)
-        l2[l2 == 0] = 1
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] normv = self.data() / l2
-        return MVector3D(normv[0], normv[1], normv[2])
+        cdef double l2 = self.length()
+        if l2 == 0:
+            l2 = 1
+        return new_MVector3D(self.__x / l2, self.__y / l2, self.__z / l2)
 
+    @cython.cdivision(True)
     cpdef normalize(self):
         self.effective()
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] l2 = np.linalg.norm(self.data(), ord=2, axis=-1, keepdims=True)
-        l2[l2 == 0] = 1
-        self.__data /= l2
-    
+        cdef double l2 = self.length()
+        if l2 == 0:
+            l2 = 1
+        self.__x /= l2
+        self.__y /= l2
+        self.__z /= l2
+
     cpdef double distanceToPoint(self, MVector3D v):
-        return MVector3D(self.data() - v.data()).length()
-    
+        cdef double dx = self.__x - v.__x
+        cdef double dy = self.__y - v.__y
+        cdef double dz = self.__z - v.__z
+        return sqrt(dx * dx + dy * dy + dz * dz)
+
     cpdef MVector3D project(self, MMatrix4x4 modelView, MMatrix4x4 projection, MRect viewport):
         cdef MVector4D tmp = MVector4D(self.x(), self.y(), self.z(), 1)
         tmp = projection * modelView * tmp
@@ -359,47 +435,47 @@ cdef class MVector3D:
 
         obj /= obj.w()
         obj.effective()
-        
+
         return obj.toVector3D()
-        
+
     cpdef MVector4D toVector4D(self):
-        return MVector4D(self.__data[0], self.__data[1], self.__data[2], 0)
+        return new_MVector4D(self.__x, self.__y, self.__z, 0)
 
     cpdef bint is_almost_null(self):
-        return (is_almost_null(self.__data[0]) and is_almost_null(self.__data[1]) and is_almost_null(self.__data[2]))
-    
+        return (almost_null(self.__x) and almost_null(self.__y) and almost_null(self.__z))
+
     cpdef MVector3D effective(self):
-        self.__data[np.isnan(self.data())] = 0
-        self.__data[np.isinf(self.data())] = 0
+        self.__x = effective_value(self.__x)
+        self.__y = effective_value(self.__y)
+        self.__z = effective_value(self.__z)
 
         return self
-                
+
     cpdef MVector3D abs(self):
-        self.setX(abs(get_effective_value(self.x())))
-        self.setY(abs(get_effective_value(self.y())))
-        self.setZ(abs(get_effective_value(self.z())))
+        self.__x = fabs(effective_value(self.__x))
+        self.__y = fabs(effective_value(self.__y))
+        self.__z = fabs(effective_value(self.__z))
 
         return self
-                
+
     cpdef MVector3D one(self):
         self.effective()
-        self.setX(1 if is_almost_null(self.x()) else self.x())
-        self.setY(1 if is_almost_null(self.y()) else self.y())
-        self.setZ(1 if is_almost_null(self.z()) else self.z())
+        self.__x = 1 if almost_null(self.__x) else self.__x
+        self.__y = 1 if almost_null(self.__y) else self.__y
+        self.__z = 1 if almost_null(self.__z) else self.__z
 
         return self
-    
+
     cpdef MVector3D non_zero(self):
         self.effective()
-        self.setX(0.0000001 if is_almost_null(self.x()) else self.x())
-        self.setY(0.0000001 if is_almost_null(self.y()) else self.y())
-        self.setZ(0.0000001 if is_almost_null(self.z()) else self.z())
+        self.__x = 0.0000001 if almost_null(self.__x) else self.__x
+        self.__y = 0.0000001 if almost_null(self.__y) else self.__y
+        self.__z = 0.0000001 if almost_null(self.__z) else self.__z
 
         return self
-    
+
     cpdef bint isnan(self):
-        self.__data = self.data().astype(np.float64)
-        return np.isnan(self.data()).any()
+        return isnan(self.__x) or isnan(self.__y) or isnan(self.__z)
 
     @classmethod
     def crossProduct(cls, v1, v2):
@@ -408,169 +484,193 @@ cdef class MVector3D:
     @classmethod
     def dotProduct(cls, v1, v2):
         return dotProduct_MVector3D(v1, v2)
-        
+
+    # 値はインスタンスが直接保持しているので、呼ばれる度にarrayを生成する
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] data(self):
-        return self.__data
+        return np.array([self.__x, self.__y, self.__z], dtype=np.float64)
 
     def to_log(self):
-        return "x: {0}, y: {1} z: {2}".format(round(self.__data[0], 5), round(self.__data[1], 5), round(self.__data[2], 5))
+        return "x: {0}, y: {1} z: {2}".format(round(self.__x, 5), round(self.__y, 5), round(self.__z, 5))
 
     def __str__(self):
-        return "MVector3D({0}, {1}, {2})".format(self.__data[0], self.__data[1], self.__data[2])
+        return "MVector3D({0}, {1}, {2})".format(self.__x, self.__y, self.__z)
 
     def __lt__(self, other):
+        cdef MVector3D v
+        if isinstance(other, MVector3D):
+            v = other
+            return self.__x < v.__x and self.__y < v.__y and self.__z < v.__z
         return np.all(np.less(self.data(), other.data()))
 
     def __le__(self, other):
+        cdef MVector3D v
+        if isinstance(other, MVector3D):
+            v = other
+            return self.__x <= v.__x and self.__y <= v.__y and self.__z <= v.__z
         return np.all(np.less_equal(self.data(), other.data()))
 
     def __eq__(self, other):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] d1 = self.data()
+        cdef MVector3D v
+        if isinstance(other, MVector3D):
+            v = other
+            return self.__x == v.__x and self.__y == v.__y and self.__z == v.__z
         cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] d2 = other.data()
-        return d1[0] == d2[0] and d1[1] == d2[1] and d1[2] == d2[2]
+        return self.__x == d2[0] and self.__y == d2[1] and self.__z == d2[2]
 
     def __ne__(self, other):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] d1 = self.data()
+        cdef MVector3D v
+        if isinstance(other, MVector3D):
+            v = other
+            return self.__x != v.__x or self.__y != v.__y or self.__z != v.__z
         cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] d2 = other.data()
-        return d1[0] != d2[0] or d1[1] != d2[1] or d1[2] != d2[2]
+        return self.__x != d2[0] or self.__y != d2[1] or self.__z != d2[2]
 
     def __gt__(self, other):
+        cdef MVector3D v
+        if isinstance(other, MVector3D):
+            v = other
+            return self.__x > v.__x and self.__y > v.__y and self.__z > v.__z
         return np.all(np.greater(self.data(), other.data()))
 
     def __ge__(self, other):
+        cdef MVector3D v
+        if isinstance(other, MVector3D):
+            v = other
+            return self.__x >= v.__x and self.__y >= v.__y and self.__z >= v.__z
         return np.all(np.greater_equal(self.data(), other.data()))
 
-    def __add__(self, other):
-        if isinstance(other, np.float):
-            v = self.add_float(other)
-        elif isinstance(other, MVector3D):
-            v = self.add_MVector3D(other)
-        elif isinstance(other, np.int):
-            v = self.add_int(other)
-        else:
-            v = self.data() + other
-        v2 = self.__class__(v)
+    def __add__(MVector3D self, other):
+        cdef MVector3D v
+        cdef double d
+        if isinstance(other, MVector3D):
+            v = other
+            return new_effective_MVector3D(self.__x + v.__x, self.__y + v.__y, self.__z + v.__z)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector3D(self.__x + d, self.__y + d, self.__z + d)
+        v2 = self.__class__(self.data() + other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] add_MVector3D(self, MVector3D other):
-        return self.__data + other.__data
+        return self.data() + other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] add_float(self, DTYPE_FLOAT_t other):
-        return self.__data + other
+        return self.data() + other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] add_int(self, DTYPE_INT_t other):
-        return self.__data + other
+        return self.data() + other
 
-    def __sub__(self, other):
-        if isinstance(other, np.float):
-            v = self.sub_float(other)
-        elif isinstance(other, MVector3D):
-            v = self.sub_MVector3D(other)
-        elif isinstance(other, np.int):
-            v = self.sub_int(other)
-        else:
-            v = self.data() - other
-        v2 = self.__class__(v)
+    def __sub__(MVector3D self, other):
+        cdef MVector3D v
+        cdef double d
+        if isinstance(other, MVector3D):
+            v = other
+            return new_effective_MVector3D(self.__x - v.__x, self.__y - v.__y, self.__z - v.__z)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector3D(self.__x - d, self.__y - d, self.__z - d)
+        v2 = self.__class__(self.data() - other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] sub_MVector3D(self, MVector3D other):
-        return self.__data - other.__data
+        return self.data() - other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] sub_float(self, DTYPE_FLOAT_t other):
-        return self.__data - other
+        return self.data() - other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] sub_int(self, DTYPE_INT_t other):
-        return self.__data - other
+        return self.data() - other
 
-    def __mul__(self, other):
-        if isinstance(other, np.float):
-            v = self.mul_float(other)
-        elif isinstance(other, MVector3D):
-            v = self.mul_MVector3D(other)
-        elif isinstance(other, np.int):
-            v = self.mul_int(other)
-        else:
-            v = self.data() * other
-        v2 = self.__class__(v)
+    def __mul__(MVector3D self, other):
+        cdef MVector3D v
+        cdef double d
+        if isinstance(other, MVector3D):
+            v = other
+            return new_effective_MVector3D(self.__x * v.__x, self.__y * v.__y, self.__z * v.__z)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector3D(self.__x * d, self.__y * d, self.__z * d)
+        v2 = self.__class__(self.data() * other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mul_MVector3D(self, MVector3D other):
-        return self.__data * other.__data
+        return self.data() * other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mul_float(self, DTYPE_FLOAT_t other):
-        return self.__data * other
+        return self.data() * other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mul_int(self, DTYPE_INT_t other):
-        return self.__data * other
+        return self.data() * other
 
-    def __truediv__(self, other):
-        if isinstance(other, np.float):
-            v = self.truediv_float(other)
-        elif isinstance(other, MVector3D):
-            v = self.truediv_MVector3D(other)
-        elif isinstance(other, np.int):
-            v = self.truediv_int(other)
-        else:
-            v = self.data() / other
-        v2 = self.__class__(v)
+    @cython.cdivision(True)
+    def __truediv__(MVector3D self, other):
+        cdef MVector3D v
+        cdef double d
+        if isinstance(other, MVector3D):
+            v = other
+            return new_effective_MVector3D(self.__x / v.__x, self.__y / v.__y, self.__z / v.__z)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector3D(self.__x / d, self.__y / d, self.__z / d)
+        v2 = self.__class__(self.data() / other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] truediv_MVector3D(self, MVector3D other):
-        return self.__data / other.__data
+        return self.data() / other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] truediv_float(self, DTYPE_FLOAT_t other):
-        return self.__data / other
+        return self.data() / other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] truediv_int(self, DTYPE_INT_t other):
-        return self.__data / other
+        return self.data() / other
 
-    def __floordiv__(self, other):
-        if isinstance(other, np.float):
-            v = self.floordiv_float(other)
-        elif isinstance(other, MVector3D):
-            v = self.floordiv_MVector3D(other)
-        elif isinstance(other, np.int):
-            v = self.floordiv_int(other)
-        else:
-            v = self.data() // other
-        v2 = self.__class__(v)
+    def __floordiv__(MVector3D self, other):
+        cdef MVector3D v
+        cdef double d
+        if isinstance(other, MVector3D):
+            v = other
+            return new_effective_MVector3D(floordiv_value(self.__x, v.__x), floordiv_value(self.__y, v.__y), floordiv_value(self.__z, v.__z))
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector3D(floordiv_value(self.__x, d), floordiv_value(self.__y, d), floordiv_value(self.__z, d))
+        v2 = self.__class__(self.data() // other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] floordiv_MVector3D(self, MVector3D other):
-        return self.__data // other.__data
+        return self.data() // other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] floordiv_float(self, DTYPE_FLOAT_t other):
-        return self.__data // other
+        return self.data() // other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] floordiv_int(self, DTYPE_INT_t other):
-        return self.__data // other
+        return self.data() // other
 
-    def __mod__(self, other):
-        if isinstance(other, np.float):
-            v = self.mod_float(other)
-        elif isinstance(other, MVector3D):
-            v = self.mod_MVector3D(other)
-        elif isinstance(other, np.int):
-            v = self.mod_int(other)
-        else:
-            v = self.data() % other
-        v2 = self.__class__(v)
+    def __mod__(MVector3D self, other):
+        cdef MVector3D v
+        cdef double d
+        if isinstance(other, MVector3D):
+            v = other
+            return new_effective_MVector3D(mod_value(self.__x, v.__x), mod_value(self.__y, v.__y), mod_value(self.__z, v.__z))
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector3D(mod_value(self.__x, d), mod_value(self.__y, d), mod_value(self.__z, d))
+        v2 = self.__class__(self.data() % other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mod_MVector3D(self, MVector3D other):
-        return self.__data % other.__data
+        return self.data() % other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mod_float(self, DTYPE_FLOAT_t other):
-        return self.__data % other
+        return self.data() % other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mod_int(self, DTYPE_INT_t other):
-        return self.__data % other
+        return self.data() % other
 
     def __lshift__(self, other):
         if isinstance(other, MVector3D):
@@ -609,250 +709,277 @@ cdef class MVector3D:
         return v2
 
     def __neg__(self):
-        return self.__class__(-self.x(), -self.y(), -self.z())
+        return new_MVector3D(-self.__x, -self.__y, -self.__z)
 
     def __pos__(self):
-        return self.__class__(+self.x(), +self.y(), +self.z())
+        return new_MVector3D(+self.__x, +self.__y, +self.__z)
 
     cpdef DTYPE_FLOAT_t x(self):
-        return self.__data[0]
+        return self.__x
 
     cpdef DTYPE_FLOAT_t y(self):
-        return self.__data[1]
+        return self.__y
 
     cpdef DTYPE_FLOAT_t z(self):
-        return self.__data[2]
-    
-    cpdef setX(self, x):
-        self.__data[0] = x
+        return self.__z
 
-    cpdef setY(self, y):
-        self.__data[1] = y
+    cpdef setX(self, DTYPE_FLOAT_t x):
+        self.__x = x
+
+    cpdef setY(self, DTYPE_FLOAT_t y):
+        self.__y = y
+
+    cpdef setZ(self, DTYPE_FLOAT_t z):
+        self.__z = z
+
+
+# __init__を通さずに生成する
+cdef inline MVector3D new_MVector3D(double x, double y, double z):
+    cdef MVector3D v = MVector3D.__new__(MVector3D)
+    v.__x = x
+    v.__y = y
+    v.__z = z
+    return v
 
-    cpdef setZ(self, z):
-        self.__data[2] = z
+
+cdef inline MVector3D new_effective_MVector3D(double x, double y, double z):
+    return new_MVector3D(effective_value(x), effective_value(y), effective_value(z))
 
 
 cdef MVector3D crossProduct_MVector3D(MVector3D v1, MVector3D v2):
-    cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] crossv = np.cross(v1.data(), v2.data())
-    return MVector3D(crossv[0], crossv[1], crossv[2])
+    return new_MVector3D(v1.__y * v2.__z - v1.__z * v2.__y, v1.__z * v2.__x - v1.__x * v2.__z, v1.__x * v2.__y - v1.__y * v2.__x)
 
 
 cdef double dotProduct_MVector3D(MVector3D v1, MVector3D v2):
-    return np.dot(v1.data(), v2.data())
+    return v1.__x * v2.__x + v1.__y * v2.__y + v1.__z * v2.__z
 
 
 cdef class MVector4D:
 
     def __init__(self, x=0.0, y=0.0, z=0.0, w=0.0):
-        if isinstance(x, float):
-            self.__data = np.array([x, y, z, w], dtype=np.float64)
-        elif isinstance(x, MVector4D):
+        if isinstance(x, MVector4D):
             # クラスの場合
-            self.__data = np.array([x.x(), x.y(), x.z(), x.w()], dtype=np.float64)
+            self.__x = x.x()
+            self.__y = x.y()
+            self.__z = x.z()
+            self.__w = x.w()
         elif isinstance(x, np.ndarray):
             # 行列そのものの場合
-            self.__data = np.array([x[0], x[1], x[2], x[3]], dtype=np.float64)
+            self.__x = x[0]
+            self.__y = x[1]
+            self.__z = x[2]
+            self.__w = x[3]
         else:
-            self.__data = np.array([x, y, z, w], dtype=np.float64)
-    
+            self.__x = x
+            self.__y = y
+            self.__z = z
+            self.__w = w
+
     cpdef double length(self):
-        return np.linalg.norm(self.data(), ord=2)
+        return sqrt(self.lengthSquared())
 
     cpdef double lengthSquared(self):
-        return np.linalg.norm(self.data(), ord=2)**2
+        return self.__x * self.__x + self.__y * self.__y + self.__z * self.__z + self.__w * self.__w
 
+    @cython.cdivision(True)
     cpdef MVector4D normalized(self):
-        l2 = np.linalg.norm(self.data(), ord=2, axis=-1, keepdims=True)
-        l2[l2 == 0] = 1
-        normv = self.data() / l2
-        return MVector4D(normv[0], normv[1], normv[2], normv[3])
+        cdef double l2 = self.length()
+        if l2 == 0:
+            l2 = 1
+        return new_MVector4D(self.__x / l2, self.__y / l2, self.__z / l2, self.__w / l2)
 
+    @cython.cdivision(True)
     cpdef normalize(self):
-        l2 = np.linalg.norm(self.data(), ord=2, axis=-1, keepdims=True)
-        l2[l2 == 0] = 1
-        normv = self.data() / l2
-        self.__data = normv
+        cdef double l2 = self.length()
+        if l2 == 0:
+            l2 = 1
+        self.__x /= l2
+        self.__y /= l2
+        self.__z /= l2
+        self.__w /= l2
 
     cpdef MVector3D toVector3D(self):
-        return MVector3D(self.__data[0], self.__data[1], self.__data[2])
+        return new_MVector3D(self.__x, self.__y, self.__z)
 
     cpdef bint is_almost_null(self):
-        return (is_almost_null(self.__data[0]) and is_almost_null(self.__data[1]) and is_almost_null(self.__data[2]) and is_almost_null(self.__data[3]))
-                   
+        return (almost_null(self.__x) and almost_null(self.__y) and almost_null(self.__z) and almost_null(self.__w))
+
     cpdef effective(self):
-        self.__data[np.isnan(self.data())] = 0
-        self.__data[np.isinf(self.data())] = 0
-                                
+        self.__x = effective_value(self.__x)
+        self.__y = effective_value(self.__y)
+        self.__z = effective_value(self.__z)
+        self.__w = effective_value(self.__w)
+
     @classmethod
     def dotProduct(cls, v1, v2):
         return dotProduct_MVector4D(v1, v2)
-    
+
+    # 値はインスタンスが直接保持しているので、呼ばれる度にarrayを生成する
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] data(self):
-        return self.__data
+        return np.array([self.__x, self.__y, self.__z, self.__w], dtype=np.float64)
 
     def __str__(self):
-        return "MVector4D({0}, {1}, {2}, {3})".format(self.__data[0], self.__data[1], self.__data[2], self.__data[3])
+        return "MVector4D({0}, {1}, {2}, {3})".format(self.__x, self.__y, self.__z, self.__w)
 
     def __lt__(self, other):
-        return self.data().less(other.data())
+        return np.all(np.less(self.data(), other.data()))
 
     def __le__(self, other):
-        return self.data().less_equal(other.data())
-
-    def __eq__(self, other):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] d1 = self.data()
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] d2 = other.data()
-        return d1[0] == d2[0] and d1[1] == d2[1] and d1[2] == d2[2] and d1[3] == d2[3]
-
-    def __ne__(self, other):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] d1 = self.data()
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] d2 = other.data()
-        return d1[0] != d2[0] or d1[1] != d2[1] or d1[2] != d2[2] or d1[3] != d2[3]
+        return np.all(np.less_equal(self.data(), other.data()))
 
     def __eq__(self, other):
-        return self.data().equal(other.data())
+        cdef MVector4D v
+        if isinstance(other, MVector4D):
+            v = other
+            return self.__x == v.__x and self.__y == v.__y and self.__z == v.__z and self.__w == v.__w
+        return np.all(np.equal(self.data(), other.data()))
 
     def __ne__(self, other):
-        return self.data().not_equal(other.data())
+        cdef MVector4D v
+        if isinstance(other, MVector4D):
+            v = other
+            return self.__x != v.__x or self.__y != v.__y or self.__z != v.__z or self.__w != v.__w
+        return np.any(np.not_equal(self.data(), other.data()))
 
     def __gt__(self, other):
-        return self.data().greater(other.data())
+        return np.all(np.greater(self.data(), other.data()))
 
     def __ge__(self, other):
-        return self.data().greater_equal(other.data())
+        return np.all(np.greater_equal(self.data(), other.data()))
 
-    def __add__(self, other):
-        if isinstance(other, np.float):
-            v = self.add_float(other)
-        elif isinstance(other, MVector4D):
-            v = self.add_MVector4D(other)
-        elif isinstance(other, np.int):
-            v = self.add_int(other)
-        else:
-            v = self.data() + other
-        v2 = self.__class__(v)
+    def __add__(MVector4D self, other):
+        cdef MVector4D v
+        cdef double d
+        if isinstance(other, MVector4D):
+            v = other
+            return new_effective_MVector4D(self.__x + v.__x, self.__y + v.__y, self.__z + v.__z, self.__w + v.__w)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector4D(self.__x + d, self.__y + d, self.__z + d, self.__w + d)
+        v2 = self.__class__(self.data() + other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] add_MVector4D(self, MVector4D other):
-        return self.__data + other.__data
+        return self.data() + other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] add_float(self, DTYPE_FLOAT_t other):
-        return self.__data + other
+        return self.data() + other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] add_int(self, DTYPE_INT_t other):
-        return self.__data + other
+        return self.data() + other
 
-    def __sub__(self, other):
-        if isinstance(other, np.float):
-            v = self.sub_float(other)
-        elif isinstance(other, MVector4D):
-            v = self.sub_MVector4D(other)
-        elif isinstance(other, np.int):
-            v = self.sub_int(other)
-        else:
-            v = self.data() - other
-        v2 = self.__class__(v)
+    def __sub__(MVector4D self, other):
+        cdef MVector4D v
+        cdef double d
+        if isinstance(other, MVector4D):
+            v = other
+            return new_effective_MVector4D(self.__x - v.__x, self.__y - v.__y, self.__z - v.__z, self.__w - v.__w)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector4D(self.__x - d, self.__y - d, self.__z - d, self.__w - d)
+        v2 = self.__class__(self.data() - other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] sub_MVector4D(self, MVector4D other):
-        return self.__data - other.__data
+        return self.data() - other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] sub_float(self, DTYPE_FLOAT_t other):
-        return self.__data - other
+        return self.data() - other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] sub_int(self, DTYPE_INT_t other):
-        return self.__data - other
+        return self.data() - other
 
-    def __mul__(self, other):
-        if isinstance(other, np.float):
-            v = self.mul_float(other)
-        elif isinstance(other, MVector4D):
-            v = self.mul_MVector4D(other)
-        elif isinstance(other, np.int):
-            v = self.mul_int(other)
-        else:
-            v = self.data() * other
-        v2 = self.__class__(v)
+    def __mul__(MVector4D self, other):
+        cdef MVector4D v
+        cdef double d
+        if isinstance(other, MVector4D):
+            v = other
+            return new_effective_MVector4D(self.__x * v.__x, self.__y * v.__y, self.__z * v.__z, self.__w * v.__w)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector4D(self.__x * d, self.__y * d, self.__z * d, self.__w * d)
+        v2 = self.__class__(self.data() * other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mul_MVector4D(self, MVector4D other):
-        return self.__data * other.__data
+        return self.data() * other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mul_float(self, DTYPE_FLOAT_t other):
-        return self.__data * other
+        return self.data() * other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mul_int(self, DTYPE_INT_t other):
-        return self.__data * other
+        return self.data() * other
 
-    def __truediv__(self, other):
-        if isinstance(other, np.float):
-            v = self.truediv_float(other)
-        elif isinstance(other, MVector4D):
-            v = self.truediv_MVector4D(other)
-        elif isinstance(other, np.int):
-            v = self.truediv_int(other)
-        else:
-            v = self.data() / other
-        v2 = self.__class__(v)
+    @cython.cdivision(True)
+    def __truediv__(MVector4D self, other):
+        cdef MVector4D v
+        cdef double d
+        if isinstance(other, MVector4D):
+            v = other
+            return new_effective_MVector4D(self.__x / v.__x, self.__y / v.__y, self.__z / v.__z, self.__w / v.__w)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector4D(self.__x / d, self.__y / d, self.__z / d, self.__w / d)
+        v2 = self.__class__(self.data() / other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] truediv_MVector4D(self, MVector4D other):
-        return self.__data / other.__data
+        return self.data() / other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] truediv_float(self, DTYPE_FLOAT_t other):
-        return self.__data / other
+        return self.data() / other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] truediv_int(self, DTYPE_INT_t other):
-        return self.__data / other
+        return self.data() / other
 
-    def __floordiv__(self, other):
-        if isinstance(other, np.float):
-            v = self.floordiv_float(other)
-        elif isinstance(other, MVector4D):
-            v = self.floordiv_MVector4D(other)
-        elif isinstance(other, np.int):
-            v = self.floordiv_int(other)
-        else:
-            v = self.data() // other
-        v2 = self.__class__(v)
+    def __floordiv__(MVector4D self, other):
+        cdef MVector4D v
+        cdef double d
+        if isinstance(other, MVector4D):
+            v = other
+            return new_effective_MVector4D(floordiv_value(self.__x, v.__x), floordiv_value(self.__y, v.__y), \
+                                           floordiv_value(self.__z, v.__z), floordiv_value(self.__w, v.__w))
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector4D(floordiv_value(self.__x, d), floordiv_value(self.__y, d), floordiv_value(self.__z, d), floordiv_value(self.__w, d))
+        v2 = self.__class__(self.data() // other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] floordiv_MVector4D(self, MVector4D other):
-        return self.__data // other.__data
+        return self.data() // other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] floordiv_float(self, DTYPE_FLOAT_t other):
-        return self.__data // other
+        return self.data() // other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] floordiv_int(self, DTYPE_INT_t other):
-        return self.__data // other
+        return self.data() // other
 
-    def __mod__(self, other):
-        if isinstance(other, np.float):
-            v = self.mod_float(other)
-        elif isinstance(other, MVector4D):
-            v = self.mod_MVector4D(other)
-        elif isinstance(other, np.int):
-            v = self.mod_int(other)
-        else:
-            v = self.data() % other
-        v2 = self.__class__(v)
+    def __mod__(MVector4D self, other):
+        cdef MVector4D v
+        cdef double d
+        if isinstance(other, MVector4D):
+            v = other
+            return new_effective_MVector4D(mod_value(self.__x, v.__x), mod_value(self.__y, v.__y), mod_value(self.__z, v.__z), mod_value(self.__w, v.__w))
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_effective_MVector4D(mod_value(self.__x, d), mod_value(self.__y, d), mod_value(self.__z, d), mod_value(self.__w, d))
+        v2 = self.__class__(self.data() % other)
         v2.effective()
         return v2
-    
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mod_MVector4D(self, MVector4D other):
-        return self.__data % other.__data
+        return self.data() % other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mod_float(self, DTYPE_FLOAT_t other):
-        return self.__data % other
+        return self.data() % other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=1] mod_int(self, DTYPE_INT_t other):
-        return self.__data % other
+        return self.data() % other
 
     def __lshift__(self, other):
         if isinstance(other, MVector4D):
@@ -891,193 +1018,156 @@ cdef class MVector4D:
         return v2
 
     def __neg__(self):
-        return self.__class__(-self.x(), -self.y(), -self.z(), -self.w())
+        return new_MVector4D(-self.__x, -self.__y, -self.__z, -self.__w)
 
     def __pos__(self):
-        return self.__class__(+self.x(), +self.y(), +self.z(), +self.w())
+        return new_MVector4D(+self.__x, +self.__y, +self.__z, +self.__w)
 
     cpdef DTYPE_FLOAT_t x(self):
-        return self.__data[0]
+        return self.__x
 
     cpdef DTYPE_FLOAT_t y(self):
-        return self.__data[1]
+        return self.__y
 
     cpdef DTYPE_FLOAT_t z(self):
-        return self.__data[2]
-    
+        return self.__z
+
     cpdef DTYPE_FLOAT_t w(self):
-        return self.__data[3]
-    
-    cpdef setX(self, x):
-        self.__data[0] = x
+        return self.__w
 
-    cpdef setY(self, y):
-        self.__data[1] = y
+    cpdef setX(self, DTYPE_FLOAT_t x):
+        self.__x = x
+
+    cpdef setY(self, DTYPE_FLOAT_t y):
+        self.__y = y
+
+    cpdef setZ(self, DTYPE_FLOAT_t z):
+        self.__z = z
 
-    cpdef setZ(self, z):
-        self.__data[2] = z
+    cpdef setW(self, DTYPE_FLOAT_t w):
+        self.__w = w
 
-    cpdef setW(self, w):
-        self.__data[3] = w
+
+cdef inline MVector4D new_MVector4D(double x, double y, double z, double w):
+    cdef MVector4D v = MVector4D.__new__(MVector4D)
+    v.__x = x
+    v.__y = y
+    v.__z = z
+    v.__w = w
+    return v
+
+
+cdef inline MVector4D new_effective_MVector4D(double x, double y, double z, double w):
+    return new_MVector4D(effective_value(x), effective_value(y), effective_value(z), effective_value(w))
 
 
 cdef double dotProduct_MVector4D(MVector4D v1, MVector4D v2):
-    return np.dot(v1.data(), v2.data())
+    return v1.__x * v2.__x + v1.__y * v2.__y + v1.__z * v2.__z + v1.__w * v2.__w
 
 
 cdef class MQuaternion:
 
     def __init__(self, w=1.0, x=0.0, y=0.0, z=0.0):
-        if isinstance(w, float):
-            self.__data = np.array([w, x, y, z], dtype=np.float64)
-        elif isinstance(w, MQuaternion):
+        if isinstance(w, MQuaternion):
             # クラスの場合
-            self.__data = np.array([w.data().components.w, w.data().components.x, w.data().components.y, w.data().components.z], dtype=np.float64)
+            self.__w = w.scalar()
+            self.__x = w.x()
+            self.__y = w.y()
+            self.__z = w.z()
         elif isinstance(w, np.quaternion):
             # quaternionの場合
-            self.__data = w.components
+            self.__w = w.w
+            self.__x = w.x
+            self.__y = w.y
+            self.__z = w.z
         elif isinstance(w, np.ndarray):
             # arrayそのものの場合
-            self.__data = np.array([w[0], w[1], w[2], w[3]], dtype=np.float64)
+            self.__w = w[0]
+            self.__x = w[1]
+            self.__y = w[2]
+            self.__z = w[3]
         else:
-            self.__data = np.array([w, x, y, z], dtype=np.float64)
+            self.__w = w
+            self.__x = x
+            self.__y = y
+            self.__z = z
 
     cpdef MQuaternion copy(self):
-        return MQuaternion(self.scalar(), self.x(), self.y(), self.z())
-    
+        return new_MQuaternion(self.__w, self.__x, self.__y, self.__z)
+
     def __str__(self):
-        return "MQuaternion({0}, {1}, {2}, {3})".format(self.scalar(), self.x(), self.y(), self.z())
+        return "MQuaternion({0}, {1}, {2}, {3})".format(self.__w, self.__x, self.__y, self.__z)
 
+    @cython.cdivision(True)
     cpdef MQuaternion inverted(self):
-        v = self.data().inverse()
-        return self.__class__(v.w, v.x, v.y, v.z)
+        cdef double norm = self.lengthSquared()
+        return new_MQuaternion(self.__w / norm, -self.__x / norm, -self.__y / norm, -self.__z / norm)
 
     cpdef double length(self):
-        return self.data().abs()
+        return sqrt(self.lengthSquared())
 
     cpdef double lengthSquared(self):
-        return self.data().abs()**2
+        return self.__w * self.__w + self.__x * self.__x + self.__y * self.__y + self.__z * self.__z
 
     cpdef MQuaternion normalized(self):
-        self.effective()
-        v = self.data().normalized()
-        return MQuaternion(v.w, v.x, v.y, v.z)
+        # 自身は変更しない（NaNはそのまま）
+        cdef MQuaternion qq = self.copy()
+        qq.normalize()
+        return qq
 
+    @cython.cdivision(True)
     cpdef normalize(self):
-        self.__data = self.data().normalized().components
+        # 長さ0の場合、quaternion同様nanとなる
+        cdef double l2 = self.length()
+        self.__w /= l2
+        self.__x /= l2
+        self.__y /= l2
+        self.__z /= l2
 
     cpdef effective(self):
-        self.data().components[np.isnan(self.data().components)] = 0
-        self.data().components[np.isinf(self.data().components)] = 0
+        # 従来はnp.quaternionの複製に対する操作だったため、値は変更しない
+        pass
         # # Scalarは1がデフォルトとなる【不要】
         # self.setScalar(1 if self.scalar() == 0 else self.scalar())
 
     cpdef MMatrix4x4 toMatrix4x4(self):
-        cdef MMatrix4x4 mat = MMatrix4x4()
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=2] m = mat.data()
-
-        # q(w,x,y,z)から(x,y,z,w)に並べ替え.
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] q2 = np.array([self.data().x, self.data().y, self.data().z, self.data().w], dtype=np.float64)
-
-        m[0, 0] = q2[3] * q2[3] + q2[0] * q2[0] - q2[1] * q2[1] - q2[2] * q2[2]
-        m[0, 1] = 2.0 * q2[0] * q2[1] - 2.0 * q2[3] * q2[2]
-        m[0, 2] = 2.0 * q2[0] * q2[2] + 2.0 * q2[3] * q2[1]
-        m[0, 3] = 0.0
-
-        m[1, 0] = 2.0 * q2[0] * q2[1] + 2.0 * q2[3] * q2[2]
-        m[1, 1] = q2[3] * q2[3] - q2[0] * q2[0] + q2[1] * q2[1] - q2[2] * q2[2]
-        m[1, 2] = 2.0 * q2[1] * q2[2] - 2.0 * q2[3] * q2[0]
-        m[1, 3] = 0.0
-
-        m[2, 0] = 2.0 * q2[0] * q2[2] - 2.0 * q2[3] * q2[1]
-        m[2, 1] = 2.0 * q2[1] * q2[2] + 2.0 * q2[3] * q2[0]
-        m[2, 2] = q2[3] * q2[3] - q2[0] * q2[0] - q2[1] * q2[1] + q2[2] * q2[2]
-        m[2, 3] = 0.0
-
-        m[3, 0] = 0.0
-        m[3, 1] = 0.0
-        m[3, 2] = 0.0
-        m[3, 3] = q2[3] * q2[3] + q2[0] * q2[0] + q2[1] * q2[1] + q2[2] * q2[2]
-
-        m /= m[3, 3]
-        m[3, 3] = 1.0
-
+        cdef MMatrix4x4 mat = MMatrix4x4.__new__(MMatrix4x4)
+        calc_rotation_matrix(self.__w, self.__x, self.__y, self.__z, mat.__data)
         return mat
-    
+
     cpdef MVector4D toVector4D(self):
-        return MVector4D(self.data().x, self.data().y, self.data().z, self.data().w)
+        return new_MVector4D(self.__x, self.__y, self.__z, self.__w)
 
     cpdef MVector3D toEulerAngles4MMD(self):
         # MMDの表記に合わせたオイラー角
         cdef MVector3D euler = self.toEulerAngles()
 
-        return MVector3D(euler.x(), -euler.y(), -euler.z())
+        return new_MVector3D(euler.__x, -euler.__y, -euler.__z)
 
     # http://www.j3d.org/matrix_faq/matrfaq_latest.html#Q37
     cpdef MVector3D toEulerAngles(self):
-        cdef DTYPE_FLOAT_t xp = self.data().x
-        cdef DTYPE_FLOAT_t yp = self.data().y
-        cdef DTYPE_FLOAT_t zp = self.data().z
-        cdef DTYPE_FLOAT_t wp = self.data().w
-
-        cdef DTYPE_FLOAT_t xx = xp * xp
-        cdef DTYPE_FLOAT_t xy = xp * yp
-        cdef DTYPE_FLOAT_t xz = xp * zp
-        cdef DTYPE_FLOAT_t xw = xp * wp
-        cdef DTYPE_FLOAT_t yy = yp * yp
-        cdef DTYPE_FLOAT_t yz = yp * zp
-        cdef DTYPE_FLOAT_t yw = yp * wp
-        cdef DTYPE_FLOAT_t zz = zp * zp
-        cdef DTYPE_FLOAT_t zw = zp * wp
-        cdef DTYPE_FLOAT_t lengthSquared = xx + yy + zz + wp * wp
-
-        if not is_almost_null(lengthSquared - 1.0) and not is_almost_null(lengthSquared):
-            xx /= lengthSquared
-            xy /= lengthSquared  # same as (xp / length) * (yp / length)
-            xz /= lengthSquared
-            xw /= lengthSquared
-            yy /= lengthSquared
-            yz /= lengthSquared
-            yw /= lengthSquared
-            zz /= lengthSquared
-            zw /= lengthSquared
-
-        cdef DTYPE_FLOAT_t pitch = asin(max(-1, min(1, -2.0 * (yz - xw))))
-        cdef DTYPE_FLOAT_t yaw = 0
-        cdef DTYPE_FLOAT_t roll = 0
-        
-        if pitch < (pi / 2):
-            if pitch > -(pi / 2):
-                yaw = atan2(2.0 * (xz + yw), 1.0 - 2.0 * (xx + yy))
-                roll = atan2(2.0 * (xy + zw), 1.0 - 2.0 * (xx + zz))
-            else:
-                # not a unique solution
-                roll = 0.0
-                yaw = -atan2(-2.0 * (xy - zw), 1.0 - 2.0 * (yy + zz))
-        else:
-            # not a unique solution
-            roll = 0.0
-            yaw = atan2(-2.0 * (xy - zw), 1.0 - 2.0 * (yy + zz))
+        cdef double euler[3]
+        calc_euler_angles(self.__w, self.__x, self.__y, self.__z, euler)
+
+        return new_MVector3D(euler[0], euler[1], euler[2])
 
-        return MVector3D(degrees(pitch), degrees(yaw), degrees(roll))
-    
     # 角度に変換
     cpdef double toDegree(self):
-        return degrees(2 * acos(min(1, max(-1, self.scalar()))))
+        return 2 * acos(min(1, max(-1, self.__w))) * RAD_TO_DEG
 
     # 軸による符号付き角度に変換
     cpdef double toDegreeSign(self, MVector3D local_axis):
-        cdef double deg =  self.toDegree() * np.sign(MVector3D.dotProduct(self.vector(), local_axis)) * np.sign(self.scalar())
+        cdef double deg = self.toDegree() * sign_value(dotProduct_MVector3D(self.vector(), local_axis)) * sign_value(self.__w)
 
-        if abs(deg) > 180:
+        if fabs(deg) > 180:
             # 180度を超してる場合、フリップなので、除去
-            return (abs(deg) - 180) * np.sign(deg)
-            
+            return (fabs(deg) - 180) * sign_value(deg)
+
         return deg
 
     # 自分ともうひとつの値vとのtheta（変位量）を返す
     cpdef double calcTheata(self, MQuaternion v):
-        return (1 - MQuaternion.dotProduct(self.normalized(), v.normalized()))
+        return (1 - dotProduct_MQuaternion(self.normalized(), v.normalized()))
         # cdef double dot = MQuaternion.dotProduct(self.normalized(), v.normalized())
         # cdef double angle = acos(min(1, max(-1, dot)))
         # cdef double sinOfAngle = sin(angle)
@@ -1086,7 +1176,7 @@ cdef class MQuaternion:
     @classmethod
     def dotProduct(cls, v1, v2):
         return dotProduct_MQuaternion(v1, v2)
-    
+
     @classmethod
     def fromAxisAndAngle(cls, vec3, angle):
         return fromAxisAndAngle(vec3, angle)
@@ -1098,11 +1188,11 @@ cdef class MQuaternion:
     @classmethod
     def fromDirection(cls, direction, up):
         return fromDirection(direction, up)
-    
+
     @classmethod
     def fromAxes(cls, xAxis, yAxis, zAxis):
         return fromAxes(xAxis, yAxis, zAxis)
-        
+
     @classmethod
     def fromRotationMatrix(cls, rot3x3):
         return fromRotationMatrix(rot3x3)
@@ -1123,35 +1213,40 @@ cdef class MQuaternion:
     def slerp(cls, q1, q2, t):
         return slerp(q1, q2, t)
 
+    @classmethod
+    def slerp_range(cls, q1s, q2s, ts):
+        return slerp_range(np.asarray(q1s, dtype=np.float64), np.asarray(q2s, dtype=np.float64), np.asarray(ts, dtype=np.float64))
+
     cpdef double x(self):
-        return self.data().x
+        return self.__x
 
     cpdef double y(self):
-        return self.data().y
+        return self.__y
 
     cpdef double z(self):
-        return self.data().z
+        return self.__z
 
     cpdef double scalar(self):
-        return self.data().w
+        return self.__w
 
     cpdef MVector3D vector(self):
-        return MVector3D(self.data().x, self.data().y, self.data().z)
+        return new_MVector3D(self.__x, self.__y, self.__z)
 
-    cpdef setX(self, x):
-        self.__data[1] = x
+    cpdef setX(self, double x):
+        self.__x = x
 
-    cpdef setY(self, y):
-        self.__data[2] = y
+    cpdef setY(self, double y):
+        self.__y = y
 
-    cpdef setZ(self, z):
-        self.__data[3] = z
+    cpdef setZ(self, double z):
+        self.__z = z
 
-    cpdef setScalar(self, w):
-        self.__data[0] = w
-        
+    cpdef setScalar(self, double w):
+        self.__w = w
+
+    # 値はインスタンスが直接保持しているので、呼ばれる度にquaternionを生成する
     cpdef data(self):
-        return np.quaternion(self.__data[0], self.__data[1], self.__data[2], self.__data[3])
+        return np.quaternion(self.__w, self.__x, self.__y, self.__z)
 
     def __lt__(self, other):
         return self.data().less(other.data())
@@ -1160,9 +1255,17 @@ cdef class MQuaternion:
         return self.data().less_equal(other.data())
 
     def __eq__(self, other):
+        cdef MQuaternion v
+        if isinstance(other, MQuaternion):
+            v = other
+            return self.__w == v.__w and self.__x == v.__x and self.__y == v.__y and self.__z == v.__z
         return self.data().equal(other.data())
 
     def __ne__(self, other):
+        cdef MQuaternion v
+        if isinstance(other, MQuaternion):
+            v = other
+            return not (self.__w == v.__w and self.__x == v.__x and self.__y == v.__y and self.__z == v.__z)
         return self.data().not_equal(other.data())
 
     def __gt__(self, other):
@@ -1171,32 +1274,47 @@ cdef class MQuaternion:
     def __ge__(self, other):
         return self.data().greater_equal(other.data())
 
-    def __add__(self, other):
+    def __add__(MQuaternion self, other):
+        cdef MQuaternion v
         if isinstance(other, MQuaternion):
-            v = self.data() + other.data()
-        else:
-            v = self.data() + other
-        return self.__class__(v.w, v.x, v.y, v.z)
-
-    def __sub__(self, other):
+            v = other
+            return new_MQuaternion(self.__w + v.__w, self.__x + v.__x, self.__y + v.__y, self.__z + v.__z)
+        elif isinstance(other, (float, int)):
+            # 実数はスカラー部にのみ加算する（quaternionと同じ）
+            return new_MQuaternion(self.__w + <double>other, self.__x, self.__y, self.__z)
+        qv = self.data() + other
+        return self.__class__(qv.w, qv.x, qv.y, qv.z)
+
+    def __sub__(MQuaternion self, other):
+        cdef MQuaternion v
         if isinstance(other, MQuaternion):
-            v = self.data() - other.data()
-        else:
-            v = self.data() - other
-        return self.__class__(v.w, v.x, v.y, v.z)
-
-    def __mul__(self, other):
+            v = other
+            return new_MQuaternion(self.__w - v.__w, self.__x - v.__x, self.__y - v.__y, self.__z - v.__z)
+        elif isinstance(other, (float, int)):
+            return new_MQuaternion(self.__w - <double>other, self.__x, self.__y, self.__z)
+        qv = self.data() - other
+        return self.__class__(qv.w, qv.x, qv.y, qv.z)
+
+    def __mul__(MQuaternion self, other):
+        cdef MQuaternion v
+        cdef double d
         if isinstance(other, MQuaternion):
-            v = self.data() * other.data()
-            return self.__class__(v)
+            v = other
+            return mul_MQuaternion(self, v)
         elif isinstance(other, MVector3D):
-            v = self.toMatrix4x4() * other
-            return v
-        else:
-            v = self.data() * other
-            return self.__class__(v.w, v.x, v.y, v.z)
-
-    def __truediv__(self, other):
+            return self.toMatrix4x4().mul_MVector3D(other)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_MQuaternion(self.__w * d, self.__x * d, self.__y * d, self.__z * d)
+        qv = self.data() * other
+        return self.__class__(qv.w, qv.x, qv.y, qv.z)
+
+    @cython.cdivision(True)
+    def __truediv__(MQuaternion self, other):
+        cdef double d
+        if isinstance(other, (float, int)):
+            d = other
+            return new_MQuaternion(self.__w / d, self.__x / d, self.__y / d, self.__z / d)
         if isinstance(other, MQuaternion):
             v = self.data() / other.data()
         else:
@@ -1242,56 +1360,170 @@ cdef class MQuaternion:
     def __or__(self, other):
         v = self.data() | other.data()
         return self.__class__(v.w, v.x, v.y, v.z)
-    
+
     def __neg__(self):
-        return self.__class__(-self.data().w, -self.data().x, -self.data().y, -self.data().z)
+        return new_MQuaternion(-self.__w, -self.__x, -self.__y, -self.__z)
 
     def __pos__(self):
-        return self.__class__(+self.data().w, +self.data().x, +self.data().y, +self.data().z)
+        return new_MQuaternion(+self.__w, +self.__x, +self.__y, +self.__z)
 
     def __invert__(self):
-        return self.__class__(~self.data().w, ~self.data().x, ~self.data().y, ~self.data().z)
+        v = self.data()
+        return self.__class__(~v.w, ~v.x, ~v.y, ~v.z)
+
+
+cdef inline MQuaternion new_MQuaternion(double w, double x, double y, double z):
+    cdef MQuaternion qq = MQuaternion.__new__(MQuaternion)
+    qq.__w = w
+    qq.__x = x
+    qq.__y = y
+    qq.__z = z
+    return qq
+
+
+# ハミルトン積（quaternionと同じ計算順）
+cdef inline MQuaternion mul_MQuaternion(MQuaternion q1, MQuaternion q2):
+    return new_MQuaternion(q1.__w * q2.__w - q1.__x * q2.__x - q1.__y * q2.__y - q1.__z * q2.__z,
+                           q1.__w * q2.__x + q1.__x * q2.__w + q1.__y * q2.__z - q1.__z * q2.__y,
+                           q1.__w * q2.__y - q1.__x * q2.__z + q1.__y * q2.__w + q1.__z * q2.__x,
+                           q1.__w * q2.__z + q1.__x * q2.__y - q1.__y * q2.__x + q1.__z * q2.__w)
+
+
+# q(w,x,y,z)から回転行列を生成する
+@cython.cdivision(True)
+cdef inline void calc_rotation_matrix(double w, double x, double y, double z, double m[4][4]):
+    m[0][0] = w * w + x * x - y * y - z * z
+    m[0][1] = 2.0 * x * y - 2.0 * w * z
+    m[0][2] = 2.0 * x * z + 2.0 * w * y
+    m[0][3] = 0.0
+
+    m[1][0] = 2.0 * x * y + 2.0 * w * z
+    m[1][1] = w * w - x * x + y * y - z * z
+    m[1][2] = 2.0 * y * z - 2.0 * w * x
+    m[1][3] = 0.0
+
+    m[2][0] = 2.0 * x * z - 2.0 * w * y
+    m[2][1] = 2.0 * y * z + 2.0 * w * x
+    m[2][2] = w * w - x * x - y * y + z * z
+    m[2][3] = 0.0
+
+    m[3][0] = 0.0
+    m[3][1] = 0.0
+    m[3][2] = 0.0
+    m[3][3] = w * w + x * x + y * y + z * z
+
+    cdef double norm = m[3][3]
+    cdef int i, j
+    for i in range(4):
+        for j in range(4):
+            m[i][j] /= norm
+    m[3][3] = 1.0
+
+
+# q(w,x,y,z)からオイラー角(度)を求める
+# http://www.j3d.org/matrix_faq/matrfaq_latest.html#Q37
+@cython.cdivision(True)
+cdef inline void calc_euler_angles(double wp, double xp, double yp, double zp, double euler[3]):
+    cdef double xx = xp * xp
+    cdef double xy = xp * yp
+    cdef double xz = xp * zp
+    cdef double xw = xp * wp
+    cdef double yy = yp * yp
+    cdef double yz = yp * zp
+    cdef double yw = yp * wp
+    cdef double zz = zp * zp
+    cdef double zw = zp * wp
+    cdef double lengthSquared = xx + yy + zz + wp * wp
+
+    if not almost_null(lengthSquared - 1.0) and not almost_null(lengthSquared):
+        xx /= lengthSquared
+        xy /= lengthSquared  # same as (xp / length) * (yp / length)
+        xz /= lengthSquared
+        xw /= lengthSquared
+        yy /= lengthSquared
+        yz /= lengthSquared
+        yw /= lengthSquared
+        zz /= lengthSquared
+        zw /= lengthSquared
+
+    cdef double pitch = asin(max(-1, min(1, -2.0 * (yz - xw))))
+    cdef double yaw = 0
+    cdef double roll = 0
+
+    if pitch < (pi / 2):
+        if pitch > -(pi / 2):
+            yaw = atan2(2.0 * (xz + yw), 1.0 - 2.0 * (xx + yy))
+            roll = atan2(2.0 * (xy + zw), 1.0 - 2.0 * (xx + zz))
+        else:
+            # not a unique solution
+            roll = 0.0
+            yaw = -atan2(-2.0 * (xy - zw), 1.0 - 2.0 * (yy + zz))
+    else:
+        # not a unique solution
+        roll = 0.0
+        yaw = atan2(-2.0 * (xy - zw), 1.0 - 2.0 * (yy + zz))
+
+    euler[0] = pitch * RAD_TO_DEG
+    euler[1] = yaw * RAD_TO_DEG
+    euler[2] = roll * RAD_TO_DEG
 
 
 cdef double dotProduct_MQuaternion(MQuaternion v1, MQuaternion v2):
-    return np.sum(v1.data().components * v2.data().components)
+    return v1.__w * v2.__w + v1.__x * v2.__x + v1.__y * v2.__y + v1.__z * v2.__z
 
 cdef MQuaternion fromAxisAndAngle(MVector3D vec3, double angle):
-    cdef DTYPE_FLOAT_t x = vec3.x()
-    cdef DTYPE_FLOAT_t y = vec3.y()
-    cdef DTYPE_FLOAT_t z = vec3.z()
-    cdef DTYPE_FLOAT_t length = sqrt(x * x + y * y + z * z)
+    cdef double q[4]
+    calc_axis_angle_quaternion(vec3.__x, vec3.__y, vec3.__z, angle, q)
+
+    return new_MQuaternion(q[0], q[1], q[2], q[3])
+
+# 軸と角度(度)から正規化済みのq(w,x,y,z)を求める
+@cython.cdivision(True)
+cdef inline void calc_axis_angle_quaternion(double x, double y, double z, double angle, double q[4]):
+    cdef double length = sqrt(x * x + y * y + z * z)
 
-    if not is_almost_null(length - 1.0) and not is_almost_null(length):
+    if not almost_null(length - 1.0) and not almost_null(length):
         x /= length
         y /= length
         z /= length
 
-    cdef DTYPE_FLOAT_t a = radians(angle / 2.0)
-    cdef DTYPE_FLOAT_t s = sin(a)
-    cdef DTYPE_FLOAT_t c = cos(a)
-    return MQuaternion(c, x * s, y * s, z * s).normalized()
+    cdef double a = (angle / 2.0) * DEG_TO_RAD
+    cdef double s = sin(a)
+    cdef double c = cos(a)
 
+    q[0] = c
+    q[1] = x * s
+    q[2] = y * s
+    q[3] = z * s
+
+    # 長さ0の場合、quaternion同様nanとなる
+    cdef double l2 = sqrt(q[0] * q[0] + q[1] * q[1] + q[2] * q[2] + q[3] * q[3])
+    q[0] /= l2
+    q[1] /= l2
+    q[2] /= l2
+    q[3] /= l2
+
+@cython.cdivision(True)
 cdef MQuaternion fromAxisAndQuaternion(MVector3D vec3, MQuaternion qq):
     qq.normalize()
 
-    cdef DTYPE_FLOAT_t x = vec3.x()
-    cdef DTYPE_FLOAT_t y = vec3.y()
-    cdef DTYPE_FLOAT_t z = vec3.z()
+    cdef DTYPE_FLOAT_t x = vec3.__x
+    cdef DTYPE_FLOAT_t y = vec3.__y
+    cdef DTYPE_FLOAT_t z = vec3.__z
     cdef DTYPE_FLOAT_t length = sqrt(x * x + y * y + z * z)
 
-    if not is_almost_null(length - 1.0) and not is_almost_null(length):
+    if not almost_null(length - 1.0) and not almost_null(length):
         x /= length
         y /= length
         z /= length
 
-    cdef DTYPE_FLOAT_t a = acos(min(1, max(-1, qq.scalar())))
+    cdef DTYPE_FLOAT_t a = acos(min(1, max(-1, qq.__w)))
     cdef DTYPE_FLOAT_t s = sin(a)
     cdef DTYPE_FLOAT_t c = cos(a)
 
     # logger.test("scalar: %s, a: %s, c: %s, degree: %s", qq.scalar(), a, c, degrees(2 * math.acos(min(1, max(-1, qq.scalar())))))
 
-    return MQuaternion(c, x * s, y * s, z * s).normalized()
+    return new_MQuaternion(c, x * s, y * s, z * s).normalized()
 
 cdef MQuaternion fromDirection(MVector3D direction, MVector3D up):
     if direction.is_almost_null():
@@ -1299,77 +1531,113 @@ cdef MQuaternion fromDirection(MVector3D direction, MVector3D up):
 
     cdef MVector3D zAxis = direction.normalized()
     cdef MVector3D xAxis = crossProduct_MVector3D(up, zAxis)
-    if (is_almost_null(xAxis.lengthSquared())):
+    if (almost_null(xAxis.lengthSquared())):
         # collinear or invalid up vector derive shortest arc to new direction
         return rotationTo(MVector3D(0.0, 0.0, 1.0), zAxis)
-    
+
     xAxis.normalize()
     cdef MVector3D yAxis = crossProduct_MVector3D(zAxis, xAxis)
-    return MQuaternion.fromAxes(xAxis, yAxis, zAxis)
+    return fromAxes(xAxis, yAxis, zAxis)
 
 cdef MQuaternion fromAxes(MVector3D xAxis, MVector3D yAxis, MVector3D zAxis):
-    return fromRotationMatrix(np.array([[xAxis.x(), yAxis.x(), zAxis.x()], [xAxis.y(), yAxis.y(), zAxis.y()], [xAxis.z(), yAxis.z(), zAxis.z()]], dtype=np.float64))
+    cdef double rot3x3[3][3]
+    rot3x3[0][0] = xAxis.__x
+    rot3x3[0][1] = yAxis.__x
+    rot3x3[0][2] = zAxis.__x
+    rot3x3[1][0] = xAxis.__y
+    rot3x3[1][1] = yAxis.__y
+    rot3x3[1][2] = zAxis.__y
+    rot3x3[2][0] = xAxis.__z
+    rot3x3[2][1] = yAxis.__z
+    rot3x3[2][2] = zAxis.__z
+
+    return fromRotation3x3(rot3x3)
 
 cdef MQuaternion fromRotationMatrix(np.ndarray[DTYPE_FLOAT_t, ndim=2] rot3x3):
+    cdef double rot[3][3]
+    cdef int i, j
+
+    for i in range(3):
+        for j in range(3):
+            rot[i][j] = rot3x3[i, j]
+
+    return fromRotation3x3(rot)
+
+@cython.cdivision(True)
+cdef MQuaternion fromRotation3x3(double rot3x3[3][3]):
     cdef DTYPE_FLOAT_t scalar = 0
-    cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] axis = np.zeros(3)
+    cdef double axis[3]
+    cdef int s_next[3]
 
-    cdef DTYPE_FLOAT_t trace = rot3x3[0,0] + rot3x3[1,1] + rot3x3[2,2]
+    cdef DTYPE_FLOAT_t trace = rot3x3[0][0] + rot3x3[1][1] + rot3x3[2][2]
     cdef DTYPE_FLOAT_t s = 0
-    cdef np.ndarray[DTYPE_INT8_t, ndim=1] s_next
     cdef int i = 0
     cdef int j = 0
     cdef int k = 0
 
+    axis[0] = 0
+    axis[1] = 0
+    axis[2] = 0
+
     if trace > 0.00000001:
         s = 2.0 * sqrt(trace + 1.0)
         scalar = 0.25 * s
-        axis[0] = (rot3x3[2,1] - rot3x3[1,2]) / s
-        axis[1] = (rot3x3[0,2] - rot3x3[2,0]) / s
-        axis[2] = (rot3x3[1,0] - rot3x3[0,1]) / s
+        axis[0] = (rot3x3[2][1] - rot3x3[1][2]) / s
+        axis[1] = (rot3x3[0][2] - rot3x3[2][0]) / s
+        axis[2] = (rot3x3[1][0] - rot3x3[0][1]) / s
     else:
-        s_next = np.array([1, 2, 0], dtype=np.int8)
+        s_next[0] = 1
+        s_next[1] = 2
+        s_next[2] = 0
         i = 0
-        if rot3x3[1,1] > rot3x3[0,0]:
+        if rot3x3[1][1] > rot3x3[0][0]:
             i = 1
-        if rot3x3[2,2] > rot3x3[i,i]:
+        if rot3x3[2][2] > rot3x3[i][i]:
             i = 2
 
         j = s_next[i]
         k = s_next[j]
 
-        s = 2.0 * sqrt(rot3x3[i,i] - rot3x3[j,j] - rot3x3[k,k] + 1.0)
+        s = 2.0 * sqrt(rot3x3[i][i] - rot3x3[j][j] - rot3x3[k][k] + 1.0)
         axis[i] = 0.25 * s
 
-        scalar = (rot3x3[k,j] - rot3x3[j,k]) / s
-        axis[j] = (rot3x3[j,i] + rot3x3[i,j]) / s
-        axis[k] = (rot3x3[k,i] + rot3x3[i,k]) / s
+        scalar = (rot3x3[k][j] - rot3x3[j][k]) / s
+        axis[j] = (rot3x3[j][i] + rot3x3[i][j]) / s
+        axis[k] = (rot3x3[k][i] + rot3x3[i][k]) / s
 
-    return MQuaternion(scalar, axis[0], axis[1], axis[2])
+    return new_MQuaternion(scalar, axis[0], axis[1], axis[2])
 
+@cython.cdivision(True)
 cdef MQuaternion rotationTo(MVector3D fromv, MVector3D tov):
     cdef MVector3D v0 = fromv.normalized()
     cdef MVector3D v1 = tov.normalized()
-    cdef double d = MVector3D.dotProduct(v0, v1) + 1.0
+    cdef double d = dotProduct_MVector3D(v0, v1) + 1.0
     cdef MVector3D axis
 
     # if dest vector is close to the inverse of source vector, ANY axis of rotation is valid
-    if is_almost_null(d):
-        axis = crossProduct_MVector3D(MVector3D(1.0, 0.0, 0.0), v0)
-        if is_almost_null(axis.lengthSquared()):
-            axis = crossProduct_MVector3D(MVector3D(0.0, 1.0, 0.0), v0)
+    if almost_null(d):
+        axis = crossProduct_MVector3D(new_MVector3D(1.0, 0.0, 0.0), v0)
+        if almost_null(axis.lengthSquared()):
+            axis = crossProduct_MVector3D(new_MVector3D(0.0, 1.0, 0.0), v0)
         axis.normalize()
         # same as MQuaternion.fromAxisAndAngle(axis, 180.0)
-        return MQuaternion(0.0, axis.x(), axis.y(), axis.z()).normalized()
+        return new_MQuaternion(0.0, axis.__x, axis.__y, axis.__z).normalized()
 
     d = sqrt(2.0 * d)
-    axis = crossProduct_MVector3D(v0, v1) / d
-    return MQuaternion(d * 0.5, axis.x(), axis.y(), axis.z()).normalized()
+    axis = crossProduct_MVector3D(v0, v1)
+    return new_MQuaternion(d * 0.5, effective_value(axis.__x / d), effective_value(axis.__y / d), effective_value(axis.__z / d)).normalized()
 
 cdef MQuaternion fromEulerAngles(double pitch, double yaw, double roll):
-    pitch = radians(pitch)
-    yaw = radians(yaw)
-    roll = radians(roll)
+    cdef double q[4]
+    calc_euler_quaternion(pitch, yaw, roll, q)
+
+    return new_MQuaternion(q[0], q[1], q[2], q[3])
+
+# オイラー角(度)からq(w,x,y,z)を求める
+cdef inline void calc_euler_quaternion(double pitch, double yaw, double roll, double q[4]):
+    pitch = pitch * DEG_TO_RAD
+    yaw = yaw * DEG_TO_RAD
+    roll = roll * DEG_TO_RAD
 
     pitch *= 0.5
     yaw *= 0.5
@@ -1383,12 +1651,11 @@ cdef MQuaternion fromEulerAngles(double pitch, double yaw, double roll):
     cdef double s3 = sin(pitch)
     cdef double c1c2 = c1 * c2
     cdef double s1s2 = s1 * s2
-    cdef double w = c1c2 * c3 + s1s2 * s3
-    cdef double x = c1c2 * s3 + s1s2 * c3
-    cdef double y = s1 * c2 * c3 - c1 * s2 * s3
-    cdef double z = c1 * s2 * c3 - s1 * c2 * s3
 
-    return MQuaternion(w, x, y, z)
+    q[0] = c1c2 * c3 + s1s2 * s3
+    q[1] = c1c2 * s3 + s1s2 * c3
+    q[2] = s1 * c2 * c3 - c1 * s2 * s3
+    q[3] = c1 * s2 * c3 - s1 * c2 * s3
 
 cdef MQuaternion nlerp(MQuaternion q1, MQuaternion q2, double t):
     # Handle the easy cases first.
@@ -1396,17 +1663,19 @@ cdef MQuaternion nlerp(MQuaternion q1, MQuaternion q2, double t):
         return q1
     elif t >= 1.0:
         return q2
-        
+
     # Determine the angle between the two quaternions.
-    cdef MQuaternion q2b = MQuaternion(q2.scalar(), q2.x(), q2.y(), q2.z())
-    
+    cdef double sign = 1.0
+
     cdef double dot = dotProduct_MQuaternion(q1, q2)
     if dot < 0.0:
-        q2b = -q2b
-    
+        sign = -1.0
+
     # Perform the linear interpolation.
-    return (q1 * (1.0 - t) + q2b * t).normalized()
+    return new_MQuaternion(q1.__w * (1.0 - t) + (sign * q2.__w) * t, q1.__x * (1.0 - t) + (sign * q2.__x) * t, \
+                           q1.__y * (1.0 - t) + (sign * q2.__y) * t, q1.__z * (1.0 - t) + (sign * q2.__z) * t).normalized()
 
+@cython.cdivision(True)
 cdef MQuaternion slerp(MQuaternion q1, MQuaternion q2, double t):
     # Handle the easy cases first.
     if t <= 0.0:
@@ -1415,11 +1684,11 @@ cdef MQuaternion slerp(MQuaternion q1, MQuaternion q2, double t):
         return q2
 
     # Determine the angle between the two quaternions.
-    cdef MQuaternion q2b = MQuaternion(q2.scalar(), q2.x(), q2.y(), q2.z())
+    cdef double sign = 1.0
     cdef double dot = dotProduct_MQuaternion(q1, q2)
-    
+
     if dot < 0.0:
-        q2b = -q2b
+        sign = -1.0
         dot = -dot
 
     # Get the scale factors.  If they are too small,
@@ -1437,33 +1706,105 @@ cdef MQuaternion slerp(MQuaternion q1, MQuaternion q2, double t):
             factor2 = sin(t * angle) / sinOfAngle
 
     # Construct the result quaternion.
-    return q1 * factor1 + q2b * factor2
+    return new_MQuaternion(q1.__w * factor1 + (sign * q2.__w) * factor2, q1.__x * factor1 + (sign * q2.__x) * factor2, \
+                           q1.__y * factor1 + (sign * q2.__y) * factor2, q1.__z * factor1 + (sign * q2.__z) * factor2)
+
+
+# slerpの一括計算（q1s, q2s: N×4(w, x, y, z)、ts: N）
+# 1件ずつのslerpと同じ計算順で求める
+cdef np.ndarray slerp_range(np.ndarray q1s, np.ndarray q2s, np.ndarray ts):
+    cdef Py_ssize_t n = np.PyArray_DIM(ts, 0)
+    cdef np.ndarray results = np.zeros((n, 4), dtype=np.float64)
+    cdef double[:, :] q1v = q1s
+    cdef double[:, :] q2v = q2s
+    cdef double[:] tv = ts
+    cdef double[:, :] rv = results
+    cdef double q1[4]
+    cdef double q2[4]
+    cdef double result[4]
+    cdef Py_ssize_t i, k
+
+    for i in range(n):
+        for k in range(4):
+            q1[k] = q1v[i, k]
+            q2[k] = q2v[i, k]
+
+        calc_slerp(q1, q2, tv[i], result)
+
+        for k in range(4):
+            rv[i, k] = result[k]
+
+    return results
+
+
+# slerpの本体（q1, q2, result: w, x, y, z）
+# GILなしで呼べるように、配列のまま計算する（計算順はslerpと同じ）
+cdef void calc_slerp(double* q1, double* q2, double t, double* result) nogil:
+    cdef double dot, sign, factor1, factor2, angle, sinOfAngle, limited
+    cdef int k
+
+    if t <= 0.0:
+        for k in range(4):
+            result[k] = q1[k]
+        return
+    elif t >= 1.0:
+        for k in range(4):
+            result[k] = q2[k]
+        return
+
+    dot = q1[0] * q2[0] + q1[1] * q2[1] + q1[2] * q2[2] + q1[3] * q2[3]
+    sign = 1.0
+
+    if dot < 0.0:
+        sign = -1.0
+        dot = -dot
+
+    factor1 = 1.0 - t
+    factor2 = t
+
+    if (1.0 - dot) > 0.0000001:
+        limited = dot if dot < 1 else 1
+        limited = limited if limited > 0 else 0
+        angle = acos(limited)
+        sinOfAngle = sin(angle)
+        if sinOfAngle > 0.0000001:
+            factor1 = sin((1.0 - t) * angle) / sinOfAngle
+            factor2 = sin(t * angle) / sinOfAngle
+
+    for k in range(4):
+        result[k] = q1[k] * factor1 + (sign * q2[k]) * factor2
 
 
 cdef class MMatrix4x4:
-    
+
     def __init__(self, m11=1.0, m12=0.0, m13=0.0, m14=0.0, m21=0.0, m22=1.0, m23=0.0, m24=0.0, m31=0.0, m32=0.0, m33=1.0, m34=0.0, m41=0.0, m42=0.0, m43=0.0, m44=1.0):
-        if isinstance(m11, float):
-            self.__data = np.array([[m11, m12, m13, m14], [m21, m22, m23, m24], [m31, m32, m33, m34], [m41, m42, m43, m44]], dtype=np.float64)
-        elif isinstance(m11, MMatrix4x4):
+        cdef MMatrix4x4 other
+        cdef int i, j
+
+        if isinstance(m11, MMatrix4x4):
             # 行列クラスの場合
-            self.__data = np.array([[m11.__data[0, 0], m11.__data[0, 1], m11.__data[0, 2], m11.__data[0, 3]], \
-                                    [m11.__data[1, 0], m11.__data[1, 1], m11.__data[1, 2], m11.__data[1, 3]], \
-                                    [m11.__data[2, 0], m11.__data[2, 1], m11.__data[2, 2], m11.__data[2, 3]], \
-                                    [m11.__data[3, 0], m11.__data[3, 1], m11.__data[3, 2], m11.__data[3, 3]]], dtype=np.float64)
+            other = m11
+            self.__data = other.__data
         elif isinstance(m11, np.ndarray):
             # 行列そのものの場合
-            self.__data = np.array([[m11[0, 0], m11[0, 1], m11[0, 2], m11[0, 3]], [m11[1, 0], m11[1, 1], m11[1, 2], m11[1, 3]], \
-                                    [m11[2, 0], m11[2, 1], m11[2, 2], m11[2, 3]], [m11[3, 0], m11[3, 1], m11[3, 2], m11[3, 3]]], dtype=np.float64)
+            for i in range(4):
+                for j in range(4):
+                    self.__data[i][j] = m11[i, j]
         else:
             # べた値の場合
-            self.__data = np.array([[m11, m12, m13, m14], [m21, m22, m23, m24], [m31, m32, m33, m34], [m41, m42, m43, m44]], dtype=np.float64)
+            self.__data[0][:] = [m11, m12, m13, m14]
+            self.__data[1][:] = [m21, m22, m23, m24]
+            self.__data[2][:] = [m31, m32, m33, m34]
+            self.__data[3][:] = [m41, m42, m43, m44]
 
     cpdef MMatrix4x4 copy(self):
-        return MMatrix4x4(self.data())
-    
+        cdef MMatrix4x4 mat = MMatrix4x4.__new__(MMatrix4x4)
+        mat.__data = self.__data
+        return mat
+
+    # 値はインスタンスが直接保持しているので、呼ばれる度にarrayを生成する
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] data(self):
-        return self.__data
+        return np.array(self.__data, dtype=np.float64)
 
     # 逆行列
     cpdef MMatrix4x4 inverted(self):
@@ -1471,115 +1812,111 @@ cdef class MMatrix4x4:
 
     # 回転行列
     cpdef rotate(self, qq):
-        self.__data = self.data().dot(qq.toMatrix4x4().data())
+        cdef MQuaternion q
+        cdef double rot[4][4]
+
+        if isinstance(qq, MQuaternion):
+            q = qq
+            calc_rotation_matrix(q.__w, q.__x, q.__y, q.__z, rot)
+            mul_matrix(self.__data, rot, self.__data)
+        else:
+            self.set_data(self.data().dot(qq.toMatrix4x4().data()))
 
     # 平行移動行列
     cpdef translate(self, MVector3D vec3):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=2] vec_mat = np.array([[vec3.x(), vec3.y(), vec3.z()], 
-                                                                   [vec3.x(), vec3.y(), vec3.z()], 
-                                                                   [vec3.x(), vec3.y(), vec3.z()], 
-                                                                   [vec3.x(), vec3.y(), vec3.z()]], dtype=np.float64)
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=2] data_mat = self.__data[:, :3] * vec_mat
-        self.__data[:, 3] += np.sum(data_mat, axis=1)
+        cdef int i
+        for i in range(4):
+            self.__data[i][3] += self.__data[i][0] * vec3.__x + self.__data[i][1] * vec3.__y + self.__data[i][2] * vec3.__z
 
     # 縮尺行列
     cpdef scale(self, MVector3D vec3):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=2] vec_mat = np.array([[vec3.x(), vec3.y(), vec3.z()], 
-                                                                   [vec3.x(), vec3.y(), vec3.z()], 
-                                                                   [vec3.x(), vec3.y(), vec3.z()], 
-                                                                   [vec3.x(), vec3.y(), vec3.z()]], dtype=np.float64)
-        self.__data[:, :3] *= vec_mat
-        
+        cdef int i
+        for i in range(4):
+            self.__data[i][0] *= vec3.__x
+            self.__data[i][1] *= vec3.__y
+            self.__data[i][2] *= vec3.__z
+
     # 単位行列
     cpdef setToIdentity(self):
-        self.__data = np.eye(4, dtype=np.float64)
-    
+        cdef int i, j
+        for i in range(4):
+            for j in range(4):
+                self.__data[i][j] = 1.0 if i == j else 0.0
+
     cpdef lookAt(self, MVector3D eye, MVector3D center, MVector3D up):
         cdef MVector3D forward = center - eye
         if forward.is_almost_null():
             # ほぼ0の場合終了
             return
-        
+
         forward.normalize()
         cdef MVector3D side = crossProduct_MVector3D(forward, up).normalized()
         cdef MVector3D upVector = crossProduct_MVector3D(side, forward)
 
-        cdef MMatrix4x4 m = MMatrix4x4()
-        m.__data[0, :-1] = side.data()
-        m.__data[1, :-1] = upVector.data()
-        m.__data[2, :-1] = -forward.data()
-        m.__data[-1, -1] = 1.0
+        cdef double m[4][4]
+        m[0][:] = [side.__x, side.__y, side.__z, 0.0]
+        m[1][:] = [upVector.__x, upVector.__y, upVector.__z, 0.0]
+        m[2][:] = [-forward.__x, -forward.__y, -forward.__z, 0.0]
+        m[3][:] = [0.0, 0.0, 0.0, 1.0]
 
-        self *= m
+        mul_matrix(self.__data, m, self.__data)
         self.translate(-eye)
-    
+
+    @cython.cdivision(True)
     cpdef perspective(self, double verticalAngle, double aspectRatio, double nearPlane, double farPlane):
         if nearPlane == farPlane or aspectRatio == 0:
             return
 
-        cdef double rad = radians(verticalAngle / 2)
+        cdef double rad = (verticalAngle / 2) * DEG_TO_RAD
         cdef double sine = sin(rad)
 
         if sine == 0:
             return
-        
+
         cdef double cotan = cos(rad) / sine
         cdef double clip = farPlane - nearPlane
 
-        cdef MMatrix4x4 m = MMatrix4x4()
-        m.__data[0, 0] = cotan / aspectRatio
-        m.__data[1, 1] = cotan
-        m.__data[2, 2] = -(nearPlane + farPlane) / clip
-        m.__data[2, 3] = -(2 * nearPlane * farPlane) / clip
-        m.__data[3, 2] = -1
+        cdef double m[4][4]
+        m[0][:] = [cotan / aspectRatio, 0.0, 0.0, 0.0]
+        m[1][:] = [0.0, cotan, 0.0, 0.0]
+        m[2][:] = [0.0, 0.0, -(nearPlane + farPlane) / clip, -(2 * nearPlane * farPlane) / clip]
+        m[3][:] = [0.0, 0.0, -1.0, 1.0]
+
+        mul_matrix(self.__data, m, self.__data)
 
-        self *= m
-    
     cpdef MVector3D mapVector(self, MVector3D vector):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] vec_mat = np.array([vector.x(), vector.y(), vector.z()])
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] xyz = np.sum(vec_mat * self.__data[:3, :3], axis=1)
+        return new_MVector3D(self.__data[0][0] * vector.__x + self.__data[0][1] * vector.__y + self.__data[0][2] * vector.__z,
+                             self.__data[1][0] * vector.__x + self.__data[1][1] * vector.__y + self.__data[1][2] * vector.__z,
+                             self.__data[2][0] * vector.__x + self.__data[2][1] * vector.__y + self.__data[2][2] * vector.__z)
 
-        return MVector3D(xyz[0], xyz[1], xyz[2])
-    
+    @cython.cdivision(True)
     cpdef MQuaternion toQuaternion(self):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=2] a = np.array([[self.__data[0, 0], self.__data[0, 1], self.__data[0, 2], self.__data[0, 3]],
-                                                             [self.__data[1, 0], self.__data[1, 1], self.__data[1, 2], self.__data[1, 3]],
-                                                             [self.__data[2, 0], self.__data[2, 1], self.__data[2, 2], self.__data[2, 3]],
-                                                             [self.__data[3, 0], self.__data[3, 1], self.__data[3, 2], self.__data[3, 3]]], dtype=np.float64)
-        
-        cdef MQuaternion q = MQuaternion()
+        cdef MatrixRow* a = self.__data
         cdef DTYPE_FLOAT_t trace, s
 
         # I removed + 1
-        trace = a[0,0] + a[1,1] + a[2,2]
+        trace = a[0][0] + a[1][1] + a[2][2]
         # I changed M_EPSILON to 0
         if trace > 0:
             s = 0.5 / sqrt(trace + 1)
-            q.setScalar(0.25 / s)
-            q.setX((a[2,1] - a[1,2]) * s)
-            q.setY((a[0,2] - a[2,0]) * s)
-            q.setZ((a[1,0] - a[0,1]) * s)
+            return new_MQuaternion(0.25 / s, (a[2][1] - a[1][2]) * s, (a[0][2] - a[2][0]) * s, (a[1][0] - a[0][1]) * s)
         else:
-            if a[0,0] > a[1,1] and a[0,0] > a[2,2]:
-                s = 2 * sqrt(1 + a[0,0] - a[1,1] - a[2,2])
-                q.setScalar((a[2,1] - a[1,2]) / s)
-                q.setX(0.25 * s)
-                q.setY((a[0,1] + a[1,0]) / s)
-                q.setZ((a[0,2] + a[2,0]) / s)
-            elif a[1,1] > a[2,2]:
-                s = 2 * sqrt(1 + a[1,1] - a[0,0] - a[2,2])
-                q.setScalar((a[0,2] - a[2,0]) / s)
-                q.setX((a[0,1] + a[1,0]) / s)
-                q.setY(0.25 * s)
-                q.setZ((a[1,2] + a[2,1]) / s)
+            if a[0][0] > a[1][1] and a[0][0] > a[2][2]:
+                s = 2 * sqrt(1 + a[0][0] - a[1][1] - a[2][2])
+                return new_MQuaternion((a[2][1] - a[1][2]) / s, 0.25 * s, (a[0][1] + a[1][0]) / s, (a[0][2] + a[2][0]) / s)
+            elif a[1][1] > a[2][2]:
+                s = 2 * sqrt(1 + a[1][1] - a[0][0] - a[2][2])
+                return new_MQuaternion((a[0][2] - a[2][0]) / s, (a[0][1] + a[1][0]) / s, 0.25 * s, (a[1][2] + a[2][1]) / s)
             else:
-                s = 2 * sqrt(1 + a[2,2] - a[0,0] - a[1,1])
-                q.setScalar((a[1,0] - a[0,1]) / s)
-                q.setX((a[0,2] + a[2,0]) / s)
-                q.setY((a[1,2] + a[2,1]) / s)
-                q.setZ(0.25 * s)
+                s = 2 * sqrt(1 + a[2][2] - a[0][0] - a[1][1])
+                return new_MQuaternion((a[1][0] - a[0][1]) / s, (a[0][2] + a[2][0]) / s, (a[1][2] + a[2][1]) / s, 0.25 * s)
 
-        return q
+    # ndarrayの値で上書きする
+    cdef set_data(self, np.ndarray m):
+        cdef int i, j
+        for i in range(4):
+            for j in range(4):
+                self.__data[i][j] = m[i, j]
 
     def __str__(self):
         return "MMatrix4x4({0})".format(self.data())
@@ -1602,136 +1939,911 @@ cdef class MMatrix4x4:
     def __ge__(self, other):
         return np.all(np.greater_equal(self.data(), other.data()))
 
-    def __add__(self, other):
-        if isinstance(other, np.float):
-            v = self.add_float(other)
-        elif isinstance(other, MMatrix4x4):
-            v = self.add_MMatrix4x4(other)
-        elif isinstance(other, np.int):
-            v = self.add_int(other)
-        else:
-            v = self.data() + other
-        v2 = self.__class__(v)
-        return v2
-    
+    def __add__(MMatrix4x4 self, other):
+        cdef MMatrix4x4 mat, m2
+        cdef double d
+        cdef int i, j
+
+        if isinstance(other, MMatrix4x4):
+            m2 = other
+            mat = MMatrix4x4.__new__(MMatrix4x4)
+            for i in range(4):
+                for j in range(4):
+                    mat.__data[i][j] = self.__data[i][j] + m2.__data[i][j]
+            return mat
+        elif isinstance(other, (float, int)):
+            d = other
+            mat = MMatrix4x4.__new__(MMatrix4x4)
+            for i in range(4):
+                for j in range(4):
+                    mat.__data[i][j] = self.__data[i][j] + d
+            return mat
+        return self.__class__(self.data() + other)
+
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] add_MMatrix4x4(self, MMatrix4x4 other):
-        return self.__data + other.__data
+        return self.data() + other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] add_float(self, DTYPE_FLOAT_t other):
-        return self.__data + other
+        return self.data() + other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] add_int(self, DTYPE_INT_t other):
-        return self.__data + other
+        return self.data() + other
+
+    def __sub__(MMatrix4x4 self, other):
+        cdef MMatrix4x4 mat, m2
+        cdef double d
+        cdef int i, j
+
+        if isinstance(other, MMatrix4x4):
+            m2 = other
+            mat = MMatrix4x4.__new__(MMatrix4x4)
+            for i in range(4):
+                for j in range(4):
+                    mat.__data[i][j] = self.__data[i][j] - m2.__data[i][j]
+            return mat
+        elif isinstance(other, (float, int)):
+            d = other
+            mat = MMatrix4x4.__new__(MMatrix4x4)
+            for i in range(4):
+                for j in range(4):
+                    mat.__data[i][j] = self.__data[i][j] - d
+            return mat
+        return self.__class__(self.data() - other)
 
-    def __sub__(self, other):
-        if isinstance(other, np.float):
-            v = self.sub_float(other)
-        elif isinstance(other, MMatrix4x4):
-            v = self.sub_MMatrix4x4(other)
-        elif isinstance(other, np.int):
-            v = self.sub_int(other)
-        else:
-            v = self.data() - other
-        v2 = self.__class__(v)
-        return v2
-    
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] sub_MMatrix4x4(self, MMatrix4x4 other):
-        return self.__data - other.__data
+        return self.data() - other.data()
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] sub_float(self, DTYPE_FLOAT_t other):
-        return self.__data - other
+        return self.data() - other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] sub_int(self, DTYPE_INT_t other):
-        return self.__data - other
-
-    def __mul__(self, other):
-        if isinstance(other, np.float):
-            v = self.mul_float(other)
-        elif isinstance(other, MMatrix4x4):
-            v = self.mul_MMatrix4x4(other)
+        return self.data() - other
+
+    def __mul__(MMatrix4x4 self, other):
+        cdef MMatrix4x4 mat, m2
+        cdef double d
+        cdef int i, j
+
+        if isinstance(other, MMatrix4x4):
+            m2 = other
+            mat = MMatrix4x4.__new__(MMatrix4x4)
+            mul_matrix(self.__data, m2.__data, mat.__data)
+            return mat
         elif isinstance(other, MVector3D):
             return self.mul_MVector3D(other)
         elif isinstance(other, MVector4D):
             return self.mul_MVector4D(other)
-        elif isinstance(other, np.int):
-            v = self.mul_int(other)
-        else:
-            v = self.data() * other
-        v2 = self.__class__(v)
-        return v2
-    
+        elif isinstance(other, (float, int)):
+            d = other
+            mat = MMatrix4x4.__new__(MMatrix4x4)
+            for i in range(4):
+                for j in range(4):
+                    mat.__data[i][j] = self.__data[i][j] * d
+            return mat
+        return self.__class__(self.data() * other)
+
+    @cython.cdivision(True)
     cpdef MVector3D mul_MVector3D(self, MVector3D other):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=2] vec_mat = np.array([[other.x(), other.y(), other.z()], 
-                                                                   [other.x(), other.y(), other.z()], 
-                                                                   [other.x(), other.y(), other.z()], 
-                                                                   [other.x(), other.y(), other.z()]], dtype=np.float64)
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] data_sum = np.sum(vec_mat * self.__data[:, :3], axis=1) + self.__data[:, 3]
-
-        cdef DTYPE_FLOAT_t x = data_sum[0]
-        cdef DTYPE_FLOAT_t y = data_sum[1]
-        cdef DTYPE_FLOAT_t z = data_sum[2]
-        cdef DTYPE_FLOAT_t w = data_sum[3]
+        cdef MatrixRow* m = self.__data
+        cdef DTYPE_FLOAT_t x = m[0][0] * other.__x + m[0][1] * other.__y + m[0][2] * other.__z + m[0][3]
+        cdef DTYPE_FLOAT_t y = m[1][0] * other.__x + m[1][1] * other.__y + m[1][2] * other.__z + m[1][3]
+        cdef DTYPE_FLOAT_t z = m[2][0] * other.__x + m[2][1] * other.__y + m[2][2] * other.__z + m[2][3]
+        cdef DTYPE_FLOAT_t w = m[3][0] * other.__x + m[3][1] * other.__y + m[3][2] * other.__z + m[3][3]
 
         if w == 1.0:
-            return MVector3D(x, y, z)
+            return new_MVector3D(x, y, z)
         elif w == 0.0:
-            return MVector3D()
+            return new_MVector3D(0, 0, 0)
         else:
-            return MVector3D(x / w, y / w, z / w)
+            return new_MVector3D(x / w, y / w, z / w)
 
     cpdef MVector4D mul_MVector4D(self, MVector4D other):
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=2] vec_mat = np.array([[other.x(), other.y(), other.z(), other.w()], 
-                                                                   [other.x(), other.y(), other.z(), other.w()], 
-                                                                   [other.x(), other.y(), other.z(), other.w()], 
-                                                                   [other.x(), other.y(), other.z(), other.w()]], dtype=np.float64)
-        cdef np.ndarray[DTYPE_FLOAT_t, ndim=1] data_sum = np.sum(vec_mat * self.__data, axis=1)
+        cdef MatrixRow* m = self.__data
 
-        cdef DTYPE_FLOAT_t x = data_sum[0]
-        cdef DTYPE_FLOAT_t y = data_sum[1]
-        cdef DTYPE_FLOAT_t z = data_sum[2]
-        cdef DTYPE_FLOAT_t w = data_sum[3]
-
-        return MVector4D(x, y, z, w)
+        return new_MVector4D(m[0][0] * other.__x + m[0][1] * other.__y + m[0][2] * other.__z + m[0][3] * other.__w,
+                             m[1][0] * other.__x + m[1][1] * other.__y + m[1][2] * other.__z + m[1][3] * other.__w,
+                             m[2][0] * other.__x + m[2][1] * other.__y + m[2][2] * other.__z + m[2][3] * other.__w,
+                             m[3][0] * other.__x + m[3][1] * other.__y + m[3][2] * other.__z + m[3][3] * other.__w)
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] mul_MMatrix4x4(self, MMatrix4x4 other):
         return np.dot(self.data(), other.data())
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] mul_float(self, DTYPE_FLOAT_t other):
-        return self.__data * other
+        return self.data() * other
 
     cpdef np.ndarray[DTYPE_FLOAT_t, ndim=2] mul_int(self, DTYPE_INT_t other):
-        return self.__data * other
+        return self.data() * other
 
     def __iadd__(self, other):
-        self.__data = self.data() + other.data().T
+        self.set_data(self.data() + other.data().T)
         return self
 
     def __isub__(self, other):
-        self.__data = self.data() + other.data().T
+        self.set_data(self.data() + other.data().T)
         return self
 
     def __imul__(self, other):
-        self.__data = np.dot(self.data(), other.data())
+        cdef MMatrix4x4 m2
+        if isinstance(other, MMatrix4x4):
+            m2 = other
+            mul_matrix(self.__data, m2.__data, self.__data)
+        else:
+            self.set_data(np.dot(self.data(), other.data()))
 
         return self
 
     def __itruediv__(self, other):
-        self.__data = self.data() / other.data().T
+        self.set_data(self.data() / other.data().T)
+        return self
+
+
+# 行列の積（resultはm1, m2と同じでもよい）
+cdef inline void mul_matrix(double m1[4][4], double m2[4][4], double result[4][4]):
+    cdef double tmp[4][4]
+    cdef int i, j
+
+    for i in range(4):
+        for j in range(4):
+            tmp[i][j] = m1[i][0] * m2[0][j] + m1[i][1] * m2[1][j] + m1[i][2] * m2[2][j] + m1[i][3] * m2[3][j]
+
+    for i in range(4):
+        for j in range(4):
+            result[i][j] = tmp[i][j]
+
+# 剛体変換（回転 + 平行移動）
+# 移動してから回転する行列（MMatrix4x4 の translate → rotate）と同じ変換を、行列を作らずに求める
+cdef class MTransform:
+
+    def __init__(self, rotation=None, translation=None):
+        cdef MTransform other
+        cdef MMatrix4x4 mat
+        cdef MQuaternion qq
+        cdef MVector3D vec3
+
+        if isinstance(rotation, MTransform):
+            # 剛体変換クラスの場合
+            other = rotation
+            self.__qw = other.__qw
+            self.__qx = other.__qx
+            self.__qy = other.__qy
+            self.__qz = other.__qz
+            self.__tx = other.__tx
+            self.__ty = other.__ty
+            self.__tz = other.__tz
+        elif isinstance(rotation, MMatrix4x4):
+            # 行列の場合（回転と平行移動のみの行列であること）
+            mat = rotation
+            self.set_rotation(mat.toQuaternion())
+            self.__tx = mat.__data[0][3]
+            self.__ty = mat.__data[1][3]
+            self.__tz = mat.__data[2][3]
+        else:
+            qq = rotation if rotation is not None else MQuaternion()
+            vec3 = translation if translation is not None else MVector3D()
+            self.set_rotation(qq)
+            self.__tx = vec3.__x
+            self.__ty = vec3.__y
+            self.__tz = vec3.__z
+
+    cpdef MTransform copy(self):
+        return MTransform(self)
+
+    cpdef MQuaternion rotation(self):
+        return new_MQuaternion(self.__qw, self.__qx, self.__qy, self.__qz)
+
+    cpdef MVector3D translation(self):
+        return new_MVector3D(self.__tx, self.__ty, self.__tz)
+
+    # 回転は正規化して保持する（MMatrix4x4.rotate も大きさで割って正規化している）
+    @cython.cdivision(True)
+    cdef set_rotation(self, MQuaternion qq):
+        cdef double l2 = sqrt(qq.__w * qq.__w + qq.__x * qq.__x + qq.__y * qq.__y + qq.__z * qq.__z)
+        self.__qw = qq.__w / l2
+        self.__qx = qq.__x / l2
+        self.__qy = qq.__y / l2
+        self.__qz = qq.__z / l2
+
+    # 逆変換（回転は共役、移動は逆回転して反転）
+    cpdef MTransform inverted(self):
+        cdef MTransform tf = MTransform.__new__(MTransform)
+        cdef double v[3]
+
+        tf.__qw = self.__qw
+        tf.__qx = -self.__qx
+        tf.__qy = -self.__qy
+        tf.__qz = -self.__qz
+
+        rotate_position(tf.__qw, tf.__qx, tf.__qy, tf.__qz, self.__tx, self.__ty, self.__tz, v)
+        tf.__tx = -v[0]
+        tf.__ty = -v[1]
+        tf.__tz = -v[2]
+
+        return tf
+
+    # 平行移動（MMatrix4x4.translate と同じく、右から掛ける）
+    cpdef translate(self, MVector3D vec3):
+        cdef double v[3]
+        rotate_position(self.__qw, self.__qx, self.__qy, self.__qz, vec3.__x, vec3.__y, vec3.__z, v)
+        self.__tx += v[0]
+        self.__ty += v[1]
+        self.__tz += v[2]
+
+    # 回転（MMatrix4x4.rotate と同じく、右から掛ける）
+    cpdef rotate(self, MQuaternion qq):
+        cdef MTransform tf = MTransform.__new__(MTransform)
+        tf.set_rotation(qq)
+        mul_transform(self, tf, self)
+
+    cpdef MVector3D mul_MVector3D(self, MVector3D other):
+        cdef double v[3]
+        rotate_position(self.__qw, self.__qx, self.__qy, self.__qz, other.__x, other.__y, other.__z, v)
+        return new_MVector3D(v[0] + self.__tx, v[1] + self.__ty, v[2] + self.__tz)
+
+    cpdef MTransform mul_MTransform(self, MTransform other):
+        cdef MTransform tf = MTransform.__new__(MTransform)
+        mul_transform(self, other, tf)
+        return tf
+
+    cpdef MMatrix4x4 toMatrix4x4(self):
+        cdef MMatrix4x4 mat = MMatrix4x4.__new__(MMatrix4x4)
+        calc_rotation_matrix(self.__qw, self.__qx, self.__qy, self.__qz, mat.__data)
+        mat.__data[0][3] = self.__tx
+        mat.__data[1][3] = self.__ty
+        mat.__data[2][3] = self.__tz
+        return mat
+
+    def __str__(self):
+        return "MTransform(rotation: {0}, translation: {1})".format(self.rotation(), self.translation())
+
+    def __mul__(MTransform self, other):
+        if isinstance(other, MTransform):
+            return self.mul_MTransform(other)
+        elif isinstance(other, MVector3D):
+            return self.mul_MVector3D(other)
+        return self.toMatrix4x4() * other
+
+
+cdef MTransform new_MTransform(MQuaternion qq, MVector3D vec3):
+    cdef MTransform tf = MTransform.__new__(MTransform)
+    tf.set_rotation(qq)
+    tf.__tx = vec3.__x
+    tf.__ty = vec3.__y
+    tf.__tz = vec3.__z
+    return tf
+
+
+# 剛体変換の積（resultはtf1, tf2と同じでもよい）
+# 回転の誤差が積み重ならないよう、積の回転は正規化し直す
+@cython.cdivision(True)
+cdef void mul_transform(MTransform tf1, MTransform tf2, MTransform result):
+    cdef double v[3]
+    cdef double qw = tf1.__qw * tf2.__qw - tf1.__qx * tf2.__qx - tf1.__qy * tf2.__qy - tf1.__qz * tf2.__qz
+    cdef double qx = tf1.__qw * tf2.__qx + tf1.__qx * tf2.__qw + tf1.__qy * tf2.__qz - tf1.__qz * tf2.__qy
+    cdef double qy = tf1.__qw * tf2.__qy - tf1.__qx * tf2.__qz + tf1.__qy * tf2.__qw + tf1.__qz * tf2.__qx
+    cdef double qz = tf1.__qw * tf2.__qz + tf1.__qx * tf2.__qy - tf1.__qy * tf2.__qx + tf1.__qz * tf2.__qw
+    cdef double l2 = sqrt(qw * qw + qx * qx + qy * qy + qz * qz)
+
+    rotate_position(tf1.__qw, tf1.__qx, tf1.__qy, tf1.__qz, tf2.__tx, tf2.__ty, tf2.__tz, v)
+
+    result.__tx = tf1.__tx + v[0]
+    result.__ty = tf1.__ty + v[1]
+    result.__tz = tf1.__tz + v[2]
+    result.__qw = qw / l2
+    result.__qx = qx / l2
+    result.__qy = qy / l2
+    result.__qz = qz / l2
+
+
+# 単位クォータニオンで位置を回転させる（v + 2w(u×v) + 2u×(u×v)）
+cdef inline void rotate_position(double qw, double qx, double qy, double qz, double x, double y, double z, double result[3]):
+    cdef double tx = 2.0 * (qy * z - qz * y)
+    cdef double ty = 2.0 * (qz * x - qx * z)
+    cdef double tz = 2.0 * (qx * y - qy * x)
+
+    result[0] = x + qw * tx + (qy * tz - qz * ty)
+    result[1] = y + qw * ty + (qz * tx - qx * tz)
+    result[2] = z + qw * tz + (qx * ty - qy * tx)
+
+
+
+# 配列の添字を正の値に変換する（boundscheck無効のため自前で範囲を確認する）
+cdef inline Py_ssize_t array_index(Py_ssize_t idx, Py_ssize_t size) except -1:
+    if idx < 0:
+        idx += size
+    if idx < 0 or idx >= size:
+        raise IndexError("index out of range: {0} (size: {1})".format(idx, size))
+    return idx
+
+
+# NaN・無限大を0にする（配列全体）
+cdef inline void effective_array(double* values, Py_ssize_t size):
+    cdef Py_ssize_t i
+    for i in range(size):
+        values[i] = effective_value(values[i])
+
+
+# MVector3Dの配列（N×3の連続したndarrayで保持する）
+cdef class MVector3DArray:
+
+    def __init__(self, values=None, size=0):
+        cdef MVector3D v
+        cdef Py_ssize_t i
+
+        if isinstance(values, MVector3DArray):
+            # 配列クラスの場合
+            self.__data = (<MVector3DArray>values).__data.copy()
+        elif isinstance(values, np.ndarray):
+            # 配列そのものの場合
+            self.__data = np.array(values, dtype=np.float64, order='C').reshape(-1, 3)
+        elif isinstance(values, MVector3D):
+            # 同じ値をsize件並べる
+            v = values
+            self.__data = np.empty((size, 3), dtype=np.float64)
+            self.__data[:, 0] = v.__x
+            self.__data[:, 1] = v.__y
+            self.__data[:, 2] = v.__z
+        elif values is not None:
+            # MVector3Dのリストの場合
+            self.__data = np.empty((len(values), 3), dtype=np.float64)
+            for i, v in enumerate(values):
+                self.__data[i, 0] = v.__x
+                self.__data[i, 1] = v.__y
+                self.__data[i, 2] = v.__z
+        else:
+            self.__data = np.zeros((size, 3), dtype=np.float64)
+
+    cpdef MVector3DArray copy(self):
+        return new_MVector3DArray(self.__data.copy())
+
+    # 配列そのものを返す（コピーではない）
+    cpdef np.ndarray data(self):
+        return self.__data
+
+    cpdef np.ndarray x(self):
+        return self.__data[:, 0]
+
+    cpdef np.ndarray y(self):
+        return self.__data[:, 1]
+
+    cpdef np.ndarray z(self):
+        return self.__data[:, 2]
+
+    cpdef np.ndarray length(self):
+        return np.sqrt(self.lengthSquared())
+
+    cpdef np.ndarray lengthSquared(self):
+        cdef np.ndarray d = self.__data
+        return d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] + d[:, 2] * d[:, 2]
+
+    cpdef MVector3DArray normalized(self):
+        cdef MVector3DArray vs = self.copy()
+        normalize_vector3d_array(vs.__data)
+        return vs
+
+    cpdef normalize(self):
+        self.effective()
+        normalize_vector3d_array(self.__data)
+
+    cpdef np.ndarray distanceToPoint(self, MVector3DArray vs):
+        return (self - vs).length()
+
+    cpdef MVector3DArray effective(self):
+        cdef double[:, ::1] dv = self.__data
+        if dv.shape[0] > 0:
+            effective_array(&dv[0, 0], dv.shape[0] * 3)
         return self
 
+    @classmethod
+    def crossProduct(cls, v1, v2):
+        return new_MVector3DArray(np.ascontiguousarray(np.cross(as_vector3d_values(v1), as_vector3d_values(v2))))
+
+    @classmethod
+    def dotProduct(cls, v1, v2):
+        return np.sum(as_vector3d_values(v1) * as_vector3d_values(v2), axis=1)
+
+    def __len__(self):
+        return np.PyArray_DIM(self.__data, 0)
+
+    def __getitem__(self, idx):
+        cdef Py_ssize_t i
+
+        if isinstance(idx, slice):
+            return new_MVector3DArray(self.__data[idx].copy())
+
+        i = array_index(idx, np.PyArray_DIM(self.__data, 0))
+        return new_MVector3D(self.__data[i, 0], self.__data[i, 1], self.__data[i, 2])
+
+    def __setitem__(self, idx, MVector3D v):
+        cdef Py_ssize_t i = array_index(idx, np.PyArray_DIM(self.__data, 0))
+        self.__data[i, 0] = v.__x
+        self.__data[i, 1] = v.__y
+        self.__data[i, 2] = v.__z
+
+    def __str__(self):
+        return "MVector3DArray({0})".format(np.PyArray_DIM(self.__data, 0))
+
+    def __add__(MVector3DArray self, other):
+        return new_MVector3DArray(self.__data + as_vector3d_values(other)).effective()
+
+    def __sub__(MVector3DArray self, other):
+        return new_MVector3DArray(self.__data - as_vector3d_values(other)).effective()
+
+    def __mul__(MVector3DArray self, other):
+        return new_MVector3DArray(self.__data * as_vector3d_values(other)).effective()
+
+    def __truediv__(MVector3DArray self, other):
+        return new_MVector3DArray(self.__data / as_vector3d_values(other)).effective()
+
+    def __neg__(self):
+        return new_MVector3DArray(-self.__data)
+
+
+cdef inline MVector3DArray new_MVector3DArray(np.ndarray data):
+    cdef MVector3DArray vs = MVector3DArray.__new__(MVector3DArray)
+    vs.__data = data
+    return vs
+
+
+# 演算相手を配列またはスカラーにする（MVector3Dは全件に同じ値を使う）
+cdef object as_vector3d_values(other):
+    cdef MVector3D v
+
+    if isinstance(other, MVector3DArray):
+        return (<MVector3DArray>other).__data
+    elif isinstance(other, MVector3D):
+        v = other
+        return np.array([v.__x, v.__y, v.__z], dtype=np.float64)
+    elif isinstance(other, np.ndarray) and other.ndim == 1 and other.shape[0] != 3:
+        # 件数分の係数
+        return other[:, np.newaxis]
+    return other
+
+
+
+# 演算相手をN×3の連続した配列にする
+cdef np.ndarray broadcast_vector3d_values(other, Py_ssize_t n):
+    cdef np.ndarray values = np.asarray(as_vector3d_values(other), dtype=np.float64)
+
+    if np.PyArray_NDIM(values) == 2 and np.PyArray_DIM(values, 0) == n and np.PyArray_DIM(values, 1) == 3 and np.PyArray_IS_C_CONTIGUOUS(values):
+        return values
+    return np.array(np.broadcast_to(values, (n, 3)), dtype=np.float64, order='C')
+
+# MVector3D.normalized と同じく長さ0はそのまま
+@cython.cdivision(True)
+cdef void normalize_vector3d_array(double[:, ::1] dv):
+    cdef Py_ssize_t i
+    cdef double l2
+
+    for i in range(dv.shape[0]):
+        l2 = sqrt(dv[i, 0] * dv[i, 0] + dv[i, 1] * dv[i, 1] + dv[i, 2] * dv[i, 2])
+        if l2 == 0:
+            l2 = 1
+        dv[i, 0] /= l2
+        dv[i, 1] /= l2
+        dv[i, 2] /= l2
+
+
+# MQuaternionの配列（N×4(w, x, y, z)の連続したndarrayで保持する）
+cdef class MQuaternionArray:
+
+    def __init__(self, values=None, size=0):
+        cdef MQuaternion q
+        cdef Py_ssize_t i
+
+        if isinstance(values, MQuaternionArray):
+            # 配列クラスの場合
+            self.__data = (<MQuaternionArray>values).__data.copy()
+        elif isinstance(values, np.ndarray):
+            # 配列そのものの場合
+            self.__data = np.array(values, dtype=np.float64, order='C').reshape(-1, 4)
+        elif isinstance(values, MQuaternion):
+            # 同じ値をsize件並べる
+            q = values
+            self.__data = np.empty((size, 4), dtype=np.float64)
+            self.__data[:, 0] = q.__w
+            self.__data[:, 1] = q.__x
+            self.__data[:, 2] = q.__y
+            self.__data[:, 3] = q.__z
+        elif values is not None:
+            # MQuaternionのリストの場合
+            self.__data = np.empty((len(values), 4), dtype=np.float64)
+            for i, q in enumerate(values):
+                self.__data[i, 0] = q.__w
+                self.__data[i, 1] = q.__x
+                self.__data[i, 2] = q.__y
+                self.__data[i, 3] = q.__z
+        else:
+            # 単位クォータニオン
+            self.__data = np.zeros((size, 4), dtype=np.float64)
+            self.__data[:, 0] = 1.0
+
+    cpdef MQuaternionArray copy(self):
+        return new_MQuaternionArray(self.__data.copy())
+
+    # 配列そのものを返す（コピーではない）
+    cpdef np.ndarray data(self):
+        return self.__data
+
+    cpdef np.ndarray w(self):
+        return self.__data[:, 0]
+
+    cpdef np.ndarray x(self):
+        return self.__data[:, 1]
+
+    cpdef np.ndarray y(self):
+        return self.__data[:, 2]
+
+    cpdef np.ndarray z(self):
+        return self.__data[:, 3]
+
+    cpdef np.ndarray length(self):
+        return np.sqrt(self.lengthSquared())
+
+    cpdef np.ndarray lengthSquared(self):
+        cdef np.ndarray d = self.__data
+        return d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] + d[:, 2] * d[:, 2] + d[:, 3] * d[:, 3]
+
+    cpdef MQuaternionArray inverted(self):
+        cdef np.ndarray norms = self.lengthSquared()[:, np.newaxis]
+        cdef np.ndarray results = self.__data / norms
+        results[:, 1:] = -self.__data[:, 1:] / norms
+        return new_MQuaternionArray(results)
+
+    cpdef MQuaternionArray normalized(self):
+        # MQuaternion.normalized と同じく自身は変更しない
+        cdef MQuaternionArray qs = self.copy()
+        qs.normalize()
+        return qs
+
+    @cython.cdivision(True)
+    cpdef normalize(self):
+        # 長さ0の場合、quaternion同様nanとなる
+        cdef double[:, ::1] qv = self.__data
+        cdef Py_ssize_t i
+        cdef double l2
+
+        for i in range(qv.shape[0]):
+            l2 = sqrt(qv[i, 0] * qv[i, 0] + qv[i, 1] * qv[i, 1] + qv[i, 2] * qv[i, 2] + qv[i, 3] * qv[i, 3])
+            qv[i, 0] /= l2
+            qv[i, 1] /= l2
+            qv[i, 2] /= l2
+            qv[i, 3] /= l2
+
+    cpdef MQuaternionArray effective(self):
+        cdef double[:, ::1] qv = self.__data
+        if qv.shape[0] > 0:
+            effective_array(&qv[0, 0], qv.shape[0] * 4)
+        return self
+
+    cpdef MMatrix4x4Array toMatrix4x4(self):
+        cdef double[:, ::1] qv = self.__data
+        cdef MMatrix4x4Array mats = new_MMatrix4x4Array(np.empty((qv.shape[0], 4, 4), dtype=np.float64))
+        cdef double[:, :, ::1] mv = mats.__data
+        cdef Py_ssize_t i
+
+        for i in range(qv.shape[0]):
+            calc_rotation_matrix(qv[i, 0], qv[i, 1], qv[i, 2], qv[i, 3], <MatrixRow*>&mv[i, 0, 0])
+
+        return mats
+
+    cpdef MVector3DArray toEulerAngles4MMD(self):
+        # MMDの表記に合わせたオイラー角
+        cdef MVector3DArray eulers = self.toEulerAngles()
+        eulers.__data[:, 1:] *= -1
+        return eulers
+
+    cpdef MVector3DArray toEulerAngles(self):
+        cdef double[:, ::1] qv = self.__data
+        cdef MVector3DArray eulers = new_MVector3DArray(np.empty((qv.shape[0], 3), dtype=np.float64))
+        cdef double[:, ::1] ev = eulers.__data
+        cdef Py_ssize_t i
+
+        for i in range(qv.shape[0]):
+            calc_euler_angles(qv[i, 0], qv[i, 1], qv[i, 2], qv[i, 3], &ev[i, 0])
+
+        return eulers
+
+    # 角度に変換
+    cpdef np.ndarray toDegree(self):
+        return 2 * np.arccos(np.clip(self.__data[:, 0], -1, 1)) * RAD_TO_DEG
+
+    @classmethod
+    def dotProduct(cls, MQuaternionArray q1s, MQuaternionArray q2s):
+        return np.sum(q1s.__data * q2s.__data, axis=1)
+
+    # オイラー角(度)の配列から求める
+    @classmethod
+    def fromEulerAngles(cls, pitchs, yaws, rolls):
+        cdef double[:] pv = np.asarray(pitchs, dtype=np.float64)
+        cdef double[:] yv = np.asarray(yaws, dtype=np.float64)
+        cdef double[:] rv = np.asarray(rolls, dtype=np.float64)
+        cdef MQuaternionArray qs = new_MQuaternionArray(np.empty((pv.shape[0], 4), dtype=np.float64))
+        cdef double[:, ::1] qv = qs.__data
+        cdef Py_ssize_t i
+
+        for i in range(pv.shape[0]):
+            calc_euler_quaternion(pv[i], yv[i], rv[i], &qv[i, 0])
+
+        return qs
+
+    # 軸（MVector3DArray、もしくは全件共通のMVector3D）と角度(度)の配列から求める
+    @classmethod
+    def fromAxisAndAngle(cls, axes, angles):
+        cdef double[:] av = np.asarray(angles, dtype=np.float64)
+        cdef double[:, ::1] xv = broadcast_vector3d_values(axes, av.shape[0])
+        cdef MQuaternionArray qs = new_MQuaternionArray(np.empty((av.shape[0], 4), dtype=np.float64))
+        cdef double[:, ::1] qv = qs.__data
+        cdef Py_ssize_t i
+
+        for i in range(av.shape[0]):
+            calc_axis_angle_quaternion(xv[i, 0], xv[i, 1], xv[i, 2], av[i], &qv[i, 0])
+
+        return qs
+
+    @classmethod
+    def slerp(cls, MQuaternionArray q1s, MQuaternionArray q2s, ts):
+        if isinstance(ts, (float, int)):
+            ts = np.full(np.PyArray_DIM(q1s.__data, 0), ts, dtype=np.float64)
+        return new_MQuaternionArray(slerp_range(q1s.__data, q2s.__data, np.asarray(ts, dtype=np.float64)))
+
+    def __len__(self):
+        return np.PyArray_DIM(self.__data, 0)
+
+    def __getitem__(self, idx):
+        cdef Py_ssize_t i
+
+        if isinstance(idx, slice):
+            return new_MQuaternionArray(self.__data[idx].copy())
+
+        i = array_index(idx, np.PyArray_DIM(self.__data, 0))
+        return new_MQuaternion(self.__data[i, 0], self.__data[i, 1], self.__data[i, 2], self.__data[i, 3])
+
+    def __setitem__(self, idx, MQuaternion q):
+        cdef Py_ssize_t i = array_index(idx, np.PyArray_DIM(self.__data, 0))
+        self.__data[i, 0] = q.__w
+        self.__data[i, 1] = q.__x
+        self.__data[i, 2] = q.__y
+        self.__data[i, 3] = q.__z
+
+    def __str__(self):
+        return "MQuaternionArray({0})".format(np.PyArray_DIM(self.__data, 0))
+
+    def __mul__(MQuaternionArray self, other):
+        cdef MQuaternion q
+        cdef MQuaternionArray qs
+        cdef double d
+
+        if isinstance(other, MQuaternionArray):
+            qs = other
+            if np.PyArray_DIM(qs.__data, 0) != np.PyArray_DIM(self.__data, 0):
+                raise ValueError("size mismatch: {0} != {1}".format(np.PyArray_DIM(self.__data, 0), np.PyArray_DIM(qs.__data, 0)))
+            return new_MQuaternionArray(mul_quaternion_array(self.__data, qs.__data))
+        elif isinstance(other, MQuaternion):
+            q = other
+            return new_MQuaternionArray(mul_quaternion_array(self.__data, np.array([[q.__w, q.__x, q.__y, q.__z]], dtype=np.float64)))
+        elif isinstance(other, (MVector3DArray, MVector3D)):
+            # 各クォータニオンでベクトルを回転させる
+            return self.toMatrix4x4() * other
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_MQuaternionArray(self.__data * d)
+        return new_MQuaternionArray(self.__data * other)
+
+
+cdef inline MQuaternionArray new_MQuaternionArray(np.ndarray data):
+    cdef MQuaternionArray qs = MQuaternionArray.__new__(MQuaternionArray)
+    qs.__data = data
+    return qs
+
+
+# ハミルトン積の一括計算（q2sが1件の場合は全件に同じ値を掛ける）
+cdef np.ndarray mul_quaternion_array(double[:, ::1] q1v, double[:, ::1] q2v):
+    cdef Py_ssize_t n = q1v.shape[0]
+    cdef Py_ssize_t step = 1 if q2v.shape[0] > 1 else 0
+    cdef np.ndarray results = np.empty((n, 4), dtype=np.float64)
+    cdef double[:, ::1] rv = results
+    cdef Py_ssize_t i, j
+
+    for i in range(n):
+        j = i * step
+        rv[i, 0] = q1v[i, 0] * q2v[j, 0] - q1v[i, 1] * q2v[j, 1] - q1v[i, 2] * q2v[j, 2] - q1v[i, 3] * q2v[j, 3]
+        rv[i, 1] = q1v[i, 0] * q2v[j, 1] + q1v[i, 1] * q2v[j, 0] + q1v[i, 2] * q2v[j, 3] - q1v[i, 3] * q2v[j, 2]
+        rv[i, 2] = q1v[i, 0] * q2v[j, 2] - q1v[i, 1] * q2v[j, 3] + q1v[i, 2] * q2v[j, 0] + q1v[i, 3] * q2v[j, 1]
+        rv[i, 3] = q1v[i, 0] * q2v[j, 3] + q1v[i, 1] * q2v[j, 2] - q1v[i, 2] * q2v[j, 1] + q1v[i, 3] * q2v[j, 0]
+
+    return results
+
+
+# MMatrix4x4の配列（N×4×4の連続したndarrayで保持する）
+cdef class MMatrix4x4Array:
+
+    def __init__(self, values=None, size=0):
+        cdef MMatrix4x4 mat
+        cdef Py_ssize_t i
+
+        if isinstance(values, MMatrix4x4Array):
+            # 配列クラスの場合
+            self.__data = (<MMatrix4x4Array>values).__data.copy()
+        elif isinstance(values, np.ndarray):
+            # 配列そのものの場合
+            self.__data = np.array(values, dtype=np.float64, order='C').reshape(-1, 4, 4)
+        elif isinstance(values, MMatrix4x4):
+            # 同じ値をsize件並べる
+            mat = values
+            self.__data = np.empty((size, 4, 4), dtype=np.float64)
+            self.__data[:] = np.array(mat.__data, dtype=np.float64)
+        elif values is not None:
+            # MMatrix4x4のリストの場合
+            self.__data = np.empty((len(values), 4, 4), dtype=np.float64)
+            for i, mat in enumerate(values):
+                self.__data[i] = np.array(mat.__data, dtype=np.float64)
+        else:
+            # 単位行列
+            self.__data = np.zeros((size, 4, 4), dtype=np.float64)
+            self.__data[:, 0, 0] = 1.0
+            self.__data[:, 1, 1] = 1.0
+            self.__data[:, 2, 2] = 1.0
+            self.__data[:, 3, 3] = 1.0
+
+    cpdef MMatrix4x4Array copy(self):
+        return new_MMatrix4x4Array(self.__data.copy())
+
+    # 配列そのものを返す（コピーではない）
+    cpdef np.ndarray data(self):
+        return self.__data
+
+    # 逆行列
+    cpdef MMatrix4x4Array inverted(self):
+        return new_MMatrix4x4Array(np.linalg.inv(self.__data))
+
+    # 回転行列（MQuaternionArray、もしくは全件共通のMQuaternion）
+    cpdef rotate(self, qqs):
+        cdef double[:, :, ::1] mv = self.__data
+        cdef double[:, ::1] qv
+        cdef MQuaternion q
+        cdef double rot[4][4]
+        cdef Py_ssize_t i, j, step
+
+        if isinstance(qqs, MQuaternionArray):
+            qv = (<MQuaternionArray>qqs).__data
+        else:
+            q = qqs
+            qv = np.array([[q.__w, q.__x, q.__y, q.__z]], dtype=np.float64)
+        step = 1 if qv.shape[0] > 1 else 0
+
+        for i in range(mv.shape[0]):
+            j = i * step
+            calc_rotation_matrix(qv[j, 0], qv[j, 1], qv[j, 2], qv[j, 3], rot)
+            mul_matrix(<MatrixRow*>&mv[i, 0, 0], rot, <MatrixRow*>&mv[i, 0, 0])
+
+    # 平行移動行列（MVector3DArray、もしくは全件共通のMVector3D）
+    cpdef translate(self, vs):
+        cdef double[:, :, ::1] mv = self.__data
+        cdef double[:, ::1] vv
+        cdef MVector3D v
+        cdef Py_ssize_t i, j, k, step
+
+        if isinstance(vs, MVector3DArray):
+            vv = (<MVector3DArray>vs).__data
+        else:
+            v = vs
+            vv = np.array([[v.__x, v.__y, v.__z]], dtype=np.float64)
+        step = 1 if vv.shape[0] > 1 else 0
+
+        for i in range(mv.shape[0]):
+            j = i * step
+            for k in range(4):
+                mv[i, k, 3] += mv[i, k, 0] * vv[j, 0] + mv[i, k, 1] * vv[j, 1] + mv[i, k, 2] * vv[j, 2]
+
+    def __len__(self):
+        return np.PyArray_DIM(self.__data, 0)
+
+    def __getitem__(self, idx):
+        cdef Py_ssize_t i, j, k
+        cdef MMatrix4x4 mat
+        cdef double[:, :, ::1] mv
+
+        if isinstance(idx, slice):
+            return new_MMatrix4x4Array(self.__data[idx].copy())
+
+        i = array_index(idx, np.PyArray_DIM(self.__data, 0))
+        mv = self.__data
+        mat = MMatrix4x4.__new__(MMatrix4x4)
+        for j in range(4):
+            for k in range(4):
+                mat.__data[j][k] = mv[i, j, k]
+        return mat
+
+    def __setitem__(self, idx, MMatrix4x4 mat):
+        cdef Py_ssize_t i = array_index(idx, np.PyArray_DIM(self.__data, 0))
+        cdef double[:, :, ::1] mv = self.__data
+        cdef Py_ssize_t j, k
+
+        for j in range(4):
+            for k in range(4):
+                mv[i, j, k] = mat.__data[j][k]
+
+    def __str__(self):
+        return "MMatrix4x4Array({0})".format(np.PyArray_DIM(self.__data, 0))
+
+    def __mul__(MMatrix4x4Array self, other):
+        cdef MMatrix4x4Array mats
+        cdef MMatrix4x4 mat
+        cdef np.ndarray results
+        cdef double[:, :, ::1] mv = self.__data
+        cdef double[:, :, ::1] ov
+        cdef double[:, :, ::1] rv
+        cdef double[:, ::1] vv
+        cdef double[:, ::1] pv
+        cdef Py_ssize_t i, n = mv.shape[0]
+        cdef double d
+
+        if isinstance(other, MMatrix4x4Array):
+            # 各行列同士の積
+            mats = other
+            if np.PyArray_DIM(mats.__data, 0) != n:
+                raise ValueError("size mismatch: {0} != {1}".format(n, np.PyArray_DIM(mats.__data, 0)))
+            results = np.empty((n, 4, 4), dtype=np.float64)
+            ov = mats.__data
+            rv = results
+            for i in range(n):
+                mul_matrix(<MatrixRow*>&mv[i, 0, 0], <MatrixRow*>&ov[i, 0, 0], <MatrixRow*>&rv[i, 0, 0])
+            return new_MMatrix4x4Array(results)
+        elif isinstance(other, MMatrix4x4):
+            mat = other
+            results = np.empty((n, 4, 4), dtype=np.float64)
+            rv = results
+            for i in range(n):
+                mul_matrix(<MatrixRow*>&mv[i, 0, 0], mat.__data, <MatrixRow*>&rv[i, 0, 0])
+            return new_MMatrix4x4Array(results)
+        elif isinstance(other, (MVector3DArray, MVector3D)):
+            # 各行列で位置を変換する（MMatrix4x4.mul_MVector3D 相当）
+            vv = broadcast_vector3d_values(other, n)
+            results = np.empty((n, 3), dtype=np.float64)
+            pv = results
+            for i in range(n):
+                mul_position(<MatrixRow*>&mv[i, 0, 0], &vv[i, 0], &pv[i, 0])
+            return new_MVector3DArray(results)
+        elif isinstance(other, (float, int)):
+            d = other
+            return new_MMatrix4x4Array(self.__data * d)
+        return new_MMatrix4x4Array(self.__data * other)
+
+
+cdef inline MMatrix4x4Array new_MMatrix4x4Array(np.ndarray data):
+    cdef MMatrix4x4Array mats = MMatrix4x4Array.__new__(MMatrix4x4Array)
+    mats.__data = data
+    return mats
+
+
+# 行列で位置を変換する（MMatrix4x4.mul_MVector3D と同じ）
+@cython.cdivision(True)
+cdef inline void mul_position(double m[4][4], double* v, double* result):
+    cdef double x = m[0][0] * v[0] + m[0][1] * v[1] + m[0][2] * v[2] + m[0][3]
+    cdef double y = m[1][0] * v[0] + m[1][1] * v[1] + m[1][2] * v[2] + m[1][3]
+    cdef double z = m[2][0] * v[0] + m[2][1] * v[1] + m[2][2] * v[2] + m[2][3]
+    cdef double w = m[3][0] * v[0] + m[3][1] * v[1] + m[3][2] * v[2] + m[3][3]
+
+    if w == 1.0:
+        result[0] = x
+        result[1] = y
+        result[2] = z
+    elif w == 0.0:
+        result[0] = 0
+        result[1] = 0
+        result[2] = 0
+    else:
+        result[0] = x / w
+        result[1] = y / w
+        result[2] = z / w
+
 
 cpdef bint is_almost_null(v):
     return abs(v) < 0.0000001
 
 
 cpdef double get_effective_value(v):
-    if math.isnan(v):
-        return 0
-    
-    if math.isinf(v):
-        return 0
-    
-    return v
+    return effective_value(v)
 
 
 cpdef double get_almost_zero_value(v):
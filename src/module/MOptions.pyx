@@ -8,7 +8,7 @@ import numpy as np
 from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
 from module.MParams import BoneLinks # noqa
 from mmd.PmxData import PmxModel, Bone, Vertex, Material, Morph, DisplaySlot, RigidBody, Joint # noqa
-from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
+from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame, VmdPoseCache # noqa
 from mmd.PmxReader import PmxReader
 from mmd.VmdReader import VmdReader
 from mmd.VpdReader import VpdReader
@@ -288,7 +288,10 @@ cdef class MOptionsDataSet():
         self.camera_offset_y = camera_offset_y
         self.selected_stance_details = selected_stance_details
 
-        self.org_motion = self.motion.copy()
+        # 元モーションは参照のみなので、列指向トラックのスナップショットで保持する
+        self.org_motion = self.motion.snapshot()
+        # 書き換えられないので、グローバル行列は各処理段階で共有する
+        self.org_motion.pose_cache = VmdPoseCache()
         self.test_params = None
         self.full_arms = False
 
@@ -3,4 +3,19 @@
 
 cdef class BoneLinks:
     cdef dict __links
+    cdef dict __indexes
+    cdef list __names
+    cdef list __bones
+    cdef list __parent_indexes
+    cdef list __prefix_keys
+    cdef tuple __key
+    cdef Py_hash_t __hash_value
+    cdef bint __is_frozen
 
+    cdef object c_get(self, str bone_name, int offset)
+    cdef object c_get_parent(self, str bone_name)
+    cdef c_append(self, object bone)
+    cdef c_check_mutable(self)
+    cdef int c_index(self, str bone_name)
+    cdef object c_prefix_key(self, int lidx)
+    cdef tuple c_key(self)
@@ -2,143 +2,218 @@
 #
 
 
+# ボーンリンク（親から末端の順）
+# ボーンはモデルのものをそのまま参照する（複製しない）ので、ボーンの設定を変える場合は、呼び出し側で複製すること
+# append/insert で組み立てた後、ハッシュを取った時点で変更不可になり、ポーズやFKのキャッシュのキーにできる
+# ボーンを渡して生成したリンク（from_links など）は最初から変更不可
 cdef class BoneLinks:
 
-    def __init__(self):
+    def __init__(self, bones=None):
+        # ボーン名: ボーン（all() 用）
         self.__links = {}
-    
+        # ボーン名: リンク内のINDEX
+        self.__indexes = {}
+        # INDEX毎のボーン名・ボーン・親ボーンのINDEX（一番親は-1）
+        self.__names = []
+        self.__bones = []
+        self.__parent_indexes = []
+        self.__prefix_keys = None
+        self.__key = None
+        self.__hash_value = 0
+        self.__is_frozen = False
+
+        if bones is not None:
+            for bone in bones:
+                self.c_append(bone)
+            self.__is_frozen = True
+
     def get(self, bone_name: str, offset=0):
-        if bone_name not in self.__links:
+        return self.c_get(bone_name, offset)
+
+    cdef object c_get(self, str bone_name, int offset):
+        cdef int lidx = self.__indexes.get(bone_name, -1)
+
+        if lidx < 0:
             return None
-        if offset == 0:
-            # オフセットなしの場合、そのまま返す
-            return self.__links[bone_name]
-        else:
-            # オフセットありの場合、その分ずらす
-            target_bone_index = self.index(bone_name)
-            
-            # オフセット加味して、該当INDEXを探す
-            for lidx, lkey in enumerate(self.__links.keys()):
-                if lidx == target_bone_index + offset:
-                    return self.__links[lkey]
-        
-        return None
-    
+
+        # オフセット加味して、該当INDEXを探す
+        lidx += offset
+        if lidx < 0 or lidx >= len(self.__bones):
+            return None
+
+        return self.__bones[lidx]
+
+    # 親ボーン（一番親の場合はNone）
+    cdef object c_get_parent(self, str bone_name):
+        cdef int lidx = self.__indexes.get(bone_name, -1)
+
+        if lidx < 0 or self.__parent_indexes[lidx] < 0:
+            return None
+
+        return self.__bones[self.__parent_indexes[lidx]]
+
     def all(self):
         return self.__links
 
     # リンクに追加
     def append(self, bone):
-        self.__links[bone.name] = bone.copy()
-    
+        self.c_check_mutable()
+        self.c_append(bone)
+
+    cdef c_append(self, object bone):
+        if bone.name in self.__indexes:
+            # 同じ名前のボーンは置き換える（位置はそのまま）
+            self.__bones[self.__indexes[bone.name]] = bone
+            self.__links[bone.name] = bone
+            return
+
+        self.__indexes[bone.name] = len(self.__names)
+        self.__parent_indexes.append(len(self.__names) - 1)
+        self.__names.append(bone.name)
+        self.__bones.append(bone)
+        self.__links[bone.name] = bone
+
     # リンクに挿入
     def insert(self, bone, prev_bone_name):
-        new_links = {}
-        for lidx, lkey in enumerate(self.__links.keys()):
-            new_links[lkey] = self.__links[lkey].copy()
-
-            if lkey == prev_bone_name:
-                # 直前ボーンが見つかったら、その後に挿入する
-                new_links[bone.name] = bone.copy()
-        
-        # 終わったら置き換える
-        self.__links = new_links
-    
+        self.c_check_mutable()
+
+        if prev_bone_name not in self.__indexes:
+            return
+
+        # 直前ボーンの後に挿入して、作り直す
+        cdef list bones = list(self.__bones)
+        bones.insert(self.__indexes[prev_bone_name] + 1, bone)
+
+        self.__links = {}
+        self.__indexes = {}
+        self.__names = []
+        self.__bones = []
+        self.__parent_indexes = []
+        for link_bone in bones:
+            self.c_append(link_bone)
+
+    cdef c_check_mutable(self):
+        if self.__is_frozen:
+            raise TypeError("BoneLinks is immutable after it has been hashed: {0}".format(self.__names))
+
     # リンクの反転
     def reversed(self):
         return reversed(self.__links)
-    
+
     # リンクの大きさ
     def size(self):
-        return len(self.__links.keys())
-    
+        return len(self.__names)
+
     # 指定されたボーン名までのインデックス
     def index(self, bone_name: str):
-        for lidx, lkey in enumerate(self.__links.keys()):
-            if lkey == bone_name:
-                return lidx
-        return -1
+        return self.c_index(bone_name)
+
+    cdef int c_index(self, str bone_name):
+        return self.__indexes.get(bone_name, -1)
 
     # 指定されたボーン名までのリンクを取得
     def from_links(self, bone_name: str):
-        new_links = BoneLinks()
-        for lidx, lkey in enumerate(self.__links.keys()):
-            new_links.append(self.__links[lkey])
-            if lkey == bone_name:
-                break
-        return new_links
+        cdef int lidx = self.__indexes.get(bone_name, len(self.__bones) - 1)
+        return BoneLinks(self.__bones[:lidx + 1])
 
     # 指定されたボーン名以降のリンクを取得
     def to_links(self, bone_name: str):
-        new_links = BoneLinks()
-        is_append = False
-        for lidx, lkey in enumerate(self.__links.keys()):
-            if lkey == bone_name:
-                is_append = True
-            
-            if is_append:
-                new_links.append(self.__links[lkey])
-                
-        return new_links
-        
+        if bone_name not in self.__indexes:
+            return BoneLinks([])
+
+        return BoneLinks(self.__bones[self.__indexes[bone_name]:])
+
     # 最後のリンク名を取得する
     def last_name(self):
-        if not self.__links:
+        if not self.__names:
             return ""
 
-        return list(self.__links.keys())[-1]
-    
+        return self.__names[-1]
+
     # 最後のリンク名を取得する
     def last_display_name(self):
-        if not self.__links:
+        if not self.__names:
             return ""
 
-        return list(self.__links.keys())[-1].replace("実体", "")
+        return self.__names[-1].replace("実体", "")
 
     # 最初のリンク名を取得する
     def first_name(self):
-        if not self.__links:
+        if not self.__names:
             return ""
 
-        return list(self.__links.keys())[0]
+        return self.__names[0]
 
     # 最初のリンク名を取得する
     def first_display_name(self):
-        if not self.__links:
+        if not self.__names:
             return ""
 
-        return list(self.__links.keys())[0].replace("実体", "")
+        return self.__names[0].replace("実体", "")
 
     # 指定されたボーン名のみを入れたリンクを取得
     def pickup_links(self, bone_names: list):
-        new_links = BoneLinks()
-        for lidx, lkey in enumerate(self.__links.keys()):
-            if lidx == 0:
-                # 末端は常に登録
-                new_links.append(self.__links[lkey])
-            else:
-                if lkey in bone_names:
-                    # それ以外はボーン名リストにあること
-                    new_links.append(self.__links[lkey])
-                
-        return new_links
+        # 末端（先頭）は常に登録し、それ以外はボーン名リストにあること
+        return BoneLinks([bone for lidx, bone in enumerate(self.__bones) if lidx == 0 or bone.name in bone_names])
 
     # 指定されたボーン名を省いたリンクを取得
     def remove_links(self, bone_names: list):
-        new_links = BoneLinks()
-        for lidx, lkey in enumerate(self.__links.keys()):
-            if lidx == 0:
-                # 末端は常に登録
-                new_links.append(self.__links[lkey])
-            else:
-                if lkey not in bone_names:
-                    # それ以外はボーン名リストにないこと
-                    new_links.append(self.__links[lkey])
-                
-        return new_links
+        # 末端（先頭）は常に登録し、それ以外はボーン名リストにないこと
+        return BoneLinks([bone for lidx, bone in enumerate(self.__bones) if lidx == 0 or bone.name not in bone_names])
 
-    def __str__(self):
-        return "<BoneLinks links:{0}".format(self.__links)
+    # 親から指定INDEXのボーンまでのリンクのキー（同じボーン名でも、位置が違えば別のキー）
+    # リンク毎に一度だけ作り、以降は同じキーを使い回す
+    cdef object c_prefix_key(self, int lidx):
+        cdef int n
+
+        if self.__prefix_keys is None:
+            self.__is_frozen = True
+            self.__prefix_keys = [BoneLinks(self.__bones[:n + 1]) for n in range(len(self.__bones) - 1)]
+            # 全体は自分自身
+            self.__prefix_keys.append(self)
+
+        return self.__prefix_keys[lidx]
+
+    # ボーン名と位置の組（等価比較とハッシュに使う）
+    cdef tuple c_key(self):
+        cdef tuple key
+
+        if self.__key is not None:
+            return self.__key
+
+        key = tuple([(bone.name, bone.position.x(), bone.position.y(), bone.position.z()) for bone in self.__bones])
+        if self.__is_frozen:
+            # 変更不可になった後は、作り直さない
+            self.__key = key
 
+        return key
 
+    def __hash__(self):
+        self.__is_frozen = True
 
+        if self.__hash_value == 0:
+            self.__hash_value = hash(self.c_key())
+
+        return self.__hash_value
+
+    def __eq__(self, other):
+        cdef BoneLinks links
+
+        if self is other:
+            return True
+
+        if not isinstance(other, BoneLinks):
+            return NotImplemented
+
+        links = other
+        return self.c_key() == links.c_key()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    def __str__(self):
+        return "<BoneLinks links:{0}".format(self.__links)
@@ -99,6 +99,8 @@ class SizingService():
 
             logger.info(service_data_txt, decoration=MLogger.DECORATION_BOX)
 
+            MServiceUtils.ik_solve_stats.reset_counts()
+
             if self.options.is_sizing_camera_only is True:
                 # 카메라사이징のみ実行する場合、출력結果VMDを読み込む
                 for data_set_idx, data_set in enumerate(self.options.data_set_list):
@@ -115,25 +117,32 @@ class SizingService():
                 # 移動보정
                 if not MoveService(self.options).execute():
                     return False
+                self.log_pose_cache("이동보정")
 
                 # 자세보정
                 if not StanceService(self.options).execute():
                     return False
+                self.log_pose_cache("자세보정")
 
                 # 강체접촉회피
                 if self.options.arm_options.avoidance:
                     if not ArmAvoidanceService(self.options).execute():
                         return False
+                    self.log_pose_cache("강체접촉회피")
 
                 # 손목위치맞춤
                 if self.options.arm_options.alignment:
                     if not ArmAlignmentService(self.options).execute():
                         return False
+                    self.log_pose_cache("손목위치맞춤")
+
+                self.log_ik_solve_stats()
 
             # 카메라보정
             if self.options.camera_motion:
                 if not CameraService(self.options).execute():
                     return False
+                self.log_pose_cache("카메라보정")
 
             if self.options.is_sizing_camera_only is False:
                 # 모프치환
@@ -180,3 +189,25 @@ class SizingService():
             return False
         finally:
             logging.shutdown()
+
+    # 元モーションのグローバル行列キャッシュの利用状況を出力し、カウントをリセットする
+    def log_pose_cache(self, stage_name: str):
+        for data_set_idx, data_set in enumerate(self.options.data_set_list):
+            pose_cache = data_set.org_motion.pose_cache
+            if pose_cache is None:
+                continue
+
+            hits, misses, invalidations, size = pose_cache.counts()
+            logger.debug_info("【No.%s】%s 행렬 캐시: hit=%s, miss=%s, 파기=%s, 보유=%s", (data_set_idx + 1), stage_name, hits, misses, invalidations, size)
+            pose_cache.reset_counts()
+
+    # IK計算の解法ごとの回数・所要時間と、解析解の速度比を出力する
+    def log_ik_solve_stats(self):
+        analytic_count, analytic_time, ccd_count, ccd_time, fallback_count = MServiceUtils.ik_solve_stats.counts()
+        if analytic_count + ccd_count == 0:
+            return
+
+        # 1回あたりの平均時間の比（解析解の結果からCCDに切り替えた分はCCD側に含む）
+        speedup = (ccd_time / ccd_count) / (analytic_time / analytic_count) if analytic_count > 0 and ccd_count > 0 and analytic_time > 0 else 0
+        logger.debug_info("IK 계산: 해석해=%s (%.3f초), CCD=%s (%.3f초, 해석해에서 전환=%s), 속도비=%.1f배", \
+                          analytic_count, analytic_time, ccd_count, ccd_time, fallback_count, speedup)
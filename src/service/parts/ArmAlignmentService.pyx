@@ -18,7 +18,7 @@ from module.MMath cimport MRect, MVector2D, MVector3D, MVector4D, MQuaternion, M
 from mmd.PmxData import PmxModel, OBB, Bone, Vertex, Material, Morph, DisplaySlot, RigidBody, Joint # noqa
 from mmd.PmxData cimport PmxModel, OBB, Bone, RigidBody
 
-from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
+from mmd.VmdData import VmdMotion, VmdFrameDict, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
 from mmd.VmdData cimport VmdMotion, VmdBoneFrame
 
 from module.MOptions import MOptions, MOptionsDataSet # noqa
@@ -583,7 +583,8 @@ cdef class ArmAlignmentService:
         cdef int data_set_idx, alignment_idx, fidx, fno, ik_cnt, next_success_fno, now_ik_max_count, prev_block_fno, prev_fno, prev_success_fno
         cdef str bone_name, link_name
         cdef list group_data_set_idxs, next_fnos, next_success_fnos, overwrited, prev_success_fnos, is_success
-        cdef dict aligned_rep_global_3ds, all_alignment_group
+        cdef dict aligned_rep_global_3ds, all_alignment_group, ik_warm_starts
+        cdef tuple ik_warm_start_key
         cdef dict dot_far_limit_dict, dot_near_dict, dot_near_limit_dict, dot_start_dict, org_bfs, rep_global_3ds, rep_global_matrixs, results, start_org_bfs
         cdef bint is_avoidance_elbow_x, is_avoidance_arm_x, is_floor, is_multi
         cdef VmdBoneFrame bf, ik_bf, next_bf, prev_bf
@@ -596,6 +597,9 @@ cdef class ArmAlignmentService:
         cdef MMatrix4x4 org_origin_matrix, rep_effector_matrix, rep_origin_matrix, rep_trunk_matrix
         cdef ArmAlignmentOption target_link
 
+        # IKチェーン毎に、前のフレームの解を引き継ぐ
+        ik_warm_starts = {}
+
         fno = 0
         prev_block_fno = 0
         for all_alignment_group in all_alignment_group_list:
@@ -634,7 +638,7 @@ cdef class ArmAlignmentService:
                     # 一度全部キーを追加する（キー自体は無効化のまま）
                     for bone_name in ["{0}腕".format(target_link.effector_bone_name[0]), "{0}ひじ".format(target_link.effector_bone_name[0])]:
                         if bone_name not in data_set.motion.bones:
-                            data_set.motion.bones[bone_name] = {}
+                            data_set.motion.bones[bone_name] = VmdFrameDict()
                         data_set.motion.bones[bone_name][fno] = data_set.motion.calc_bf(bone_name, fno)
 
             results = {}
@@ -823,8 +827,13 @@ cdef class ArmAlignmentService:
                             logger.debug("IK計算開始(%s): f: %s(%s:%s), 現在[%s], 지정[%s]", now_ik_max_count, fno, (data_set_idx + 1), \
                                          list(now_ik_links.all().keys()), rep_effector_vec.to_log(), rep_global_effector.to_log())
 
-                            # IK計算실행
-                            MServiceUtils.c_calc_IK(data_set.rep_model, target_link.rep_links, data_set.motion, fno, rep_global_effector, now_ik_links, max_count=(ik_max_count + 1))
+                            ik_warm_start_key = (data_set_idx, tuple(now_ik_links.all().keys()))
+                            if ik_warm_start_key not in ik_warm_starts:
+                                ik_warm_starts[ik_warm_start_key] = MServiceUtils.IKWarmStart()
+
+                            # IK計算실행（手首/ひじ/腕の場合は解析解）
+                            MServiceUtils.c_calc_IK(data_set.rep_model, target_link.rep_links, data_set.motion, fno, rep_global_effector, now_ik_links, max_count=(ik_max_count + 1), \
+                                                    is_analytic=True, warm_start=ik_warm_starts[ik_warm_start_key])
 
                             # 現在のエフェクタ位置
                             (aligned_rep_global_3ds, _) = MServiceUtils.c_calc_global_pos(data_set.rep_model, target_link.rep_links, data_set.motion, fno, return_matrix=False, is_local_x=False, limit_links=None)
@@ -1273,6 +1282,11 @@ cdef class ArmAlignmentService:
 
         logger.count("위치 맞춤", fno, fnos)
 
+        # IKチェーン毎の収束状況
+        for (data_set_idx, ik_names), ik_warm_start in ik_warm_starts.items():
+            logger.debug_info("【No.%s】%s IK 반복: 계산=%s, 수렴=%s, 이전 프레임 해 사용=%s, 반복 횟수별 프레임 수=%s", \
+                              (data_set_idx + 1), "/".join(ik_names), *ik_warm_start.counts())
+
     # 手首위치 맞춤の準備
     def prepare_wrist(self, data_set_idx: int):
         self.target_links[data_set_idx] = {}
@@ -1303,7 +1317,7 @@ cdef class ArmAlignmentService:
             #     wrist_twist_bone.dot_single_limit = 0.9
             #     wrist_twist_bone.degree_limit = 57.2957
 
-            elbow_bone = rep_wrist_links.get("{0}ひじ".format(direction))
+            elbow_bone = rep_wrist_links.get("{0}ひじ".format(direction)).copy()
             elbow_bone.dot_near_limit = 0.97
             elbow_bone.dot_far_limit = 0.7
             elbow_bone.dot_single_limit = 0.9
@@ -1316,7 +1330,7 @@ cdef class ArmAlignmentService:
             #     arm_twist_bone.dot_single_limit = 0.9
             #     arm_twist_bone.degree_limit = 57.2957
 
-            arm_bone = rep_wrist_links.get("{0}腕".format(direction))
+            arm_bone = rep_wrist_links.get("{0}腕".format(direction)).copy()
             arm_bone.dot_near_limit = 0.97
             arm_bone.dot_far_limit = 0.8
             arm_bone.dot_single_limit = 0.9
@@ -1374,14 +1388,14 @@ cdef class ArmAlignmentService:
 
                 if rep_wrist_links.get("上半身2") and "上半身2" in data_set.motion.bones:
                     # 上半身2もある場合、上半身2も補正する
-                    upper_bone2 = rep_wrist_links.get("上半身2")
+                    upper_bone2 = rep_wrist_links.get("上半身2").copy()
                     upper_bone2.dot_near_limit = 0.97
                     upper_bone2.dot_far_limit = 0.95
                     upper_bone2.dot_single_limit = 0.95
                     upper_bone2.degree_limit = 57.2957
                     ik_links.append(upper_bone2)
 
-                upper_bone = rep_wrist_links.get("上半身")
+                upper_bone = rep_wrist_links.get("上半身").copy()
                 upper_bone.dot_near_limit = 0.97
                 upper_bone.dot_far_limit = 0.95
                 upper_bone.dot_single_limit = 0.95
@@ -1450,7 +1464,7 @@ cdef class ArmAlignmentService:
                 #     wrist_twist_bone.dot_single_limit = 0.9
                 #     wrist_twist_bone.degree_limit = 57.2957
 
-                elbow_bone = rep_finger_links.get("{0}ひじ".format(direction))
+                elbow_bone = rep_finger_links.get("{0}ひじ".format(direction)).copy()
                 elbow_bone.dot_near_limit = 0.97
                 elbow_bone.dot_far_limit = 0.7
                 elbow_bone.dot_single_limit = 0.9
@@ -1463,7 +1477,7 @@ cdef class ArmAlignmentService:
                 #     arm_twist_bone.dot_single_limit = 0.9
                 #     arm_twist_bone.degree_limit = 57.2957
 
-                arm_bone = rep_finger_links.get("{0}腕".format(direction))
+                arm_bone = rep_finger_links.get("{0}腕".format(direction)).copy()
                 arm_bone.dot_near_limit = 0.97
                 arm_bone.dot_far_limit = 0.8
                 arm_bone.dot_single_limit = 0.9
@@ -17,7 +17,7 @@ from module.MMath cimport MRect, MVector2D, MVector3D, MVector4D, MQuaternion, M
 from mmd.PmxData import PmxModel, OBB, Bone, Vertex, Material, Morph, DisplaySlot, RigidBody, Joint # noqa
 from mmd.PmxData cimport PmxModel, OBB, Bone, RigidBody
 
-from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
+from mmd.VmdData import VmdMotion, VmdFrameDict, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
 from mmd.VmdData cimport VmdMotion, VmdBoneFrame
 
 from module.MOptions import MOptions, MOptionsDataSet # noqa
@@ -180,7 +180,7 @@ cdef class ArmAvoidanceService:
         cdef int fno, ik_cnt, ik_max_count, now_ik_max_count, prev_block_fno
         cdef str arm_bone_name, avoidance_name, bone_name, elbow_bone_name, link_name, wrist_bone_name, axis
         cdef list fnos, ik_links_list, target_bone_names, is_success, failured_last_names
-        cdef dict dot_dict, dot_limit_dict, now_rep_global_3ds, org_bfs, rep_avbone_global_3ds, rep_avbone_global_mats, rep_global_3ds, avoidance_axis
+        cdef dict dot_dict, dot_limit_dict, now_rep_global_3ds, org_bfs, rep_avbone_global_3ds, rep_avbone_global_transforms, rep_global_3ds, avoidance_axis
         cdef bint is_in_elbow
         cdef MVector3D now_rep_effector_pos, rep_collision_vec, rep_diff, prev_rep_diff
         cdef MOptionsDataSet data_set
@@ -214,7 +214,7 @@ cdef class ArmAvoidanceService:
         for fno in fnos:
             for bone_name in [arm_bone_name, elbow_bone_name]:
                 if bone_name not in data_set.motion.bones:
-                    data_set.motion.bones[bone_name] = {}
+                    data_set.motion.bones[bone_name] = VmdFrameDict()
                 data_set.motion.bones[bone_name][fno] = data_set.motion.calc_bf(bone_name, fno)
 
         while len(fnos) > 0:
@@ -226,10 +226,10 @@ cdef class ArmAvoidanceService:
 
             for ((avoidance_name, avodance_link), avoidance) in zip(avoidance_options.avoidance_links.items(), avoidance_options.avoidances.values()):
                 # 剛体の현재위치をチェック
-                (rep_avbone_global_3ds, rep_avbone_global_mats) = \
-                    MServiceUtils.c_calc_global_pos(data_set.rep_model, avodance_link, data_set.motion, fno, return_matrix=True, is_local_x=False, limit_links=None)
+                (rep_avbone_global_3ds, rep_avbone_global_transforms) = \
+                    MServiceUtils.c_calc_global_pos(data_set.rep_model, avodance_link, data_set.motion, fno, return_matrix=False, is_local_x=False, limit_links=None, return_transform=True)
 
-                obb = avoidance.get_obb(fno, avodance_link.get(avodance_link.last_name()).position, rep_avbone_global_mats, self.options.arm_options.alignment, direction == "左")
+                obb = avoidance.get_obb(fno, avodance_link.get(avodance_link.last_name()).position, rep_avbone_global_transforms, self.options.arm_options.alignment, direction == "左")
 
                 # # 剛体の原点 ---------------
                 # debug_bone_name = "原点"
@@ -319,8 +319,9 @@ cdef class ArmAvoidanceService:
                                 logger.debug("IK計算開始(%s): f: %s(%s:%s:%s), axis: %s, now[%s], new[%s]", now_ik_max_count, fno, (data_set_idx + 1), \
                                              list(ik_links.all().keys()), avoidance_name, axis, rep_global_3ds[arm_link.last_name()].to_log(), rep_collision_vec.to_log())
 
-                                # 修正角度がない場合、IK計算실행
-                                MServiceUtils.c_calc_IK(data_set.rep_model, arm_link, data_set.motion, fno, rep_collision_vec, ik_links, max_count=(ik_max_count + 1))
+                                # 修正角度がない場合、IK計算실행（手首/ひじ/腕の場合は解析解）
+                                MServiceUtils.c_calc_IK(data_set.rep_model, arm_link, data_set.motion, fno, rep_collision_vec, ik_links, max_count=(ik_max_count + 1), \
+                                                        is_analytic=True)
 
                                 # 현재のエフェクタ위치
                                 (now_rep_global_3ds, _) = \
@@ -530,7 +531,7 @@ cdef class ArmAvoidanceService:
         cdef int aidx, fno, from_fno, prev_block_fno, to_fno
         cdef double block_x_distance, block_z_plus_distance, x_distance, z_plus_distance, block_z_minus_distance, z_minus_distance
         cdef list all_avoidance_list, fnos, prev_collisions
-        cdef dict all_avoidance_axis, rep_avbone_global_3ds, rep_avbone_global_mats, rep_global_3ds, rep_matrixs, avoidance_list
+        cdef dict all_avoidance_axis, rep_avbone_global_3ds, rep_avbone_global_transforms, rep_global_3ds, rep_matrixs, avoidance_list
         cdef str avoidance_name, bone_name
         cdef bint collision, near_collision
         cdef BoneLinks arm_link, avodance_link
@@ -563,10 +564,10 @@ cdef class ArmAvoidanceService:
 
             for ((avoidance_name, avodance_link), avoidance) in zip(avoidance_options.avoidance_links.items(), avoidance_options.avoidances.values()):
                 # 剛体の현재위치をチェック
-                (rep_avbone_global_3ds, rep_avbone_global_mats) = \
-                    MServiceUtils.c_calc_global_pos(data_set.rep_model, avodance_link, data_set.motion, fno, return_matrix=True, is_local_x=False, limit_links=None)
+                (rep_avbone_global_3ds, rep_avbone_global_transforms) = \
+                    MServiceUtils.c_calc_global_pos(data_set.rep_model, avodance_link, data_set.motion, fno, return_matrix=False, is_local_x=False, limit_links=None, return_transform=True)
 
-                obb = avoidance.get_obb(fno, avodance_link.get(avodance_link.last_name()).position, rep_avbone_global_mats, self.options.arm_options.alignment, direction == "左")
+                obb = avoidance.get_obb(fno, avodance_link.get(avodance_link.last_name()).position, rep_avbone_global_transforms, self.options.arm_options.alignment, direction == "左")
 
                 for arm_link in avoidance_options.arm_links:
                     # 先モデルのそれぞれのグローバル위치
@@ -730,7 +731,7 @@ cdef class ArmAvoidanceService:
 
             effector_bone = arm_link.get(effector_bone_name)
 
-            arm_bone = arm_link.get("{0}腕".format(direction))
+            arm_bone = arm_link.get("{0}腕".format(direction)).copy()
             arm_bone.dot_limit = 0.8
             arm_bone.degree_limit = 57.2957
 
@@ -766,7 +767,7 @@ cdef class ArmAvoidanceService:
             #     wrist_twist_bone.dot_single_limit = 0.9
             #     wrist_twist_bone.degree_limit = 57.2957
 
-            elbow_bone = arm_link.get("{0}ひじ".format(direction))
+            elbow_bone = arm_link.get("{0}ひじ".format(direction)).copy()
             elbow_bone.dot_limit = 0.7
             elbow_bone.degree_limit = 57.2957
 
@@ -777,7 +778,7 @@ cdef class ArmAvoidanceService:
             #     arm_twist_bone.dot_single_limit = 0.9
             #     arm_twist_bone.degree_limit = 57.2957
 
-            arm_bone = arm_link.get("{0}腕".format(direction))
+            arm_bone = arm_link.get("{0}腕".format(direction)).copy()
             arm_bone.dot_limit = 0.8
             arm_bone.degree_limit = 57.2957
 
@@ -495,7 +495,7 @@ class CameraService():
                 data_set = self.options.data_set_list[data_set_idx]
 
                 # 元모델のそれぞれのグローバル위치
-                org_global_3ds = MServiceUtils.calc_global_pos(data_set.camera_org_model, org_link, data_set.org_motion, fno)
+                org_global_3ds = camera_option.org_pose_range.calc_global_pos(org_link, fno)
                 for bone_name, org_vec in org_global_3ds.items():
                     if bone_name in camera_option.org_link_target.keys() and (data_set_idx, bone_name) not in all_org_project_square_poses:
                         # 処理対象ボーンである場合, データを保持
@@ -523,7 +523,7 @@ class CameraService():
             camera_option = self.camera_options[data_set_idx]
 
             # 先모델のそれぞれのグローバル위치
-            rep_global_3ds = MServiceUtils.calc_global_pos(data_set.rep_model, rep_link, data_set.motion, fno)
+            rep_global_3ds = camera_option.rep_pose_range.calc_global_pos(rep_link, fno)
 
             for bone_name, rep_vec in rep_global_3ds.items():
                 if (data_set_idx, bone_name) in data_bone_name_list:
@@ -667,8 +667,13 @@ class CameraService():
             self.prepare_link(data_set.camera_org_model, data_set.rep_model, data_set.camera_offset_y, org_links, org_link_target, rep_links, \
                               ["{0}足".format(direction), "下半身"], ["{0}足".format(direction)])
 
+        # カメラの키 프레임ごとのグローバル위치は、まとめて求めておく
+        camera_fnos = sorted(self.options.camera_motion.cameras.keys())
+        org_pose_range = MServiceUtils.calc_global_pose_range(data_set.camera_org_model, data_set.org_motion, camera_fnos, org_links)
+        rep_pose_range = MServiceUtils.calc_global_pose_range(data_set.rep_model, data_set.motion, camera_fnos, list(rep_links.values()))
+
         self.camera_options[data_set_idx] = CameraOption(org_links, org_link_target, rep_links, org_total_height, org_face_length, org_heads, \
-                                                         rep_total_height, rep_face_length, rep_heads, body_ratio, head_ratio)
+                                                         rep_total_height, rep_face_length, rep_heads, body_ratio, head_ratio, org_pose_range, rep_pose_range)
 
     def prepare_ratio(self, data_set_idx: int, org_model: PmxModel, rep_model: PmxModel):
         data_set = self.options.data_set_list[data_set_idx]
@@ -733,7 +738,10 @@ class CameraService():
 
                     # 頭頂実体がある場合, Y오프셋加味
                     if "頭頂実体" == target_bone_name:
-                        rep_link.get("頭頂実体").position.setY(float(rep_link.get("頭頂実体").position.y()) + float(camera_offset_y))
+                        # リンクのボーンはモデルのボーンそのものなので、複製してからずらす
+                        head_bone = rep_link.get("頭頂実体").copy()
+                        head_bone.position.setY(float(head_bone.position.y()) + float(camera_offset_y))
+                        rep_link = BoneLinks([head_bone if lname == "頭頂実体" else bone for lname, bone in rep_link.all().items()])
 
                     rep_links[target_bone_name] = rep_link
                     rep_target_bone_name_list.append(target_bone_name)
@@ -764,12 +772,15 @@ class CameraService():
 # カメラオプション
 class CameraOption():
     def __init__(self, org_links: list, org_link_target: dict, rep_links: dict, org_total_height: float, org_face_length: float, org_heads: float, \
-                 rep_total_height: float, rep_face_length: float, rep_heads: float, body_ratio: float, head_ratio: float):
+                 rep_total_height: float, rep_face_length: float, rep_heads: float, body_ratio: float, head_ratio: float, org_pose_range, rep_pose_range):
         super().__init__()
 
         self.org_links = org_links
         self.org_link_target = org_link_target
         self.rep_links = rep_links
+        # カメラの키 프레임ごとのグローバル위치（GlobalPoseRange）
+        self.org_pose_range = org_pose_range
+        self.rep_pose_range = rep_pose_range
 
         self.org_total_height = org_total_height
         self.org_face_length = org_face_length
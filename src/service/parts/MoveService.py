@@ -74,13 +74,13 @@ class MoveService():
                 bf.position.setY(bf.position.y() * data_set.y_ratio)
                 bf.position.setZ(bf.position.z() * data_set.xz_ratio)
 
-                _, rep_global_mats = MServiceUtils.calc_global_pos(data_set.rep_model, bone_link, data_set.motion, fno, return_matrix=True)
+                _, rep_global_transforms = MServiceUtils.calc_global_pos(data_set.rep_model, bone_link, data_set.motion, fno, return_transform=True)
                 # 該当ボーンのローカル位置
-                local_pos = rep_global_mats[bone_name].inverted() * bf.position
+                local_pos = rep_global_transforms[bone_name].inverted() * bf.position
                 # ローカル位置に오프셋調整
                 local_pos += data_set.rep_model.bones[bone_name].local_offset
                 # 元に戻す
-                bf.position = rep_global_mats[bone_name] * local_pos
+                bf.position = rep_global_transforms[bone_name] * local_pos
 
             if len(fnos) > 0:
                 logger.info("이동보정:종료【No.%s - %s】", data_set_idx + 1, bone_name)
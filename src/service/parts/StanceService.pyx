@@ -1564,6 +1564,9 @@ cdef class StanceService():
                             # 플래그ONの場合のみ, 키 프레임保持
                             d_on_fnos.append(fno)
 
+                    # 元モーションは書き換えないので、対象키 프레임のグローバル位置はまとめて求めておく
+                    org_pose_range = MServiceUtils.calc_global_pose_range(data_set.org_model, data_set.org_motion, fnos, [org_ik_root_links, org_leg_ik_links])
+
                     for fno_idx, fno in enumerate(fnos):
                         if fno not in ik_on_fnos:
                             # IK=ONの키 프레임ではない場合, 처리スルー
@@ -1584,8 +1587,8 @@ cdef class StanceService():
                                                             limit_links=rep_leg_ik_links.from_links(rep_leg_ik_links.get(target_bone_name, offset=-1).name), return_matrix=True)
 
                         # 처리대상ボーンまでの位置とグローバル座標
-                        org_ik_root_global_3ds = MServiceUtils.calc_global_pos(data_set.org_model, org_ik_root_links, data_set.org_motion, fno)
-                        org_leg_ik_global_3ds = MServiceUtils.calc_global_pos(data_set.org_model, org_leg_ik_links, data_set.org_motion, fno)
+                        org_ik_root_global_3ds = org_pose_range.calc_global_pos(org_ik_root_links, fno)
+                        org_leg_ik_global_3ds = org_pose_range.calc_global_pos(org_leg_ik_links, fno)
 
                         # 先リンク元(足ボーン)
                         rep_ik_root_global_3ds = MServiceUtils.calc_global_pos(data_set.rep_model, rep_ik_root_links, data_set.motion, fno)
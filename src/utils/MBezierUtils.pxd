@@ -11,14 +11,49 @@ cpdef np.ndarray calc_value_from_catmullrom(str bone_name, list fnos, list value
 
 cdef bint fit_bezier_mmd(list bzs)
 
-cdef tuple c_join_value_2_bezier(int fno, str bone_name, list values, double offset, double diff_limit)
+cdef tuple c_join_value_2_bezier(int fno, str bone_name, list values, double offset, double diff_limit, bint is_least_squares)
+
+cdef tuple c_fit_value_2_bezier(int fno, str bone_name, list values, double offset, double diff_limit)
 
 cdef tuple convert_catmullrom_2_bezier(np.ndarray xs, np.ndarray ys)
 
 cdef tuple c_evaluate(int x1v, int y1v, int x2v, int y2v, int start, int now, int end)
 
+cdef class BezierLUT:
+    cdef readonly int x1v
+    cdef readonly int x2v
+    cdef double x1
+    cdef double x2
+    cdef double[::1] xs
+    cdef int[::1] x_counts
+    cdef readonly bint is_monotone
+
+    cdef double c_calc_t(self, double x)
+
+cdef class BezierLUTCache:
+    cdef public int max_size
+    cdef public long hits
+    cdef public long misses
+    cdef public long discards
+    cdef readonly int size
+    cdef int key_size
+    cdef list luts
+    cdef np.int64_t[::1] last_used
+    cdef long long clock
+    cdef object lock
+
+    cdef BezierLUT c_get(self, int x1v, int x2v)
+
+cdef tuple c_evaluate_frames(int x1v, int y1v, int x2v, int y2v, int start, np.ndarray nows, int end)
+
+cdef np.ndarray c_evaluate_range(np.ndarray x1vs, np.ndarray y1vs, np.ndarray x2vs, np.ndarray y2vs, np.ndarray starts, np.ndarray nows, np.ndarray ends)
+
 cdef tuple c_evaluate_by_t(int x1v, int y1v, int x2v, int y2v, int start, int end, double t)
 
+cdef tuple c_split_bezier_mmd(int x1v, int y1v, int x2v, int y2v, int start, int now, int end)
+
+cdef bint c_is_fit_bezier_mmd(double* xs, double* ys, double offset) nogil
+
 cdef tuple split_bezier(int x1v, int y1v, int x2v, int y2v, int start, int now, int end)
 
 cdef list scale_bezier(MVector2D p1, MVector2D p2, MVector2D p3, MVector2D p4)
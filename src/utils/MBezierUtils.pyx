@@ -4,17 +4,26 @@ from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MM
 from utils.MLogger import MLogger # noqa
 import numpy as np
 cimport numpy as np
+cimport cython
+from libc.math cimport floor, fabs, fmod, fmin, fmax, isfinite, INFINITY
+from libc.limits cimport INT_MIN, INT_MAX
+import threading
 
 import ctypes
 ctypes.cdll.LoadLibrary(r".\bezier-2a44d276.dll")
 
 import bezier
 cimport bezier._curve
+import inspect
 
 logger = MLogger(__name__, level=1)
 
+# 交点の検証を省く引数名（bezier 2020.x は _verify、それ以降は verify）
+INTERSECT_VERIFY_ARG = "verify" if "verify" in inspect.signature(bezier.Curve.intersect).parameters else "_verify"
+
 # MMDでの補間曲線の最大値
 INTERPOLATION_MMD_MAX = 127
+cdef double INTERPOLATION_MMD_MAX_VALUE = INTERPOLATION_MMD_MAX
 # MMDの線形補間
 LINEAR_MMD_INTERPOLATION = [MVector2D(0, 0), MVector2D(20, 20), MVector2D(107, 107), MVector2D(127, 127)]
 
@@ -42,6 +51,18 @@ MZ_y1_idxs = [6, 21, 51, 36]
 MZ_x2_idxs = [10, 25, 55, 40]
 MZ_y2_idxs = [14, 29, 59, 44]
 
+# 補間曲線の表（BezierLUT）の刻み数
+# 二分法の最初の BEZIER_LUT_LEVEL 回で判定するtは、すべて 1 / BEZIER_LUT_SIZE の倍数になる
+cdef int BEZIER_LUT_LEVEL = 8
+cdef int BEZIER_LUT_SIZE = 1 << BEZIER_LUT_LEVEL
+
+# 最小二乗法での補間曲線の当てはめで、制御点を寄せ直す最大回数
+cdef int BEZIER_FIT_ITERATIONS = 10
+# 最小二乗法での補間曲線の当てはめで、tを求める二分法の回数
+cdef int BEZIER_FIT_BISECT_COUNT = 30
+# 始点と終点の値の差がこれ未満の場合、値は変わらないと見なす
+cdef double BEZIER_FIT_FLAT_LIMIT = 1e-9
+
 BZ_TYPE_MX = "MX"
 BZ_TYPE_MY = "MY"
 BZ_TYPE_MZ = "MZ"
@@ -137,17 +158,21 @@ cpdef np.ndarray calc_value_from_catmullrom(str bone_name, list fnos, list value
         return np.empty(1)
 
 
-# 指定したすべての値を通るカトマル曲線からベジェ曲線を計算し、MMD補間曲線範囲内に収められた場合、そのベジェ曲線を返す
-def join_value_2_bezier(fno: int, bone_name: str, values: list, offset=0, diff_limit=0.01):
-    return_tuple = c_join_value_2_bezier(fno, bone_name, values, offset, diff_limit)
+# 指定したすべての値を通るベジェ曲線を計算し、MMD補間曲線範囲内に収められた場合、そのベジェ曲線を返す
+# is_least_squares: True の場合、最小二乗法で直接当てはめる。False の場合、カトマル曲線から次数を減らして求める（従来の方法）
+def join_value_2_bezier(fno: int, bone_name: str, values: list, offset=0, diff_limit=0.01, is_least_squares=False):
+    return_tuple = c_join_value_2_bezier(fno, bone_name, values, offset, diff_limit, is_least_squares)
     return return_tuple[0], return_tuple[1]
 
-cdef tuple c_join_value_2_bezier(int fno, str bone_name, list values, double offset, double diff_limit):
+cdef tuple c_join_value_2_bezier(int fno, str bone_name, list values, double offset, double diff_limit, bint is_least_squares):
     if len(values) <= 2:
         # 次数が1の場合、線形補間
         logger.debug("차수 1: values: %s", values)
         return (LINEAR_MMD_INTERPOLATION, [])
 
+    if is_least_squares:
+        return c_fit_value_2_bezier(fno, bone_name, values, offset, diff_limit)
+
     cdef np.ndarray[np.double_t, ndim=1] xs, yx
     cdef np.ndarray[np.float_t, ndim=1] bz_x, bz_y, reduce_bz_x, reduce_bz_y, bezier_x, diff_ys, full_ys, reduced_ys, diff_large
     cdef np.ndarray[np.float_t, ndim=2] nodes
@@ -287,6 +312,221 @@ cdef tuple c_join_value_2_bezier(int fno, str bone_name, list values, double off
         return (None, [])
 
 
+# 指定したすべての値に、MMD用の3次ベジェ曲線を最小二乗法で直接当てはめる
+# 始点(0, 0)と終点(1, 1)は固定し、2つの制御点は0-1（MMDの0-127）の範囲に制約する
+# MMDと同じく、フレームの進み具合をXとしてtを求め、そのtでのYと値の差（縦方向の残差）を最小にする
+# 当てはめた曲線はMMDの値に丸めた上で、全フレームをまとめて評価して誤差を判定する
+cdef tuple c_fit_value_2_bezier(int fno, str bone_name, list values, double offset, double diff_limit):
+    cdef np.ndarray[np.float64_t, ndim=1] vs, xs, ws, ts, ss, b1, b2, b3, errors, params, next_params, vector
+    cdef np.ndarray[np.float64_t, ndim=2] matrix
+    cdef np.ndarray normal_matrix = np.zeros((4, 4), dtype=np.float64)
+    cdef np.ndarray normal_vector = np.zeros(4, dtype=np.float64)
+    cdef np.ndarray nows
+    cdef double start_value, diff_value, limit, x1, y1, x2, y2, cost, next_cost, damping
+    cdef int n, x1v, y1v, x2v, y2v, iteration
+    cdef double bz_xs[4]
+    cdef double bz_ys[4]
+    cdef list joined_bz
+
+    n = len(values)
+    vs = np.array(values, dtype=np.float64)
+    start_value = vs[0]
+    diff_value = vs[-1] - vs[0]
+    limit = diff_limit * (offset + 1)
+
+    if fabs(diff_value) < BEZIER_FIT_FLAT_LIMIT:
+        # 始点と終点が同じ値の場合、補間曲線に関わらず値は変わらないので、すべて始点の値と見なせるかだけ判定する
+        errors = np.abs(vs - start_value)
+        if np.count_nonzero(errors > limit) > 0:
+            return (None, np.where(errors > limit)[0].tolist())
+
+        return (LINEAR_MMD_INTERPOLATION, [])
+
+    # Xはフレームの進み具合(0-1)、Yは値の進み具合(始点0、終点1)
+    xs = np.arange(n, dtype=np.float64) / (n - 1)
+    ws = (vs - start_value) / diff_value
+
+    # 初期値は t = X として、X・Yそれぞれを線形の最小二乗法で求める
+    ts = xs
+    ss = 1 - ts
+    b1 = 3 * ss * ss * ts
+    b2 = 3 * ss * ts * ts
+    b3 = ts * ts * ts
+    x1, x2 = c_solve_box_least_squares(np.dot(b1, b1), np.dot(b1, b2), np.dot(b2, b2), np.dot(b1, xs - b3), np.dot(b2, xs - b3))
+    y1, y2 = c_solve_box_least_squares(np.dot(b1, b1), np.dot(b1, b2), np.dot(b2, b2), np.dot(b1, ws - b3), np.dot(b2, ws - b3))
+
+    # 4つの値（x1, y1, x2, y2）をレーベンバーグ・マーカート法で寄せる（範囲外に出た値は0-1に戻す）
+    params = np.array([x1, y1, x2, y2], dtype=np.float64)
+    cost = c_calc_fit_residual(params, xs, ws, normal_matrix, normal_vector)
+    damping = 1e-3
+
+    for iteration in range(BEZIER_FIT_ITERATIONS):
+        matrix = normal_matrix.copy()
+        vector = normal_vector.copy()
+        next_cost = cost
+
+        while damping <= 1e6:
+            next_params = np.clip(params + np.linalg.solve(matrix + damping * np.diag(np.diag(matrix) + 1e-12), -vector), 0, 1)
+            next_cost = c_calc_fit_residual(next_params, xs, ws, normal_matrix, normal_vector)
+
+            if next_cost < cost:
+                break
+
+            damping *= 10
+
+        if next_cost >= cost:
+            # これ以上改善しない場合、終了
+            break
+
+        params = next_params
+        damping = fmax(damping / 10, 1e-9)
+
+        if cost - next_cost <= next_cost * 1e-4:
+            # 改善がわずかな場合、終了
+            break
+
+        cost = next_cost
+
+    # MMD用補間曲線に変換
+    # Xを丸めた後、MMDで使われるtでYだけをもう一度求めて、丸めによる誤差を減らす
+    nows = np.arange(n, dtype=np.intc)
+    x1v = c_round_integer(params[0] * INTERPOLATION_MMD_MAX_VALUE)
+    x2v = c_round_integer(params[2] * INTERPOLATION_MMD_MAX_VALUE)
+
+    ts = c_evaluate_frames(x1v, 0, x2v, 0, 0, nows, n - 1)[2]
+    ss = 1 - ts
+    b1 = 3 * ss * ss * ts
+    b2 = 3 * ss * ts * ts
+    b3 = ts * ts * ts
+    y1, y2 = c_solve_box_least_squares(np.dot(b1, b1), np.dot(b1, b2), np.dot(b2, b2), np.dot(b1, ws - b3), np.dot(b2, ws - b3))
+
+    y1v = c_round_integer(y1 * INTERPOLATION_MMD_MAX_VALUE)
+    y2v = c_round_integer(y2 * INTERPOLATION_MMD_MAX_VALUE)
+
+    bz_xs[:] = [0, x1v, x2v, INTERPOLATION_MMD_MAX_VALUE]
+    bz_ys[:] = [0, y1v, y2v, INTERPOLATION_MMD_MAX_VALUE]
+    joined_bz = c_to_bezier_list(bz_xs, bz_ys)
+
+    if not c_is_fit_bezier_mmd(bz_xs, bz_ys, 0):
+        # 制御点が全部0の場合、MMD用補間曲線として不整合
+        return (None, [])
+
+    # 丸めた補間曲線で全フレームの値をまとめて求め、元の値との差を取る
+    errors = np.abs(start_value + diff_value * c_evaluate_frames(x1v, y1v, x2v, y2v, 0, nows, n - 1)[1] - vs)
+    logger.debug("f: %s, %s, values: %s, joined_bz: %s, %s, errors: %s, diff_limit: %s", fno, bone_name, values, joined_bz[1], joined_bz[2], errors, diff_limit)
+
+    if np.count_nonzero(errors > limit) > 0:
+        # 差が大きい箇所がある場合、分割不可
+        return (None, np.where(errors > limit)[0].tolist())
+
+    # すべてクリアした場合、補間曲線採用
+    return (joined_bz, [])
+
+
+# 制御点(x1, y1, x2, y2)での、各フレームの縦方向の残差の二乗和を求める
+# あわせて、ガウス・ニュートン法の正規方程式（J^T J と J^T r）を求める
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double c_calc_fit_residual(double[::1] params, double[::1] xs, double[::1] ws, double[:, ::1] normal_matrix, double[::1] normal_vector) nogil:
+    cdef double x1 = params[0]
+    cdef double y1 = params[1]
+    cdef double x2 = params[2]
+    cdef double y2 = params[3]
+    cdef double cost = 0
+    cdef double t, s, b1, b2, r, dx, dy, g
+    cdef double jacobian[4]
+    cdef Py_ssize_t k
+    cdef int i, j
+
+    normal_matrix[:, :] = 0
+    normal_vector[:] = 0
+
+    for k in range(xs.shape[0]):
+        t = c_solve_bezier_t(x1, x2, xs[k])
+        s = 1 - t
+        b1 = 3 * s * s * t
+        b2 = 3 * s * t * t
+        r = b1 * y1 + b2 * y2 + t * t * t - ws[k]
+        cost += r * r
+
+        # x1, x2 はtを通して残差に効く（X(t) = x より、dt/dx1 = -b1 / X'(t)）
+        dx = 3 * s * s * x1 + 6 * s * t * (x2 - x1) + 3 * t * t * (1 - x2)
+        dy = 3 * s * s * y1 + 6 * s * t * (y2 - y1) + 3 * t * t * (1 - y2)
+        g = dy / dx if dx > 1e-9 else 0
+
+        jacobian[0] = -g * b1
+        jacobian[1] = b1
+        jacobian[2] = -g * b2
+        jacobian[3] = b2
+
+        for i in range(4):
+            normal_vector[i] += jacobian[i] * r
+            for j in range(4):
+                normal_matrix[i, j] += jacobian[i] * jacobian[j]
+
+    return cost
+
+
+# 補間曲線のXがxになるt（制御点が0-1の範囲ならXは単調増加なので、二分法で求める）
+@cython.cdivision(True)
+cdef inline double c_solve_bezier_t(double x1, double x2, double x) nogil:
+    cdef double t_min = 0
+    cdef double t_max = 1
+    cdef double t, s
+    cdef int i
+
+    for i in range(BEZIER_FIT_BISECT_COUNT):
+        t = (t_min + t_max) / 2
+        s = 1 - t
+
+        if 3 * s * s * t * x1 + 3 * s * t * t * x2 + t * t * t < x:
+            t_min = t
+        else:
+            t_max = t
+
+    return (t_min + t_max) / 2
+
+
+# 2変数の最小二乗問題（正規方程式 G * c = h）を、両方の変数を0-1に制約して解く
+# 制約なしの解が範囲外の場合、境界（どちらかの変数が0か1）上の最小値のうち、一番小さいものを採る
+@cython.cdivision(True)
+cdef tuple c_solve_box_least_squares(double g11, double g12, double g22, double h1, double h2):
+    cdef double det = g11 * g22 - g12 * g12
+    cdef double c1, c2, f
+    cdef double best_c1 = 0
+    cdef double best_c2 = 0
+    cdef double best_f = INFINITY
+    cdef double bound
+    cdef int i
+
+    if det > 1e-12:
+        c1 = (g22 * h1 - g12 * h2) / det
+        c2 = (g11 * h2 - g12 * h1) / det
+
+        if 0 <= c1 <= 1 and 0 <= c2 <= 1:
+            return (c1, c2)
+
+    for i in range(4):
+        bound = i % 2
+        if i < 2:
+            # c1を境界に固定
+            c1 = bound
+            c2 = fmin(fmax((h2 - g12 * c1) / g22, 0), 1) if g22 > 0 else 0
+        else:
+            # c2を境界に固定
+            c2 = bound
+            c1 = fmin(fmax((h1 - g12 * c2) / g11, 0), 1) if g11 > 0 else 0
+
+        f = g11 * c1 * c1 + 2 * g12 * c1 * c2 + g22 * c2 * c2 - 2 * (h1 * c1 + h2 * c2)
+        if f < best_f:
+            best_f = f
+            best_c1 = c1
+            best_c2 = c2
+
+    return (best_c1, best_c2)
+
+
 cdef bint fit_bezier_mmd(list bzs):
     for bz in bzs:
         bz.effective()
@@ -365,7 +605,7 @@ cdef np.ndarray intersect_by_x(curve, np.ndarray xs):
         line1 = bezier.Curve(np.asfortranarray([[x, x], [-99999, 99999]]), degree=1)
 
         # 交点を求める（高精度は求めない）
-        intersections = curve.intersect(line1, _verify=False)
+        intersections = curve.intersect(line1, **{INTERSECT_VERIFY_ARG: False})
 
         # tからyを求め直す
         s_vals = np.asfortranarray(intersections[0, :])
@@ -396,8 +636,8 @@ cdef tuple c_evaluate(int x1v, int y1v, int x2v, int y2v, int start, int now, in
     if (now - start) == 0 or (end - start) == 0:
         return (0, 0, 0)
 
-    cdef double x, x1, x2, y1, y2, t, s, ft, y
-    cdef int i
+    cdef double x, x1, x2, y1, y2, t, s, y
+    cdef BezierLUT lut = (<BezierLUTCache>bezier_lut_cache).c_get(x1v, x2v)
 
     x = (now - start) / (end - start)
     x1 = x1v / INTERPOLATION_MMD_MAX
@@ -405,27 +645,262 @@ cdef tuple c_evaluate(int x1v, int y1v, int x2v, int y2v, int start, int now, in
     y1 = y1v / INTERPOLATION_MMD_MAX
     y2 = y2v / INTERPOLATION_MMD_MAX
 
-    t = 0.5
-    s = 0.5
-
     # 二分法
-    # logger.test("x1: %s, x2: %s, y1: %s, y2: %s, x: %s", x1, x2, y1, y2, x)
-    for i in range(15):
-        ft = (3 * (s * s) * t * x1) + (3 * s * (t * t) * x2) + (t * t * t) - x
+    t = c_calc_t(lut, x1, x2, x)
+    s = 1 - t
+
+    y = (3 * (s * s) * t * y1) + (3 * s * (t * t) * y2) + (t * t * t)
+
+    # logger.test("y: %s, t: %s, s: %s", y, t, s)
+
+    return (x, y, t)
+
+
+# 補間曲線のxになるt（表がある場合は表を使う）
+cdef inline double c_calc_t(BezierLUT lut, double x1, double x2, double x):
+    if lut is None:
+        return c_bisect_t(x1, x2, x, NULL, NULL)
+
+    return lut.c_calc_t(x)
+
+
+# 補間曲線のxになるtを二分法で求める（15回）
+# xs がある場合、最初の BEZIER_LUT_LEVEL 回は計算済みのXと比べる（計算の順番が同じなので、結果も同じ）
+# さらに x_counts がある場合（表が単調増加の場合）、その回数分の結果は、x以下の表の値の数から直接求める
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline double c_bisect_t(double x1, double x2, double x, double* xs, int* x_counts) nogil:
+    cdef double t = 0.5
+    cdef double s = 0.5
+    cdef double ft
+    cdef int i
+    cdef int start_i = 0
+    cdef int m
+
+    if xs != NULL and x_counts != NULL and 0 <= x <= 1:
+        # xの区間より前の値の数から数え始めて、x以下の値の数を数える
+        m = x_counts[min(<int>(x * BEZIER_LUT_SIZE), BEZIER_LUT_SIZE - 1)]
+        while m < BEZIER_LUT_SIZE - 1 and not (xs[m + 1] - x > 0):
+            m += 1
+
+        t = (m + 0.5) / BEZIER_LUT_SIZE
+        s = 1 - t
+        start_i = BEZIER_LUT_LEVEL
+
+    for i in range(start_i, 15):
+        if xs != NULL and i < BEZIER_LUT_LEVEL:
+            ft = xs[<int>(t * BEZIER_LUT_SIZE)] - x
+        else:
+            ft = (3 * (s * s) * t * x1) + (3 * s * (t * t) * x2) + (t * t * t) - x
         # logger.test("i: %s, 4 << i: %s, ft: %s(%s), t: %s, s: %s", i, (4 << i), ft, abs(ft) < 0.00001, t, s)
 
         if ft > 0:
-            t -= 1 / (4 << i)
+            t -= 1 / <double>(4 << i)
         else:
-            t += 1 / (4 << i)
+            t += 1 / <double>(4 << i)
 
         s = 1 - t
 
-    y = (3 * (s * s) * t * y1) + (3 * s * (t * t) * y2) + (t * t * t)
+    return t
+
+
+# 補間曲線の二分法用の表（X側の制御点 (x1, x2) 毎に1つ）
+# 表の刻みのtでのXを先に計算しておき、二分法の最初の BEZIER_LUT_LEVEL 回はその値で済ませる
+cdef class BezierLUT:
+    def __init__(self, int x1v, int x2v):
+        cdef double t, s
+        cdef int k, m
+
+        self.x1v = x1v
+        self.x2v = x2v
+        self.x1 = x1v / INTERPOLATION_MMD_MAX
+        self.x2 = x2v / INTERPOLATION_MMD_MAX
+        self.xs = np.empty(BEZIER_LUT_SIZE + 1, dtype=np.float64)
+        self.x_counts = np.zeros(BEZIER_LUT_SIZE, dtype=np.int32)
+
+        for k in range(BEZIER_LUT_SIZE + 1):
+            t = k / <double>BEZIER_LUT_SIZE
+            s = 1 - t
+            self.xs[k] = (3 * (s * s) * t * self.x1) + (3 * s * (t * t) * self.x2) + (t * t * t)
+
+        # 丸め誤差で単調増加になっていない場合は、二分法の順番通りに表を引く
+        self.is_monotone = bool(np.all(np.diff(self.xs) >= 0))
+
+        if self.is_monotone:
+            # xの区間毎に、区間の始まり以下の値の数（両端は除く）
+            m = 0
+            for k in range(BEZIER_LUT_SIZE):
+                while m < BEZIER_LUT_SIZE - 1 and self.xs[m + 1] <= k / <double>BEZIER_LUT_SIZE:
+                    m += 1
+                self.x_counts[k] = m
+
+    # xになるt
+    def calc_t(self, x: float):
+        return self.c_calc_t(x)
+
+    cdef double c_calc_t(self, double x):
+        if self.is_monotone:
+            return c_bisect_t(self.x1, self.x2, x, &self.xs[0], &self.x_counts[0])
+
+        return c_bisect_t(self.x1, self.x2, x, &self.xs[0], NULL)
+
+
+# 補間曲線の表のキャッシュ（使われていないものから捨てる）
+# 制御点は0-127なので、(x1, x2) 毎の枠を先に用意して、辞書を引かずに取得する
+cdef class BezierLUTCache:
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.key_size = INTERPOLATION_MMD_MAX + 1
+        self.luts = [None] * (self.key_size * self.key_size)
+        # 最後に使った順番（空き枠は最大値）
+        self.last_used = np.full(self.key_size * self.key_size, np.iinfo(np.int64).max, dtype=np.int64)
+        self.clock = 0
+        self.size = 0
+        self.lock = threading.Lock()
+        self.reset_counts()
+
+    def get(self, x1v: int, x2v: int):
+        return self.c_get(x1v, x2v)
+
+    # 範囲外の制御点の場合はNone
+    cdef BezierLUT c_get(self, int x1v, int x2v):
+        cdef int idx
+        cdef Py_ssize_t old_idx
+        cdef BezierLUT lut
+
+        if x1v < 0 or x1v >= self.key_size or x2v < 0 or x2v >= self.key_size:
+            return None
+
+        idx = x1v * self.key_size + x2v
+        self.clock += 1
+
+        lut = self.luts[idx]
+        if lut is not None:
+            self.hits += 1
+            self.last_used[idx] = self.clock
+            return lut
+
+        with self.lock:
+            lut = self.luts[idx]
+            if lut is None:
+                self.misses += 1
+
+                while self.size > 0 and self.size >= self.max_size:
+                    # 一番使われていないものから捨てる
+                    old_idx = np.argmin(self.last_used)
+                    self.luts[old_idx] = None
+                    self.last_used[old_idx] = np.iinfo(np.int64).max
+                    self.size -= 1
+                    self.discards += 1
+
+                lut = BezierLUT(x1v, x2v)
+                self.luts[idx] = lut
+                self.size += 1
+
+            self.last_used[idx] = self.clock
+
+        return lut
+
+    # (ヒット数, ミス数, 破棄数, 保持数)
+    def counts(self):
+        with self.lock:
+            return (self.hits, self.misses, self.discards, self.size)
+
+    def reset_counts(self):
+        self.hits = 0
+        self.misses = 0
+        self.discards = 0
+
+    def clear(self):
+        with self.lock:
+            self.luts = [None] * (self.key_size * self.key_size)
+            self.last_used[:] = np.iinfo(np.int64).max
+            self.size = 0
+
+
+bezier_lut_cache = BezierLUTCache()
+
+
+# 1つの補間曲線で、複数フレームをまとめて評価する（各フレームの求め方はc_evaluateと同じ）
+# nows: 評価するフレーム番号の配列  戻り値: x, y, t それぞれの配列
+def evaluate_frames(x1v: int, y1v: int, x2v: int, y2v: int, start: int, nows, end: int):
+    return c_evaluate_frames(x1v, y1v, x2v, y2v, start, np.asarray(nows, dtype=np.int32), end)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef tuple c_evaluate_frames(int x1v, int y1v, int x2v, int y2v, int start, np.ndarray nows, int end):
+    cdef Py_ssize_t n = np.PyArray_DIM(nows, 0)
+    cdef np.ndarray xs = np.zeros(n, dtype=np.float64)
+    cdef np.ndarray ys = np.zeros(n, dtype=np.float64)
+    cdef np.ndarray ts = np.zeros(n, dtype=np.float64)
+    cdef int[:] nowv = nows
+    cdef double[:] xv = xs
+    cdef double[:] yv = ys
+    cdef double[:] tv = ts
+    cdef BezierLUT lut = (<BezierLUTCache>bezier_lut_cache).c_get(x1v, x2v)
+    cdef double max_value = INTERPOLATION_MMD_MAX
+    cdef double x, x1, x2, y1, y2, t, s
+    cdef Py_ssize_t k
+
+    x1 = x1v / max_value
+    x2 = x2v / max_value
+    y1 = y1v / max_value
+    y2 = y2v / max_value
+
+    for k in range(n):
+        if (nowv[k] - start) == 0 or (end - start) == 0:
+            continue
 
-    # logger.test("y: %s, t: %s, s: %s", y, t, s)
+        x = (nowv[k] - start) / <double>(end - start)
+        t = c_calc_t(lut, x1, x2, x)
+        s = 1 - t
 
-    return (x, y, t)
+        xv[k] = x
+        yv[k] = (3 * (s * s) * t * y1) + (3 * s * (t * t) * y2) + (t * t * t)
+        tv[k] = t
+
+    return (xs, ys, ts)
+
+
+# 複数フレームの補間曲線をまとめて評価し、yの配列を返す（引数はすべて同じ長さの配列）
+# 各フレームの求め方はc_evaluateと同じ
+def evaluate_range(x1vs, y1vs, x2vs, y2vs, starts, nows, ends):
+    return c_evaluate_range(np.asarray(x1vs, dtype=np.int32), np.asarray(y1vs, dtype=np.int32), np.asarray(x2vs, dtype=np.int32), np.asarray(y2vs, dtype=np.int32), \
+                            np.asarray(starts, dtype=np.int32), np.asarray(nows, dtype=np.int32), np.asarray(ends, dtype=np.int32))
+
+cdef np.ndarray c_evaluate_range(np.ndarray x1vs, np.ndarray y1vs, np.ndarray x2vs, np.ndarray y2vs, np.ndarray starts, np.ndarray nows, np.ndarray ends):
+    cdef Py_ssize_t n = np.PyArray_DIM(nows, 0)
+    cdef np.ndarray ys = np.zeros(n, dtype=np.float64)
+    cdef int[:] x1v = x1vs
+    cdef int[:] y1v = y1vs
+    cdef int[:] x2v = x2vs
+    cdef int[:] y2v = y2vs
+    cdef int[:] startv = starts
+    cdef int[:] nowv = nows
+    cdef int[:] endv = ends
+    cdef double[:] yv = ys
+    cdef BezierLUTCache lut_cache = bezier_lut_cache
+    cdef double max_value = INTERPOLATION_MMD_MAX
+    cdef double x, x1, x2, y1, y2, t, s
+    cdef Py_ssize_t k
+
+    for k in range(n):
+        if (nowv[k] - startv[k]) == 0 or (endv[k] - startv[k]) == 0:
+            continue
+
+        x = (nowv[k] - startv[k]) / <double>(endv[k] - startv[k])
+        x1 = x1v[k] / max_value
+        x2 = x2v[k] / max_value
+        y1 = y1v[k] / max_value
+        y2 = y2v[k] / max_value
+
+        # 二分法
+        t = c_calc_t(lut_cache.c_get(x1v[k], x2v[k]), x1, x2, x)
+        s = 1 - t
+
+        yv[k] = (3 * (s * s) * t * y1) + (3 * s * (t * t) * y2) + (t * t * t)
+
+    return ys
 
 
 # 指定されたtになるフレーム番号を取得する
@@ -438,51 +913,83 @@ cdef tuple c_evaluate_by_t(int x1v, int y1v, int x2v, int y2v, int start, int en
         # 差が1以内の場合、終了
         return (start, 0, t)
 
-    cdef double x1, x2, y1, y2
+    cdef double x1, x2, y1, y2, x, y
     cdef int fno
 
-    x1 = x1v / INTERPOLATION_MMD_MAX
-    x2 = x2v / INTERPOLATION_MMD_MAX
-    y1 = y1v / INTERPOLATION_MMD_MAX
-    y2 = y2v / INTERPOLATION_MMD_MAX
-
-    # 補間曲線
-    curve1 = bezier.Curve(np.asfortranarray([[0, x1, x2, 1], [0, y1, y2, 1]]), degree=3)
+    x1 = x1v / INTERPOLATION_MMD_MAX_VALUE
+    x2 = x2v / INTERPOLATION_MMD_MAX_VALUE
+    y1 = y1v / INTERPOLATION_MMD_MAX_VALUE
+    y2 = y2v / INTERPOLATION_MMD_MAX_VALUE
 
     # 単一の評価(x, y)
-    es = curve1.evaluate(t)
+    x = c_evaluate_bezier_value(x1, x2, t)
+    y = c_evaluate_bezier_value(y1, y2, t)
 
     # xに相当するフレーム番号
-    fno = int(round_integer(start + ((end - start) * es[0, 0])))
+    fno = c_round_integer(start + ((end - start) * x))
+
+    return (fno, y, t)
+
 
-    return (fno, es[1, 0], t)
+# 補間曲線（始点0、終点1）の、tでの値
+# bezier.Curve.evaluate と同じ順番（VS Algorithm: 二項係数 × tの累乗 を、(1 - t) を掛けながら足し込む）で計算する
+@cython.cdivision(True)
+cdef inline double c_evaluate_bezier_value(double v1, double v2, double t) nogil:
+    cdef double s = 1.0 - t
+    cdef double t2 = t * t
+    cdef double v = s * 0.0
+
+    v = (v + (3.0 * t) * v1) * s
+    v = (v + (3.0 * t2) * v2) * s
+    v += (t * t2) * 1.0
+
+    return v
 
 
 # 3次ベジェ曲線の分割
 def split_bezier_mmd(x1v: int, y1v: int, x2v: int, y2v: int, start: int, now: int, end: int):
+    return c_split_bezier_mmd(x1v, y1v, x2v, y2v, start, now, end)
+
+cdef tuple c_split_bezier_mmd(int x1v, int y1v, int x2v, int y2v, int start, int now, int end):
     if (now - start) == 0 or (end - start) == 0:
         return 0, 0, 0, False, False, LINEAR_MMD_INTERPOLATION, LINEAR_MMD_INTERPOLATION
 
+    cdef double x, y, t
+    cdef double before_xs[4]
+    cdef double before_ys[4]
+    cdef double after_xs[4]
+    cdef double after_ys[4]
+
     # 3次ベジェ曲線を分割する
-    return_tuple = split_bezier(x1v, y1v, x2v, y2v, start, now, end)
-    x = return_tuple[0]
-    y = return_tuple[1]
-    t = return_tuple[2]
-    before_bz = return_tuple[3]
-    after_bz = return_tuple[4]
+    x, y, t = c_evaluate(x1v, y1v, x2v, y2v, start, now, end)
+    c_split_bezier_points(x1v, y1v, x2v, y2v, t, before_xs, before_ys, after_xs, after_ys)
 
     # ベジェ曲線の値がMMD用に合っているかを加味して返す
-    return x, y, t, is_fit_bezier_mmd(before_bz), is_fit_bezier_mmd(after_bz), before_bz, after_bz
+    return x, y, t, c_is_fit_bezier_mmd(before_xs, before_ys, 0), c_is_fit_bezier_mmd(after_xs, after_ys, 0), \
+        c_to_bezier_list(before_xs, before_ys), c_to_bezier_list(after_xs, after_ys)
 
 
 # ベジェ曲線の値がMMD用に合っているか
 def is_fit_bezier_mmd(bz: list, offset=0):
-    for b in bz:
-        if not (0 - offset <= b.x() <= INTERPOLATION_MMD_MAX + offset) or not (0 - offset <= b.y() <= INTERPOLATION_MMD_MAX + offset):
+    cdef double xs[4]
+    cdef double ys[4]
+    cdef int i
+
+    for i in range(4):
+        xs[i] = bz[i].x()
+        ys[i] = bz[i].y()
+
+    return c_is_fit_bezier_mmd(xs, ys, offset)
+
+cdef bint c_is_fit_bezier_mmd(double* xs, double* ys, double offset) nogil:
+    cdef int i
+
+    for i in range(4):
+        if not (0 - offset <= xs[i] <= INTERPOLATION_MMD_MAX_VALUE + offset) or not (0 - offset <= ys[i] <= INTERPOLATION_MMD_MAX_VALUE + offset):
             # MMD用の範囲内でなければNG
             return False
 
-    if bz[1].x() == bz[1].y() == bz[2].x() == bz[2].y() == 0:
+    if xs[1] == ys[1] == xs[2] == ys[2] == 0:
         # 全部0なら不整合
         return False
 
@@ -492,31 +999,64 @@ def is_fit_bezier_mmd(bz: list, offset=0):
 # 3次ベジェ曲線の分割
 # http://geom.web.fc2.com/geometry/bezier/cut-cb.html
 cdef tuple split_bezier(int x1v, int y1v, int x2v, int y2v, int start, int now, int end):
+    cdef double x, y, t
+    cdef double before_xs[4]
+    cdef double before_ys[4]
+    cdef double after_xs[4]
+    cdef double after_ys[4]
+
     # 補間曲線の進んだ時間分を求める
-    return_tuple = c_evaluate(x1v, y1v, x2v, y2v, start, now, end)
-    cdef double x = return_tuple[0]
-    cdef double y = return_tuple[1]
-    cdef double t = return_tuple[2]
-
-    cdef MVector2D A = MVector2D(0.0, 0.0)
-    cdef MVector2D B = MVector2D(x1v / INTERPOLATION_MMD_MAX, y1v / INTERPOLATION_MMD_MAX)
-    cdef MVector2D C = MVector2D(x2v / INTERPOLATION_MMD_MAX, y2v / INTERPOLATION_MMD_MAX)
-    cdef MVector2D D = MVector2D(1.0, 1.0)
-
-    cdef MVector2D E = A * (1 - t) + B * t
-    cdef MVector2D F = B * (1 - t) + C * t
-    cdef MVector2D G = C * (1 - t) + D * t
-    cdef MVector2D H = E * (1 - t) + F * t
-    cdef MVector2D I = F * (1 - t) + G * t # noqa
-    cdef MVector2D J = H * (1 - t) + I * t
+    x, y, t = c_evaluate(x1v, y1v, x2v, y2v, start, now, end)
+    c_split_bezier_points(x1v, y1v, x2v, y2v, t, before_xs, before_ys, after_xs, after_ys)
+
+    return (x, y, t, c_to_bezier_list(before_xs, before_ys), c_to_bezier_list(after_xs, after_ys))
+
+
+# 3次ベジェ曲線をtで分割し、前後それぞれの制御点をMMD用の数値(0-127)で返す
+# 分割点を求める計算の順番は、MVector2Dで計算していた時と同じにしてある
+@cython.cdivision(True)
+cdef inline void c_split_bezier_points(int x1v, int y1v, int x2v, int y2v, double t, \
+                                       double* before_xs, double* before_ys, double* after_xs, double* after_ys) nogil:
+    cdef double s = 1 - t
+
+    c_split_bezier_axis(0.0, x1v / INTERPOLATION_MMD_MAX_VALUE, x2v / INTERPOLATION_MMD_MAX_VALUE, 1.0, t, s, before_xs, after_xs)
+    c_split_bezier_axis(0.0, y1v / INTERPOLATION_MMD_MAX_VALUE, y2v / INTERPOLATION_MMD_MAX_VALUE, 1.0, t, s, before_ys, after_ys)
+
+@cython.cdivision(True)
+cdef inline void c_split_bezier_axis(double a, double b, double c, double d, double t, double s, double* before_vs, double* after_vs) nogil:
+    cdef double e = a * s + b * t
+    cdef double f = b * s + c * t
+    cdef double g = c * s + d * t
+    cdef double h = e * s + f * t
+    cdef double i = f * s + g * t
+    cdef double j = h * s + i * t
 
     # 新たな4つのベジェ曲線の制御点は、A側がAEHJ、C側がJIGDとなる。
 
     # スケーリング
-    cdef list beforeBz = scale_bezier(A, E, H, J)
-    cdef list afterBz = scale_bezier(J, I, G, D)
+    before_vs[0] = c_scale_bezier_value(a, a, j - a)
+    before_vs[1] = c_scale_bezier_value(e, a, j - a)
+    before_vs[2] = c_scale_bezier_value(h, a, j - a)
+    before_vs[3] = c_scale_bezier_value(j, a, j - a)
 
-    return (x, y, t, beforeBz, afterBz)
+    after_vs[0] = c_scale_bezier_value(j, j, d - j)
+    after_vs[1] = c_scale_bezier_value(i, j, d - j)
+    after_vs[2] = c_scale_bezier_value(g, j, d - j)
+    after_vs[3] = c_scale_bezier_value(d, j, d - j)
+
+# 分割したベジェの点をスケーリングして、MMD用の数値に丸める
+@cython.cdivision(True)
+cdef inline double c_scale_bezier_value(double pn, double p1, double diff) nogil:
+    cdef double v = (pn - p1) / diff
+
+    # nanになったら0決め打ち
+    if not isfinite(v):
+        v = 0
+
+    return c_round_integer(v * INTERPOLATION_MMD_MAX_VALUE)
+
+cdef list c_to_bezier_list(double* xs, double* ys):
+    return [MVector2D(xs[0], ys[0]), MVector2D(xs[1], ys[1]), MVector2D(xs[2], ys[2]), MVector2D(xs[3], ys[3])]
 
 
 # 分割したベジェのスケーリング
@@ -563,8 +1103,34 @@ cdef MVector2D round_bezier_mmd(MVector2D target):
 
 
 cdef int round_integer(double t):
-    # 一旦整数部にまで持ち上げる
+    return c_round_integer(t)
+
+# round(round(t * 1000000, -6) / 1000000) と同じ値（偶数丸め）をCで求める
+# 一旦整数部にまで持ち上げて、1000000毎の商と余りで丸める（余りは誤差なく求まる）
+# nan, inf, intに収まらない値は0
+cdef inline int c_round_integer(double t) nogil:
     cdef double t2 = t * 1000000
+    cdef double k, r
+
+    if not isfinite(t2) or fabs(t2) > 3e15:
+        return 0
+
+    k = floor(t2 / 1000000)
+    r = t2 - k * 1000000
+
+    # 商の誤差を補正
+    if r < 0:
+        k -= 1
+        r += 1000000
+    elif r >= 1000000:
+        k += 1
+        r -= 1000000
+
+    # pythonは偶数丸めなので、ちょうど半分の場合は偶数に寄せる
+    if r > 500000 or (r == 500000 and fmod(k, 2) != 0):
+        k += 1
+
+    if k > INT_MAX or k < INT_MIN:
+        return 0
 
-    # pythonは偶数丸めなので、整数部で丸めた後、元に戻す
-    return round(round(t2, -6) / 1000000)
+    return <int>k
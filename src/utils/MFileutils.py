@@ -9,6 +9,11 @@ import glob
 import traceback
 from pathlib import Path
 import re
+import mmap
+import threading
+from collections import OrderedDict
+import hashlib
+from contextlib import contextmanager
 import _pickle as cPickle
 
 from utils.MLogger import MLogger # noqa
@@ -23,6 +28,78 @@ def resource_path(relative):
     return os.path.join(relative)
 
 
+# ファイルのハッシュ値キャッシュ（ファイルパス: ((サイズ, 更新日時), ハッシュ値)）
+# 読み込みスレッドから参照されるのでロックし、古いものから捨てる
+file_digests = OrderedDict()
+file_digests_lock = threading.Lock()
+FILE_DIGESTS_MAX = 100
+
+
+# ファイルをメモリマップで読み込み専用に開く（中身はコピーしない）
+@contextmanager
+def open_file_buffer(file_path):
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # 空ファイルはmmapできないので、空のバイト列
+            yield b''
+            return
+
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield buffer
+        finally:
+            try:
+                buffer.close()
+            except BufferError:
+                # 例外のトレースバックなどが参照を持っている場合、GCに任せる
+                pass
+
+
+# ファイルのハッシュ値を取得する
+# bufferが指定された場合はその内容から計算し、ない場合はサイズと更新日時が同じならキャッシュを返す
+def get_file_digest(file_path, buffer=None):
+    stat = os.stat(file_path)
+    file_key = (stat.st_size, stat.st_mtime_ns)
+
+    if buffer is None:
+        with file_digests_lock:
+            if file_path in file_digests and file_digests[file_path][0] == file_key:
+                file_digests.move_to_end(file_path)
+                return file_digests[file_path][1]
+
+        with open_file_buffer(file_path) as file_buffer:
+            digest = calc_file_digest(file_path, file_buffer)
+    else:
+        digest = calc_file_digest(file_path, buffer)
+
+    with file_digests_lock:
+        file_digests[file_path] = (file_key, digest)
+        file_digests.move_to_end(file_path)
+        while len(file_digests) > FILE_DIGESTS_MAX:
+            file_digests.popitem(last=False)
+
+    return digest
+
+
+# ファイル内容のハッシュ値を計算する
+def calc_file_digest(file_path, buffer):
+    sha1 = hashlib.sha1()
+    # 従来の読み込み単位
+    chunk_size = 2048 * sha1.block_size
+
+    with memoryview(buffer) as view:
+        sha1.update(view)
+
+        # 従来通り、最後の読み込み単位をもう一度含める
+        if len(view) > 0:
+            sha1.update(view[((len(view) - 1) // chunk_size) * chunk_size:])
+
+    # ファイルパスをハッシュに含める
+    sha1.update(file_path.encode('utf-8'))
+
+    return sha1.hexdigest()
+
+
 # ファイル履歴読み込み
 def read_history(mydir_path):
     # ファイル履歴
@@ -5,6 +5,7 @@ import logging
 import traceback
 import threading
 import sys
+import io
 
 import cython
 
@@ -51,6 +52,16 @@ class MLogger():
         # sh.setStream(sys.stdout)
         self.logger.addHandler(sh)
 
+    # 指定レベルのログが出力対象か（重い引数を組み立てる前に判定する）
+    def is_enabled(self, level):
+        return self.total_level <= level and self.default_level <= level
+
+    # 出力時にのみ評価するログ引数を生成する
+    # logger.debug("rot: %s", MLogger.lazy(bf.rotation.toEulerAngles4MMD)) のように関数と引数を渡す
+    @staticmethod
+    def lazy(func, *args):
+        return MLazyArg(func, args)
+
     def copy(self, options):
         self.is_file = options.is_file
         self.outout_datetime = options.outout_datetime
@@ -156,7 +167,7 @@ class MLogger():
 
         target_level = kwargs.pop("level", logging.INFO)
         # if self.logger.isEnabledFor(target_level) and self.default_level <= target_level:
-        if self.total_level <= target_level and self.default_level <= target_level:
+        if self.is_enabled(target_level):
 
             if self.is_file:
                 for f in self.logger.handlers:
@@ -273,8 +284,36 @@ class MLogger():
         cls.outout_datetime = "{0:%Y%m%d_%H%M%S}".format(datetime.now())
 
 
+# 出力時（文字列化時）にのみ評価されるログ引数
+class MLazyArg():
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.value = None
+        self.is_evaluated = False
+
+    # 1回の出力でメッセージを何度か組み立てるので、評価結果は保持する
+    def evaluate(self):
+        if not self.is_evaluated:
+            self.value = self.func(*self.args)
+            self.is_evaluated = True
+
+        return self.value
+
+    def __str__(self):
+        return str(self.evaluate())
+
+    def __repr__(self):
+        return repr(self.evaluate())
+
+
 @cython.ccall
 def print_message(msg: str, target_level: int):
-    sys.stdout.write(msg + "\n", (target_level < MLogger.INFO))
+    if isinstance(sys.stdout, io.TextIOBase):
+        # GUIのコンソールではなく標準出力の場合（ベンチマークなど）
+        sys.stdout.write(msg + "\n")
+    else:
+        sys.stdout.write(msg + "\n", (target_level < MLogger.INFO))
 
 
@@ -3,15 +3,105 @@ import numpy as np
 cimport numpy as np
 
 from mmd.PmxData cimport PmxModel, Bone
-from mmd.VmdData cimport VmdMotion, VmdBoneFrame
+from mmd.VmdData cimport VmdMotion, VmdBoneFrame, VmdPoseCache, c_get_frames_version
 from module.MParams cimport BoneLinks # noqa
-from module.MMath cimport MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
+from module.MMath cimport MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4, MTransform, new_MTransform, MVector3DArray, MQuaternionArray, MMatrix4x4Array # noqa
 
-cdef c_calc_IK(PmxModel model, BoneLinks links, VmdMotion motion, int fno, MVector3D target_pos, BoneLinks ik_links, int max_count)
+cdef class IKChainPose
+
+cdef class IKSolveStats:
+    cdef public long analytic_count
+    cdef public double analytic_time
+    cdef public long ccd_count
+    cdef public double ccd_time
+    cdef public long fallback_count
+    cdef object lock
+
+    cdef c_add(self, bint is_analytic, bint is_fallback, double elapsed)
+
+cdef class IKWarmStart:
+    cdef public dict deltas
+    cdef public bint is_warm
+    cdef public long solve_count
+    cdef public long converged_count
+    cdef public long warm_count
+    cdef public dict iteration_counts
+
+    cdef bint c_apply(self, VmdMotion motion, int fno, dict start_rotations, IKChainPose chain_pose, str effector_name, MVector3D target_pos)
+    cdef c_record(self, VmdMotion motion, int fno, dict start_rotations, int iterations, bint is_converged)
+
+cdef c_calc_IK(PmxModel model, BoneLinks links, VmdMotion motion, int fno, MVector3D target_pos, BoneLinks ik_links, int max_count, bint is_analytic=*, \
+               IKWarmStart warm_start=*)
+
+cdef MQuaternion c_correct_ik_rotation(int fno, Bone ik_bone, MQuaternion rotation, MQuaternion correct_qq, dict bone_axis_dict)
 
 cdef tuple c_separate_local_qq(int fno, str bone_name, MQuaternion qq, MVector3D global_x_axis)
 
-cdef tuple c_calc_global_pos(PmxModel model, BoneLinks links, VmdMotion motion, int fno, BoneLinks limit_links, bint return_matrix, bint is_local_x)
+cdef tuple c_calc_global_pos(PmxModel model, BoneLinks links, VmdMotion motion, int fno, BoneLinks limit_links, bint return_matrix, bint is_local_x, bint return_transform=*)
+
+cdef dict c_to_matrixs(dict total_transforms)
+
+cdef tuple c_calc_global_transform(PmxModel model, BoneLinks links, VmdMotion motion, int fno, BoneLinks limit_links, bint is_local_x)
+
+cdef c_calc_chain_transforms(list trans_vs, list transforms, list global_positions, list global_transforms, int start)
+
+cdef class IKChainPose:
+    cdef PmxModel model
+    cdef BoneLinks links
+    cdef VmdMotion motion
+    cdef int fno
+    cdef dict link_indexes
+    cdef bint is_incremental
+    cdef list trans_vs
+    cdef list transforms
+    cdef list global_positions
+    cdef list global_transforms
+
+    cdef c_calc_all(self)
+    cdef c_update(self, str bone_name)
+    cdef MVector3D c_get_position(self, str bone_name)
+    cdef MTransform c_get_transform(self, str bone_name)
+
+cdef bint c_has_effect_link(PmxModel model, BoneLinks links, set bone_names)
+
+cdef bint c_is_two_bone_links(IKChainPose chain_pose, BoneLinks ik_links)
+
+cdef bint c_calc_two_bone_IK(int fno, MVector3D target_pos, BoneLinks ik_links, IKChainPose chain_pose, VmdMotion motion, dict bone_axis_dict)
+
+cdef tuple c_get_pose_stamp(PmxModel model, VmdMotion motion, Bone bone)
+
+cdef tuple c_calc_global_pos_by_cache(PmxModel model, BoneLinks links, VmdMotion motion, int fno, VmdPoseCache pose_cache, bint is_local_x)
+
+cdef MMatrix4x4 c_calc_local_x_matrix(PmxModel model, BoneLinks links, str lname)
+
+cdef MQuaternion c_calc_local_x_qq(PmxModel model, BoneLinks links, str lname)
+
+cdef class GlobalPoseRange:
+    cdef public PmxModel model
+    cdef public VmdMotion motion
+    cdef public np.ndarray fnos
+    cdef public dict poses
+    cdef public dict matrixs
+    cdef public dict bone_keys
+    cdef dict bone_values
+
+    cdef tuple c_calc_global_pos(self, BoneLinks links, int fno, bint is_local_x)
+    cdef object c_append_chain(self, list bones)
+    cdef tuple c_get_bone_values(self, str bone_name)
+
+cdef GlobalPoseRange c_calc_global_pose_range(PmxModel model, VmdMotion motion, np.ndarray fnos, list links_list)
+
+cdef list c_get_bone_chain(PmxModel model, str bone_name, dict chains)
+
+cdef np.ndarray c_deform_rotation_range(PmxModel model, VmdMotion motion, str bone_name, np.ndarray fnos, np.ndarray rotations)
+
+cdef np.ndarray c_deform_fix_rotation_range(str bone_name, MVector3D fixed_axis, np.ndarray rots)
+
+cdef np.ndarray c_mul_quaternion_range(np.ndarray q1s, np.ndarray q2s)
+
+cdef np.ndarray c_calc_matrix_range(np.ndarray trans_vs, np.ndarray rots)
+
+cdef np.ndarray c_mul_position_range(np.ndarray mats, np.ndarray vs)
 
 cpdef dict calc_global_pos_by_direction(MQuaternion direction_qq, dict target_pos_3ds_dic)
 
@@ -3,11 +3,14 @@
 import numpy as np # noqa
 import math # noqa
 import numpy as np
+import threading
+from time import perf_counter
 cimport numpy as np
+cimport cython
 from libc.math cimport sin, cos, acos, atan2, asin, pi, sqrt
 
 from module.MParams import BoneLinks # noqa
-from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
+from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4, MTransform, MVector3DArray, MQuaternionArray, MMatrix4x4Array # noqa
 from mmd.PmxData import PmxModel, Bone, Vertex, Material, Morph, DisplaySlot, RigidBody, Joint # noqa
 from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
 from module.MOptions import MOptionsDataSet # noqa
@@ -17,13 +20,119 @@ from utils.MLogger import MLogger # noqa
 logger = MLogger(__name__, level=MLogger.DEBUG)
 
 
+# IK計算の解法ごとの回数と所要時間（サイジング1回分の集計）
+cdef class IKSolveStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset_counts()
+
+    cdef c_add(self, bint is_analytic, bint is_fallback, double elapsed):
+        with self.lock:
+            if is_analytic:
+                self.analytic_count += 1
+                self.analytic_time += elapsed
+            else:
+                self.ccd_count += 1
+                self.ccd_time += elapsed
+
+            if is_fallback:
+                self.fallback_count += 1
+
+    # (解析解の回数, 解析解の秒数, CCDの回数, CCDの秒数, 解析解からCCDに切り替えた回数)
+    def counts(self):
+        with self.lock:
+            return (self.analytic_count, self.analytic_time, self.ccd_count, self.ccd_time, self.fallback_count)
+
+    def reset_counts(self):
+        self.analytic_count = 0
+        self.analytic_time = 0
+        self.ccd_count = 0
+        self.ccd_time = 0
+        self.fallback_count = 0
+
+
+ik_solve_stats = IKSolveStats()
+
+
+# 連続するフレームのIK計算で、前のフレームの解を開始値として引き継ぐ（チェーン毎に1つ）
+# 引き継ぐのは、IKで加えた回転量（開始時の回転からの差分）
+cdef class IKWarmStart:
+    # is_warm: Falseの場合、前のフレームの解は引き継がずに反復回数だけ記録する（引き継いだ場合との比較用）
+    def __init__(self, is_warm=True):
+        self.deltas = {}
+        self.is_warm = is_warm
+        self.reset_counts()
+
+    # 前のフレームの解を引き継ぐ。引き継がない方が目標に近い場合は元に戻す
+    cdef bint c_apply(self, VmdMotion motion, int fno, dict start_rotations, IKChainPose chain_pose, str effector_name, MVector3D target_pos):
+        cdef double cold_distance
+        cdef str bone_name
+        cdef VmdBoneFrame bf
+
+        if not self.is_warm or not self.deltas:
+            return False
+
+        cold_distance = (chain_pose.c_get_position(effector_name) - target_pos).lengthSquared()
+
+        for bone_name in start_rotations.keys():
+            if bone_name in self.deltas:
+                bf = motion.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
+                bf.rotation = bf.rotation * self.deltas[bone_name]
+        chain_pose.c_calc_all()
+
+        if (chain_pose.c_get_position(effector_name) - target_pos).lengthSquared() < cold_distance:
+            self.warm_count += 1
+            return True
+
+        for bone_name in start_rotations.keys():
+            bf = motion.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
+            bf.rotation = (<MQuaternion>start_rotations[bone_name]).copy()
+        chain_pose.c_calc_all()
+
+        return False
+
+    # 解いた結果を次のフレーム用に保持し、反復回数を記録する
+    cdef c_record(self, VmdMotion motion, int fno, dict start_rotations, int iterations, bint is_converged):
+        cdef str bone_name
+        cdef MQuaternion start_qq
+
+        if self.is_warm:
+            for bone_name, start_qq in start_rotations.items():
+                self.deltas[bone_name] = start_qq.inverted() * motion.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False).rotation
+
+        self.solve_count += 1
+        if is_converged:
+            self.converged_count += 1
+        self.iteration_counts[iterations] = self.iteration_counts.get(iterations, 0) + 1
+
+    # (計算回数, 収束した回数, 前のフレームの解を引き継いだ回数, 反復回数: その回数)
+    def counts(self):
+        return (self.solve_count, self.converged_count, self.warm_count, dict(sorted(self.iteration_counts.items())))
+
+    # 1回あたりの平均反復回数
+    def mean_iterations(self):
+        if not self.solve_count:
+            return 0
+        return sum([iterations * cnt for iterations, cnt in self.iteration_counts.items()]) / self.solve_count
+
+    def reset_counts(self):
+        self.solve_count = 0
+        self.converged_count = 0
+        self.warm_count = 0
+        self.iteration_counts = {}
+
+
 # IK計算
 # target_pos: IKリンクの目的位置
 # ik_links: IKリンク
-def calc_IK(model: PmxModel, links: BoneLinks, motion: VmdMotion, fno: int, target_pos: MVector3D, ik_links: BoneLinks, max_count=10):
-    c_calc_IK(model, links, motion, fno, target_pos, ik_links, max_count)
-
-cdef c_calc_IK(PmxModel model, BoneLinks links, VmdMotion motion, int fno, MVector3D target_pos, BoneLinks ik_links, int max_count):
+# is_analytic: 2ボーンのリンク（腕/ひじ/手首、足/ひざ/足首）の場合、解析解で求める（収束しなかった場合はCCDで続ける）
+# warm_start: 前のフレームの解を開始値にする場合、チェーン毎のIKWarmStart（is_warm=Falseの場合は反復回数の記録のみ）
+def calc_IK(model: PmxModel, links: BoneLinks, motion: VmdMotion, fno: int, target_pos: MVector3D, ik_links: BoneLinks, max_count=10, is_analytic=False, \
+            warm_start=None):
+    c_calc_IK(model, links, motion, fno, target_pos, ik_links, max_count, is_analytic, warm_start)
+
+cdef c_calc_IK(PmxModel model, BoneLinks links, VmdMotion motion, int fno, MVector3D target_pos, BoneLinks ik_links, int max_count, bint is_analytic=False, \
+               IKWarmStart warm_start=None):
     cdef list bone_name_list = list(ik_links.all().keys())[1:]
     cdef str bone_name
     cdef VmdBoneFrame bf
@@ -49,11 +158,9 @@ cdef c_calc_IK(PmxModel model, BoneLinks links, VmdMotion motion, int fno, MVect
     cdef int ik_idx
     cdef str joint_name
     cdef Bone ik_bone
-    cdef dict global_3ds_dic
-    cdef dict total_mats
     cdef MVector3D global_effector_pos
-    cdef MMatrix4x4 joint_mat
-    cdef MMatrix4x4 inv_coord
+    cdef MTransform joint_tf
+    cdef MTransform inv_coord
     cdef MVector3D basis2_effector
     cdef MVector3D basis2_target
     cdef double rotation_dot
@@ -61,27 +168,60 @@ cdef c_calc_IK(PmxModel model, BoneLinks links, VmdMotion motion, int fno, MVect
     cdef MVector3D rotation_axis
     cdef double rotation_degree
     cdef MQuaternion correct_qq
-    cdef MQuaternion new_ik_qq
-    cdef MQuaternion x_qq, y_qq, z_qq, yz_qq
-    cdef double x_degree, y_degree, z_degree, new_x_degree, new_y_degree, new_z_degree, elbow_degree, new_elbow_degree
+
+    # 現在のボーングローバル位置と剛体変換（ジョイントを動かす度に、子側だけ計算し直す）
+    cdef IKChainPose chain_pose = IKChainPose(model, links, motion, fno, set(bone_name_list))
+
+    cdef double start_time = perf_counter()
+    cdef bint is_two_bone = is_analytic and c_is_two_bone_links(chain_pose, ik_links)
+    cdef dict start_rotations = None
+    cdef int iterations = 0
+    cdef bint is_converged = False
+
+    if warm_start is not None:
+        # 開始時の回転（解いた結果との差分を、次のフレームに引き継ぐ）
+        start_rotations = {bone_name: motion.c_calc_bf(bone_name, fno, is_key=False, is_read=False, is_reset_interpolation=False).rotation.copy() \
+                           for bone_name in bone_name_list}
+        if not is_two_bone:
+            # 解析解は開始値によらないので、CCDの場合だけ引き継ぐ
+            warm_start.c_apply(motion, fno, start_rotations, chain_pose, ik_links.first_name(), target_pos)
+
+        # 既に目標に届いている場合、反復しない
+        if (chain_pose.c_get_position(ik_links.first_name()) - target_pos).lengthSquared() < 0.0001:
+            (<IKSolveStats>ik_solve_stats).c_add(is_two_bone, False, perf_counter() - start_time)
+            warm_start.c_record(motion, fno, start_rotations, 0, True)
+            return
+
+    if is_two_bone:
+        iterations += 1
+
+        if c_calc_two_bone_IK(fno, target_pos, ik_links, chain_pose, motion, bone_axis_dict):
+            (<IKSolveStats>ik_solve_stats).c_add(True, False, perf_counter() - start_time)
+            if warm_start is not None:
+                # 届かない目標で解析解を採用した場合は、未収束として数える
+                warm_start.c_record(motion, fno, start_rotations, iterations, \
+                                    (chain_pose.c_get_position(ik_links.first_name()) - target_pos).lengthSquared() < 0.0001)
+            return
+
+        # 可動範囲外などで届かなかった場合、解析解の結果からCCDで続ける
+        logger.debug("2ボーンIK未収束: f: %s, %s", fno, list(ik_links.all().keys()))
 
     for cnt in range(max_count):
+        iterations += 1
+
         # 規定回数ループ
         for ik_idx, joint_name in enumerate(bone_name_list):
             # 処理対象IKボーン
             ik_bone = ik_links.get(joint_name)
 
-            # 現在のボーングローバル位置と行列を取得
-            global_3ds_dic, total_mats = c_calc_global_pos(model, links, motion, fno, limit_links=None, return_matrix=True, is_local_x=False)
-
             # エフェクタ（末端）
-            global_effector_pos = global_3ds_dic[ik_links.first_name()]
+            global_effector_pos = chain_pose.c_get_position(ik_links.first_name())
 
             # 注目ノード（実際に動かすボーン）
-            joint_mat = total_mats[joint_name]
+            joint_tf = chain_pose.c_get_transform(joint_name)
 
-            # ワールド座標系から注目ノードの局所座標系への変換
-            inv_coord = joint_mat.inverted()
+            # ワールド座標系から注目ノードの局所座標系への変換（剛体変換なので逆行列を求めずに済む）
+            inv_coord = joint_tf.inverted()
 
             # 注目ノードを起点とした、エフェクタのローカル位置
             local_effector_pos = inv_coord * global_effector_pos
@@ -109,53 +249,189 @@ cdef c_calc_IK(PmxModel model, BoneLinks links, VmdMotion motion, int fno, MVect
                 # 関節回転量の補正(最大変位量を制限する)
                 correct_qq = MQuaternion.fromAxisAndAngle(rotation_axis, min(rotation_degree, ik_bone.degree_limit))
 
-                # 軸制限がある場合、軸制限上の角度に変換する
-                if ik_bone.fixed_axis != MVector3D():
-                    correct_qq = deform_fix_rotation(joint_name, ik_bone.fixed_axis, correct_qq)
-
                 # ジョイントに補正をかける
                 bf = motion.c_calc_bf(joint_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
-                new_ik_qq = bf.rotation * correct_qq
+                bf.rotation = c_correct_ik_rotation(fno, ik_bone, bf.rotation, correct_qq, bone_axis_dict)
+
+                # 動かしたジョイントから子側のグローバル位置を計算し直す
+                chain_pose.c_update(joint_name)
+
+        # 位置の差がほとんどない場合、終了
+        if (local_effector_pos - local_target_pos).lengthSquared() < 0.0001:
+            is_converged = True
+            break
 
-                # 軸制限がある場合、軸制限上の角度に変換する
-                if ik_bone.fixed_axis != MVector3D():
-                    new_ik_qq = deform_fix_rotation(joint_name, ik_bone.fixed_axis, new_ik_qq)
+    (<IKSolveStats>ik_solve_stats).c_add(False, is_two_bone, perf_counter() - start_time)
 
-                # IK軸制限がある場合、上限下限をチェック
-                if ik_bone.ik_limit_min != MVector3D() and ik_bone.ik_limit_max != MVector3D():
-                    x_qq, y_qq, z_qq, yz_qq = separate_local_qq(fno, ik_bone.name, new_ik_qq, bone_axis_dict[ik_bone.name]["x"])
+    if warm_start is not None:
+        warm_start.c_record(motion, fno, start_rotations, iterations, is_converged)
 
-                    # logger.debug("new_ik_qq: %s, x_qq: %s, y_qq: %s, z_qq: %s", new_ik_qq.toEulerAngles(), x_qq.toEulerAngles(), y_qq.toEulerAngles(), z_qq.toEulerAngles())
+    return
 
-                    x_degree = x_qq.toDegree()
-                    y_degree = y_qq.toDegree()
-                    z_degree = z_qq.toDegree()
 
-                    logger.debug("new_ik_qq: %s, x_qq: %s, y_qq: %s, z_qq: %s", new_ik_qq.toEulerAngles4MMD(), x_degree, y_degree, z_degree)
+# ジョイントの回転に補正をかけ、軸制限・IK軸制限の範囲に収めた回転を返す
+cdef MQuaternion c_correct_ik_rotation(int fno, Bone ik_bone, MQuaternion rotation, MQuaternion correct_qq, dict bone_axis_dict):
+    cdef MQuaternion new_ik_qq
+    cdef MQuaternion x_qq, y_qq, z_qq, yz_qq
+    cdef double x_degree, y_degree, z_degree, new_x_degree, new_y_degree, new_z_degree
 
-                    new_x_degree = min(ik_bone.ik_limit_max.x(), max(ik_bone.ik_limit_min.x(), x_degree))
-                    new_y_degree = min(ik_bone.ik_limit_max.y(), max(ik_bone.ik_limit_min.y(), y_degree))
-                    new_z_degree = min(ik_bone.ik_limit_max.z(), max(ik_bone.ik_limit_min.z(), z_degree))
+    # 軸制限がある場合、軸制限上の角度に変換する
+    if ik_bone.fixed_axis != MVector3D():
+        correct_qq = deform_fix_rotation(ik_bone.name, ik_bone.fixed_axis, correct_qq)
 
-                    x_qq = MQuaternion.fromAxisAndAngle(x_qq.vector(), new_x_degree)
-                    y_qq = MQuaternion.fromAxisAndAngle(y_qq.vector(), new_y_degree)
-                    z_qq = MQuaternion.fromAxisAndAngle(z_qq.vector(), new_z_degree)
+    new_ik_qq = rotation * correct_qq
 
-                    new_ik_qq = y_qq * x_qq * z_qq
+    # 軸制限がある場合、軸制限上の角度に変換する
+    if ik_bone.fixed_axis != MVector3D():
+        new_ik_qq = deform_fix_rotation(ik_bone.name, ik_bone.fixed_axis, new_ik_qq)
 
-                    logger.debug(f"yxz: {(y_qq * z_qq * x_qq).toEulerAngles4MMD()}")
+    # IK軸制限がある場合、上限下限をチェック
+    if c_has_ik_limit(ik_bone):
+        x_qq, y_qq, z_qq, yz_qq = separate_local_qq(fno, ik_bone.name, new_ik_qq, bone_axis_dict[ik_bone.name]["x"])
 
-                    diff = "○" if (x_degree != new_x_degree or y_degree != new_y_degree or z_degree != new_z_degree) else "－"
-                    logger.debug(f"limit_degree: {diff}: {x_degree}, {y_degree}, {z_degree} -> {new_x_degree}, {new_y_degree}, {new_z_degree}")
-                    logger.debug(f"limit_qq: {new_ik_qq.toEulerAngles4MMD()}")
+        # logger.debug("new_ik_qq: %s, x_qq: %s, y_qq: %s, z_qq: %s", new_ik_qq.toEulerAngles(), x_qq.toEulerAngles(), y_qq.toEulerAngles(), z_qq.toEulerAngles())
 
-                bf.rotation = new_ik_qq
+        x_degree = x_qq.toDegree()
+        y_degree = y_qq.toDegree()
+        z_degree = z_qq.toDegree()
 
-        # 位置の差がほとんどない場合、終了
-        if (local_effector_pos - local_target_pos).lengthSquared() < 0.0001:
-            return
+        if logger.is_enabled(MLogger.DEBUG):
+            logger.debug("new_ik_qq: %s, x_qq: %s, y_qq: %s, z_qq: %s", new_ik_qq.toEulerAngles4MMD(), x_degree, y_degree, z_degree)
 
-    return
+        new_x_degree = min(ik_bone.ik_limit_max.x(), max(ik_bone.ik_limit_min.x(), x_degree))
+        new_y_degree = min(ik_bone.ik_limit_max.y(), max(ik_bone.ik_limit_min.y(), y_degree))
+        new_z_degree = min(ik_bone.ik_limit_max.z(), max(ik_bone.ik_limit_min.z(), z_degree))
+
+        x_qq = MQuaternion.fromAxisAndAngle(x_qq.vector(), new_x_degree)
+        y_qq = MQuaternion.fromAxisAndAngle(y_qq.vector(), new_y_degree)
+        z_qq = MQuaternion.fromAxisAndAngle(z_qq.vector(), new_z_degree)
+
+        new_ik_qq = y_qq * x_qq * z_qq
+
+        if logger.is_enabled(MLogger.DEBUG):
+            logger.debug("yxz: %s", (y_qq * z_qq * x_qq).toEulerAngles4MMD())
+
+            diff = "○" if (x_degree != new_x_degree or y_degree != new_y_degree or z_degree != new_z_degree) else "－"
+            logger.debug("limit_degree: %s: %s, %s, %s -> %s, %s, %s", diff, x_degree, y_degree, z_degree, new_x_degree, new_y_degree, new_z_degree)
+            logger.debug("limit_qq: %s", new_ik_qq.toEulerAngles4MMD())
+
+    return new_ik_qq
+
+
+# 解析解で求められる2ボーンのリンクか（エフェクタ・中間・根元の順で、リンク上も同じ親子順）
+cdef bint c_is_two_bone_links(IKChainPose chain_pose, BoneLinks ik_links):
+    cdef list ik_names = list(ik_links.all().keys())
+    cdef str ik_name
+
+    if len(ik_names) != 3 or not chain_pose.is_incremental:
+        return False
+
+    for ik_name in ik_names:
+        if ik_name not in chain_pose.link_indexes:
+            return False
+
+    return chain_pose.link_indexes[ik_names[2]] < chain_pose.link_indexes[ik_names[1]] < chain_pose.link_indexes[ik_names[0]]
+
+
+# 2ボーンIK（解析解）
+# 中間ボーン（ひじ・ひざ）を曲げて根元からエフェクタまでの距離を合わせ、根元（腕・足）でエフェクタを目標に向ける
+# 曲げる軸は、中間ボーンに軸制限があればその軸、なければ今の曲げ方向の法線
+# 回転はCCDと同じく軸制限・IK軸制限の範囲に収め、目標に届いたかを返す
+@cython.cdivision(True)
+cdef bint c_calc_two_bone_IK(int fno, MVector3D target_pos, BoneLinks ik_links, IKChainPose chain_pose, VmdMotion motion, dict bone_axis_dict):
+    cdef list ik_names = list(ik_links.all().keys())
+    cdef str effector_name = ik_names[0]
+    cdef str middle_name = ik_names[1]
+    cdef str root_name = ik_names[2]
+    cdef Bone middle_bone = ik_links.get(middle_name)
+    cdef Bone root_bone = ik_links.get(root_name)
+    cdef VmdBoneFrame bf
+    cdef MQuaternion middle_qq
+    cdef MTransform inv_coord
+    cdef MVector3D root_pos, middle_pos, effector_pos, bend_axis, effector_vec, parallel_vec, perpendicular_vec, root_middle_vec
+    cdef MVector3D local_effector_pos, local_target_pos
+    cdef double a, b, r, rhs, phi, alpha, theta1, theta2, theta, rotation_dot
+    cdef bint is_out_of_reach
+
+    root_pos = chain_pose.c_get_position(root_name)
+    middle_pos = chain_pose.c_get_position(middle_name)
+    effector_pos = chain_pose.c_get_position(effector_name)
+    middle_qq = chain_pose.c_get_transform(middle_name).rotation()
+
+    # 中間ボーンを曲げる軸（グローバル）
+    if middle_bone.fixed_axis != MVector3D():
+        bend_axis = middle_qq * middle_bone.fixed_axis.normalized()
+    else:
+        bend_axis = MVector3D.crossProduct(middle_pos - root_pos, effector_pos - middle_pos)
+        if bend_axis.lengthSquared() < 1e-12:
+            # 伸びきっている場合、目標方向に曲げる
+            bend_axis = MVector3D.crossProduct(middle_pos - root_pos, target_pos - root_pos)
+        if bend_axis.lengthSquared() < 1e-12:
+            return False
+        bend_axis = bend_axis.normalized()
+
+    # 中間ボーンからエフェクタへのベクトルを、曲げる軸に平行な成分と垂直な成分に分ける
+    effector_vec = effector_pos - middle_pos
+    parallel_vec = bend_axis * MVector3D.dotProduct(effector_vec, bend_axis)
+    perpendicular_vec = effector_vec - parallel_vec
+    root_middle_vec = middle_pos - root_pos + parallel_vec
+
+    # 軸回りにθ回した時の根元からエフェクタまでの距離^2 = 定数 + 2 * (a * cosθ + b * sinθ)
+    a = MVector3D.dotProduct(root_middle_vec, perpendicular_vec)
+    b = MVector3D.dotProduct(root_middle_vec, MVector3D.crossProduct(bend_axis, perpendicular_vec))
+    r = sqrt(a * a + b * b)
+    if r < 1e-12:
+        return False
+
+    rhs = ((target_pos - root_pos).lengthSquared() - root_middle_vec.lengthSquared() - perpendicular_vec.lengthSquared()) / 2
+    phi = atan2(b, a)
+    # 届かない（届きすぎる）場合は、一番近い角度にする
+    is_out_of_reach = abs(rhs) > r
+    alpha = acos(max(-1, min(1, rhs / r)))
+
+    # 今の姿勢からの回転量が少ない方を採用する
+    theta1 = wrap_radian(phi - alpha)
+    theta2 = wrap_radian(phi + alpha)
+    theta = theta1 if abs(theta1) <= abs(theta2) else theta2
+
+    if abs(theta) > 0.0001:
+        bf = motion.c_calc_bf(middle_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
+        bf.rotation = c_correct_ik_rotation(fno, middle_bone, bf.rotation, \
+                                            MQuaternion.fromAxisAndAngle(middle_qq.inverted() * bend_axis, math.degrees(theta)), bone_axis_dict)
+        chain_pose.c_update(middle_name)
+
+    # 根元ボーンでエフェクタを目標に向ける
+    inv_coord = chain_pose.c_get_transform(root_name).inverted()
+    local_effector_pos = (inv_coord * chain_pose.c_get_position(effector_name)).normalized()
+    local_target_pos = (inv_coord * target_pos).normalized()
+
+    rotation_dot = acos(max(-1, min(1, MVector3D.dotProduct(local_effector_pos, local_target_pos))))
+    if abs(rotation_dot) > 0.0001:
+        bf = motion.c_calc_bf(root_name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
+        bf.rotation = c_correct_ik_rotation(fno, root_bone, bf.rotation, \
+                                            MQuaternion.fromAxisAndAngle(MVector3D.crossProduct(local_effector_pos, local_target_pos).normalized(), math.degrees(rotation_dot)), \
+                                            bone_axis_dict)
+        chain_pose.c_update(root_name)
+
+    if (chain_pose.c_get_position(effector_name) - target_pos).lengthSquared() < 0.0001:
+        return True
+
+    # 届かない目標の場合、制限がなければ今の姿勢が一番近いので、CCDには切り替えない
+    return is_out_of_reach and not c_has_ik_limit(middle_bone) and not c_has_ik_limit(root_bone) and root_bone.fixed_axis == MVector3D()
+
+
+# IK軸制限があるか
+cdef inline bint c_has_ik_limit(Bone ik_bone):
+    return ik_bone.ik_limit_min != MVector3D() and ik_bone.ik_limit_max != MVector3D()
+
+
+# -π～πに収める
+cdef inline double wrap_radian(double radian):
+    while radian > pi:
+        radian -= 2 * pi
+    while radian <= -pi:
+        radian += 2 * pi
+    return radian
 
 
 # クォータニオンをローカル軸の回転量に分離
@@ -275,92 +551,542 @@ cdef tuple c_calc_front_global_pos(PmxModel model, BoneLinks links, VmdMotion mo
 
 
 # グローバル位置算出
-def calc_global_pos(model: PmxModel, links: BoneLinks, motion: VmdMotion, fno: int, limit_links=None, return_matrix=False, is_local_x=False):
+def calc_global_pos(model: PmxModel, links: BoneLinks, motion: VmdMotion, fno: int, limit_links=None, return_matrix=False, is_local_x=False, return_transform=False):
     # cfun = profile(c_calc_global_pos)
     # return_tuple = cfun(model, links, motion, fno, limit_links, return_matrix, is_local_x)
-    return_tuple = c_calc_global_pos(model, links, motion, fno, limit_links, return_matrix, is_local_x)
-    if not return_matrix:
+    return_tuple = c_calc_global_pos(model, links, motion, fno, limit_links, return_matrix, is_local_x, return_transform)
+    if not return_matrix and not return_transform:
         return return_tuple[0]
     else:
-        # 行列も返す場合
+        # 行列（剛体変換）も返す場合
         return return_tuple[0], return_tuple[1]
 
-cdef tuple c_calc_global_pos(PmxModel model, BoneLinks links, VmdMotion motion, int fno, BoneLinks limit_links, bint return_matrix, bint is_local_x):
+# return_transform: 行列の代わりに剛体変換（MTransform）を返す
+# 行列は、return_matrix が指定された場合だけ剛体変換から変換する（それ以外は剛体変換のまま返す）
+cdef tuple c_calc_global_pos(PmxModel model, BoneLinks links, VmdMotion motion, int fno, BoneLinks limit_links, bint return_matrix, bint is_local_x, bint return_transform=False):
+    cdef dict global_3ds_dic
+    cdef dict total_transforms
+
+    if motion.pose_cache is not None and not limit_links:
+        # キャッシュが有効な場合、親から順に求めた結果を使い回す
+        global_3ds_dic, total_transforms = c_calc_global_pos_by_cache(model, links, motion, fno, <VmdPoseCache>motion.pose_cache, is_local_x)
+    else:
+        global_3ds_dic, total_transforms = c_calc_global_transform(model, links, motion, fno, limit_links, is_local_x)
+
+    if return_matrix and not return_transform:
+        return (global_3ds_dic, c_to_matrixs(total_transforms))
+
+    return (global_3ds_dic, total_transforms)
+
+
+# 剛体変換を行列に変換する
+cdef dict c_to_matrixs(dict total_transforms):
+    cdef dict total_mats = {}
+    cdef str lname
+    cdef MTransform tf
+
+    for lname, tf in total_transforms.items():
+        total_mats[lname] = tf.toMatrix4x4()
+
+    return total_mats
+
+
+# グローバル位置と、自身までの剛体変換の積
+cdef tuple c_calc_global_transform(PmxModel model, BoneLinks links, VmdMotion motion, int fno, BoneLinks limit_links, bint is_local_x):
     # pfun = profile(c_calc_relative_position)
     # cdef list trans_vs = pfun(model, links, motion, fno, limit_links)
     cdef list trans_vs = c_calc_relative_position(model, links, motion, fno, limit_links)
     cdef list add_qs = c_calc_relative_rotation(model, links, motion, fno, limit_links)
 
-    # 行列
-    cdef list matrixs = [MMatrix4x4() for i in range(links.size())]
+    # 剛体変換（移動してから回転）
+    cdef list transforms = []
     cdef int n
     cdef str lname
     cdef MVector3D v
     cdef MQuaternion q
-    cdef MMatrix4x4 mm
 
-    for n, (lname, v, q) in enumerate(zip(links.all().keys(), trans_vs, add_qs)):
-        # 行列を生成
-        mm = MMatrix4x4()
-        # 初期化
-        mm.setToIdentity()
-        # 移動
-        mm.translate(v)
-        # 回転
-        mm.rotate(q)
-        # 設定
-        matrixs[n] = mm
+    for v, q in zip(trans_vs, add_qs):
+        transforms.append(new_MTransform(q, v))
 
-    cdef dict total_mats = {}
+    cdef list global_positions = [None] * len(transforms)
+    cdef list global_transforms = [None] * len(transforms)
+    c_calc_chain_transforms(trans_vs, transforms, global_positions, global_transforms, 0)
+
+    cdef dict total_transforms = {}
     cdef dict global_3ds_dic = {}
 
-    cdef MMatrix4x4 local_x_matrix
-    cdef MVector3D local_axis
-    cdef MQuaternion local_axis_qq
+    for n, lname in enumerate(links.all().keys()):
+        global_3ds_dic[lname] = global_positions[n]
+        total_transforms[lname] = global_transforms[n]
+
+        # ローカル軸の向きを調整する
+        if n > 0 and is_local_x:
+            # 子の計算に使う積は書き換えないよう、別の剛体変換にする
+            total_transforms[lname] = (<MTransform>global_transforms[n]).mul_MTransform(new_MTransform(c_calc_local_x_qq(model, links, lname), MVector3D()))
 
-    for n, (lname, v) in enumerate(zip(links.all().keys(), trans_vs)):
+    return (global_3ds_dic, total_transforms)
+
+
+# チェーンのグローバル位置と、自身までの剛体変換の積を start 番目から求める
+# start より親側は global_positions, global_transforms に求めてあるものを使う
+cdef c_calc_chain_transforms(list trans_vs, list transforms, list global_positions, list global_transforms, int start):
+    cdef int n
+    cdef MTransform tf
+
+    for n in range(start, len(transforms)):
         if n == 0:
-            mm = MMatrix4x4()
-            mm.setToIdentity()
-
-        for m in range(n):
-            # 最後のひとつ手前までループ
-            if m == 0:
-                # 0番目の位置を初期値とする
-                mm = matrixs[0].copy()
-            else:
-                # 自分より前の行列結果を掛け算する
-                mm *= matrixs[m]
+            tf = MTransform()
+        elif n == 1:
+            # 0番目の位置を初期値とする
+            tf = transforms[0]
+        else:
+            # 自分より前の剛体変換の積は、ひとつ前で求めたものを使い回す
+            tf = global_transforms[n - 1]
 
         # 自分は、位置だけ掛ける
-        global_3ds_dic[lname] = mm * v
+        global_positions[n] = tf.mul_MVector3D(trans_vs[n])
+
+        # 最後の剛体変換をかけ算する
+        global_transforms[n] = tf.mul_MTransform(transforms[n])
+
+
+# IK計算中のチェーンのグローバル位置・剛体変換
+# IKで動くのはジョイントの回転だけなので、相対位置は最初に一度だけ求め、
+# ジョイントを動かしたら、そのジョイントから子側だけを計算し直す
+cdef class IKChainPose:
+    def __init__(self, PmxModel model, BoneLinks links, VmdMotion motion, int fno, set joint_names):
+        self.model = model
+        self.links = links
+        self.motion = motion
+        self.fno = fno
+        # ボーン名: リンク内のインデックス
+        self.link_indexes = {lname: n for n, lname in enumerate(links.all().keys())}
+        # 付与親でほかのリンクボーンの回転に影響する場合は、毎回全体を計算し直す
+        self.is_incremental = not c_has_effect_link(model, links, joint_names)
+        self.trans_vs = c_calc_relative_position(model, links, motion, fno, None)
+        self.transforms = []
+        self.global_positions = [None] * len(self.trans_vs)
+        self.global_transforms = [None] * len(self.trans_vs)
+
+        self.c_calc_all()
+
+    # 全ボーンの回転を取得し直して計算する
+    cdef c_calc_all(self):
+        cdef list add_qs = c_calc_relative_rotation(self.model, self.links, self.motion, self.fno, None)
+        cdef MVector3D v
+        cdef MQuaternion q
+
+        self.transforms = [new_MTransform(q, v) for v, q in zip(self.trans_vs, add_qs)]
+        c_calc_chain_transforms(self.trans_vs, self.transforms, self.global_positions, self.global_transforms, 0)
+
+    # 指定ボーンの回転を変えた後に呼ぶ
+    cdef c_update(self, str bone_name):
+        cdef int n
+        cdef VmdBoneFrame bf
+
+        if not self.is_incremental:
+            self.c_calc_all()
+            return
 
-        # 最後の行列をかけ算する
-        total_mats[lname] = mm * matrixs[n]
+        n = self.link_indexes[bone_name]
+        bf = self.motion.c_calc_bf(bone_name, self.fno, is_key=False, is_read=False, is_reset_interpolation=False)
+        self.transforms[n] = new_MTransform(deform_rotation(self.model, self.motion, bf), self.trans_vs[n])
+        c_calc_chain_transforms(self.trans_vs, self.transforms, self.global_positions, self.global_transforms, n)
+
+    cdef MVector3D c_get_position(self, str bone_name):
+        return self.global_positions[self.link_indexes[bone_name]]
+
+    cdef MTransform c_get_transform(self, str bone_name):
+        return self.global_transforms[self.link_indexes[bone_name]]
+
+
+# リンク内に、指定ボーンを（多段も含めて）付与親とするボーンがあるか
+cdef bint c_has_effect_link(PmxModel model, BoneLinks links, set bone_names):
+    cdef Bone bone
+    cdef Bone effect_bone
+    cdef int cnt
+
+    for bone in links.all().values():
+        if bone.name not in model.bones:
+            continue
+
+        bone = model.bones[bone.name]
+        cnt = 0
+
+        while bone.getExternalRotationFlag() and bone.effect_index in model.bone_indexes and cnt < 100:
+            effect_bone = model.bones[model.bone_indexes[bone.effect_index]]
+            if effect_bone.name in bone_names:
+                return True
+
+            bone = effect_bone
+            cnt += 1
+
+    return False
+
+# ボーンの回転・位置の計算に使うキーフレーム辞書と、その書き込み番号の組（自身と付与親）
+cdef tuple c_get_pose_stamp(PmxModel model, VmdMotion motion, Bone bone):
+    cdef list stamp = []
+    cdef object bf_dict = motion.bones.get(bone.name, None)
+    cdef Bone effect_bone = bone
+    cdef int cnt = 0
+
+    stamp.extend((bf_dict, c_get_frames_version(bf_dict)))
+
+    while cnt < 100 and effect_bone.getExternalRotationFlag() and effect_bone.effect_index in model.bone_indexes:
+        effect_bone = model.bones[model.bone_indexes[effect_bone.effect_index]]
+        bf_dict = motion.bones.get(effect_bone.name, None)
+        stamp.extend((bf_dict, c_get_frames_version(bf_dict)))
+        cnt += 1
+
+    return tuple(stamp)
+
+# キャッシュを使ったグローバル位置計算
+# 親からのリンクが同じ部分はキャッシュから取得し、残りのボーンだけ計算して등록する
+# 登録後にキーフレーム辞書が書き換えられたボーン以降は計算し直す
+cdef tuple c_calc_global_pos_by_cache(PmxModel model, BoneLinks links, VmdMotion motion, int fno, VmdPoseCache pose_cache, bint is_local_x):
+    cdef dict total_transforms = {}
+    cdef dict global_3ds_dic = {}
+    # 親からのリンクキー（同じボーン名でも、リンク上のボーン位置が違えば別のキー）
+    cdef BoneLinks link_key
+    cdef tuple pose
+    cdef tuple stamp
+    cdef bint is_hit = True
+    cdef int n
+    cdef str lname
+    cdef Bone link_bone
+    cdef Bone prev_bone = None
+    cdef VmdBoneFrame fill_bf
+    cdef MVector3D trans_v
+    cdef MVector3D global_pos
+    cdef MTransform tf
+    cdef MTransform parent_tf = None
+
+    for n, (lname, link_bone) in enumerate(links.all().items()):
+        link_key = links.c_prefix_key(n)
+        stamp = c_get_pose_stamp(model, motion, link_bone)
+        pose = pose_cache.c_get(model, fno, link_key, stamp) if is_hit else None
+
+        if pose is not None:
+            global_pos = pose[0]
+            parent_tf = pose[1]
+        else:
+            # 一度外れたら、以降の子は計算する
+            is_hit = False
+
+            # 位置と回転で同じキー情報を使う
+            fill_bf = motion.c_calc_bf(link_bone.name, fno, is_key=False, is_read=False, is_reset_interpolation=False)
+
+            if n == 0:
+                # 一番親は、グローバル座標を考慮
+                trans_v = link_bone.position + fill_bf.position
+                tf = MTransform()
+            else:
+                # 位置：自身から親の位置を引いた相対位置
+                trans_v = link_bone.position + fill_bf.position - prev_bone.position
+                tf = parent_tf
+
+            global_pos = tf.mul_MVector3D(trans_v)
+            parent_tf = tf.mul_MTransform(new_MTransform(deform_rotation(model, motion, fill_bf), trans_v))
+
+            # キャッシュしたものは書き換えられないよう、返すときは複製する
+            pose_cache.c_put(model, fno, link_key, stamp, global_pos, parent_tf)
+
+        global_3ds_dic[lname] = global_pos.copy()
 
-        # ローカル軸の向きを調整する
         if n > 0 and is_local_x:
-            # ボーン自身にローカル軸が設定されているか
-            local_x_matrix = MMatrix4x4()
-            local_x_matrix.setToIdentity()
+            total_transforms[lname] = parent_tf.mul_MTransform(new_MTransform(c_calc_local_x_qq(model, links, lname), MVector3D()))
+        else:
+            total_transforms[lname] = parent_tf.copy()
+
+        prev_bone = link_bone
+
+    return (global_3ds_dic, total_transforms)
+
+
+# ボーンのローカル軸の向きの行列
+cdef MMatrix4x4 c_calc_local_x_matrix(PmxModel model, BoneLinks links, str lname):
+    cdef MMatrix4x4 local_x_matrix = MMatrix4x4()
+    local_x_matrix.setToIdentity()
+    local_x_matrix.rotate(c_calc_local_x_qq(model, links, lname))
+
+    return local_x_matrix
+
+
+# ボーンのローカル軸の向きの回転
+cdef MQuaternion c_calc_local_x_qq(PmxModel model, BoneLinks links, str lname):
+    cdef MVector3D local_axis
+
+    # ボーン自身にローカル軸が設定されているか
+    if model.bones[lname].local_x_vector == MVector3D():
+        # ローカル軸が設定されていない場合、計算
+
+        # 自身から親を引いた軸の向き
+        local_axis = model.bones[lname].position - links.c_get_parent(lname).position
+        return MQuaternion.fromDirection(local_axis.normalized(), MVector3D(0, 0, 1))
+
+    # ローカル軸が設定されている場合、その値を採用
+    return MQuaternion.fromDirection(model.bones[lname].local_x_vector.normalized(), MVector3D(0, 0, 1))
+
+
+# 複数フレームのグローバル位置・行列を、ボーンごとに配列でまとめて求める
+# links_list: 計算対象リンクのリスト（省略時はモデルの親子関係で全ボーン）
+def calc_global_pose_range(model: PmxModel, motion: VmdMotion, fnos, links_list=None):
+    return c_calc_global_pose_range(model, motion, np.unique(np.asarray(fnos, dtype=np.int32)), links_list)
+
+cdef GlobalPoseRange c_calc_global_pose_range(PmxModel model, VmdMotion motion, np.ndarray fnos, list links_list):
+    cdef GlobalPoseRange pose_range = GlobalPoseRange(model, motion, fnos)
+    cdef BoneLinks links
+    cdef dict chains
+    cdef str bone_name
+
+    if links_list is None:
+        # 親から順に、ボーンごとの親までのチェーンを作る
+        chains = {}
+        for bone_name in model.bones.keys():
+            pose_range.bone_keys[bone_name] = pose_range.c_append_chain(c_get_bone_chain(model, bone_name, chains))
+    else:
+        for links in links_list:
+            pose_range.c_append_chain(list(links.all().values()))
+
+    return pose_range
+
+# モデルの親子関係で、一番親から指定ボーンまでのチェーンを求める
+cdef list c_get_bone_chain(PmxModel model, str bone_name, dict chains):
+    cdef Bone bone = model.bones[bone_name]
+    cdef list chain
+    cdef str parent_name
+
+    if bone_name in chains:
+        return chains[bone_name]
+
+    # 親子が循環している場合は、そこで打ち切る
+    chains[bone_name] = [bone]
+
+    if bone.parent_index in model.bone_indexes:
+        parent_name = model.bone_indexes[bone.parent_index]
+        chain = c_get_bone_chain(model, parent_name, chains)
+        if bone_name not in [b.name for b in chain]:
+            chains[bone_name] = chain + [bone]
+
+    return chains[bone_name]
+
+
+cdef class GlobalPoseRange:
+    def __init__(self, model, motion, fnos):
+        self.model = model
+        self.motion = motion
+        self.fnos = fnos
+        # リンクキー（c_calc_global_pos_by_cache と同じ）: (フレーム数, 3)のグローバル位置
+        self.poses = {}
+        # リンクキー: (フレーム数, 4, 4)の自身までの行列の積
+        self.matrixs = {}
+        # ボーン名: リンクキー（モデルの親子関係で求めた場合）
+        self.bone_keys = {}
+        # ボーン名: ((フレーム数, 3)の位置, (フレーム数, 4)の実際の回転)
+        self.bone_values = {}
+
+    # 1フレーム分を calc_global_pos と同じ形で返す
+    # 計算していないフレーム・リンクの場合は、その場でモーションから計算する
+    def calc_global_pos(self, links: BoneLinks, fno: int, return_matrix=False, is_local_x=False):
+        return_tuple = self.c_calc_global_pos(links, fno, is_local_x)
+        if not return_matrix:
+            return return_tuple[0]
+        else:
+            return return_tuple[0], return_tuple[1]
+
+    cdef tuple c_calc_global_pos(self, BoneLinks links, int fno, bint is_local_x):
+        cdef Py_ssize_t fidx = np.searchsorted(self.fnos, fno)
+        if fidx >= np.PyArray_DIM(self.fnos, 0) or self.fnos[fidx] != fno:
+            return c_calc_global_pos(self.model, links, self.motion, fno, None, True, is_local_x)
+
+        cdef list link_keys = []
+        cdef BoneLinks link_key
+        cdef int n
+
+        for n in range(links.size()):
+            link_key = links.c_prefix_key(n)
+            if link_key not in self.matrixs:
+                return c_calc_global_pos(self.model, links, self.motion, fno, None, True, is_local_x)
+            link_keys.append(link_key)
+
+        cdef dict total_mats = {}
+        cdef dict global_3ds_dic = {}
+        cdef str lname
+        cdef np.ndarray pos
+
+        for n, lname in enumerate(links.all().keys()):
+            pos = self.poses[link_keys[n]][fidx]
+            global_3ds_dic[lname] = MVector3D(pos[0], pos[1], pos[2])
+            total_mats[lname] = MMatrix4x4(self.matrixs[link_keys[n]][fidx])
+
+            if n > 0 and is_local_x:
+                total_mats[lname] = total_mats[lname] * c_calc_local_x_matrix(self.model, links, lname)
+
+        return (global_3ds_dic, total_mats)
+
+    # 指定ボーンの全フレームのグローバル位置（モデルの親子関係で求めた場合）
+    def get_global_positions(self, bone_name: str):
+        return self.poses[self.bone_keys[bone_name]]
+
+    # 指定ボーンの全フレームの行列（モデルの親子関係で求めた場合）
+    def get_global_matrixs(self, bone_name: str):
+        return self.matrixs[self.bone_keys[bone_name]]
+
+    # 親から順にチェーンのボーンを計算して登録し、末端のリンクキーを返す
+    cdef object c_append_chain(self, list bones):
+        cdef BoneLinks chain_links = BoneLinks(bones)
+        cdef BoneLinks link_key = None
+        cdef BoneLinks parent_key = None
+        cdef int n
+        cdef Bone bone
+        cdef Bone prev_bone = None
+        cdef np.ndarray positions, rotations, trans_vs, local_mats
+
+        for n, bone in enumerate(bones):
+            link_key = chain_links.c_prefix_key(n)
+
+            if link_key not in self.matrixs:
+                positions, rotations = self.c_get_bone_values(bone.name)
+
+                if n == 0:
+                    # 一番親は、グローバル座標を考慮
+                    trans_vs = positions + bone.position.data()
+                else:
+                    # 位置：自身から親の位置を引いた相対位置
+                    trans_vs = positions + bone.position.data() - prev_bone.position.data()
+
+                local_mats = c_calc_matrix_range(trans_vs, rotations)
 
-            local_axis_qq = MQuaternion()
+                if n == 0:
+                    self.poses[link_key] = trans_vs
+                    self.matrixs[link_key] = local_mats
+                else:
+                    self.poses[link_key] = c_mul_position_range(self.matrixs[parent_key], trans_vs)
+                    self.matrixs[link_key] = (MMatrix4x4Array(self.matrixs[parent_key]) * MMatrix4x4Array(local_mats)).data()
 
-            if model.bones[lname].local_x_vector == MVector3D():
-                # ローカル軸が設定されていない場合、計算
+            parent_key = link_key
+            prev_bone = bone
 
-                # 自身から親を引いた軸の向き
-                local_axis = model.bones[lname].position - links.get(lname, offset=-1).position
-                local_axis_qq = MQuaternion.fromDirection(local_axis.normalized(), MVector3D(0, 0, 1))
+        return link_key
+
+    # ボーンの位置と実際の回転（deform_rotation 相当）
+    cdef tuple c_get_bone_values(self, str bone_name):
+        cdef np.ndarray positions, rotations
+
+        if bone_name not in self.bone_values:
+            positions, rotations = self.motion.c_calc_bf_range(bone_name, self.fnos)
+            self.bone_values[bone_name] = (positions, c_deform_rotation_range(self.model, self.motion, bone_name, self.fnos, rotations))
+
+        return self.bone_values[bone_name]
+
+
+# 指定ボーンの実際の回転情報（複数フレーム、wxyz）
+cdef np.ndarray c_deform_rotation_range(PmxModel model, VmdMotion motion, str bone_name, np.ndarray fnos, np.ndarray rotations):
+    cdef np.ndarray rots = np.zeros((np.PyArray_DIM(fnos, 0), 4), dtype=np.float64)
+    rots[:, 0] = 1
+
+    if bone_name not in model.bones:
+        return rots
+
+    cdef Bone bone = model.bones[bone_name]
+
+    rots = np.where(np.isfinite(rotations), rotations, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rots = rots / np.linalg.norm(rots, axis=1)[:, np.newaxis]
+
+    rots = c_deform_fix_rotation_range(bone_name, bone.fixed_axis, rots)
+
+    cdef Bone effect_parent_bone
+    cdef Bone effect_bone
+    cdef int cnt
+    cdef np.ndarray effect_rots
+
+    if bone.getExternalRotationFlag() and bone.effect_index in model.bone_indexes:
+
+        effect_parent_bone = bone
+        effect_bone = model.bones[model.bone_indexes[bone.effect_index]]
+        cnt = 0
+
+        while cnt < 100:
+            # 付与親の回転を取得する
+            _, effect_rots = motion.c_calc_bf_range(effect_bone.name, fnos)
+
+            # 自身の回転量に付与親の回転量を付与率を加味して付与する
+            if effect_parent_bone.effect_factor == 0:
+                # ゼロの場合、とりあえず初期化
+                rots = np.zeros((np.PyArray_DIM(fnos, 0), 4), dtype=np.float64)
+                rots[:, 0] = 1
+            elif effect_parent_bone.effect_factor < 0:
+                # マイナス付与の場合、逆回転
+                effect_rots = effect_rots * abs(effect_parent_bone.effect_factor)
+                rots = c_mul_quaternion_range(rots, (effect_rots * np.array([1, -1, -1, -1])) / np.sum(effect_rots ** 2, axis=1)[:, np.newaxis])
             else:
-                # ローカル軸が設定されている場合、その値を採用
-                local_axis_qq = MQuaternion.fromDirection(model.bones[lname].local_x_vector.normalized(), MVector3D(0, 0, 1))
+                rots = c_mul_quaternion_range(rots, effect_rots * effect_parent_bone.effect_factor)
+
+            if effect_bone.getExternalRotationFlag() and effect_bone.effect_index in model.bone_indexes:
+                # 付与親の親として現在のeffectboneを保持
+                effect_parent_bone = effect_bone
+                # 付与親置き換え
+                effect_bone = model.bones[model.bone_indexes[effect_bone.effect_index]]
+            else:
+                break
+
+            cnt += 1
+
+    return rots
+
 
-            local_x_matrix.rotate(local_axis_qq)
+# 軸制限回転を求め直す（複数フレーム、wxyz）
+cdef np.ndarray c_deform_fix_rotation_range(str bone_name, MVector3D fixed_axis, np.ndarray rots):
+    if fixed_axis == MVector3D():
+        return rots
 
-            total_mats[lname] *= local_x_matrix
+    cdef double fixed_x = fixed_axis.x()
+    cdef np.ndarray is_rotated = np.any(rots != np.array([1, 0, 0, 0]), axis=1)
+    cdef np.ndarray is_flip = np.zeros(np.PyArray_DIM(rots, 0), dtype=np.bool_)
 
-    return (global_3ds_dic, total_mats)
+    # 回転補正（コロン式ミクさん等軸反転パターンも含む）
+    if "右" in bone_name:
+        is_flip |= ((rots[:, 1] > 0) & (fixed_x <= 0)) | ((rots[:, 1] < 0) & (fixed_x > 0))
+    if "左" in bone_name:
+        is_flip |= ((rots[:, 1] < 0) & (fixed_x >= 0)) | ((rots[:, 1] > 0) & (fixed_x < 0))
+    is_flip &= is_rotated
+
+    rots = rots.copy()
+    rots[is_flip, :2] *= -1
+    rots[is_rotated] /= np.linalg.norm(rots[is_rotated], axis=1)[:, np.newaxis]
+
+    # 軸固定の場合、回転を制限する
+    cdef np.ndarray axis = fixed_axis.data()
+    cdef double length = np.linalg.norm(axis)
+    if abs(length - 1.0) >= 0.0000001 and abs(length) >= 0.0000001:
+        axis = axis / length
+
+    cdef np.ndarray half_angles = np.radians(np.degrees(2 * np.arccos(np.clip(rots[:, 0], -1, 1))) / 2.0)
+    cdef np.ndarray fixed_rots = np.zeros((np.PyArray_DIM(rots, 0), 4), dtype=np.float64)
+    fixed_rots[:, 0] = np.cos(half_angles)
+    fixed_rots[:, 1:] = np.sin(half_angles)[:, np.newaxis] * axis
+
+    return fixed_rots / np.linalg.norm(fixed_rots, axis=1)[:, np.newaxis]
+
+
+# クォータニオンの積（複数フレーム、wxyz）
+cdef np.ndarray c_mul_quaternion_range(np.ndarray q1s, np.ndarray q2s):
+    return (MQuaternionArray(q1s) * MQuaternionArray(q2s)).data()
+
+
+# 移動してから回転する行列（複数フレーム、MMatrix4x4 の translate → rotate 相当）
+cdef np.ndarray c_calc_matrix_range(np.ndarray trans_vs, np.ndarray rots):
+    cdef MMatrix4x4Array mats = MMatrix4x4Array(size=np.PyArray_DIM(rots, 0))
+    mats.translate(MVector3DArray(trans_vs))
+    mats.rotate(MQuaternionArray(rots))
+
+    return mats.data()
+
+
+# 行列で位置を変換する（複数フレーム、MMatrix4x4.mul_MVector3D 相当）
+cdef np.ndarray c_mul_position_range(np.ndarray mats, np.ndarray vs):
+    return (MMatrix4x4Array(mats) * MVector3DArray(vs)).data()
 
 
 # 指定された方向に向いた場合の位置情報を返す
@@ -401,7 +1127,7 @@ cdef list c_calc_relative_position(PmxModel model, BoneLinks links, VmdMotion mo
     cdef VmdBoneFrame fill_bf
 
     for link_idx, link_bone_name in enumerate(links.all()):
-        link_bone = links.get(link_bone_name)
+        link_bone = links.c_get(link_bone_name, 0)
 
         if not limit_links or (limit_links and limit_links.get(link_bone_name)):
             # 上限リンクがある倍、ボーンが存在している場合のみ、モーション内のキー情報を取得
@@ -417,7 +1143,7 @@ cdef list c_calc_relative_position(PmxModel model, BoneLinks links, VmdMotion mo
             trans_vs.append(link_bone.position + fill_bf.position)
         else:
             # 位置：自身から親の位置を引いた相対位置
-            trans_vs.append(link_bone.position + fill_bf.position - links.get(link_bone_name, offset=-1).position)
+            trans_vs.append(link_bone.position + fill_bf.position - links.c_get_parent(link_bone_name).position)
 
     return trans_vs
 
@@ -445,12 +1171,14 @@ cdef list c_calc_relative_rotation(PmxModel model, BoneLinks links, VmdMotion mo
             fill_bf = VmdBoneFrame(fno=fno)
             fill_bf.set_name(link_bone_name)
 
-        logger.debug(f"c_calc_relative_rotation 1 bone_name={fill_bf.name} fno={fill_bf.fno} rot={motion.calc_bf(fill_bf.name, fill_bf.fno).rotation.toEulerAngles().to_log()}")
+        if logger.is_enabled(MLogger.DEBUG):
+            logger.debug("c_calc_relative_rotation 1 bone_name=%s fno=%s rot=%s", fill_bf.name, fill_bf.fno, motion.calc_bf(fill_bf.name, fill_bf.fno).rotation.toEulerAngles().to_log())
 
         # 実際の回転量を計算
         rot = deform_rotation(model, motion, fill_bf)
 
-        logger.debug(f"c_calc_relative_rotation 2 bone_name={fill_bf.name} fno={fill_bf.fno} rot={motion.calc_bf(fill_bf.name, fill_bf.fno).rotation.toEulerAngles().to_log()}")
+        if logger.is_enabled(MLogger.DEBUG):
+            logger.debug("c_calc_relative_rotation 2 bone_name=%s fno=%s rot=%s", fill_bf.name, fill_bf.fno, motion.calc_bf(fill_bf.name, fill_bf.fno).rotation.toEulerAngles().to_log())
 
         add_qs.append(rot)
 
@@ -462,16 +1190,19 @@ cpdef MQuaternion deform_rotation(PmxModel model, VmdMotion motion, VmdBoneFrame
     if bf.name not in model.bones:
         return MQuaternion()
 
-    logger.debug(f"deform_rotation 0 bone_name={bf.name} fno={bf.fno} rot={motion.calc_bf(bf.name, bf.fno).rotation.toEulerAngles().to_log()}")
+    if logger.is_enabled(MLogger.DEBUG):
+        logger.debug("deform_rotation 0 bone_name=%s fno=%s rot=%s", bf.name, bf.fno, motion.calc_bf(bf.name, bf.fno).rotation.toEulerAngles().to_log())
 
     cdef Bone bone = model.bones[bf.name]
     cdef MQuaternion rot = bf.rotation.normalized().copy()
 
-    logger.debug(f"deform_rotation 1 bone_name={bf.name} fno={bf.fno} rot={motion.calc_bf(bf.name, bf.fno).rotation.toEulerAngles().to_log()}")
+    if logger.is_enabled(MLogger.DEBUG):
+        logger.debug("deform_rotation 1 bone_name=%s fno=%s rot=%s", bf.name, bf.fno, motion.calc_bf(bf.name, bf.fno).rotation.toEulerAngles().to_log())
 
     rot = deform_fix_rotation(bf.name, bone.fixed_axis, rot)
 
-    logger.debug(f"deform_rotation 2 bone_name={bf.name} fno={bf.fno} rot={motion.calc_bf(bf.name, bf.fno).rotation.toEulerAngles().to_log()}")
+    if logger.is_enabled(MLogger.DEBUG):
+        logger.debug("deform_rotation 2 bone_name=%s fno=%s rot=%s", bf.name, bf.fno, motion.calc_bf(bf.name, bf.fno).rotation.toEulerAngles().to_log())
 
     cdef Bone effect_parent_bone
     cdef Bone effect_bone
@@ -491,7 +1222,7 @@ cpdef MQuaternion deform_rotation(PmxModel model, VmdMotion motion, VmdBoneFrame
             # 自身の回転量に付与親の回転量を付与率を加味して付与する
             if effect_parent_bone.effect_factor == 0:
                 # ゼロの場合、とりあえず初期化
-                logger.debug(f"モデル「{model.name}」ボーン「{effect_parent_bone.name}」の付与率がゼロ")
+                logger.debug("モデル「%s」ボーン「%s」の付与率がゼロ", model.name, effect_parent_bone.name)
                 rot = MQuaternion()
             elif effect_parent_bone.effect_factor < 0:
                 # マイナス付与の場合、逆回転
@@ -509,7 +1240,8 @@ cpdef MQuaternion deform_rotation(PmxModel model, VmdMotion motion, VmdBoneFrame
 
             cnt += 1
 
-    logger.debug(f"deform_rotation 3 bone_name={bf.name} fno={bf.fno} rot={motion.calc_bf(bf.name, bf.fno).rotation.toEulerAngles().to_log()}")
+    if logger.is_enabled(MLogger.DEBUG):
+        logger.debug("deform_rotation 3 bone_name=%s fno=%s rot=%s", bf.name, bf.fno, motion.calc_bf(bf.name, bf.fno).rotation.toEulerAngles().to_log())
 
     return rot
 
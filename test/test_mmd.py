@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 #
+import math
+import struct
 import numpy as np
 import glob
 import _pickle as cPickle
 from datetime import datetime
 import unittest
+import tracemalloc
 import sys
 import pathlib
 # このソースのあるディレクトリの絶対パスを取得
@@ -17,7 +20,7 @@ from mmd.PmxReader import PmxReader # noqa
 from mmd.VmdReader import VmdReader # noqa
 from mmd.VmdWriter import VmdWriter # noqa
 from mmd.PmxData import PmxModel, Vertex, Material, Bone, Morph, DisplaySlot, RigidBody, Joint, Sdef # noqa
-from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
+from mmd.VmdData import DEFAULT_INTERPOLATION, DEFAULT_ORG_ROTATION, VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame, VmdBoneTrack, VmdMorphTrack, OneEuroFilter, calc_infections, filter_values # noqa
 from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
 from module.MOptions import MOptionsDataSet # noqa
 from module.MParams import BoneLinks # noqa
@@ -722,6 +725,532 @@ class VmdDataTest(unittest.TestCase):
         self.assertAlmostEqual(bf.rotation.toEulerAngles4MMD().y(), 18.53442383, delta=0.1)
         self.assertAlmostEqual(bf.rotation.toEulerAngles4MMD().z(), 24.47537041, delta=0.1)
     
+    def test_smooth_bf_spike(self):
+        motion = VmdMotion()
+
+        # 5フレーム目だけ跳ねている회전
+        for fno in range(11):
+            bf = VmdBoneFrame(fno)
+            bf.set_name("右腕")
+            bf.key = True
+            bf.read = True
+            bf.rotation = MQuaternion.fromEulerAngles(0, 60 if fno == 5 else fno * 2, 0)
+            motion.append_bone_frame(bf)
+
+        motion.smooth_bf(0, "右腕", True, False, 1, is_show_log=False)
+
+        # 跳ねたキーだけ前後の中間になる
+        for fno in range(11):
+            self.assertAlmostEqual(motion.calc_bf("右腕", fno).rotation.toDegree(), fno * 2, delta=0.0001)
+
+    def test_get_differ_fnos(self):
+        motion = VmdMotion()
+
+        # 1フレームあたり3度ずつ回る
+        for fno in [0, 30]:
+            bf = VmdBoneFrame(fno)
+            bf.set_name("右腕")
+            bf.key = True
+            bf.read = True
+            bf.rotation = MQuaternion.fromEulerAngles(0, fno * 3, 0)
+            motion.append_bone_frame(bf)
+
+        self.assertEqual([0, 5, 10, 15, 20, 25, 30], motion.get_differ_fnos(0, ["右腕"], 10, 0))
+
+    def test_calc_infections(self):
+        fnos = np.arange(81)
+        positions = np.zeros((81, 3))
+        positions[:, 0] = np.sin(fnos * 2 * np.pi / 40) * 10
+        rotations = np.zeros((81, 4))
+        rotations[:, 0] = 1
+
+        marks, values = calc_infections(rotations, positions, True, True)
+
+        # 이동Xの変化量の増減が変わる箇所（最後の候補は除く）
+        self.assertEqual([2, 21, 41], fnos[marks].tolist())
+        self.assertTrue(np.all(values[:, 0] == 0))
+        self.assertTrue(np.all(values[:, 1] == positions[:, 0]))
+
+    def test_filter_values(self):
+        config = {"freq": 30, "mincutoff": 0.3, "beta": 0.01, "dcutoff": 0.25}
+        values = np.array([[0, 1], [0.5, 1], [0.5, 3], [-1, 2.5], [2, 2.5], [2, -0.5], [1.5, 0]])
+        timestamps = [0, 1, 2, 4, 5, 8, 9]
+
+        # 列ごとに1件ずつかけた場合と同じ
+        for ts in [None, timestamps]:
+            results = filter_values(values, config, ts)
+            for col in range(values.shape[1]):
+                one_filter = OneEuroFilter(**config)
+                expected = [one_filter(v) if ts is None else one_filter(v, t) for v, t in zip(values[:, col], timestamps)]
+                self.assertEqual(expected, results[:, col].tolist())
+
+        self.assertEqual((7,), filter_values(values[:, 0], config).shape)
+
+        # 符号が反転したクォータニオンは前と同じ向きに揃えてからかける
+        qq = MQuaternion.fromEulerAngles(10, 20, 30)
+        rotations = np.array([[qq.scalar(), qq.x(), qq.y(), qq.z()], [-qq.scalar(), -qq.x(), -qq.y(), -qq.z()]])
+        results = filter_values(rotations, config, is_quaternion=True)
+        self.assertTrue(np.allclose(rotations[0], results[1]))
+
+    def test_read_frames(self):
+        # 終端の後ろにゴミがある名前
+        odd_bname = b'\x83\x41\x00\xfd'.ljust(15, b'\x00')
+        bfs = []
+        for fno, name, bname in [(3, "センター", b''), (7, "ア", odd_bname)]:
+            bf = VmdBoneFrame(fno)
+            bf.set_name(name)
+            if bname:
+                bf.bname = bname
+            bf.position = MVector3D(fno, -0.5, 1.25)
+            bf.rotation = MQuaternion.fromEulerAngles(10, fno, 30)
+            bf.interpolation = [(n * 7) % 128 for n in range(64)]
+            bfs.append(bf)
+        mfs = []
+        for fno, name, bname in [(0, "あ", b''), (2, "ア", odd_bname)]:
+            mf = VmdMorphFrame(fno)
+            mf.set_name(name)
+            if bname:
+                mf.bname = bname
+            mf.ratio = 0.25 * (fno + 1)
+            mfs.append(mf)
+
+        writer = VmdWriter(None)
+        bone_bytes = writer.pack_bone_frames(bfs)
+        morph_bytes = writer.pack_morph_frames(mfs)
+
+        reader = VmdReader(None)
+        reader.buffer = bone_bytes + morph_bytes
+        motion = VmdMotion()
+        motion.motion_cnt = 2
+        reader.read_bone_frames(motion)
+        motion.morph_cnt = 2
+        reader.read_morph_frames(motion)
+
+        self.assertEqual(len(reader.buffer), reader.offset)
+        self.assertEqual(7, motion.last_motion_frame)
+        self.assertEqual(reader.decode_text(odd_bname, "shift-jis", False), "ア")
+
+        for bf in bfs:
+            read_bf = motion.bones[bf.name][bf.fno]
+            self.assertEqual(bf.bname, read_bf.bname)
+            self.assertTrue(read_bf.key and read_bf.read)
+            self.assertEqual(np.float32(bf.position.data()).tolist(), read_bf.position.data().tolist())
+            self.assertEqual(np.float32(bf.rotation.data().components).tolist(), read_bf.rotation.data().components.tolist())
+            self.assertEqual(list(bf.interpolation), list(read_bf.interpolation))
+
+        for mf in mfs:
+            read_mf = motion.morphs[mf.name][mf.fno]
+            self.assertEqual(mf.bname, read_mf.bname)
+            self.assertEqual(mf.ratio, read_mf.ratio)
+
+        # 読み込んだフレームを書き出すと元のバイト列に戻る
+        self.assertEqual(bone_bytes, writer.pack_bone_frames([motion.bones[bf.name][bf.fno] for bf in bfs]))
+        self.assertEqual(morph_bytes, writer.pack_morph_frames([motion.morphs[mf.name][mf.fno] for mf in mfs]))
+
+        # 負のフレーム番号は1件ずつの出力と同じくエラーになる
+        bfs[1].fno = -1
+        with self.assertRaises(struct.error):
+            writer.write_frames(bfs)
+        with self.assertRaises(struct.error):
+            writer.pack_bone_frames(bfs)
+
+        # フレーム番号は符号なしで読む（符号付きの-1は-1にならない）
+        minus_record = bytearray(bone_bytes[:111])
+        minus_record[15:19] = struct.pack('<i', -1)
+        reader = VmdReader(None)
+        reader.buffer = bytes(minus_record)
+        motion = VmdMotion()
+        motion.motion_cnt = 1
+        with self.assertRaises(OverflowError):
+            reader.read_bone_frames(motion)
+
+    def test_decode_cached_text(self):
+        # 15バイトで切れて、最後の全角文字が1バイト目だけ残る名前
+        cut_bname = "左人指先先先先先".encode("shift_jis")[:15]
+        self.assertEqual(b'\x90', cut_bname[-1:])
+        bnames = ["右腕".encode("shift_jis").ljust(15, b'\x00'), cut_bname, "あ".encode("shift_jis").ljust(15, b'\x00')]
+
+        reader = VmdReader(None)
+        for bname in bnames:
+            # 同じバイト列を2回デコードしても、キャッシュなしでデコードした結果と同じ
+            for _ in range(2):
+                cached_bname, text = reader.decode_cached_text(bname)
+                self.assertEqual(bname, cached_bname)
+                self.assertEqual(VmdReader(None).decode_text(bname, "shift-jis", False), text)
+            self.assertIs(reader.decode_cached_text(bname), reader.decode_cached_text(bname))
+
+        self.assertEqual("shift-jis", reader.encoding)
+        self.assertEqual("右腕", reader.decode_cached_text(bnames[0])[1])
+        self.assertTrue(reader.decode_cached_text(cut_bname)[1].startswith("左人指先先先先"))
+        self.assertEqual(3, len(reader.texts))
+
+        # 読み込み時のデコード（read_text）もキャッシュを通す
+        reader.buffer = cut_bname + bnames[0] + cut_bname
+        self.assertEqual([reader.decode_cached_text(bname) for bname in [cut_bname, bnames[0], cut_bname]], [reader.read_text(15) for _ in range(3)])
+        self.assertEqual(3, len(reader.texts))
+
+    def test_pack_bone_frames(self):
+        bfs = []
+        for fno, rotation in [(0, MQuaternion.fromEulerAngles(10, 20, 30)), (5, MQuaternion(2, 0, 0, 0)), (9, MQuaternion(float('nan'), 0.1, 0.2, 0.3)), \
+                              (12, MQuaternion(0, 0, 0, 0))]:
+            bf = VmdBoneFrame(fno)
+            bf.set_name("右腕")
+            bf.position = MVector3D(fno, -0.5, 1.25)
+            bf.rotation = rotation
+            bfs.append(bf)
+
+        writer = VmdWriter(None)
+
+        # 一括出力と1件ずつの出力は同じ内容
+        bulk_bytes = writer.pack_bone_frames(bfs)
+        self.assertEqual(writer.write_frames(bfs), bulk_bytes)
+        self.assertEqual(111 * len(bfs), len(bulk_bytes))
+
+        # NaNの회전はそのままNaNで出力し、フレームの値は変わらない
+        self.assertEqual(b'\x00\x00\xc0\x7f', bulk_bytes[111 * 2 + 31:111 * 2 + 35])
+        self.assertTrue(math.isnan(bfs[2].rotation.scalar()))
+        self.assertEqual([0.1, 0.2, 0.3], [bfs[2].rotation.x(), bfs[2].rotation.y(), bfs[2].rotation.z()])
+
+        # floatに収まらない値がある場合は1件ずつの出力と同じくエラーになる
+        bfs[0].position = MVector3D(1e40, 0, 0)
+        with self.assertRaises(OverflowError):
+            writer.write_frames(bfs)
+        with self.assertRaises(OverflowError):
+            writer.pack_bone_frames(bfs)
+
+    def test_bone_frame_defaults(self):
+        # 既定値は全フレームで共有するので書き換えられない
+        bf = VmdBoneFrame(0)
+        with self.assertRaises(TypeError):
+            bf.org_interpolation[0] = 0
+
+        # あるフレームを書き換えても既定値・他フレームは変わらない
+        other = VmdBoneFrame(1)
+        bf.org_rotation.setX(0.5)
+        bf.interpolation[0] = 127
+        self.assertEqual(0.5, bf.org_rotation.x())
+        self.assertEqual(127, bf.interpolation[0])
+        for q in [other.org_rotation, VmdBoneFrame(2).org_rotation, DEFAULT_ORG_ROTATION]:
+            self.assertEqual([1, 0, 0, 0], [q.scalar(), q.x(), q.y(), q.z()])
+        self.assertEqual(list(DEFAULT_INTERPOLATION), list(other.interpolation))
+        self.assertEqual(20, DEFAULT_INTERPOLATION[0])
+
+        # 複製先の書き換えは元フレームに影響しない
+        copy_bf = bf.copy()
+        copy_bf.org_rotation.setX(0.25)
+        copy_bf.interpolation[0] = 0
+        self.assertEqual(0.5, bf.org_rotation.x())
+        self.assertEqual(127, bf.interpolation[0])
+
+        # 1フレームあたりのメモリ（補間曲線をリストで持っていた頃は1.5KB超）
+        tracemalloc.start()
+        start_size = tracemalloc.get_traced_memory()[0]
+        bfs = [VmdBoneFrame(fno) for fno in range(1000)]
+        frame_size = (tracemalloc.get_traced_memory()[0] - start_size) / len(bfs)
+        copy_bfs = [bf.copy() for bf in bfs]
+        copy_size = (tracemalloc.get_traced_memory()[0] - start_size) / len(bfs) - frame_size
+        tracemalloc.stop()
+        print("frame_size: %s, copy_size: %s" % (frame_size, copy_size))
+        self.assertLess(frame_size, 600)
+        self.assertLess(copy_size, 600)
+        self.assertEqual(1000, len(copy_bfs))
+
+    def test_bone_fnos_index(self):
+        def create_bf(fno):
+            bf = VmdBoneFrame(fno)
+            bf.set_name("右腕")
+            bf.position = MVector3D(fno, 0, 0)
+            bf.key = True
+            return bf
+
+        motion = VmdMotion()
+        # 順不同で登録しても昇順
+        for fno in [30, 10, 50, 0, 20]:
+            motion.append_bone_frame(create_bf(fno))
+        self.assertEqual([0, 10, 20, 30, 50], motion.get_bone_fnos("右腕"))
+        self.assertEqual([10, 20, 30], motion.get_bone_fnos("右腕", start_fno=5, end_fno=30))
+        self.assertAlmostEqual(40, motion.calc_bf("右腕", 40).position.x(), delta=0.01)
+
+        # 無効なキーを削除すると、前後のキーで補間する
+        motion.bones["右腕"][30].key = False
+        motion.remove_unkey_bf(0, "右腕")
+        self.assertEqual([0, 10, 20, 50], motion.get_bone_fnos("右腕"))
+        self.assertAlmostEqual(35, motion.calc_bf("右腕", 35).position.x(), delta=0.01)
+
+        # 削除したキーを別の値で再登録する
+        bf = create_bf(30)
+        bf.position = MVector3D(60, 0, 0)
+        motion.append_bone_frame(bf)
+        self.assertEqual([0, 10, 20, 30, 50], motion.get_bone_fnos("右腕"))
+        self.assertAlmostEqual(40, motion.calc_bf("右腕", 25).position.x(), delta=0.01)
+        self.assertAlmostEqual(55, motion.calc_bf("右腕", 40).position.x(), delta=0.01)
+
+        # 辞書に直接追加した場合もインデックスを作り直す
+        motion.bones["右腕"][5] = create_bf(5)
+        motion.bones["右腕"][5].position = MVector3D(-5, 0, 0)
+        self.assertEqual([0, 5, 10, 20, 30, 50], motion.get_bone_fnos("右腕"))
+        self.assertAlmostEqual(1, motion.calc_bf("右腕", 7).position.x(), delta=0.01)
+        self.assertEqual([5, 10], motion.get_bone_fnos("右腕", start_fno=1, end_fno=19))
+
+        # キー数を変えずに直接キーを入れ替えた場合も作り直す
+        del motion.bones["右腕"][5]
+        motion.bones["右腕"][15] = create_bf(15)
+        self.assertEqual([0, 10, 15, 20, 30, 50], motion.get_bone_fnos("右腕"))
+        self.assertAlmostEqual(12, motion.calc_bf("右腕", 12).position.x(), delta=0.01)
+
+        # 列指向トラックでも同じ
+        motion.pack_tracks()
+        self.assertEqual([0, 10, 15, 20, 30, 50], motion.get_bone_fnos("右腕"))
+        del motion.bones["右腕"][15]
+        motion.bones["右腕"][25] = create_bf(25)
+        self.assertEqual([0, 10, 20, 25, 30, 50], motion.get_bone_fnos("右腕"))
+        self.assertAlmostEqual(39, motion.calc_bf("右腕", 27).position.x(), delta=0.05)
+
+    def test_remove_unnecessary_bf(self):
+        motion = VmdMotion()
+        for fno in range(0, 41):
+            bf = VmdBoneFrame(fno)
+            bf.set_name("右腕")
+            bf.key = True
+            bf.read = True
+            bf.rotation = MQuaternion.fromEulerAngles(fno * 1.5 if fno <= 20 else 30 + (fno - 20) * 0.5, 0, 0)
+            motion.regist_bf(bf, "右腕", fno)
+
+        # 既定は従来の方法で、変更前と同じキーと補間結果になる（値は変更前の実装で求めたもの）
+        motion.remove_unnecessary_bf(0, "右腕", True, False, is_show_log=False)
+        self.assertEqual([0, 40], motion.get_bone_fnos("右腕", is_key=True))
+        for fno, degree in zip(range(0, 41, 5), [0, 9.812, 18.414, 25.628, 31.302, 35.374, 37.94, 39.316, 40.0]):
+            self.assertAlmostEqual(degree, motion.calc_bf("右腕", fno).rotation.toEulerAngles().x(), delta=0.001)
+
+    def test_bone_track(self):
+        bf_dict = {}
+        for fno in [0, 4, 8, 12]:
+            bf = VmdBoneFrame(fno)
+            bf.set_name("左足")
+            bf.position = MVector3D(fno, 1, 2)
+            bf.rotation = MQuaternion.fromEulerAngles(0, fno, 0)
+            bf.key = True
+            bf_dict[fno] = bf
+
+        track = VmdBoneTrack("左足", bf_dict)
+        self.assertEqual(4, len(track))
+        self.assertEqual([0, 4, 8, 12], track.keys())
+        self.assertIn(8, track)
+        self.assertNotIn(5, track)
+        self.assertEqual(MVector3D(8, 1, 2), track[8].position)
+        self.assertEqual("左足", track[8].name)
+        with self.assertRaises(KeyError):
+            track[5]
+
+        # 列にあるキーの削除・列にないキーの追加
+        del track[4]
+        self.assertNotIn(4, track)
+        with self.assertRaises(KeyError):
+            del track[4]
+        bf = VmdBoneFrame(6)
+        bf.set_name("左足")
+        bf.position = MVector3D(6, 1, 2)
+        track[6] = bf
+        self.assertEqual(4, len(track))
+        self.assertEqual([0, 6, 8, 12], track.keys())
+        self.assertEqual([0, 6, 8, 12], list(track))
+
+        # 削除したキーの再登録・追加したキーの削除
+        bf = VmdBoneFrame(4)
+        bf.set_name("左足")
+        track[4] = bf
+        del track[6]
+        self.assertEqual(4, len(track))
+        self.assertEqual([0, 4, 8, 12], track.keys())
+        self.assertEqual(MVector3D(), track[4].position)
+        self.assertIsNone(track.get(6))
+
+        # 列に書き戻しても内容は変わらない
+        track.compact()
+        self.assertEqual(4, len(track))
+        self.assertEqual([0, 4, 8, 12], track.keys())
+        self.assertEqual(MVector3D(), track[4].position)
+        self.assertEqual(MQuaternion.fromEulerAngles(0, 8, 0), track[8].rotation)
+
+    def test_calc_bf_range(self):
+        motion = VmdMotion()
+        for fno, degree in [(5, 10), (12, 80), (30, -40)]:
+            bf = VmdBoneFrame(fno)
+            bf.set_name("右腕")
+            bf.position = MVector3D(fno, -fno / 2, degree / 10)
+            bf.rotation = MQuaternion.fromEulerAngles(degree, degree / 2, -degree)
+            bf.key = True
+            if fno == 12:
+                # 補間曲線を既定の直線から変えておく
+                for x1_idxs, y1_idxs, x2_idxs, y2_idxs, (x1, y1, x2, y2) in \
+                        [(MBezierUtils.R_x1_idxs, MBezierUtils.R_y1_idxs, MBezierUtils.R_x2_idxs, MBezierUtils.R_y2_idxs, (90, 10, 30, 120)), \
+                         (MBezierUtils.MX_x1_idxs, MBezierUtils.MX_y1_idxs, MBezierUtils.MX_x2_idxs, MBezierUtils.MX_y2_idxs, (10, 100, 110, 20))]:
+                    for i in range(4):
+                        bf.interpolation[x1_idxs[i]] = x1
+                        bf.interpolation[y1_idxs[i]] = y1
+                        bf.interpolation[x2_idxs[i]] = x2
+                        bf.interpolation[y2_idxs[i]] = y2
+            motion.regist_bf(bf, "右腕", fno)
+
+            mf = VmdMorphFrame(fno)
+            mf.set_name("あ")
+            mf.ratio = degree / 80
+            motion.regist_mf(mf, "あ", fno)
+
+        # 最初の키より前・키の間・最後の키より後のいずれも、1フレームずつ求めた結果と同じ
+        fnos = list(range(0, 41))
+        for target_motion in [motion, motion.snapshot()]:
+            positions, rotations = target_motion.calc_bf_range("右腕", fnos)
+            ratios = target_motion.calc_mf_range("あ", fnos)
+            for n, fno in enumerate(fnos):
+                bf = target_motion.calc_bf("右腕", fno)
+                self.assertTrue(np.allclose(bf.position.data(), positions[n], rtol=0, atol=1e-6), fno)
+                qq = bf.rotation
+                self.assertTrue(np.allclose([qq.scalar(), qq.x(), qq.y(), qq.z()], rotations[n], rtol=0, atol=1e-6), fno)
+                self.assertAlmostEqual(target_motion.calc_mf("あ", fno).ratio, ratios[n], delta=1e-6, msg=fno)
+
+        # 補間曲線を変えた区間は直線補間とは違う値になっている
+        self.assertFalse(np.allclose(positions[8], (positions[5] * 4 + positions[12] * 3) / 7))
+
+        # キーのないボーン・モーフは初期値
+        positions, rotations = motion.calc_bf_range("左腕", [0, 10])
+        self.assertTrue(np.allclose(np.zeros((2, 3)), positions))
+        self.assertTrue(np.allclose([[1, 0, 0, 0], [1, 0, 0, 0]], rotations))
+        self.assertTrue(np.allclose(np.zeros(2), motion.calc_mf_range("い", [0, 10])))
+
+    def test_pack_tracks(self):
+        motion = VmdMotion()
+        for fno in [0, 10, 20]:
+            bf = VmdBoneFrame(fno)
+            bf.set_name("上半身")
+            bf.position = MVector3D(0, fno, 0)
+            bf.rotation = MQuaternion.fromEulerAngles(fno, 0, 0)
+            bf.key = True
+            motion.regist_bf(bf, "上半身", fno)
+
+            mf = VmdMorphFrame(fno)
+            mf.set_name("あ")
+            mf.ratio = fno / 20
+            motion.regist_mf(mf, "あ", fno)
+
+        org_bfs = [motion.calc_bf("上半身", fno) for fno in range(21)]
+        org_interpolation = motion.bones["上半身"][10].interpolation[:]
+
+        motion.pack_tracks()
+        self.assertIsInstance(motion.bones["上半身"], VmdBoneTrack)
+        self.assertIsInstance(motion.morphs["あ"], VmdMorphTrack)
+        self.assertEqual([0, 10, 20], motion.get_bone_fnos("上半身"))
+        self.assertEqual(0.5, motion.morphs["あ"][10].ratio)
+        self.assertEqual(org_interpolation, motion.bones["上半身"][10].interpolation)
+        for fno, org_bf in enumerate(org_bfs):
+            bf = motion.calc_bf("上半身", fno)
+            self.assertEqual(org_bf.position, bf.position)
+            self.assertEqual(org_bf.rotation, bf.rotation)
+
+        # 辞書に戻しても同じ
+        motion.unpack_tracks()
+        self.assertIsInstance(motion.bones["上半身"], dict)
+        self.assertEqual([0, 10, 20], sorted(motion.bones["上半身"].keys()))
+        for fno, org_bf in enumerate(org_bfs):
+            self.assertEqual(org_bf.rotation, motion.calc_bf("上半身", fno).rotation)
+
+    def test_track_copy(self):
+        motion = VmdMotion()
+        for fno in [0, 10, 20]:
+            bf = VmdBoneFrame(fno)
+            bf.set_name("上半身")
+            bf.position = MVector3D(0, fno, 0)
+            bf.key = True
+            motion.regist_bf(bf, "上半身", fno)
+        motion.pack_tracks()
+
+        copy_motion1 = motion.copy()
+        copy_motion2 = copy_motion1.copy()
+
+        # 複製の一方を変更しても、元・もう一方の複製は変わらない
+        copy_motion1.bones["上半身"][10].position = MVector3D(1, 2, 3)
+        del copy_motion1.bones["上半身"][0]
+        bf = VmdBoneFrame(15)
+        bf.set_name("上半身")
+        bf.key = True
+        copy_motion1.regist_bf(bf, "上半身", 15)
+
+        self.assertEqual([10, 15, 20], copy_motion1.get_bone_fnos("上半身"))
+        self.assertEqual(MVector3D(1, 2, 3), copy_motion1.bones["上半身"][10].position)
+        for target_motion in [motion, copy_motion2]:
+            self.assertEqual([0, 10, 20], target_motion.get_bone_fnos("上半身"))
+            self.assertEqual(3, len(target_motion.bones["上半身"]))
+            self.assertEqual(MVector3D(0, 10, 0), target_motion.bones["上半身"][10].position)
+            self.assertNotIn(15, target_motion.bones["上半身"])
+
+    def test_read_only_track(self):
+        motion = VmdMotion()
+        for fno in range(0, 30, 3):
+            bf = VmdBoneFrame(fno)
+            bf.set_name("右腕")
+            bf.rotation = MQuaternion.fromEulerAngles(fno, 0, 0)
+            bf.key = True
+            motion.regist_bf(bf, "右腕", fno)
+        motion.pack_tracks()
+
+        # 列指向トラックでも、取り出したフレームへの変更は辞書と同じく保持される
+        bfs = motion.bones["右腕"]
+        self.assertIs(bfs[3], bfs[3])
+        bfs[3].rotation = MQuaternion()
+        self.assertEqual(MQuaternion(), motion.bones["右腕"][3].rotation)
+        motion.calc_bf("右腕", 6).rotation = MQuaternion()
+        self.assertEqual(MQuaternion(), motion.calc_bf("右腕", 6).rotation)
+        with self.assertRaises(KeyError):
+            bfs[4]
+
+        # 参照専用の複製では取り出すたびに一時的なフレームを生成し、書き込みは受け付けない
+        org_motion = motion.snapshot()
+        org_bfs = org_motion.bones["右腕"]
+        self.assertIsNot(org_bfs[9], org_bfs[9])
+        self.assertEqual(MQuaternion.fromEulerAngles(9, 0, 0), org_bfs[9].rotation)
+        self.assertEqual(MQuaternion(), org_bfs[3].rotation)
+        with self.assertRaises(TypeError):
+            org_bfs[9] = VmdBoneFrame(9)
+        with self.assertRaises(TypeError):
+            del org_bfs[9]
+
+        # 全キーを読んだ後の複製でも、複製先で取り出したフレームは元と独立している
+        for fno in motion.get_bone_fnos("右腕"):
+            bfs[fno].rotation
+        copy_motion = motion.copy()
+        copy_bfs = copy_motion.bones["右腕"]
+        self.assertIs(copy_bfs[9], copy_bfs[9])
+        copy_bfs[9].rotation = MQuaternion()
+        self.assertEqual(MQuaternion(), copy_motion.bones["右腕"][9].rotation)
+        self.assertEqual(MQuaternion.fromEulerAngles(9, 0, 0), bfs[9].rotation)
+        self.assertEqual(MQuaternion.fromEulerAngles(9, 0, 0), org_bfs[9].rotation)
+
+    def test_peek_bf(self):
+        motion = VmdMotion()
+        for fno in range(0, 30, 3):
+            bf = VmdBoneFrame(fno)
+            bf.set_name("右腕")
+            bf.rotation = MQuaternion.fromEulerAngles(fno, 0, 0)
+            bf.key = True
+            motion.regist_bf(bf, "右腕", fno)
+        motion.pack_tracks()
+
+        # 参照用の取得では保持しないので、戻り値を変更しても反映されない
+        self.assertIsNot(motion.peek_bf("右腕", 3), motion.peek_bf("右腕", 3))
+        motion.peek_bf("右腕", 3).rotation = MQuaternion()
+        self.assertEqual(MQuaternion.fromEulerAngles(3, 0, 0), motion.bones["右腕"][3].rotation)
+        with self.assertRaises(KeyError):
+            motion.peek_bf("右腕", 4)
+
+        # 保持しているフレームは参照用の取得でも同じものを返す
+        motion.bones["右腕"][3].rotation = MQuaternion()
+        self.assertIs(motion.bones["右腕"][3], motion.peek_bf("右腕", 3))
+
+        # 読み込み後の複製元（列指向トラック）で変更したフレームは複製先にも引き継がれる
+        copy_motion = motion.copy()
+        self.assertEqual(MQuaternion(), copy_motion.peek_bf("右腕", 3).rotation)
+        self.assertEqual(MQuaternion.fromEulerAngles(6, 0, 0), copy_motion.peek_bf("右腕", 6).rotation)
+
     def test_vmd_output(self):
         motion = VmdReader(u"test/data/補間曲線テスト01.vmd").read_data()
         model = PmxReader("D:/MMD/MikuMikuDance_v926x64/UserFile/Model/ダミーボーン頂点追加2.pmx").read_data()
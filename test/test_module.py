@@ -12,7 +12,9 @@ current_dir = pathlib.Path(__file__).resolve().parent
 sys.path.append(str(current_dir) + '/../')
 sys.path.append(str(current_dir) + '/../src/')
 
-from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
+from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4, MTransform, MVector3DArray, MQuaternionArray, MMatrix4x4Array # noqa
+from module.MParams import BoneLinks # noqa
+from mmd.PmxData import Bone # noqa
 from utils.MLogger import MLogger # noqa
 
 logger = MLogger(__name__, level=1)
@@ -79,3 +81,161 @@ class MMathTest(unittest.TestCase):
 
         rot = initial.inverted() * orientation
         print(rot.toEulerAngles())
+
+    def test_MQuaternion_normalized(self):
+        qq = MQuaternion(2, 0, 0, 0)
+        self.assertEqual([1, 0, 0, 0], qq.normalized().data().components.tolist())
+        # 自身は変更しない
+        self.assertEqual([2, 0, 0, 0], qq.data().components.tolist())
+
+        # NaNは0にせず、そのまま残る
+        nan_qq = MQuaternion(float('nan'), 0.1, 0.2, 0.3)
+        self.assertTrue(np.all(np.isnan(nan_qq.normalized().data().components)))
+        nan_qq.effective()
+        self.assertTrue(math.isnan(nan_qq.scalar()))
+        self.assertEqual([0.1, 0.2, 0.3], [nan_qq.x(), nan_qq.y(), nan_qq.z()])
+
+    def test_MMatrix4x4_mul_MVector3D(self):
+        mat = MMatrix4x4()
+        mat.setToIdentity()
+        mat.translate(MVector3D(1, 2, 3))
+        mat.rotate(MQuaternion.fromEulerAngles(10, 20, 30))
+        vec = MVector3D(4, 5, 6)
+
+        # data()は呼ぶ度に生成したコピーを返す
+        mat_data = mat.data()
+        mat_data[0, 3] = 100
+        self.assertNotEqual(100, mat.data()[0, 3])
+
+        expected = mat.data().dot(np.array([vec.x(), vec.y(), vec.z(), 1]))
+        self.assertTrue(np.allclose(expected[:3], (mat * vec).data()))
+
+        qq = MQuaternion.fromEulerAngles(10, 20, 30) * MQuaternion.fromEulerAngles(-5, 40, 3)
+        expected_qq = MQuaternion.fromEulerAngles(10, 20, 30).data() * MQuaternion.fromEulerAngles(-5, 40, 3).data()
+        self.assertTrue(np.allclose(expected_qq.components, qq.data().components))
+
+    def test_MTransform(self):
+        qq = MQuaternion.fromEulerAngles(10, 20, 30)
+        qq2 = MQuaternion.fromEulerAngles(-5, 40, 3)
+        vec = MVector3D(4, 5, 6)
+
+        mat = MMatrix4x4()
+        mat.setToIdentity()
+        mat.translate(MVector3D(1, 2, 3))
+        mat.rotate(qq)
+        mat2 = MMatrix4x4()
+        mat2.setToIdentity()
+        mat2.translate(MVector3D(-2, 0, 1))
+        mat2.rotate(qq2)
+
+        tf = MTransform(qq, MVector3D(1, 2, 3))
+        tf2 = MTransform()
+        tf2.translate(MVector3D(-2, 0, 1))
+        tf2.rotate(qq2)
+
+        # 移動してから回転する行列と同じ変換になる
+        self.assertTrue(np.allclose(mat.data(), tf.toMatrix4x4().data()))
+        self.assertTrue(np.allclose((mat * vec).data(), (tf * vec).data()))
+        self.assertTrue(np.allclose((mat * mat2).data(), (tf * tf2).toMatrix4x4().data()))
+        self.assertTrue(np.allclose((mat.inverted() * vec).data(), (tf.inverted() * vec).data()))
+        self.assertTrue(np.allclose(np.eye(4), (tf * tf.inverted()).toMatrix4x4().data()))
+        self.assertTrue(np.allclose(mat.data(), MTransform(mat).toMatrix4x4().data()))
+
+    def test_MQuaternionArray(self):
+        qqs = [MQuaternion.fromEulerAngles(10, 20, 30), MQuaternion.fromEulerAngles(-5, 40, 3), MQuaternion.fromEulerAngles(45, -60, 10)]
+        qqs2 = [MQuaternion.fromAxisAndAngle(MVector3D(1, 2, 3), 45), MQuaternion(), MQuaternion.fromEulerAngles(0, 0, 120)]
+        vecs = [MVector3D(4, 5, 6), MVector3D(-1, 0, 2), MVector3D(0, 0, 0)]
+        qq_array = MQuaternionArray(qqs)
+        qq_array2 = MQuaternionArray(qqs2)
+        vec_array = MVector3DArray(vecs)
+
+        mul_qqs = qq_array * qq_array2
+        eulers = qq_array.toEulerAngles4MMD()
+        slerp_qqs = MQuaternionArray.slerp(qq_array, qq_array2, 0.3)
+        axis_qqs = MQuaternionArray.fromAxisAndAngle(vec_array, np.array([10, -30, 90]))
+
+        for n, (qq, qq2, vec) in enumerate(zip(qqs, qqs2, vecs)):
+            # 1件ずつの計算と同じ結果になる
+            self.assertTrue(np.array_equal((qq * qq2).data().components, mul_qqs.data()[n]))
+            self.assertTrue(np.array_equal(qq.toEulerAngles4MMD().data(), eulers[n].data()))
+            self.assertTrue(np.array_equal(MQuaternion.slerp(qq, qq2, 0.3).data().components, slerp_qqs.data()[n]))
+            self.assertTrue(np.array_equal((qq * vec).data(), (qq_array * vec_array)[n].data()))
+            self.assertTrue(np.array_equal(MQuaternion.fromAxisAndAngle(vec, [10, -30, 90][n]).data().components, axis_qqs.data()[n]))
+
+        euler_qqs = MQuaternionArray.fromEulerAngles(eulers.x(), -eulers.y(), -eulers.z())
+        self.assertTrue(np.allclose(qq_array.data(), euler_qqs.data()))
+        self.assertTrue(np.allclose(np.array([1, 0, 0, 0]), (qq_array * qq_array.inverted()).data()))
+
+        with self.assertRaises(IndexError):
+            qq_array[3]
+
+        # normalizedは自身を変更せず、NaNもそのまま残る
+        nan_array = MQuaternionArray([MQuaternion(float('nan'), 0.1, 0.2, 0.3), MQuaternion(2, 0, 0, 0)])
+        normalized_array = nan_array.normalized()
+        self.assertTrue(np.all(np.isnan(normalized_array.data()[0])))
+        self.assertEqual([1, 0, 0, 0], normalized_array.data()[1].tolist())
+        self.assertTrue(np.isnan(nan_array.data()[0, 0]))
+        self.assertEqual([2, 0, 0, 0], nan_array.data()[1].tolist())
+
+    def test_MMatrix4x4Array(self):
+        vecs = [MVector3D(1, 2, 3), MVector3D(-4, 0, 2)]
+        qqs = [MQuaternion.fromEulerAngles(10, 20, 30), MQuaternion.fromEulerAngles(-5, 40, 3)]
+
+        mat_array = MMatrix4x4Array(size=2)
+        mat_array.translate(MVector3DArray(vecs))
+        mat_array.rotate(MQuaternionArray(qqs))
+
+        # data()はコピーではなく配列そのもの
+        self.assertIs(mat_array.data(), mat_array.data())
+
+        pos_array = mat_array * MVector3D(4, 5, 6)
+        mul_array = mat_array * mat_array.inverted()
+
+        for n, (vec, qq) in enumerate(zip(vecs, qqs)):
+            mat = MMatrix4x4()
+            mat.setToIdentity()
+            mat.translate(vec)
+            mat.rotate(qq)
+
+            self.assertTrue(np.array_equal(mat.data(), mat_array[n].data()))
+            self.assertTrue(np.array_equal((mat * MVector3D(4, 5, 6)).data(), pos_array[n].data()))
+            self.assertTrue(np.allclose(np.eye(4), mul_array[n].data()))
+
+
+class BoneLinksTest(unittest.TestCase):
+
+    def test_BoneLinks(self):
+        bones = [Bone(bone_name, bone_name, MVector3D(0, n, 0), n - 1, 0, 0) for n, bone_name in enumerate(["センター", "上半身", "首", "頭"])]
+
+        links = BoneLinks()
+        for bone in bones:
+            links.append(bone)
+
+        # ボーンは複製せず、そのまま参照する
+        self.assertIs(bones[1], links.get("上半身"))
+        self.assertIs(bones[0], links.get("上半身", offset=-1))
+        self.assertIs(bones[3], links.get("首", offset=1))
+        self.assertIsNone(links.get("頭", offset=1))
+        self.assertIsNone(links.get("下半身"))
+        self.assertEqual(2, links.index("首"))
+        self.assertEqual(["センター", "上半身", "首", "頭"], list(links.all().keys()))
+
+        # 同じボーン名・位置なら同じキー
+        from_links = links.from_links("首")
+        self.assertEqual(BoneLinks(bones[:3]), from_links)
+        self.assertEqual(hash(BoneLinks(bones[:3])), hash(from_links))
+        self.assertNotEqual(links, from_links)
+        self.assertEqual(["首", "頭"], list(links.to_links("首").all().keys()))
+
+        # 位置が違えば別のキー
+        moved_bone = bones[2].copy()
+        moved_bone.position = MVector3D(0, 2.5, 0)
+        self.assertNotEqual(from_links, BoneLinks(bones[:2] + [moved_bone]))
+
+        # ハッシュを取った後は変更できない
+        cache = {links: 1}
+        self.assertEqual(1, cache[BoneLinks(bones)])
+        with self.assertRaises(TypeError):
+            links.append(moved_bone)
+        with self.assertRaises(TypeError):
+            from_links.insert(moved_bone, "上半身")
@@ -12,16 +12,106 @@ sys.path.append(str(current_dir) + '/../src/')
 from mmd.PmxReader import PmxReader # noqa
 from mmd.VmdReader import VmdReader # noqa
 from mmd.PmxData import PmxModel, Vertex, Material, Bone, Morph, DisplaySlot, RigidBody, Joint # noqa
-from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
+from mmd.VmdData import VmdMotion, VmdBoneFrame, VmdPoseCache, VmdCameraFrame, VmdInfoIk, VmdLightFrame, VmdMorphFrame, VmdShadowFrame, VmdShowIkFrame # noqa
 from module.MMath import MRect, MVector2D, MVector3D, MVector4D, MQuaternion, MMatrix4x4 # noqa
 from module.MOptions import MOptions # noqa
 from module.MParams import BoneLinks # noqa
-from utils import MBezierUtils, MServiceUtils # noqa
+from utils import MBezierUtils, MServiceUtils, MFileutils # noqa
 from utils.MLogger import MLogger # noqa
 import itertools
+import os
+import hashlib
+import tempfile
+import random
+import math
+import numpy as np
 
 logger = MLogger(__name__)
 
+# 合成モデルのボーン（名前, 位置, 親ボーン名）
+CHAIN_BONES = [
+    ("全ての親", MVector3D(0, 0, 0), None),
+    ("センター", MVector3D(0, 8, 0), "全ての親"),
+    ("上半身", MVector3D(0, 11.5, 0.2), "センター"),
+    ("右腕", MVector3D(-1.5, 15.2, 0.4), "上半身"),
+    ("右ひじ", MVector3D(-3.5, 13.5, 0.5), "右腕"),
+    ("右手首", MVector3D(-5.2, 11.8, 0.2), "右ひじ"),
+    ("下半身", MVector3D(0, 11.5, 0.2), "センター"),
+    ("右足", MVector3D(-0.9, 10.5, 0.1), "下半身"),
+]
+
+CHAIN_LINKS = {
+    "腕": ["全ての親", "センター", "上半身", "右腕", "右ひじ", "右手首"],
+    "足": ["全ての親", "センター", "下半身", "右足"],
+}
+
+
+def create_chain_model():
+    model = PmxModel()
+    model.name = "chain"
+
+    for bidx, (bone_name, position, parent_name) in enumerate(CHAIN_BONES):
+        parent_index = model.bones[parent_name].index if parent_name else -1
+        bone = Bone(bone_name, bone_name, position, parent_index, 0, 0x0001 | 0x0002 | 0x0004 | 0x0008 | 0x0010)
+        bone.index = bidx
+        model.bones[bone_name] = bone
+        model.bone_indexes[bidx] = bone_name
+
+    return model
+
+
+def create_chain_links(model: PmxModel, bone_names: list):
+    links = BoneLinks()
+
+    for bone_name in bone_names:
+        links.append(model.bones[bone_name])
+
+    return links
+
+
+def create_chain_bf(bone_name: str, fno: int):
+    bf = VmdBoneFrame(fno)
+    bf.set_name(bone_name)
+    bf.key = True
+    bf.read = True
+    bf.position = MVector3D(random.uniform(-1, 1), random.uniform(-1, 1), random.uniform(-1, 1))
+    bf.rotation = MQuaternion.fromEulerAngles(random.uniform(-45, 45), random.uniform(-45, 45), random.uniform(-45, 45))
+
+    return bf
+
+
+def create_chain_motion(model: PmxModel, last_fno: int):
+    motion = VmdMotion()
+
+    for bone_name in model.bones.keys():
+        for fno in range(0, last_fno + 1, 5):
+            motion.append_bone_frame(create_chain_bf(bone_name, fno))
+
+    motion.last_motion_frame = last_fno
+
+    return motion
+
+
+def create_chain_ik(model: PmxModel, motion: VmdMotion, fno: int, ik_bone_names: list, offset: MVector3D):
+    links = create_chain_links(model, CHAIN_LINKS["腕"])
+
+    ik_links = BoneLinks()
+    for bone_name in ik_bone_names:
+        model.bones[bone_name].degree_limit = 57.0
+        ik_links.append(model.bones[bone_name])
+
+    # 目標位置は、元のエフェクタ位置を根元に寄せて、一定量ずらした所
+    global_3ds = MServiceUtils.calc_global_pos(model, links, motion, fno)
+    root_pos = global_3ds["右腕"]
+    target_pos = root_pos + (global_3ds["右手首"] - root_pos) * 0.9 + offset
+
+    return links, ik_links, target_pos
+
+
+def is_same_global_pos(global_3ds1: dict, global_3ds2: dict):
+    return global_3ds1.keys() == global_3ds2.keys() \
+        and all([np.allclose(global_3ds1[k].data(), global_3ds2[k].data(), rtol=0, atol=1e-6) for k in global_3ds1.keys()])
+
 
 class MServiceUtilsSeparateTest(unittest.TestCase):
 
@@ -413,6 +503,322 @@ class MServiceUtilsTest(unittest.TestCase):
         self.assertAlmostEqual(pos_dic["右手首"].y(), 13.83, delta=0.1)
         self.assertAlmostEqual(pos_dic["右手首"].z(), 0.23, delta=0.1)
                 
+    def test_calc_global_pos_cache(self):
+        random.seed(0)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 60)
+        cache_motion = motion.copy()
+        cache_motion.pose_cache = VmdPoseCache()
+        links_list = [create_chain_links(model, bone_names) for bone_names in CHAIN_LINKS.values()]
+
+        # 問い合わせとキーの登録を交互に行っても、キャッシュなしと同じ結果
+        mismatch_cnt = 0
+        for n in range(1000):
+            if n % 10 == 9:
+                bone_name = random.choice(list(model.bones.keys()))
+                bf = create_chain_bf(bone_name, random.randint(0, 60))
+                motion.regist_bf(bf.copy(), bone_name, bf.fno)
+                cache_motion.regist_bf(bf.copy(), bone_name, bf.fno)
+            else:
+                links = random.choice(links_list)
+                fno = random.randint(0, 60)
+                is_local_x = random.random() < 0.5
+                global_3ds, total_mats = MServiceUtils.calc_global_pos(model, links, motion, fno, return_matrix=True, is_local_x=is_local_x)
+                cache_global_3ds, cache_total_mats = MServiceUtils.calc_global_pos(model, links, cache_motion, fno, return_matrix=True, is_local_x=is_local_x)
+                if not is_same_global_pos(global_3ds, cache_global_3ds) or not is_same_global_pos(total_mats, cache_total_mats):
+                    mismatch_cnt += 1
+
+        self.assertEqual(0, mismatch_cnt)
+        hits, misses, _, _ = cache_motion.pose_cache.counts()
+        self.assertGreater(hits, 0)
+        self.assertGreater(misses, 0)
+
+    def test_calc_global_pos_cache_write(self):
+        random.seed(1)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 10)
+        motion.pose_cache = VmdPoseCache()
+        links = create_chain_links(model, CHAIN_LINKS["腕"])
+
+        before_global_3ds = MServiceUtils.calc_global_pos(model, links, motion, 5)
+
+        # regist_bf を通さずにキーフレーム辞書へ直接書き込んでも、書き換えたボーン以降は計算し直す
+        bf = motion.calc_bf("上半身", 5).copy()
+        bf.rotation = MQuaternion.fromEulerAngles(0, 0, 90)
+        motion.bones["上半身"][5] = bf
+        after_global_3ds = MServiceUtils.calc_global_pos(model, links, motion, 5)
+        self.assertFalse(is_same_global_pos(before_global_3ds, after_global_3ds))
+
+        # キーの削除でも同じ
+        del motion.bones["上半身"][5]
+        self.assertFalse(is_same_global_pos(after_global_3ds, MServiceUtils.calc_global_pos(model, links, motion, 5)))
+        motion.bones["上半身"][5] = bf
+
+        no_cache_motion = motion.copy()
+        self.assertTrue(is_same_global_pos(MServiceUtils.calc_global_pos(model, links, no_cache_motion, 5), MServiceUtils.calc_global_pos(model, links, motion, 5)))
+
+        # 参照専用の複製では、取り出したフレームを書き換えても結果は変わらず、書き込みは受け付けない
+        org_motion = motion.snapshot()
+        org_motion.pose_cache = VmdPoseCache()
+        org_global_3ds = MServiceUtils.calc_global_pos(model, links, org_motion, 5)
+        self.assertTrue(is_same_global_pos(after_global_3ds, org_global_3ds))
+        org_motion.bones["上半身"][5].rotation = MQuaternion()
+        org_motion.calc_bf("上半身", 5).rotation = MQuaternion()
+        self.assertTrue(is_same_global_pos(org_global_3ds, MServiceUtils.calc_global_pos(model, links, org_motion, 5)))
+        with self.assertRaises(TypeError):
+            org_motion.bones["上半身"][5] = bf
+
+        # トラックごと差し替えた場合は計算し直す
+        org_motion.bones["上半身"] = motion.bones["上半身"].copy()
+        org_motion.bones["上半身"][5].rotation = MQuaternion()
+        self.assertFalse(is_same_global_pos(org_global_3ds, MServiceUtils.calc_global_pos(model, links, org_motion, 5)))
+        _, _, invalidations, _ = org_motion.pose_cache.counts()
+        self.assertGreater(invalidations, 0)
+
+    def test_calc_global_pose_range(self):
+        random.seed(2)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 30)
+        links_list = [create_chain_links(model, bone_names) for bone_names in CHAIN_LINKS.values()]
+
+        # リンク指定・モデルの全ボーンのいずれも、1フレームずつ求めた結果と同じ
+        for pose_range in [MServiceUtils.calc_global_pose_range(model, motion, range(0, 31), links_list), \
+                           MServiceUtils.calc_global_pose_range(model, motion, range(0, 31))]:
+            # 範囲外のフレームはその場で計算する
+            for fno in list(range(0, 31)) + [33]:
+                for links in links_list:
+                    for is_local_x in [False, True]:
+                        global_3ds, total_mats = MServiceUtils.calc_global_pos(model, links, motion, fno, return_matrix=True, is_local_x=is_local_x)
+                        range_global_3ds, range_total_mats = pose_range.calc_global_pos(links, fno, return_matrix=True, is_local_x=is_local_x)
+                        self.assertTrue(is_same_global_pos(global_3ds, range_global_3ds))
+                        self.assertTrue(is_same_global_pos(total_mats, range_total_mats))
+
+    def test_calc_global_pos_prefix(self):
+        random.seed(3)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 30)
+
+        for bone_names in CHAIN_LINKS.values():
+            links = create_chain_links(model, bone_names)
+            for fno in [0, 7, 18, 30]:
+                # ボーン毎に、親までの行列を最初から掛け直す（従来の計算）
+                trans_vs = MServiceUtils.calc_relative_position(model, links, motion, fno)
+                add_qs = MServiceUtils.calc_relative_rotation(model, links, motion, fno)
+                matrixs = []
+                for v, q in zip(trans_vs, add_qs):
+                    mm = MMatrix4x4()
+                    mm.setToIdentity()
+                    mm.translate(v)
+                    mm.rotate(q)
+                    matrixs.append(mm)
+
+                org_global_3ds = {}
+                org_total_mats = {}
+                for n, (lname, v) in enumerate(zip(links.all().keys(), trans_vs)):
+                    mm = MMatrix4x4()
+                    mm.setToIdentity()
+                    for m in range(n):
+                        mm = matrixs[0].copy() if m == 0 else mm * matrixs[m]
+                    org_global_3ds[lname] = mm * v
+                    org_total_mats[lname] = mm * matrixs[n]
+
+                # 親までの行列の積を使い回しても同じ結果
+                global_3ds, total_mats = MServiceUtils.calc_global_pos(model, links, motion, fno, return_matrix=True)
+                self.assertTrue(is_same_global_pos(org_global_3ds, global_3ds))
+                self.assertTrue(is_same_global_pos(org_total_mats, total_mats))
+
+class MServiceUtilsIKTest(unittest.TestCase):
+
+    def test_calc_IK_suffix(self):
+        random.seed(7)
+        model = create_chain_model()
+        max_count = 20
+
+        # 手首合わせ（手首/ひじ/腕）と腕の回避（手首/腕）のリンク
+        for ik_bone_names in [["右手首", "右ひじ", "右腕"], ["右手首", "右腕"]]:
+            motion = create_chain_motion(model, 10)
+            links, ik_links, _ = create_chain_ik(model, motion, 0, ik_bone_names, MVector3D())
+            self.check_calc_IK_suffix(model, motion, links, ik_links, ik_bone_names, max_count)
+
+    def check_calc_IK_suffix(self, model: PmxModel, motion: VmdMotion, links: BoneLinks, ik_links: BoneLinks, ik_bone_names: list, max_count: int):
+        for fno in [0, 3, 7]:
+            _, _, target_pos = create_chain_ik(model, motion, fno, ik_bone_names, MVector3D(-0.3, 0.3, 0.2))
+
+            # 1ジョイント動かすごとにチェーン全体を計算し直すCCD（従来の計算）
+            full_motion = motion.copy()
+            for bone_name in ik_bone_names[1:]:
+                full_motion.regist_bf(full_motion.calc_bf(bone_name, fno), bone_name, fno)
+
+            for _ in range(max_count):
+                for joint_name in ik_bone_names[1:]:
+                    global_3ds, total_mats = MServiceUtils.calc_global_pos(model, links, full_motion, fno, return_matrix=True)
+                    inv_coord = total_mats[joint_name].inverted()
+                    local_effector_pos = inv_coord * global_3ds[ik_bone_names[0]]
+                    local_target_pos = inv_coord * target_pos
+                    basis2_effector = local_effector_pos.normalized()
+                    basis2_target = local_target_pos.normalized()
+                    rotation_radian = math.acos(max(-1, min(1, MVector3D.dotProduct(basis2_effector, basis2_target))))
+
+                    if abs(rotation_radian) > 0.0001:
+                        rotation_axis = MVector3D.crossProduct(basis2_effector, basis2_target).normalized()
+                        correct_qq = MQuaternion.fromAxisAndAngle(rotation_axis, min(math.degrees(rotation_radian), model.bones[joint_name].degree_limit))
+                        bf = full_motion.calc_bf(joint_name, fno)
+                        bf.rotation = bf.rotation * correct_qq
+
+                if (local_effector_pos - local_target_pos).lengthSquared() < 0.0001:
+                    break
+
+            # 動かしたジョイントから子側だけを計算し直しても同じ結果
+            MServiceUtils.calc_IK(model, links, motion, fno, target_pos, ik_links, max_count=max_count)
+
+            for bone_name in ik_bone_names[1:]:
+                self.assertTrue(np.allclose(full_motion.calc_bf(bone_name, fno).rotation.data().components, \
+                                            motion.calc_bf(bone_name, fno).rotation.data().components, rtol=0, atol=1e-6))
+            self.assertTrue(is_same_global_pos(MServiceUtils.calc_global_pos(model, links, full_motion, fno), MServiceUtils.calc_global_pos(model, links, motion, fno)))
+
+    def test_calc_IK_warm_start(self):
+        random.seed(8)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 20)
+        arm_links, arm_ik_links, _ = create_chain_ik(model, motion, 0, ["右手首", "右ひじ", "右腕"], MVector3D())
+        elbow_links, elbow_ik_links, _ = create_chain_ik(model, motion, 0, ["右ひじ", "右腕", "上半身"], MVector3D())
+
+        # チェーン毎に別々に記録する
+        arm_warm_start = MServiceUtils.IKWarmStart()
+        elbow_warm_start = MServiceUtils.IKWarmStart()
+        for fno in range(10):
+            _, _, target_pos = create_chain_ik(model, motion, fno, ["右手首", "右ひじ", "右腕"], MVector3D(-0.3, 0.3, 0.2))
+            MServiceUtils.calc_IK(model, arm_links, motion, fno, target_pos, arm_ik_links, max_count=20, warm_start=arm_warm_start)
+
+            if fno % 2 == 0:
+                global_3ds = MServiceUtils.calc_global_pos(model, elbow_links, motion, fno)
+                target_pos = global_3ds["右ひじ"] + MVector3D(0.1, -0.1, 0)
+                MServiceUtils.calc_IK(model, elbow_links, motion, fno, target_pos, elbow_ik_links, max_count=20, warm_start=elbow_warm_start)
+
+        for warm_start, solve_count in [(arm_warm_start, 10), (elbow_warm_start, 5)]:
+            counts = warm_start.counts()
+            self.assertEqual(solve_count, counts[0])
+            self.assertEqual(warm_start.converged_count, counts[1])
+            self.assertGreater(counts[1], 0)
+            self.assertLessEqual(counts[1], solve_count)
+            # 最初のフレームは引き継ぐ解がない
+            self.assertLessEqual(counts[2], solve_count - 1)
+            self.assertEqual(solve_count, sum(counts[3].values()))
+            self.assertTrue(all([1 <= iterations <= 20 for iterations in counts[3].keys()]))
+
+        # 既に目標に届いている場合は、反復せずに収束として数える
+        global_3ds = MServiceUtils.calc_global_pos(model, arm_links, motion, 15)
+        arm_warm_start.reset_counts()
+        MServiceUtils.calc_IK(model, arm_links, motion, 15, global_3ds["右手首"], arm_ik_links, max_count=20, warm_start=arm_warm_start)
+        self.assertEqual((1, 1, 0, {0: 1}), arm_warm_start.counts())
+
+    def test_calc_IK_warm_start_iterations(self):
+        random.seed(8)
+        model = create_chain_model()
+        org_motion = create_chain_motion(model, 40)
+        links, ik_links, _ = create_chain_ik(model, org_motion, 0, ["右手首", "右ひじ", "右腕"], MVector3D())
+        targets = [create_chain_ik(model, org_motion, fno, ["右手首", "右ひじ", "右腕"], MVector3D(-0.3, 0.3, 0.2))[2] for fno in range(40)]
+
+        # 引き継がない場合（反復回数の記録のみ）と比べて、平均反復回数が減る
+        mean_iterations = []
+        for is_warm in [False, True]:
+            motion = org_motion.copy()
+            warm_start = MServiceUtils.IKWarmStart(is_warm=is_warm)
+            for fno in range(40):
+                MServiceUtils.calc_IK(model, links, motion, fno, targets[fno], ik_links, max_count=20, warm_start=warm_start)
+            self.assertEqual(40, warm_start.solve_count)
+            mean_iterations.append(warm_start.mean_iterations())
+
+            if not is_warm:
+                self.assertEqual(0, warm_start.warm_count)
+                self.assertEqual({}, warm_start.deltas)
+
+        print("mean_iterations: cold %.2f, warm %.2f" % tuple(mean_iterations))
+        self.assertLess(mean_iterations[1], mean_iterations[0])
+
+    def test_calc_IK_analytic(self):
+        random.seed(3)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 10)
+        links, ik_links, target_pos = create_chain_ik(model, motion, 3, ["右手首", "右ひじ", "右腕"], MVector3D(-0.3, 0.3, 0.2))
+
+        # 届く目標は解析解だけで届く
+        MServiceUtils.ik_solve_stats.reset_counts()
+        MServiceUtils.calc_IK(model, links, motion, 3, target_pos, ik_links, max_count=20, is_analytic=True)
+        analytic_count, _, ccd_count, _, fallback_count = MServiceUtils.ik_solve_stats.counts()
+        self.assertEqual((1, 0, 0), (analytic_count, ccd_count, fallback_count))
+        self.assertLess((MServiceUtils.calc_global_pos(model, links, motion, 3)["右手首"] - target_pos).length(), 0.01)
+
+    def test_calc_IK_analytic_copied_links(self):
+        random.seed(9)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 10)
+        links, _, target_pos = create_chain_ik(model, motion, 3, ["右手首", "右ひじ", "右腕"], MVector3D(-0.3, 0.3, 0.2))
+
+        # 腕の回避と同じく、ひじ・腕を複製したボーンでリンクを作っても解析解で解く
+        ik_links = BoneLinks()
+        ik_links.append(model.bones["右手首"])
+        for bone_name in ["右ひじ", "右腕"]:
+            bone = model.bones[bone_name].copy()
+            bone.degree_limit = 57.2957
+            ik_links.append(bone)
+
+        MServiceUtils.ik_solve_stats.reset_counts()
+        MServiceUtils.calc_IK(model, links, motion, 3, target_pos, ik_links, max_count=31, is_analytic=True)
+        analytic_count, _, ccd_count, _, fallback_count = MServiceUtils.ik_solve_stats.counts()
+        self.assertEqual((1, 0, 0), (analytic_count, ccd_count, fallback_count))
+        self.assertLess((MServiceUtils.calc_global_pos(model, links, motion, 3)["右手首"] - target_pos).length(), 0.01)
+
+    def test_calc_IK_analytic_fixed_axis(self):
+        random.seed(4)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 10)
+        links, ik_links, target_pos = create_chain_ik(model, motion, 3, ["右手首", "右ひじ", "右腕"], MVector3D(-0.3, 0.3, 0.2))
+
+        # ひじに軸制限がある場合、その軸回りにだけ回す
+        fixed_axis = MVector3D(0, 0, 1)
+        model.bones["右ひじ"].fixed_axis = fixed_axis
+        MServiceUtils.calc_IK(model, links, motion, 3, target_pos, ik_links, max_count=20, is_analytic=True)
+
+        elbow_qq = motion.calc_bf("右ひじ", 3).rotation
+        self.assertGreater(elbow_qq.toDegree(), 0.01)
+        self.assertLess(MVector3D.crossProduct(elbow_qq.vector().normalized(), fixed_axis).length(), 1e-4)
+
+    def test_calc_IK_analytic_limit(self):
+        random.seed(5)
+        model = create_chain_model()
+        motion = create_chain_motion(model, 10)
+        links, ik_links, target_pos = create_chain_ik(model, motion, 3, ["右手首", "右ひじ", "右腕"], MVector3D(-2, 2, 1))
+
+        # IK軸制限がある場合、各軸の角度は制限内（合成した角度も軸ごとの上限の合計以内）
+        for bone_name in ["右ひじ", "右腕"]:
+            model.bones[bone_name].ik_limit_min = MVector3D(-5, -5, -5)
+            model.bones[bone_name].ik_limit_max = MVector3D(5, 5, 5)
+
+        MServiceUtils.ik_solve_stats.reset_counts()
+        MServiceUtils.calc_IK(model, links, motion, 3, target_pos, ik_links, max_count=20, is_analytic=True)
+
+        for bone_name in ["右ひじ", "右腕"]:
+            self.assertLessEqual(motion.calc_bf(bone_name, 3).rotation.toDegree(), 15 + 1e-4)
+
+        # 制限で届かないので、解析解からCCDに切り替えて続ける
+        analytic_count, _, ccd_count, _, fallback_count = MServiceUtils.ik_solve_stats.counts()
+        self.assertEqual((0, 1, 1), (analytic_count, ccd_count, fallback_count))
+
+    def test_calc_IK_analytic_fallback(self):
+        random.seed(6)
+        model = create_chain_model()
+
+        # 2ボーンではない・親子順が違うリンクは、最初からCCDで解く
+        for ik_bone_names in [["右手首", "右ひじ", "右腕", "上半身"], ["右手首", "右腕", "右ひじ"]]:
+            motion = create_chain_motion(model, 10)
+            links, ik_links, target_pos = create_chain_ik(model, motion, 3, ik_bone_names, MVector3D(-0.3, 0.3, 0.2))
+
+            MServiceUtils.ik_solve_stats.reset_counts()
+            MServiceUtils.calc_IK(model, links, motion, 3, target_pos, ik_links, max_count=20, is_analytic=True)
+            analytic_count, _, ccd_count, _, fallback_count = MServiceUtils.ik_solve_stats.counts()
+            self.assertEqual((0, 1, 0), (analytic_count, ccd_count, fallback_count))
+
 
 class MBezierUtilsTest(unittest.TestCase):
 
@@ -466,6 +872,65 @@ class MBezierUtilsTest(unittest.TestCase):
         self.assertAlmostEqual(y, 0.34, delta=0.01)
         self.assertAlmostEqual(t, 0.16, delta=0.01)
     
+    def test_MBezierUtils_evaluate_frames(self):
+        nows = [0, 1, 5, 17, 29, 30]
+        xs, ys, ts = MBezierUtils.evaluate_frames(104, 63, 13, 111, 0, nows, 30)
+
+        # 1フレームずつ評価した場合と同じ
+        for n, now in enumerate(nows):
+            x, y, t = MBezierUtils.evaluate(104, 63, 13, 111, 0, now, 30)
+            self.assertEqual(x, xs[n])
+            self.assertEqual(y, ys[n])
+            self.assertEqual(t, ts[n])
+
+    def test_BezierLUTCache(self):
+        lut_cache = MBezierUtils.BezierLUTCache(max_size=2)
+
+        lut1 = lut_cache.get(20, 107)
+        lut2 = lut_cache.get(0, 127)
+        self.assertIs(lut1, lut_cache.get(20, 107))
+
+        # 一番使われていない (0, 127) から捨てる
+        lut3 = lut_cache.get(127, 0)
+        self.assertIs(lut1, lut_cache.get(20, 107))
+        self.assertIsNot(lut2, lut_cache.get(0, 127))
+        self.assertEqual((2, 4, 2, 2), lut_cache.counts())
+        self.assertAlmostEqual(0.5, lut3.calc_t(0.5), delta=0.01)
+
+        # MMDの範囲外の制御点は表を作らない
+        self.assertIsNone(lut_cache.get(128, 0))
+
+    def test_join_value_2_bezier_least_squares(self):
+        # MMDの補間曲線で動かした値からは、同じ補間曲線が求まる
+        xs, ys, ts = MBezierUtils.evaluate_frames(20, 50, 90, 110, 0, list(range(31)), 30)
+        joined_bz, inflection = MBezierUtils.join_value_2_bezier(30, "test", list(3 + 5 * ys), diff_limit=0.01, is_least_squares=True)
+        self.assertEqual([(0, 0), (20, 50), (90, 110), (127, 127)], [(bz.x(), bz.y()) for bz in joined_bz])
+        self.assertEqual([], inflection)
+
+        # 始点と終点が同じ値の場合、途中も同じ値なら線形補間
+        joined_bz, inflection = MBezierUtils.join_value_2_bezier(5, "test", [1, 1, 1, 1, 1, 1], diff_limit=0.01, is_least_squares=True)
+        self.assertIs(MBezierUtils.LINEAR_MMD_INTERPOLATION, joined_bz)
+
+        # 行って戻る値は1つの補間曲線では表せないので、差の大きいフレームを返す
+        joined_bz, inflection = MBezierUtils.join_value_2_bezier(6, "test", [0, 1, 2, 3, 2, 1, 2], diff_limit=0.01, is_least_squares=True)
+        self.assertIsNone(joined_bz)
+        self.assertIn(3, inflection)
+
+    def test_join_value_2_bezier_legacy(self):
+        # 従来の方法（既定）は、bezier のバージョンによらず変更前と同じ結果（値は変更前の実装で求めたもの）
+        xs, ys, ts = MBezierUtils.evaluate_frames(20, 50, 90, 110, 0, list(range(31)), 30)
+        joined_bz, inflection = MBezierUtils.join_value_2_bezier(30, "test", list(3 + 5 * ys), diff_limit=0.01)
+        self.assertIsNone(joined_bz)
+        self.assertEqual(list(range(1, 29)) + [30], inflection)
+
+        joined_bz, inflection = MBezierUtils.join_value_2_bezier(5, "test", [1, 1, 1, 1, 1, 1], diff_limit=0.01)
+        self.assertEqual([(0, 0), (45, 0), (89, 0), (127, 0)], [(bz.x(), bz.y()) for bz in joined_bz])
+        self.assertEqual([], inflection)
+
+        joined_bz, inflection = MBezierUtils.join_value_2_bezier(6, "test", [0, 1, 2, 3, 2, 1, 2], diff_limit=0.01)
+        self.assertIsNone(joined_bz)
+        self.assertEqual([1, 2, 3, 4, 5, 6], inflection)
+
     def test_round_integer(self):
         self.assertEqual(MBezierUtils.round_integer(3.56), 4)
         self.assertEqual(MBezierUtils.round_integer(3.52), 4)
@@ -529,6 +994,151 @@ class MBezierUtilsTest(unittest.TestCase):
         self.assertFalse(is_fit_before_bz)
         self.assertTrue(is_fit_after_bz)
 
+    def test_split_bezier_mmd_cases(self):
+        # (x1, y1, x2, y2, start, now, end): (x, y, t, is_fit_before_bz, is_fit_after_bz, before_bz, after_bz)
+        cases = [
+            ((20, 20, 107, 107, 0, 5, 10), (0.5, 0.5000192837452289, 0.5000152587890625, True, True, [(0, 0), (20, 20), (74, 74), (127, 127)], [(0, 0), (54, 54), (107, 107), (127, 127)])),
+            ((127, 0, 0, 127, 0, 8, 15), (0.5333333333333333, 0.7874477744936215, 0.7027435302734375, False, True, [(0, 0), (167, 0), (99, 80), (127, 127)], [(0, 0), (13, 74), (46, 127), (127, 127)])),
+            ((64, 0, 64, 127, 3, 4, 30), (0.037037037037037035, 0.001862990814863963, 0.0251312255859375, True, True, [(0, 0), (43, 0), (86, 43), (127, 127)], [(0, 0), (62, 6), (63, 127), (127, 127)])),
+            ((0, 127, 127, 0, 10, 25, 40), (0.5, 0.5000000000000142, 0.5000152587890625, True, True, [(0, 0), (0, 127), (64, 127), (127, 127)], [(0, 0), (64, 0), (127, 0), (127, 127)])),
+            ((10, 100, 90, 30, 0, 1, 2), (0.5, 0.5310784038622475, 0.5643463134765625, True, True, [(0, 0), (11, 106), (67, 111), (127, 127)], [(0, 0), (46, 14), (95, 37), (127, 127)])),
+            ((127, 127, 127, 127, 0, 3, 7), (0.42857142857142855, 0.42858755801507087, 0.1701812744140625, True, True, [(0, 0), (50, 50), (92, 92), (127, 127)], [(0, 0), (127, 127), (127, 127), (127, 127)])),
+            ((50, 10, 60, 120, 100, 137, 160), (0.6166666666666667, 0.7633761669797015, 0.6906890869140625, True, True, [(0, 0), (56, 9), (81, 81), (127, 127)], [(0, 0), (33, 67), (73, 118), (127, 127)])),
+            ((20, 20, 107, 107, 0, 0, 10), (0, 0, 0, False, False, [(0, 0), (20, 20), (107, 107), (127, 127)], [(0, 0), (20, 20), (107, 107), (127, 127)]))
+        ]
+
+        for args, (x, y, t, is_fit_before_bz, is_fit_after_bz, before_bz, after_bz) in cases:
+            result = MBezierUtils.split_bezier_mmd(*args)
+            self.assertAlmostEqual(x, result[0], delta=1e-12)
+            self.assertAlmostEqual(y, result[1], delta=1e-12)
+            self.assertAlmostEqual(t, result[2], delta=1e-12)
+            self.assertEqual((is_fit_before_bz, is_fit_after_bz), (result[3], result[4]))
+            self.assertEqual(before_bz, [(v.x(), v.y()) for v in result[5]])
+            self.assertEqual(after_bz, [(v.x(), v.y()) for v in result[6]])
+
+    def test_evaluate_by_t_cases(self):
+        # (x1, y1, x2, y2, start, end, t): (fno, y, t)
+        cases = [
+            ((20, 20, 107, 107, 0, 10, 0.5), (5, 0.5, 0.5)),
+            ((127, 0, 0, 127, 0, 15, 0.25), (7, 0.15625, 0.25)),
+            ((64, 0, 64, 127, 3, 30, 0.731), (22, 0.821847218, 0.731)),
+            ((0, 127, 127, 0, 10, 40, 1.0), (40, 1.0, 1.0)),
+            ((10, 100, 90, 30, 0, 2, 0.5), (1, 0.5088582677165354, 0.5)),
+            ((50, 10, 60, 120, 100, 160, 0.0), (100, 0.0, 0.0)),
+            ((50, 10, 60, 120, 100, 160, 0.125), (108, 0.06331508366141733, 0.125)),
+            ((20, 20, 107, 107, 3, 4, 0.5), (3, 0, 0.5))
+        ]
+
+        for args, (fno, y, t) in cases:
+            result = MBezierUtils.evaluate_by_t(*args)
+            self.assertEqual(fno, result[0])
+            self.assertAlmostEqual(y, result[1], delta=1e-12)
+            self.assertEqual(t, result[2])
+
+
+class RaisingLogArg():
+
+    def __init__(self):
+        self.cnt = 0
+
+    def to_log(self):
+        self.cnt += 1
+        raise ValueError("to_log")
+
+    def __str__(self):
+        self.cnt += 1
+        raise ValueError("__str__")
+
+
+class MLoggerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.total_level = MLogger.total_level
+
+    def tearDown(self):
+        MLogger.total_level = self.total_level
+
+    def test_lazy_debug_args(self):
+        MLogger.total_level = MLogger.INFO
+        logger = MLogger(__name__, level=MLogger.INFO)
+        arg = RaisingLogArg()
+
+        # DEBUGより上のレベルでは、引数の文字列化も遅延引数の評価もしない
+        self.assertFalse(logger.is_enabled(MLogger.DEBUG))
+        logger.debug("arg: %s", arg)
+        logger.test("arg: %s", MLogger.lazy(arg.to_log))
+        logger.debug("arg: %s, %s", MLogger.lazy(arg.to_log), arg)
+        self.assertEqual(0, arg.cnt)
+
+        # 出力するレベルでは、遅延引数は1回だけ評価する
+        MLogger.total_level = MLogger.DEBUG
+        logger = MLogger(__name__, level=MLogger.DEBUG)
+        self.assertTrue(logger.is_enabled(MLogger.DEBUG))
+        calls = []
+        lazy_arg = MLogger.lazy(lambda v: calls.append(v) or v * 2, 21)
+        logger.debug("lazy: %s, %s", lazy_arg, lazy_arg)
+        self.assertEqual("42", str(lazy_arg))
+        self.assertEqual([21], calls)
+
+        with self.assertRaises(ValueError):
+            logger.debug("arg: %s", MLogger.lazy(arg.to_log))
+        self.assertEqual(1, arg.cnt)
+
+
+class MFileutilsTest(unittest.TestCase):
+
+    # 従来のチャンク読み込みでのハッシュ値
+    def calc_chunk_digest(self, file_path):
+        sha1 = hashlib.sha1()
+
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(2048 * sha1.block_size), b''):
+                sha1.update(chunk)
+
+        sha1.update(chunk)
+
+        # ファイルパスをハッシュに含める
+        sha1.update(file_path.encode('utf-8'))
+
+        return sha1.hexdigest()
+
+    def test_get_file_digest(self):
+        chunk_size = 2048 * hashlib.sha1().block_size
+
+        with tempfile.TemporaryDirectory() as dir_path:
+            for size in [1, 100, chunk_size - 1, chunk_size, chunk_size + 1, chunk_size * 2, chunk_size * 2 + 10]:
+                file_path = os.path.join(dir_path, "digest_{0}.vmd".format(size))
+                with open(file_path, 'wb') as f:
+                    f.write(bytes([(n * 7) % 256 for n in range(size)]))
+
+                # キャッシュなし・キャッシュあり・バッファ指定のいずれも従来と同じ
+                expected = self.calc_chunk_digest(file_path)
+                self.assertEqual(expected, MFileutils.get_file_digest(file_path))
+                self.assertEqual(expected, MFileutils.get_file_digest(file_path))
+                with MFileutils.open_file_buffer(file_path) as buffer:
+                    self.assertEqual(expected, MFileutils.get_file_digest(file_path, buffer))
+
+            # 内容が変わったら再計算する
+            file_path = os.path.join(dir_path, "digest_1.vmd")
+            with open(file_path, 'wb') as f:
+                f.write(b'abc')
+            self.assertEqual(self.calc_chunk_digest(file_path), MFileutils.get_file_digest(file_path))
+
+    def test_get_file_digest_limit(self):
+        with tempfile.TemporaryDirectory() as dir_path:
+            file_paths = []
+            for n in range(MFileutils.FILE_DIGESTS_MAX + 10):
+                file_path = os.path.join(dir_path, "digest_{0}.vmd".format(n))
+                with open(file_path, 'wb') as f:
+                    f.write(str(n).encode('utf-8'))
+                MFileutils.get_file_digest(file_path)
+                file_paths.append(file_path)
+
+            # 上限を超えたら古いものから捨てる
+            self.assertLessEqual(len(MFileutils.file_digests), MFileutils.FILE_DIGESTS_MAX)
+            self.assertNotIn(file_paths[0], MFileutils.file_digests)
+            self.assertIn(file_paths[-1], MFileutils.file_digests)
+
 
 if __name__ == "__main__":
     unittest.main()